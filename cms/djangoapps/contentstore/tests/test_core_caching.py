@@ -3,9 +3,15 @@ Tests core caching facilities.
 """
 
 from django.test import TestCase
+from django.test.utils import override_settings
+from mock import patch
 
 from opaque_keys.edx.locations import Location
-from openedx.core.djangoapps.contentserver.caching import get_cached_content, set_cached_content, del_cached_content
+from openedx.core.djangoapps.contentserver.caching import (
+    DEFAULT_CACHE_TIERS, LOCAL_CONTENT_CACHE, get_cache_tiers, get_cached_content, get_cached_content_metadata,
+    set_cached_content, del_cached_content
+)
+from xmodule.contentstore.content import StaticContent
 
 
 class Content(object):
@@ -43,3 +49,86 @@ class CachingTestCase(TestCase):
                          'should not be stored in cache with unicodeLocation')
         self.assertEqual(None, get_cached_content(self.nonUnicodeLocation),
                          'should not be stored in cache with nonUnicodeLocation')
+
+
+@override_settings(COURSE_ASSET_CACHE_TIERS={
+    'LOCAL_MAX_ASSET_SIZE': 10, 'LOCAL_MAX_SIZE': 25, 'SHARED_MAX_ASSET_SIZE': 100,
+})
+class CacheTiersTestCase(TestCase):
+    """
+    Tests for the size tiers of the asset cache.
+    """
+    def setUp(self):
+        super(CacheTiersTestCase, self).setUp()
+        LOCAL_CONTENT_CACHE.clear()
+        self.addCleanup(LOCAL_CONTENT_CACHE.clear)
+
+    def make_content(self, name, size):
+        """
+        Returns content with data of the given size.
+        """
+        location = Location(u'c4x', u'mitX', u'800', u'run', u'asset', name)
+        return StaticContent(location, name, 'text/plain', 'x' * size, length=size, content_digest=name)
+
+    def cached_locally(self, content):
+        """
+        Returns whether the content is cached in this process.
+        """
+        return LOCAL_CONTENT_CACHE.get(unicode(content.location).encode('utf-8')) is not None
+
+    def test_small_content(self):
+        content = self.make_content('small.txt', 10)
+        set_cached_content(content)
+        self.assertTrue(self.cached_locally(content))
+        self.assertEqual(get_cached_content(content.location).data, content.data)
+
+    def test_medium_content(self):
+        content = self.make_content('medium.txt', 100)
+        set_cached_content(content)
+        self.assertFalse(self.cached_locally(content))
+        self.assertEqual(get_cached_content(content.location).data, content.data)
+
+    def test_large_content(self):
+        content = self.make_content('large.txt', 101)
+        set_cached_content(content)
+        self.assertIsNone(get_cached_content(content.location))
+        self.assertEqual(get_cached_content_metadata(content.location).content_digest, 'large.txt')
+
+    def test_local_size_limit(self):
+        contents = [self.make_content('small{}.txt'.format(index), 10) for index in range(3)]
+        for content in contents:
+            set_cached_content(content)
+        self.assertEqual(LOCAL_CONTENT_CACHE.size, 20)
+        self.assertFalse(self.cached_locally(contents[0]))
+        self.assertTrue(self.cached_locally(contents[2]))
+
+    def test_deleted_in_other_process(self):
+        content = self.make_content('small.txt', 10)
+        set_cached_content(content)
+        # Deleting the content in another process only deletes it from the shared cache.
+        with patch.object(LOCAL_CONTENT_CACHE, 'delete'):
+            del_cached_content(content.location)
+        self.assertTrue(self.cached_locally(content))
+        self.assertIsNone(get_cached_content(content.location))
+        self.assertFalse(self.cached_locally(content))
+
+    def test_hits_and_misses(self):
+        content = self.make_content('small.txt', 10)
+        with patch('openedx.core.djangoapps.contentserver.caching.dog_stats_api') as mock_dog_stats_api:
+            get_cached_content(content.location)
+            set_cached_content(content)
+            get_cached_content(content.location)
+        self.assertEqual(
+            [(args[0], kwargs['tags']) for args, kwargs in mock_dog_stats_api.increment.call_args_list],
+            [
+                ('contentserver.cache.misses', ['tier:local']),
+                ('contentserver.cache.misses', ['tier:shared']),
+                ('contentserver.cache.hits', ['tier:local']),
+            ]
+        )
+
+    @override_settings(COURSE_ASSET_CACHE_TIERS={'LOCAL_MAX_ASSET_SIZE': 10})
+    def test_partial_override(self):
+        tiers = get_cache_tiers()
+        self.assertEqual(tiers['LOCAL_MAX_ASSET_SIZE'], 10)
+        self.assertEqual(tiers['SHARED_MAX_ASSET_SIZE'], DEFAULT_CACHE_TIERS['SHARED_MAX_ASSET_SIZE'])
@@ -2,10 +2,12 @@ import logging
 from functools import partial
 import math
 import json
+import re
 from pymongo import ASCENDING, DESCENDING
 
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
+from django.core.cache import cache
 from django.core.exceptions import PermissionDenied
 from django.http import HttpResponseBadRequest, HttpResponseNotFound
 from django.utils.translation import ugettext as _
@@ -15,6 +17,7 @@ from django.views.decorators.http import require_http_methods, require_POST
 from edxmako.shortcuts import render_to_response
 from contentstore.utils import reverse_course_url
 from contentstore.views.exception import AssetNotFoundException
+from opaque_keys import InvalidKeyError
 from opaque_keys.edx.keys import CourseKey, AssetKey
 from openedx.core.djangoapps.contentserver.caching import del_cached_content
 from student.auth import has_course_author_access
@@ -26,6 +29,10 @@ from xmodule.exceptions import NotFoundError
 from xmodule.modulestore.django import modulestore
 from xmodule.modulestore.exceptions import ItemNotFoundError
 
+# How long the number of assets of a course is cached for, in seconds. It's cached for each
+# version of the course's assets, so it's counted again whenever they change.
+ASSET_COUNT_CACHE_TIMEOUT = 5 * 60
+
 __all__ = ['assets_handler']
 
 # pylint: disable=unused-argument
@@ -45,6 +52,8 @@ def assets_handler(request, course_key_string=None, asset_key_string=None):
         json: returns a page of assets. The following parameters are supported:
             page: the desired page of results (defaults to 0)
             page_size: the number of items per page (defaults to 50)
+            after: the id of the last asset of the previous page, if it's the page before the desired
+                one, which makes fetching the page faster on courses with many assets
             sort: the asset field to sort by (defaults to "date_added")
             direction: the sort direction (defaults to "descending")
     POST
@@ -102,24 +111,26 @@ def _assets_json(request, course_key):
         requested_filter, None)
     filter_params = None
     if requested_filter:
+        # Match the content types case-insensitively, with regular expressions rather than $where,
+        # which runs JavaScript for every asset of the course.
         if requested_filter == 'OTHER':
             all_filters = settings.FILES_AND_UPLOAD_TYPE_FILTERS
-            where = []
+            content_types = []
             for all_filter in all_filters:
-                extension_filters = all_filters[all_filter]
-                where.extend(
-                    ["JSON.stringify(this.contentType).toUpperCase() != JSON.stringify('{}').toUpperCase()".format(
-                        extension_filter) for extension_filter in extension_filters])
+                content_types.extend(all_filters[all_filter])
             filter_params = {
-                "$where": ' && '.join(where),
+                "contentType": {"$nin": _content_type_regexes(content_types)},
             }
         else:
-            where = ["JSON.stringify(this.contentType).toUpperCase() == JSON.stringify('{}').toUpperCase()".format(
-                req_filter) for req_filter in requested_file_types]
             filter_params = {
-                "$where": ' || '.join(where),
+                "contentType": {"$in": _content_type_regexes(requested_file_types)},
             }
 
+    try:
+        after = AssetKey.from_string(request.GET['after']) if request.GET.get('after') else None
+    except InvalidKeyError:
+        after = None
+
     sort_direction = DESCENDING
     if request.GET.get('direction', '').lower() == 'asc':
         sort_direction = ASCENDING
@@ -137,9 +148,11 @@ def _assets_json(request, course_key):
         'current_page': current_page,
         'page_size': requested_page_size,
         'sort': sort,
-        'filter_params': filter_params
+        'filter_params': filter_params,
+        'after': after,
     }
-    assets, total_count = _get_assets_for_page(request, course_key, options)
+    total_count = _get_asset_count(course_key, requested_filter, filter_params)
+    assets = _get_assets_for_page(request, course_key, options)
     end = start + len(assets)
 
     # If the query is beyond the final page, then re-query the final page so
@@ -147,7 +160,8 @@ def _assets_json(request, course_key):
     if requested_page > 0 and start >= total_count:
         options['current_page'] = current_page = int(math.floor((total_count - 1) / requested_page_size))
         start = current_page * requested_page_size
-        assets, total_count = _get_assets_for_page(request, course_key, options)
+        options['after'] = None
+        assets = _get_assets_for_page(request, course_key, options)
         end = start + len(assets)
 
     asset_json = []
@@ -191,9 +205,40 @@ def _get_assets_for_page(request, course_key, options):
     filter_params = options['filter_params'] if options['filter_params'] else None
     start = current_page * page_size
 
-    return contentstore().get_all_content_for_course(
-        course_key, start=start, maxresults=page_size, sort=sort, filter_params=filter_params
+    assets, __ = contentstore().get_all_content_for_course(
+        course_key, start=start, maxresults=page_size, sort=sort, filter_params=filter_params,
+        after=options.get('after'), with_count=False
     )
+    return assets
+
+
+def _content_type_regexes(content_types):
+    """
+    Returns regular expressions matching each of the given content types, ignoring case.
+    """
+    return [re.compile(u'^{}$'.format(re.escape(content_type)), re.IGNORECASE) for content_type in content_types]
+
+
+def _asset_count_cache_key(course_key):
+    """
+    Returns the key of the cached numbers of assets of the current version of the given course's assets.
+    """
+    return u'contentstore.assets.count.{}.{}'.format(course_key, contentstore().get_asset_version(course_key))
+
+
+def _get_asset_count(course_key, requested_filter, filter_params):
+    """
+    Returns the number of assets of the given course which match the given filter, which is cached
+    (for each filter) so that it isn't counted again for every page.
+    """
+    cache_key = _asset_count_cache_key(course_key)
+    counts = cache.get(cache_key) or {}
+    if requested_filter not in counts:
+        __, counts[requested_filter] = contentstore().get_all_content_for_course(
+            course_key, maxresults=1, filter_params=filter_params
+        )
+        cache.set(cache_key, counts, ASSET_COUNT_CACHE_TIMEOUT)
+    return counts[requested_filter]
 
 
 def get_file_size(upload_file):
@@ -16,7 +16,7 @@ from django.contrib.auth.decorators import login_required
 from django.core.exceptions import SuspiciousOperation, PermissionDenied
 from django.core.files.temp import NamedTemporaryFile
 from django.core.servers.basehttp import FileWrapper
-from django.http import HttpResponse, HttpResponseNotFound, Http404
+from django.http import HttpResponse, HttpResponseNotFound, Http404, StreamingHttpResponse
 from django.utils.translation import ugettext as _
 from django.views.decorators.csrf import ensure_csrf_cookie
 from django.views.decorators.http import require_http_methods, require_GET
@@ -29,7 +29,9 @@ from xmodule.modulestore.django import modulestore
 from opaque_keys.edx.keys import CourseKey
 from opaque_keys.edx.locator import LibraryLocator
 from xmodule.modulestore.xml_importer import import_course_from_xml, import_library_from_xml
-from xmodule.modulestore.xml_exporter import export_course_to_xml, export_library_to_xml
+from xmodule.modulestore.xml_exporter import (
+    export_course_to_xml, export_library_to_xml, stream_course_export_tarball
+)
 from xmodule.modulestore import COURSE_ROOT, LIBRARY_ROOT
 
 from student.auth import has_course_author_access
@@ -456,6 +458,22 @@ def send_tarball(tarball):
     return response
 
 
+def stream_export_tarball(course_module):
+    """
+    Renders the export tarball of a course to a streaming response, as it is generated, without
+    writing the export to disk.
+
+    Unlike create_export_tarball, export errors can't be rendered: they end the response early.
+    """
+    name = course_module.url_name
+    response = StreamingHttpResponse(
+        stream_course_export_tarball(modulestore(), contentstore(), course_module.id, name),
+        content_type='application/x-tgz'
+    )
+    response['Content-Disposition'] = 'attachment; filename=%s' % (name + '.tar.gz').encode('utf-8')
+    return response
+
+
 @ensure_csrf_cookie
 @login_required
 @require_http_methods(("GET",))
@@ -503,6 +521,8 @@ def export_handler(request, course_key_string):
     requested_format = request.GET.get('_accept', request.META.get('HTTP_ACCEPT', 'text/html'))
 
     if 'application/x-tgz' in requested_format:
+        if settings.FEATURES.get('ENABLE_STREAMING_EXPORT') and not isinstance(course_key, LibraryLocator):
+            return stream_export_tarball(courselike_module)
         try:
             tarball = create_export_tarball(courselike_module, course_key, context)
         except SerializationError:
@@ -182,6 +182,40 @@ class PaginationTestCase(AssetsTestCase):
         self.assert_correct_asset_response(
             self.url + "?page_size=3&page=1", 3, 1, 4)
 
+    def test_json_responses_after(self):
+        """
+        Test continuing from the last asset of the previous page
+        """
+        for index in range(5):
+            self.upload_asset("asset-{}".format(index))
+
+        for sort in ('date_added', 'display_name'):
+            url = self.url + "?page_size=2&sort=" + sort
+            first_page = json.loads(self.client.get(url, HTTP_ACCEPT='application/json').content)
+            second_page = json.loads(self.client.get(url + "&page=1", HTTP_ACCEPT='application/json').content)
+            resp = self.client.get(
+                url + "&page=1&after=" + first_page['assets'][-1]['id'], HTTP_ACCEPT='application/json'
+            )
+            json_response = json.loads(resp.content)
+            self.assertEquals(json_response['start'], 2)
+            self.assertEquals(json_response['totalCount'], 5)
+            self.assertEquals(
+                [asset['id'] for asset in json_response['assets']],
+                [asset['id'] for asset in second_page['assets']]
+            )
+
+        # Deleting an asset updates the cached count.
+        test_url = reverse_course_url(
+            'assets_handler', self.course.id, kwargs={'asset_key_string': first_page['assets'][0]['id']})
+        resp = self.client.delete(test_url, HTTP_ACCEPT='application/json')
+        self.assertEquals(resp.status_code, 204)
+        self.assert_correct_asset_response(self.url, 0, 4, 4)
+
+        # So does saving an asset without the view, e.g. by importing.
+        asset_key = self.course.id.make_asset_key('asset', 'imported.txt')
+        contentstore().save(StaticContent(asset_key, 'imported.txt', 'text/plain', 'imported'))
+        self.assert_correct_asset_response(self.url, 0, 5, 5)
+
     @mock.patch('xmodule.contentstore.mongo.MongoContentStore.get_all_content_for_course')
     def test_mocked_filtered_response(self, mock_get_all_content_for_course):
         """
@@ -6,17 +6,20 @@ import ddt
 import json
 import logging
 import lxml
+import mock
 import os
 import shutil
 import tarfile
 import tempfile
 from path import Path as path
+from StringIO import StringIO
 from uuid import uuid4
 
 from django.test.utils import override_settings
 from django.conf import settings
 
 from contentstore.tests.test_libraries import LibraryTestCase
+from xmodule.contentstore.content import StaticContent
 from xmodule.contentstore.django import contentstore
 from xmodule.modulestore.django import modulestore
 from xmodule.modulestore.xml_exporter import export_library_to_xml, export_course_to_xml
@@ -558,6 +561,27 @@ class ExportTestCase(CourseTestCase):
         self.assertEquals(resp.status_code, 200)
         self.assertTrue(resp.get('Content-Disposition').startswith('attachment'))
 
+    @mock.patch.dict('django.conf.settings.FEATURES', {'ENABLE_STREAMING_EXPORT': True})
+    def test_export_targz_streaming(self):
+        """
+        Get tar.gz file streamed as it is generated.
+        """
+        asset_key = self.course.id.make_asset_key('asset', 'streamed.txt')
+        contentstore().save(StaticContent(asset_key, 'streamed.txt', 'text/plain', 'streamed asset'))
+
+        resp = self.client.get(self.url + '?_accept=application/x-tgz')
+        self._verify_export_succeeded(resp)
+        self.assertTrue(resp.streaming)
+
+        name = self.course.url_name
+        with tarfile.open(fileobj=StringIO(''.join(resp.streaming_content))) as tar_file:
+            names = tar_file.getnames()
+            self.assertIn(name + '/course.xml', names)
+            self.assertIn(name + '/policies/assets.json', names)
+            self.assertEqual(tar_file.extractfile(name + '/static/streamed.txt').read(), 'streamed asset')
+            policy = json.load(tar_file.extractfile(name + '/policies/assets.json'))
+            self.assertEqual(policy['streamed.txt']['contentType'], 'text/plain')
+
     def test_export_failure_top_level(self):
         """
         Export failure.
@@ -218,6 +218,10 @@ FEATURES = {
 
     # Set this to False to facilitate cleaning up invalid xml from your modulestore.
     'ENABLE_XBLOCK_XML_VALIDATION': True,
+
+    # Stream course exports to the browser as they are generated, rather than writing them to
+    # disk first. Export errors then end the download early instead of showing an error page.
+    'ENABLE_STREAMING_EXPORT': False,
 }
 
 ENABLE_JASMINE = False
@@ -381,6 +385,7 @@ MIDDLEWARE_CLASSES = (
     'django.middleware.locale.LocaleMiddleware',
 
     'codejail.django_integration.ConfigureCodeJailMiddleware',
+    'util.sandboxing.ConfigureSandboxPoolMiddleware',
 
     # catches any uncaught RateLimitExceptions and returns a 403 instead of a 500
     'ratelimitbackend.middleware.RateLimitMiddleware',
@@ -443,6 +448,9 @@ MODULESTORE = {
                         'default_class': 'xmodule.hidden_module.HiddenDescriptor',
                         'fs_root': DATA_DIR,
                         'render_template': 'edxmako.shortcuts.render_to_string',
+                        # Cache up to this many blocks of course structures in each
+                        # process (0 to not cache them).
+                        'structure_cache_max_blocks': 0,
                     }
                 },
                 {
@@ -477,6 +485,16 @@ CODE_JAIL = {
         # How many CPU seconds can jailed code use?
         'CPU': 1,
     },
+
+    # The pool of sandboxes that are started ahead of time, with the
+    # sandbox packages imported, in each process.
+    'pool': {
+        # How many idle sandboxes to keep.  0 means don't use a pool.
+        'size': 0,
+        # How many executions can use the pool at once?  More executions
+        # start a sandbox of their own.
+        'max_queue': 4,
+    },
 }
 
 ############################ DJANGO_BUILTINS ################################
@@ -519,6 +537,11 @@ if not EDX_PLATFORM_REVISION:
 STATIC_URL = '/static/' + EDX_PLATFORM_REVISION + "/"
 STATIC_ROOT = ENV_ROOT / "staticfiles" / EDX_PLATFORM_REVISION
 
+# Overrides of the size thresholds, in bytes, of the tiers in which the contentserver caches
+# course assets (LOCAL_MAX_ASSET_SIZE, LOCAL_MAX_SIZE and SHARED_MAX_ASSET_SIZE): see
+# DEFAULT_CACHE_TIERS in openedx.core.djangoapps.contentserver.caching for their defaults.
+COURSE_ASSET_CACHE_TIERS = {}
+
 STATICFILES_DIRS = [
     COMMON_ROOT / "static",
     PROJECT_ROOT / "static",
@@ -5,6 +5,13 @@ define([
 ], function(_, PagingCollection, AssetModel) {
     'use strict';
 
+    /**
+     * Returns a key identifying the sort order and the filter of the collection's assets.
+     */
+    var listingKey = function(collection) {
+        return [collection.state.sortKey, collection.state.order, collection.assetType].join('|');
+    };
+
     var AssetCollection = PagingCollection.extend({
         assetType: '',
         model: AssetModel,
@@ -28,10 +35,22 @@ define([
                 asc: 'asc',
                 desc: 'desc'
             },
-            asset_type: function() { return this.assetType; }
+            asset_type: function() { return this.assetType; },
+            // When moving to the next page of the same listing, ask for the assets after
+            // the last one loaded, so that the server doesn't skip over the earlier pages.
+            after: function() {
+                var lastAsset = _.last(this.models);
+                if (lastAsset && this.state.currentPage === this.loadedPage + 1 &&
+                        listingKey(this) === this.loadedListingKey) {
+                    return lastAsset.id;
+                }
+                return null;
+            }
         },
 
         parse: function(response, options) {
+            this.loadedPage = response.page;
+            this.loadedListingKey = listingKey(this);
             response.results = response.assets;
             delete response.assets;
             return PagingCollection.prototype.parse.call(this, response, options);
@@ -424,6 +424,19 @@ define(['jquery', 'edx-ui-toolkit/js/utils/spec-helpers/ajax-helpers', 'URI', 'j
                             .toHaveClass('is-disabled');
                     });
 
+                    it('asks for the assets after the last one loaded on the next page', function() {
+                        var requests = AjaxHelpers.requests(this);
+                        assetsView.pagingView.setPage(1);
+                        AjaxHelpers.respondWithJson(requests, firstPageAssets);
+                        assetsView.pagingView.pagingFooter.$('button.next-page-link').click();
+                        expect(new URI(AjaxHelpers.currentRequest(requests).url).query(true).after)
+                            .toEqual('/c4x/A/CS102/asset/test.pdf');
+                        AjaxHelpers.respondWithJson(requests, secondPageAssets);
+                        assetsView.pagingView.pagingFooter.$('button.previous-page-link').click();
+                        expect(new URI(AjaxHelpers.currentRequest(requests).url).query(true).after)
+                            .toBeUndefined();
+                    });
+
                     it('can move back a page using the previous page button', function() {
                         var requests = AjaxHelpers.requests(this);
                         assetsView.pagingView.setPage(2);
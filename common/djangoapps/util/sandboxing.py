@@ -1,5 +1,10 @@
 import re
 from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import InvalidCacheBackendError
+from django.core.exceptions import MiddlewareNotUsed
+
+from capa.safe_exec import sandbox_pool
 
 # We'll make assets named this be importable by Python code in the sandbox.
 PYTHON_LIB_ZIP = "python_lib.zip"
@@ -38,3 +43,25 @@ def get_python_lib_zip(contentstore, course_id):
         return zip_lib.data
     else:
         return None
+
+
+def get_safe_exec_cache():
+    """
+    Return the cache of the results of Python code run in the sandbox: the
+    "safe_exec" cache if there's one configured, else the default cache.
+    """
+    try:
+        return caches['safe_exec']
+    except InvalidCacheBackendError:
+        return caches['default']
+
+
+class ConfigureSandboxPoolMiddleware(object):
+    """
+    Configure the pool of warm sandboxes from the "pool" of the CODE_JAIL setting.
+
+    Like codejail's ConfigureCodeJailMiddleware, this only runs once, at startup.
+    """
+    def __init__(self):
+        sandbox_pool.configure(**getattr(settings, 'CODE_JAIL', {}).get('pool', {}))
+        raise MiddlewareNotUsed
@@ -2,9 +2,10 @@
 Tests for sandboxing.py in util app
 """
 
+from django.core.cache import caches
 from django.test import TestCase
 from opaque_keys.edx.locator import LibraryLocator
-from util.sandboxing import can_execute_unsafe_code
+from util.sandboxing import can_execute_unsafe_code, get_safe_exec_cache
 from django.test.utils import override_settings
 from opaque_keys.edx.locations import SlashSeparatedCourseKey
 
@@ -37,3 +38,21 @@ class SandboxingTest(TestCase):
         self.assertFalse(can_execute_unsafe_code(SlashSeparatedCourseKey('edX', 'full', '2012_Fall')))
         self.assertFalse(can_execute_unsafe_code(SlashSeparatedCourseKey('edX', 'full', '2013_Spring')))
         self.assertFalse(can_execute_unsafe_code(LibraryLocator('edX', 'test_bank')))
+
+    @override_settings(CACHES={
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'default'},
+        'safe_exec': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'safe_exec'},
+    })
+    def test_safe_exec_cache(self):
+        """
+        Test that the results of sandboxed code are cached in the "safe_exec" cache if there's one
+        """
+        get_safe_exec_cache().set('key', 'value')
+        self.assertEqual(caches['safe_exec'].get('key'), 'value')
+        self.assertIsNone(caches['default'].get('key'))
+
+    def test_safe_exec_cache_default(self):
+        """
+        Test that the results of sandboxed code are cached in the default cache otherwise
+        """
+        self.assertIs(get_safe_exec_cache(), caches['default'])
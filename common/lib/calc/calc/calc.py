@@ -1,12 +1,17 @@
 """
 Parser and evaluator for FormulaResponse and NumericalResponse
 
-Uses pyparsing to parse. Main function as of now is evaluator().
+Uses pyparsing to parse. Main function as of now is evaluator(). To evaluate
+the same expression many times, use compile_expression(), whose result can
+also evaluate the expression for many samples of its variables at once, with
+NumPy arrays.
 """
 
+from collections import OrderedDict
 import math
 import operator
 import numbers
+import threading
 import numpy
 import scipy.constants
 import functions
@@ -72,6 +77,18 @@ SUFFIXES = {
     'c': 1e-2, 'm': 1e-3, 'u': 1e-6, 'n': 1e-9, 'p': 1e-12
 }
 
+# The number of compiled expressions that compile_expression() keeps.
+COMPILED_EXPRESSION_CACHE_SIZE = 1000
+
+# The functions (besides NumPy ufuncs) which can be applied to arrays of values,
+# when evaluating expressions for many samples at once.
+VECTORIZED_FUNCTIONS = frozenset([
+    functions.sec, functions.csc, functions.cot,
+    functions.arcsec, functions.arccsc,
+    functions.sech, functions.csch, functions.coth,
+    functions.arcsech, functions.arccsch, functions.arccoth,
+])
+
 
 class UndefinedVariable(Exception):
     """
@@ -200,6 +217,73 @@ def eval_product(parse_result):
     return prod
 
 
+# The following evaluation actions do the same as the ones above, but for
+# numbers or NumPy arrays of numbers (one for each sample of the variables).
+
+def operands(parse_result):
+    """
+    Return the results of the child nodes, leaving out the operators and parentheses.
+    """
+    return [k for k in parse_result if not isinstance(k, basestring)]
+
+
+def eval_atom_vectorized(parse_result):
+    """
+    Return the value wrapped by the atom, like `eval_atom`.
+    """
+    return operands(parse_result)[0]
+
+
+def eval_power_vectorized(parse_result):
+    """
+    Exponentiate the inputs right to left, like `eval_power`.
+    """
+    return reduce(lambda a, b: b ** a, reversed(operands(parse_result)))
+
+
+def eval_parallel_vectorized(parse_result):
+    """
+    Compute the inputs according to the parallel resistors operator, like `eval_parallel`.
+
+    Return NaN for the samples with a zero among the inputs.
+    """
+    inputs = operands(parse_result)
+    if len(inputs) == 1:
+        return inputs[0]
+    inputs = [numpy.asarray(e) for e in inputs]
+    result = 1. / sum(1. / e for e in inputs)
+    has_zero = reduce(numpy.logical_or, [e == 0 for e in inputs])
+    return numpy.where(has_zero, float('nan'), result)
+
+
+def eval_sum_vectorized(parse_result):
+    """
+    Add the inputs, keeping in mind their sign, like `eval_sum`.
+    """
+    total = 0.0
+    current_op = operator.add
+    for token in parse_result:
+        if isinstance(token, basestring):
+            current_op = operator.sub if token == '-' else operator.add
+        else:
+            total = current_op(total, token)
+    return total
+
+
+def eval_product_vectorized(parse_result):
+    """
+    Multiply the inputs, like `eval_product`.
+    """
+    prod = 1.0
+    current_op = operator.mul
+    for token in parse_result:
+        if isinstance(token, basestring):
+            current_op = operator.truediv if token == '/' else operator.mul
+        else:
+            prod = current_op(prod, token)
+    return prod
+
+
 def add_defaults(variables, functions, case_sensitive):
     """
     Create dictionaries with both the default and user-defined variables.
@@ -224,89 +308,203 @@ def evaluator(variables, functions, math_expr, case_sensitive=False):
      python numbers.
     -Unary functions are passed as a dictionary from string to function.
     """
-    # No need to go further.
-    if math_expr.strip() == "":
-        return float('nan')
+    return compile_expression(math_expr, case_sensitive).evaluate(variables, functions)
 
-    # Parse the tree.
-    math_interpreter = ParseAugmenter(math_expr, case_sensitive)
-    math_interpreter.parse_algebra()
 
-    # Get our variables together.
-    all_variables, all_functions = add_defaults(variables, functions, case_sensitive)
-
-    # ...and check them
-    math_interpreter.check_variables(all_variables, all_functions)
-
-    # Create a recursion to evaluate the tree.
-    if case_sensitive:
-        casify = lambda x: x
-    else:
-        casify = lambda x: x.lower()  # Lowercase for case insens.
+class CompiledExpression(object):
+    """
+    A math expression parsed once, to be evaluated with any variables and functions.
 
-    evaluate_actions = {
-        'number': eval_number,
-        'variable': lambda x: all_variables[casify(x[0])],
-        'function': lambda x: all_functions[casify(x[0])](x[1]),
+    The parse tree is turned into a tree of closures which each compute the
+    value of a node from the values of its children, using the same
+    evaluation actions as `ParseAugmenter.reduce_tree`.
+    """
+    # The evaluation actions of the nodes which only combine their children.
+    reduce_actions = {
         'atom': eval_atom,
         'power': eval_power,
         'parallel': eval_parallel,
         'product': eval_product,
         'sum': eval_sum
     }
+    vectorized_reduce_actions = {
+        'atom': eval_atom_vectorized,
+        'power': eval_power_vectorized,
+        'parallel': eval_parallel_vectorized,
+        'product': eval_product_vectorized,
+        'sum': eval_sum_vectorized
+    }
 
-    return math_interpreter.reduce_tree(evaluate_actions)
-
+    def __init__(self, math_expr, case_sensitive=False):
+        """
+        Parse `math_expr`, raising a `pyparsing.ParseException` if it can't be.
+        """
+        self.math_expr = math_expr
+        self.case_sensitive = case_sensitive
+        if math_expr.strip() == "":
+            # No need to go further.
+            self.parser = None
+            self._evaluate = lambda variables, functions: float('nan')
+        else:
+            self.parser = ParseAugmenter(math_expr, case_sensitive)
+            self.parser.parse_algebra()
+            self._evaluate = self._compile(self.parser.tree)
+        # Compiled when first needed.
+        self._evaluate_vectorized = None
 
-class ParseAugmenter(object):
-    """
-    Holds the data for a particular parse.
+    def _casify(self, name):
+        """
+        Return the name as it's looked up in the variables and functions.
+        """
+        return name if self.case_sensitive else name.lower()
 
-    Retains the `math_expr` and `case_sensitive` so they needn't be passed
-    around method to method.
-    Eventually holds the parse tree and sets of variables as well.
-    """
-    def __init__(self, math_expr, case_sensitive=False):
+    def _compile(self, node, vectorized=False):
         """
-        Create the ParseAugmenter for a given math expression string.
+        Return a function of (all_variables, all_functions) which evaluates the node.
 
-        Do the parsing later, when called like `OBJ.parse_algebra()`.
+        If `vectorized`, the values of the variables can be NumPy arrays, and functions
+        which don't accept arrays are applied to each of their values.
         """
-        self.case_sensitive = case_sensitive
-        self.math_expr = math_expr
-        self.tree = None
-        self.variables_used = set()
-        self.functions_used = set()
+        if not isinstance(node, ParseResults):
+            # Then treat it as a terminal node.
+            return lambda variables, functions: node
+
+        node_name = node.getName()
+        if node_name == 'number':
+            value = eval_number(node)
+            return lambda variables, functions: value
+        elif node_name == 'variable':
+            variable_name = self._casify(node[0])
+            return lambda variables, functions: variables[variable_name]
+        elif node_name == 'function':
+            function_name = self._casify(node[0])
+            argument = self._compile(node[1], vectorized)
+            if vectorized:
+                return lambda variables, functions: apply_vectorized(
+                    functions[function_name], argument(variables, functions)
+                )
+            return lambda variables, functions: functions[function_name](argument(variables, functions))
+        elif node_name not in self.reduce_actions:  # pragma: no cover
+            raise Exception(u"Unknown branch name '{}'".format(node_name))
+
+        action = (self.vectorized_reduce_actions if vectorized else self.reduce_actions)[node_name]
+        kids = [self._compile(kid, vectorized) for kid in node]
+        return lambda variables, functions: action([kid(variables, functions) for kid in kids])
+
+    def evaluate(self, variables, functions):
+        """
+        Return the value of the expression with the given variables and functions
+        (besides the default ones), as `evaluator` does.
+        """
+        if self.parser is None:
+            return self._evaluate(variables, functions)
 
-        def vpa(tokens):
-            """
-            When a variable is recognized, store it in `variables_used`.
-            """
-            varname = tokens[0][0]
-            self.variables_used.add(varname)
+        # Get our variables together.
+        all_variables, all_functions = add_defaults(variables, functions, self.case_sensitive)
 
-        def fpa(tokens):
-            """
-            When a function is recognized, store it in `functions_used`.
-            """
-            varname = tokens[0][0]
-            self.functions_used.add(varname)
+        # ...and check them
+        self.parser.check_variables(all_variables, all_functions)
 
-        self.variable_parse_action = vpa
-        self.function_parse_action = fpa
+        return self._evaluate(all_variables, all_functions)
 
-    def parse_algebra(self):
+    def evaluate_vectorized(self, variables, functions):
         """
-        Parse an algebraic expression into a tree.
+        Return the values of the expression for many samples of the variables at once.
 
-        Store a `pyparsing.ParseResult` in `self.tree` with proper groupings to
-        reflect parenthesis and order of operations. Leave all operators in the
-        tree and do not parse any strings of numbers into their float versions.
+        The values of the variables can be NumPy arrays of the same length (one value for
+        each sample) as well as numbers, and the result is an array of that length, or a
+        number if it doesn't depend on any arrays.
 
-        Adding the groups and result names makes the `repr()` of the result
-        really gross. For debugging, use something like
-          print OBJ.tree.asXML()
+        Unlike `evaluate`, errors such as dividing by zero give NaN or infinity (and
+        NumPy warnings) rather than raising exceptions.
+        """
+        if self.parser is None:
+            return self._evaluate(variables, functions)
+
+        all_variables, all_functions = add_defaults(variables, functions, self.case_sensitive)
+        self.parser.check_variables(all_variables, all_functions)
+
+        if self._evaluate_vectorized is None:
+            self._evaluate_vectorized = self._compile(self.parser.tree, vectorized=True)
+        return self._evaluate_vectorized(all_variables, all_functions)
+
+    def evaluate_samples(self, samples, functions):
+        """
+        Return the list of the values of the expression for each dict of variables in
+        `samples`, as `[self.evaluate(variables, functions) for variables in samples]`
+        does (and raising the same exceptions).
+
+        The samples are evaluated all at once with `evaluate_vectorized` when they have the
+        same variables. If any of the values isn't finite though, they're evaluated one by
+        one instead, since evaluating a sample can then give other values or raise an
+        exception, depending on the types of the operands.
         """
+        if not samples:
+            return []
+        names = set(samples[0])
+        if self.parser is not None and all(set(variables) == names for variables in samples):
+            # Check the variables first, which raises as evaluating the first sample would.
+            all_variables, all_functions = add_defaults(samples[0], functions, self.case_sensitive)
+            self.parser.check_variables(all_variables, all_functions)
+
+            arrays = {name: numpy.array([variables[name] for variables in samples]) for name in names}
+            try:
+                with numpy.errstate(all='ignore'):
+                    values = self.evaluate_vectorized(arrays, functions)
+                    values = numpy.broadcast_to(values, (len(samples),))
+                    if numpy.all(numpy.isfinite(values)):
+                        return list(values)
+            except Exception:  # pylint: disable=broad-except
+                pass
+
+        return [self.evaluate(variables, functions) for variables in samples]
+
+
+def apply_vectorized(function, value):
+    """
+    Return the function applied to the number or NumPy array of numbers, applying it to
+    each of the numbers of the array if it doesn't accept arrays.
+    """
+    if isinstance(function, numpy.ufunc) or function in VECTORIZED_FUNCTIONS or numpy.ndim(value) == 0:
+        return function(value)
+    return numpy.array([function(item) for item in value])
+
+
+_COMPILED_EXPRESSIONS = OrderedDict()
+_COMPILED_EXPRESSIONS_LOCK = threading.Lock()
+
+
+def compile_expression(math_expr, case_sensitive=False):
+    """
+    Return the `CompiledExpression` of the math expression, which is kept for
+    the next call, up to `COMPILED_EXPRESSION_CACHE_SIZE` expressions.
+
+    Evaluate it with `.evaluate(variables, functions)`.
+    """
+    key = (math_expr, case_sensitive)
+    with _COMPILED_EXPRESSIONS_LOCK:
+        compiled = _COMPILED_EXPRESSIONS.pop(key, None)
+        if compiled is not None:
+            # Mark the expression as the most recently used.
+            _COMPILED_EXPRESSIONS[key] = compiled
+            return compiled
+
+    compiled = CompiledExpression(math_expr, case_sensitive)
+    with _COMPILED_EXPRESSIONS_LOCK:
+        _COMPILED_EXPRESSIONS[key] = compiled
+        while len(_COMPILED_EXPRESSIONS) > COMPILED_EXPRESSION_CACHE_SIZE:
+            _COMPILED_EXPRESSIONS.popitem(last=False)
+    return compiled
+
+
+_GRAMMAR = []
+
+
+def get_grammar():
+    """
+    Return the pyparsing grammar of algebraic expressions, which is built once.
+    """
+    if not _GRAMMAR:
         # 0.33 or 7 or .34 or 16.
         number_part = Word(nums)
         inner_number = (number_part + Optional("." + Optional(number_part))) | ("." + number_part)
@@ -333,11 +531,9 @@ class ParseAugmenter(object):
         # and may contain numbers afterward.
         inner_varname = Word(alphas + "_", alphanums + "_")
         varname = Group(inner_varname)("variable")
-        varname.setParseAction(self.variable_parse_action)
 
         # Same thing for functions.
         function = Group(inner_varname + Suppress("(") + expr + Suppress(")"))("function")
-        function.setParseAction(self.function_parse_action)
 
         atom = number | function | varname | "(" + expr + ")"
         atom = Group(atom)("atom")
@@ -357,7 +553,64 @@ class ParseAugmenter(object):
 
         # Finish the recursion.
         expr << sum_term  # pylint: disable=pointless-statement
-        self.tree = (expr + stringEnd).parseString(self.math_expr)[0]
+        grammar = expr + stringEnd
+        grammar.streamline()
+        _GRAMMAR.append(grammar)
+    return _GRAMMAR[0]
+
+
+class ParseAugmenter(object):
+    """
+    Holds the data for a particular parse.
+
+    Retains the `math_expr` and `case_sensitive` so they needn't be passed
+    around method to method.
+    Eventually holds the parse tree and sets of variables as well.
+    """
+    def __init__(self, math_expr, case_sensitive=False):
+        """
+        Create the ParseAugmenter for a given math expression string.
+
+        Do the parsing later, when called like `OBJ.parse_algebra()`.
+        """
+        self.case_sensitive = case_sensitive
+        self.math_expr = math_expr
+        self.tree = None
+        self.variables_used = set()
+        self.functions_used = set()
+
+    def parse_algebra(self):
+        """
+        Parse an algebraic expression into a tree.
+
+        Store a `pyparsing.ParseResult` in `self.tree` with proper groupings to
+        reflect parenthesis and order of operations. Leave all operators in the
+        tree and do not parse any strings of numbers into their float versions.
+        Store the variables and functions used in the tree in `variables_used`
+        and `functions_used`.
+
+        Adding the groups and result names makes the `repr()` of the result
+        really gross. For debugging, use something like
+          print OBJ.tree.asXML()
+        """
+        self.tree = get_grammar().parseString(self.math_expr)[0]
+
+        def find_used(node):
+            """
+            Add the variables and functions used in the node to the sets.
+            """
+            if not isinstance(node, ParseResults):
+                return
+            if node.getName() == 'variable':
+                self.variables_used.add(node[0])
+            elif node.getName() == 'function':
+                self.functions_used.add(node[0])
+                find_used(node[1])
+            else:
+                for kid in node:
+                    find_used(kid)
+
+        find_used(self.tree)
 
     def reduce_tree(self, handle_actions, terminal_converter=None):
         """
@@ -5,6 +5,7 @@ Unit tests for calc.py
 import unittest
 import numpy
 import calc
+from mock import patch
 from pyparsing import ParseException
 
 # numpy's default behavior when it evaluates a function outside its domain
@@ -559,3 +560,121 @@ class EvaluatorTest(unittest.TestCase):
             calc.evaluator({'r1': 5}, {}, "r1+r2")
         with self.assertRaisesRegexp(calc.UndefinedVariable, 'r1 r3'):
             calc.evaluator(variables, {}, "r1*r3", case_sensitive=True)
+
+
+class CompileExpressionTest(unittest.TestCase):
+    """
+    Run tests for calc.compile_expression
+    """
+
+    def test_evaluate_many_times(self):
+        """
+        Check that a compiled expression can be evaluated with different variables
+        """
+        compiled = calc.compile_expression("x^2 + sin(y) - X")
+        for x in range(5):
+            self.assertEqual(
+                compiled.evaluate({'x': x, 'y': 0}, {}),
+                calc.evaluator({'x': x, 'y': 0}, {}, "x^2 + sin(y) - X")
+            )
+        self.assertEqual(compiled.evaluate({'x': 3, 'y': 0}, {'sin': lambda y: 1}), 7.0)
+        with self.assertRaisesRegexp(calc.UndefinedVariable, 'y'):
+            compiled.evaluate({'x': 3}, {})
+
+    def test_blank_expression(self):
+        """
+        Check that blank expressions evaluate to NaN, whatever the variables
+        """
+        self.assertTrue(numpy.isnan(calc.compile_expression("  ").evaluate({}, {})))
+
+    def test_parse_error(self):
+        """
+        Check that expressions which can't be parsed raise when they're compiled
+        """
+        with self.assertRaises(ParseException):
+            calc.compile_expression("5 +* 3")
+
+    def test_compiled_once(self):
+        """
+        Check that compiled expressions are kept, for each case sensitivity
+        """
+        compiled = calc.compile_expression("3*x + 1")
+        self.assertIs(calc.compile_expression("3*x + 1"), compiled)
+        self.assertIsNot(calc.compile_expression("3*x + 1", case_sensitive=True), compiled)
+
+    def test_cache_size(self):
+        """
+        Check that only the most recently used expressions are kept
+        """
+        compiled = calc.compile_expression("2*x")
+        for number in range(calc.COMPILED_EXPRESSION_CACHE_SIZE):
+            calc.compile_expression(str(number))
+        self.assertIsNot(calc.compile_expression("2*x"), compiled)
+
+
+class VectorizedEvaluationTest(unittest.TestCase):
+    """
+    Run tests for evaluating compiled expressions for many samples at once
+    """
+    samples = [{'x': x, 'y': y} for x, y in zip(numpy.linspace(0.1, 3, 20), numpy.linspace(-2, 5, 20))]
+
+    def assert_same_values(self, expression, samples=None):
+        """
+        Check that evaluating the samples at once gives the values of evaluating them one by one
+        """
+        samples = samples or self.samples
+        compiled = calc.compile_expression(expression)
+        expected = [compiled.evaluate(variables, {}) for variables in samples]
+        values = compiled.evaluate_samples(samples, {})
+        self.assertEqual(len(values), len(expected))
+        for value, expected_value in zip(values, expected):
+            if numpy.isnan(expected_value):
+                self.assertTrue(numpy.isnan(value))
+            else:
+                self.assertAlmostEqual(value, expected_value)
+
+    def test_evaluate_vectorized(self):
+        compiled = calc.compile_expression("x^2 + 2*y")
+        values = compiled.evaluate_vectorized({'x': numpy.array([1.0, 2.0]), 'y': 1}, {})
+        self.assertEqual(list(values), [3.0, 6.0])
+
+        # The samples are evaluated one by one only if that could give other values.
+        with patch.object(calc.CompiledExpression, 'evaluate') as mock_evaluate:
+            values = compiled.evaluate_samples([{'x': 1.0, 'y': 1.0}, {'x': 2.0, 'y': -1.0}], {})
+        self.assertEqual(values, [3.0, 2.0])
+        self.assertFalse(mock_evaluate.called)
+
+    def test_operators_and_functions(self):
+        for expression in (
+            "x + y - 3.5k", "-x*y/2", "x^y^0.5", "x || y^2", "x || 2 || 3",
+            "sin(x)*cos(y) + tan(x/4)", "sec(x) + csc(x) + cot(x)", "arccot(y) + arcsec(x + 2)",
+            "sqrt(x) + ln(x) + log10(x) + exp(y) + abs(y)", "sinh(y)/cosh(y) - tanh(y)", "fact(3)*x",
+            "(x + i*y)^2 + e^(i*pi)", "sqrt(y)", "7",
+        ):
+            self.assert_same_values(expression)
+
+    def test_elementwise_functions(self):
+        samples = [{'n': n} for n in range(1, 8)]
+        self.assert_same_values("fact(n) + factorial(n - 1)", samples)
+        positive = lambda x: x if x > 0 else 0
+        compiled = calc.compile_expression("positive(x)")
+        self.assertEqual(compiled.evaluate_samples([{'x': -1.0}, {'x': 2.0}], {'positive': positive}), [0, 2.0])
+
+    def test_parallel_with_zero(self):
+        samples = [{'x': 0.0}, {'x': 1.0}]
+        values = calc.compile_expression("x || 1").evaluate_samples(samples, {})
+        self.assertTrue(numpy.isnan(values[0]))
+        self.assertEqual(values[1], 0.5)
+
+    def test_errors(self):
+        """
+        Check that errors are raised as they are when evaluating the samples one by one
+        """
+        samples = [{'x': 1.0}, {'x': 0.0}]
+        with self.assertRaises(ZeroDivisionError):
+            calc.compile_expression("1/x").evaluate_samples(samples, {})
+        with self.assertRaisesRegexp(ValueError, 'factorial'):
+            calc.compile_expression("fact(x - 0.5)").evaluate_samples(samples, {})
+        with self.assertRaisesRegexp(calc.UndefinedVariable, 'y'):
+            calc.compile_expression("x + y").evaluate_samples(samples, {})
+        self.assertEqual(calc.compile_expression("x").evaluate_samples([], {}), [])
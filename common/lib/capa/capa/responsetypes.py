@@ -37,7 +37,7 @@ from shapely.geometry import Point, MultiPoint
 import dogstats_wrapper as dog_stats_api
 
 # specific library imports
-from calc import evaluator, UndefinedVariable
+from calc import compile_expression, evaluator, UndefinedVariable
 from . import correctmap
 from .registry import TagRegistry
 from datetime import datetime
@@ -2102,6 +2102,7 @@ class CustomResponse(LoncapaResponse):
         # the <answer>...</answer> stanza should be local to the current <customresponse>.
         # So try looking there first.
         self.code = None
+        self.code_digest = None
         answer = None
         try:
             answer = xml.xpath('//*[@id=$id]//answer', id=xml.get('id'))[0]
@@ -2281,6 +2282,10 @@ class CustomResponse(LoncapaResponse):
     def execute_check_function(self, idset, submission):
         # exec the check function
         if isinstance(self.code, basestring):
+            if self.code_digest is None:
+                self.code_digest = safe_exec.CodeDigest(
+                    self.code, self.context['extra_files'], self.context['python_path']
+                )
             try:
                 safe_exec.safe_exec(
                     self.code,
@@ -2291,6 +2296,7 @@ class CustomResponse(LoncapaResponse):
                     slug=self.id,
                     random_seed=self.context['seed'],
                     unsafely=self.capa_system.can_execute_unsafe_code(),
+                    code_digest=self.code_digest,
                 )
             except Exception as err:  # pylint: disable=broad-except
                 self._handle_exec_exception(err)
@@ -3089,55 +3095,52 @@ class FormulaResponse(LoncapaResponse):
         """
         _ = self.capa_system.i18n.ugettext
 
-        out = []
-        for var_dict in var_dict_list:
-            try:
-                out.append(evaluator(
-                    var_dict,
-                    dict(),
-                    answer,
-                    case_sensitive=self.case_sensitive,
-                ))
-            except UndefinedVariable as err:
+        try:
+            # Evaluate the answer for all of the samples at once.
+            out = compile_expression(answer, case_sensitive=self.case_sensitive).evaluate_samples(
+                var_dict_list,
+                dict(),
+            )
+        except UndefinedVariable as err:
+            log.debug(
+                'formularesponse: undefined variable in formula=%s',
+                cgi.escape(answer)
+            )
+            raise StudentInputError(
+                _("Invalid input: {bad_input} not permitted in answer.").format(bad_input=err.message)
+            )
+        except ValueError as err:
+            if 'factorial' in err.message:
+                # This is thrown when fact() or factorial() is used in a formularesponse answer
+                #   that tests on negative and/or non-integer inputs
+                # err.message will be: `factorial() only accepts integral values` or
+                # `factorial() not defined for negative values`
                 log.debug(
-                    'formularesponse: undefined variable in formula=%s',
+                    ('formularesponse: factorial function used in response '
+                     'that tests negative and/or non-integer inputs. '
+                     'Provided answer was: %s'),
                     cgi.escape(answer)
                 )
                 raise StudentInputError(
-                    _("Invalid input: {bad_input} not permitted in answer.").format(bad_input=err.message)
+                    _("factorial function not permitted in answer "
+                      "for this problem. Provided answer was: "
+                      "{bad_input}").format(bad_input=cgi.escape(answer))
                 )
-            except ValueError as err:
-                if 'factorial' in err.message:
-                    # This is thrown when fact() or factorial() is used in a formularesponse answer
-                    #   that tests on negative and/or non-integer inputs
-                    # err.message will be: `factorial() only accepts integral values` or
-                    # `factorial() not defined for negative values`
-                    log.debug(
-                        ('formularesponse: factorial function used in response '
-                         'that tests negative and/or non-integer inputs. '
-                         'Provided answer was: %s'),
-                        cgi.escape(answer)
-                    )
-                    raise StudentInputError(
-                        _("factorial function not permitted in answer "
-                          "for this problem. Provided answer was: "
-                          "{bad_input}").format(bad_input=cgi.escape(answer))
-                    )
-                # If non-factorial related ValueError thrown, handle it the same as any other Exception
-                log.debug('formularesponse: error %s in formula', err)
-                raise StudentInputError(
-                    _("Invalid input: Could not parse '{bad_input}' as a formula.").format(
-                        bad_input=cgi.escape(answer)
-                    )
+            # If non-factorial related ValueError thrown, handle it the same as any other Exception
+            log.debug('formularesponse: error %s in formula', err)
+            raise StudentInputError(
+                _("Invalid input: Could not parse '{bad_input}' as a formula.").format(
+                    bad_input=cgi.escape(answer)
                 )
-            except Exception as err:
-                # traceback.print_exc()
-                log.debug('formularesponse: error %s in formula', err)
-                raise StudentInputError(
-                    _("Invalid input: Could not parse '{bad_input}' as a formula").format(
-                        bad_input=cgi.escape(answer)
-                    )
+            )
+        except Exception as err:
+            # traceback.print_exc()
+            log.debug('formularesponse: error %s in formula', err)
+            raise StudentInputError(
+                _("Invalid input: Could not parse '{bad_input}' as a formula").format(
+                    bad_input=cgi.escape(answer)
                 )
+            )
         return out
 
     def randomize_variables(self, samples):
@@ -3248,6 +3251,7 @@ class SchematicResponse(LoncapaResponse):
 
     def __init__(self, *args, **kwargs):
         self.code = ''
+        self.code_digest = None
         super(SchematicResponse, self).__init__(*args, **kwargs)
 
     def setup_response(self):
@@ -3265,6 +3269,10 @@ class SchematicResponse(LoncapaResponse):
             json.loads(student_answers[k]) for k in sorted(self.answer_ids)
         ]
         self.context.update({'submission': submission})
+        if self.code_digest is None:
+            self.code_digest = safe_exec.CodeDigest(
+                self.code, self.context['extra_files'], self.context['python_path']
+            )
         try:
             safe_exec.safe_exec(
                 self.code,
@@ -3275,6 +3283,7 @@ class SchematicResponse(LoncapaResponse):
                 slug=self.id,
                 random_seed=self.context['seed'],
                 unsafely=self.capa_system.can_execute_unsafe_code(),
+                code_digest=self.code_digest,
             )
         except Exception as err:
             _ = self.capa_system.i18n.ugettext
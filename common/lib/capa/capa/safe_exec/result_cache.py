@@ -0,0 +1,170 @@
+"""
+Caching of the results of safe_exec.
+
+Results are cached in two tiers: an LRU cache in each process, and the shared
+cache that the caller passes to safe_exec (memcache, in the LMS).  Both hold
+(exception message, globals) pairs, the message being None if the code ran
+without an exception.
+
+Exceptions are only cached when they are deterministic, that is, when running
+the same code on the same globals again would raise the same exception.
+Sandboxes that ran out of time or memory, or couldn't be started, aren't.
+"""
+from collections import OrderedDict
+import copy
+import hashlib
+import re
+import threading
+
+from dogapi import dog_stats_api
+
+# The number of results cached in each process.
+LOCAL_CACHE_SIZE = 1000
+
+# The names that let code read globals without naming them.  Code that uses
+# any of them depends on all of its globals.
+DYNAMIC_ACCESS_NAMES = frozenset([
+    "globals", "locals", "vars", "dir", "eval", "exec", "execfile", "compile", "__dict__",
+    "inspect", "_getframe", "currentframe", "f_globals", "f_locals",
+])
+
+IDENTIFIER_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+
+# The end of the message of the exceptions of codejail and the sandbox pool
+# when the sandboxed Python exited.  It exits with status 1 when the code
+# raised an exception; other statuses mean that it was killed.
+STATUS_CODE_RE = re.compile(r"with status code: (-?\d+)$")
+
+
+class CodeDigest(object):
+    """
+    The digest of some code to execute (and of the extra files it's executed
+    with), and the names it uses.
+
+    Code executed with extra files or a Python path can use all of its
+    globals, since the modules it imports from them aren't read.
+
+    Computing it reads all of the code, so callers that execute the same code
+    more than once should compute it once and pass it to safe_exec.
+    """
+    def __init__(self, code, extra_files=None, python_path=None):
+        md5er = hashlib.md5()
+        md5er.update(repr(code))
+        for name, contents in extra_files or ():
+            md5er.update(repr(name))
+            md5er.update(hashlib.md5(contents).hexdigest())
+        self.hexdigest = md5er.hexdigest()
+
+        # Every identifier in the code, including the ones in strings and
+        # comments, which errs on the side of the code using a global.
+        self.names = frozenset(IDENTIFIER_RE.findall(code))
+        self.dynamic = bool(extra_files or python_path) or not self.names.isdisjoint(DYNAMIC_ACCESS_NAMES)
+
+    def uses(self, name):
+        """
+        Return whether the code can use the global named `name`.
+        """
+        return self.dynamic or name in self.names
+
+
+def is_deterministic_error(emsg):
+    """
+    Return whether the exception message `emsg` of safe_exec is the result
+    of the code (which would raise it again), rather than of its sandbox.
+    """
+    if "MemoryError" in emsg or "timed out" in emsg or "Couldn't start" in emsg:
+        return False
+    match = STATUS_CODE_RE.search(emsg)
+    return match is None or int(match.group(1)) == 1
+
+
+class LocalResultCache(object):
+    """
+    A thread-safe LRU cache of safe_exec results in this process.
+
+    Results are copied in and out, since callers update the globals they hold.
+    """
+    def __init__(self, size):
+        self.size = size
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Return a copy of the result cached for key, or None.
+        """
+        with self._lock:
+            result = self._results.pop(key, None)
+            if result is None:
+                return None
+            # Mark the result as the most recently used.
+            self._results[key] = result
+        return copy.deepcopy(result)
+
+    def set(self, key, result):
+        """
+        Cache a copy of the result for key, evicting the least recently used result.
+        """
+        result = copy.deepcopy(result)
+        with self._lock:
+            self._results.pop(key, None)
+            self._results[key] = result
+            while len(self._results) > self.size:
+                self._results.popitem(last=False)
+
+    def clear(self):
+        """
+        Delete all of the cached results.
+        """
+        with self._lock:
+            self._results.clear()
+
+
+LOCAL_RESULTS = LocalResultCache(LOCAL_CACHE_SIZE)
+
+
+class ResultCache(object):
+    """
+    The result cache of safe_exec: the results cached in this process, backed
+    by a shared cache with .get(key) and .set(key, value) methods.
+
+    `slug` identifies the problem whose code is executed, in the hit and miss metrics.
+    """
+    def __init__(self, shared_cache, slug=None):
+        self.shared_cache = shared_cache
+        self.slug = slug
+
+    def _record_lookup(self, tier, hit):
+        """
+        Count a hit or miss of the given tier.
+        """
+        tags = ["tier:{}".format(tier)]
+        if self.slug:
+            tags.append(u"problem:{}".format(self.slug))
+        dog_stats_api.increment("capa.safe_exec.cache.{}".format("hits" if hit else "misses"), tags=tags)
+
+    def get(self, key):
+        """
+        Return the (exception message, globals) pair cached for key, or None.
+        """
+        result = LOCAL_RESULTS.get(key)
+        self._record_lookup("local", result is not None)
+        if result is not None:
+            return result
+
+        result = self.shared_cache.get(key)
+        self._record_lookup("shared", result is not None)
+        if result is not None:
+            LOCAL_RESULTS.set(key, result)
+        return result
+
+    def set(self, key, result):
+        """
+        Cache the (exception message, globals) pair for key, unless the
+        exception wasn't deterministic.
+        """
+        emsg = result[0]
+        if emsg and not is_deterministic_error(emsg):
+            return
+        LOCAL_RESULTS.set(key, result)
+        self.shared_cache.set(key, result)
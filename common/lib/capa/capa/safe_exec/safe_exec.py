@@ -4,6 +4,8 @@ from codejail.safe_exec import safe_exec as codejail_safe_exec
 from codejail.safe_exec import not_safe_exec as codejail_not_safe_exec
 from codejail.safe_exec import json_safe, SafeExecException
 from . import lazymod
+from . import sandbox_pool
+from .result_cache import CodeDigest, ResultCache
 from dogapi import dog_stats_api
 
 import hashlib
@@ -80,6 +82,7 @@ def safe_exec(
     cache=None,
     slug=None,
     unsafely=False,
+    code_digest=None,
 ):
     """
     Execute python code safely.
@@ -98,8 +101,12 @@ def safe_exec(
     created in the sandbox.
 
     `cache` is an object with .get(key) and .set(key, value) methods.  It will be used
-    to cache the execution, taking into account the code, the values of the globals,
-    and the random seed.
+    (behind a cache in this process) to cache the execution, taking into account the
+    code, the extra files, the Python path, the random seed, and the values of the
+    globals that the code uses.
+
+    `code_digest` is the CodeDigest of `code`, `extra_files` and `python_path`, for callers that
+    execute the same code more than once.  It's computed if it isn't given.
 
     `slug` is an arbitrary string, a description that's meaningful to the
     caller, that will be used in log messages.
@@ -109,10 +116,18 @@ def safe_exec(
     """
     # Check the cache for a previous result.
     if cache:
+        cache = ResultCache(cache, slug)
+        if code_digest is None:
+            code_digest = CodeDigest(code, extra_files, python_path)
+        # Leave the globals that the code doesn't use (such as the anonymous id
+        # of the student) out of the key, so that all of the students with the
+        # same seed share a result.
         safe_globals = json_safe(globals_dict)
+        used_globals = {name: value for name, value in safe_globals.iteritems() if code_digest.uses(name)}
         md5er = hashlib.md5()
-        md5er.update(repr(code))
-        update_hash(md5er, safe_globals)
+        md5er.update(code_digest.hexdigest)
+        update_hash(md5er, used_globals)
+        update_hash(md5er, python_path or [])
         key = "safe_exec.%r.%s" % (random_seed, md5er.hexdigest())
         cached = cache.get(key)
         if cached is not None:
@@ -128,8 +143,11 @@ def safe_exec(
     code_prolog = CODE_PROLOG % random_seed
 
     # Decide which code executor to use.
+    pool = None if unsafely else sandbox_pool.get_pool()
     if unsafely:
         exec_fn = codejail_not_safe_exec
+    elif pool is not None:
+        exec_fn = pool.safe_exec
     else:
         exec_fn = codejail_safe_exec
 
@@ -145,9 +163,14 @@ def safe_exec(
         emsg = None
 
     # Put the result back in the cache.  This is complicated by the fact that
-    # the globals dict might not be entirely serializable.
+    # the globals dict might not be entirely serializable.  The globals that
+    # the code doesn't use are left as they were, so aren't cached.
     if cache:
-        cleaned_results = json_safe(globals_dict)
+        cleaned_results = {
+            name: value
+            for name, value in json_safe(globals_dict).iteritems()
+            if name not in safe_globals or code_digest.uses(name)
+        }
         cache.set(key, (emsg, cleaned_results))
 
     # If an exception happened, raise it now.
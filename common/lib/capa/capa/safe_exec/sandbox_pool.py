@@ -0,0 +1,372 @@
+"""
+A pool of warm sandboxed Python processes for safe_exec.
+
+codejail starts a new sandboxed Python for each execution, which then has to
+import the modules that Capa code uses (numpy and scipy take hundreds of
+milliseconds).  The pool starts its workers ahead of time, with those modules
+already imported, so that an execution only has to wait for its code to run.
+
+Each worker runs one job and then exits, so no state is shared between
+executions; a replacement is started as soon as a worker is taken from the pool.
+
+The workers are started with codejail's configuration for "python" (its
+command line, user and limits), and with the same process limits as codejail
+sets: each worker is in a session of its own, which is killed as a whole when
+it runs out of time, and can't start other processes.  Pools of unsandboxed
+workers, which the tests use, have to be given the command line to run.
+"""
+import json
+import logging
+import os
+import os.path
+import resource
+import shutil
+import signal
+import subprocess
+import tempfile
+import threading
+
+from codejail import jail_code
+from codejail.safe_exec import safe_exec as codejail_safe_exec
+from codejail.safe_exec import json_safe, SafeExecException
+from dogapi import dog_stats_api
+
+log = logging.getLogger(__name__)
+
+# The code that each worker runs: it imports the modules, says it's ready,
+# then reads one job from stdin, runs it within the job's limits, and writes
+# the resulting globals to stdout.
+WORKER_CODE = r"""
+import json, os, resource, sys
+
+for modname in %(modules)r:
+    try:
+        __import__(modname)
+    except Exception:
+        pass
+
+sys.stdout.write("ready\n")
+sys.stdout.flush()
+line = sys.stdin.readline()
+if not line:
+    sys.exit(0)
+job = json.loads(line)
+
+os.chdir(job["home"])
+os.environ["TMPDIR"] = os.path.join(job["home"], "tmp")
+limits = job["limits"]
+resource.setrlimit(resource.RLIMIT_NPROC, (0, 0))
+if limits.get("CPU"):
+    # The imports used some CPU already, which doesn't count against the job.
+    # The soft limit sends a SIGXCPU, as codejail's does.
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    cpu = int(usage.ru_utime + usage.ru_stime) + 1 + limits["CPU"]
+    resource.setrlimit(resource.RLIMIT_CPU, (cpu, cpu + 1))
+if limits.get("VMEM"):
+    resource.setrlimit(resource.RLIMIT_AS, (limits["VMEM"], limits["VMEM"]))
+fsize = limits.get("FSIZE", 0)
+resource.setrlimit(resource.RLIMIT_FSIZE, (fsize, fsize))
+sys.path.extend(job["python_path"])
+
+result_file = sys.stdout
+sys.stdout = open(os.devnull, "w")
+g_dict = job["globals"]
+exec job["code"] in g_dict
+
+ok_types = (type(None), int, long, float, str, unicode, list, tuple, dict)
+def jsonable(value):
+    if not isinstance(value, ok_types):
+        return False
+    try:
+        json.dumps(value)
+    except Exception:
+        return False
+    return True
+g_dict = dict((k, v) for k, v in g_dict.iteritems() if k != "__builtins__" and jsonable(v))
+result_file.write(json.dumps(g_dict))
+"""
+
+
+class SandboxPoolFull(Exception):
+    """
+    Raised when the pool is already running as many jobs as it will queue.
+    """
+    pass
+
+
+class SandboxPool(object):
+    """
+    A pool of `size` idle workers that runs up to `max_queue` jobs at once.
+
+    When no idle worker is left, jobs start a worker of their own (a cold
+    start), and when `max_queue` jobs are running, SandboxPoolFull is raised.
+
+    The workers run codejail's command line for "python" (as its user), unless
+    `command` (and `user`) are given, which codejail then needn't configure.
+    """
+    def __init__(self, size, max_queue=4, command=None, user=None, limits=None, modules=()):
+        if command is None:
+            if not jail_code.is_configured("python"):
+                raise ValueError("codejail isn't configured to run python, so the pool needs a command")
+            command = jail_code.COMMANDS["python"]["cmdline_start"]
+            user = jail_code.COMMANDS["python"]["user"]
+        self.size = size
+        self.max_queue = max_queue
+        self.user = user
+        self.limits = dict(jail_code.LIMITS if limits is None else limits)
+        self.argv = (["sudo", "-u", user] if user else []) + list(command)
+        self.argv.extend(["-c", WORKER_CODE % {"modules": list(modules)}])
+
+        self._lock = threading.Lock()
+        self._idle = []
+        self.queue_depth = 0
+        self.stats = dict.fromkeys(("jobs", "warm_starts", "cold_starts", "timeouts", "overflows"), 0)
+        with self._lock:
+            self._fill()
+
+    def _start_worker(self):
+        """
+        Start a worker process, which starts importing the modules right away.
+        """
+        return subprocess.Popen(
+            self.argv, cwd=tempfile.gettempdir(), close_fds=True, preexec_fn=self._set_process_limits,
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        )
+
+    def _set_process_limits(self):
+        """
+        Set the limits of a worker that don't depend on its job, as codejail's
+        set_process_limits does (in the worker, before it runs Python).
+
+        The CPU limit is set by the worker once it has imported the modules.
+        """
+        # A new session, so that the worker and any process it starts can be killed as a process group.
+        os.setsid()
+        # No subprocesses.
+        resource.setrlimit(resource.RLIMIT_NPROC, (0, 0))
+        if self.limits.get("VMEM"):
+            resource.setrlimit(resource.RLIMIT_AS, (self.limits["VMEM"], self.limits["VMEM"]))
+        fsize = self.limits.get("FSIZE", 0)
+        resource.setrlimit(resource.RLIMIT_FSIZE, (fsize, fsize))
+
+    def _fill(self):
+        """
+        Start workers until `size` of them are idle (with the lock held).
+        """
+        while len(self._idle) < self.size:
+            self._idle.append(self._start_worker())
+
+    def _take_worker(self):
+        """
+        Return an idle worker that's still alive, or None if there's none.
+        """
+        with self._lock:
+            if self.queue_depth >= self.max_queue:
+                self.stats["overflows"] += 1
+                raise SandboxPoolFull()
+            self.queue_depth += 1
+            self.stats["jobs"] += 1
+            worker = None
+            while self._idle and worker is None:
+                worker = self._idle.pop(0)
+                if worker.poll() is not None:
+                    worker = None
+            self.stats["warm_starts" if worker else "cold_starts"] += 1
+            self._fill()
+            dog_stats_api.histogram("capa.safe_exec.pool.queue_depth", self.queue_depth)
+        dog_stats_api.increment(
+            "capa.safe_exec.pool.jobs", tags=["start:{}".format("warm" if worker else "cold")]
+        )
+        return worker
+
+    def _kill(self, worker, timed_out):
+        """
+        Kill the process group of a worker that has run out of real time.
+        """
+        timed_out.append(True)
+        # The worker leads its session, so its pid is the id of its process group.
+        if self.user:
+            # The worker runs as another user, so can only be killed as them.
+            subprocess.call(["sudo", "-u", self.user, "kill", "-9", "--", "-{}".format(worker.pid)])
+        try:
+            os.killpg(worker.pid, signal.SIGKILL)
+        except OSError:
+            pass
+
+    def safe_exec(self, code, globals_dict, python_path=None, extra_files=None, slug=None):
+        """
+        Execute code in a worker of the pool, as codejail.safe_exec.safe_exec does.
+
+        Falls back to codejail's safe_exec if the pool is full.
+        """
+        try:
+            worker = self._take_worker()
+        except SandboxPoolFull:
+            log.warning("Sandbox pool full, running %s without it", slug)
+            return codejail_safe_exec(
+                code, globals_dict, python_path=python_path, extra_files=extra_files, slug=slug,
+            )
+        try:
+            if worker is None:
+                worker = self._start_worker()
+            self._run(worker, code, globals_dict, python_path or [], extra_files or [], slug)
+        finally:
+            with self._lock:
+                self.queue_depth -= 1
+
+    def _run(self, worker, code, globals_dict, python_path, extra_files, slug):
+        """
+        Run a job in the (just started or idle) worker.
+        """
+        if slug:
+            log.debug("Executing jailed code %s in the sandbox pool", slug)
+        home = tempfile.mkdtemp(prefix="codejail-")
+        try:
+            # The worker can run as another user, who needs to read and write here.
+            os.chmod(home, 0775)
+            os.mkdir(os.path.join(home, "tmp"))
+            os.chmod(os.path.join(home, "tmp"), 0777)
+
+            # Copy the files on the Python path that aren't extra files, as codejail does.
+            extra_names = set(name for name, __ in extra_files)
+            sys_path = []
+            for filename in python_path:
+                name = os.path.basename(filename)
+                if name not in extra_names:
+                    if os.path.isdir(filename):
+                        shutil.copytree(filename, os.path.join(home, name))
+                    else:
+                        shutil.copy(filename, home)
+                sys_path.append(name)
+            for name, contents in extra_files:
+                with open(os.path.join(home, name), "wb") as extra_file:
+                    extra_file.write(contents)
+
+            ready = worker.stdout.readline()
+            if not ready:
+                raise SafeExecException(
+                    "Couldn't start a sandbox: {!r}, with status code: {}".format(
+                        worker.stderr.read(), worker.wait(),
+                    )
+                )
+
+            job = {
+                "code": code,
+                "globals": json_safe(globals_dict),
+                "python_path": sys_path,
+                "home": home,
+                "limits": self.limits,
+            }
+            timed_out = []
+            timer = None
+            if self.limits.get("REALTIME"):
+                timer = threading.Timer(self.limits["REALTIME"], self._kill, (worker, timed_out))
+                timer.start()
+            try:
+                stdout, stderr = worker.communicate(json.dumps(job) + "\n")
+            finally:
+                if timer is not None:
+                    timer.cancel()
+
+            if timed_out:
+                with self._lock:
+                    self.stats["timeouts"] += 1
+                dog_stats_api.increment("capa.safe_exec.pool.timeouts")
+                raise SafeExecException(
+                    "Couldn't execute jailed code: timed out after {} seconds".format(self.limits["REALTIME"])
+                )
+            if worker.returncode != 0:
+                raise SafeExecException(
+                    "Couldn't execute jailed code: stdout: {!r}, stderr: {!r} with status code: {}".format(
+                        stdout, stderr, worker.returncode,
+                    )
+                )
+            globals_dict.update(json.loads(stdout))
+        finally:
+            shutil.rmtree(home, ignore_errors=True)
+
+    def get_stats(self):
+        """
+        Return a dict of the pool's size, idle workers and queue depth, and counts of its jobs.
+        """
+        with self._lock:
+            stats = dict(self.stats)
+            stats.update({
+                "size": self.size,
+                "idle": len([worker for worker in self._idle if worker.poll() is None]),
+                "queue_depth": self.queue_depth,
+                "max_queue": self.max_queue,
+            })
+        return stats
+
+    def close(self):
+        """
+        Stop the idle workers.
+        """
+        with self._lock:
+            idle, self._idle = self._idle, []
+            self.size = 0
+        for worker in idle:
+            try:
+                # Closing stdin tells the worker to exit without running a job.
+                worker.stdin.close()
+                worker.wait()
+            except (IOError, OSError):
+                pass
+
+
+# The pool configuration, set by configure().
+POOL_CONFIG = {"size": 0, "max_queue": 4}
+
+# The pool of this process, created by the first get_pool() call (in each
+# process, since workers started by a parent process can't be shared).
+_POOL = None
+_POOL_PID = None
+_POOL_LOCK = threading.Lock()
+
+
+def configure(size=0, max_queue=4):
+    """
+    Configure the pools: `size` idle workers (0 to not use a pool), running
+    up to `max_queue` jobs at once.
+    """
+    global _POOL  # pylint: disable=global-statement
+    POOL_CONFIG.update(size=size, max_queue=max_queue)
+    with _POOL_LOCK:
+        if _POOL is not None and _POOL_PID == os.getpid():
+            _POOL.close()
+        _POOL = None
+
+
+def get_pool():
+    """
+    Return the pool of this process, or None if pools aren't configured.
+
+    Pools are disabled if codejail isn't configured to run python, since their
+    workers wouldn't be sandboxed.
+    """
+    global _POOL, _POOL_PID  # pylint: disable=global-statement
+    if not POOL_CONFIG["size"]:
+        return None
+    with _POOL_LOCK:
+        if not jail_code.is_configured("python"):
+            log.warning("Not using a sandbox pool, since codejail isn't configured to run python")
+            POOL_CONFIG["size"] = 0
+            return None
+        if _POOL is None or _POOL_PID != os.getpid():
+            # Import here, since safe_exec imports this module.
+            from .safe_exec import ASSUMED_IMPORTS
+            _POOL = SandboxPool(
+                POOL_CONFIG["size"], POOL_CONFIG["max_queue"],
+                modules=[modname for __, modname in ASSUMED_IMPORTS],
+            )
+            _POOL_PID = os.getpid()
+        return _POOL
+
+
+def get_stats():
+    """
+    Return the stats of the pool of this process (see SandboxPool.get_stats), or None.
+    """
+    pool = get_pool()
+    return pool.get_stats() if pool is not None else None
@@ -0,0 +1,6 @@
+import sys
+
+
+def student_id():
+    # Read the anonymous id of the student from the globals of the caller.
+    return sys._getframe(1).f_globals["anonymous_student_id"]
@@ -4,15 +4,21 @@ import hashlib
 import os
 import os.path
 import random
+import sys
 import textwrap
 import unittest
 
+from mock import patch
 from nose.plugins.skip import SkipTest
 
-from capa.safe_exec import safe_exec, update_hash
+from capa.safe_exec import safe_exec, update_hash, CodeDigest
+from capa.safe_exec.result_cache import LOCAL_RESULTS, is_deterministic_error
 from codejail.safe_exec import SafeExecException
 from codejail.jail_code import is_configured
 
+# The safe_exec module, which the package's safe_exec function hides.
+SAFE_EXEC_MODULE = sys.modules['capa.safe_exec.safe_exec']
+
 
 class TestSafeExec(unittest.TestCase):
     def test_set_values(self):
@@ -110,6 +116,10 @@ class DictCache(object):
 class TestSafeExecCaching(unittest.TestCase):
     """Test that caching works on safe_exec."""
 
+    def setUp(self):
+        super(TestSafeExecCaching, self).setUp()
+        LOCAL_RESULTS.clear()
+
     def test_cache_miss_then_hit(self):
         g = {}
         cache = {}
@@ -120,8 +130,10 @@ class TestSafeExecCaching(unittest.TestCase):
         # A result has been cached
         self.assertEqual(cache.values()[0], (None, {'a': 3}))
 
-        # Fiddle with the cache, then try it again.
+        # Fiddle with the cache, then try it again.  The result is cached in
+        # this process too, so clear that to read the fiddled one.
         cache[cache.keys()[0]] = (None, {'a': 17})
+        LOCAL_RESULTS.clear()
 
         g = {}
         safe_exec("a = int(math.pi)", g, cache=DictCache(cache))
@@ -153,6 +165,7 @@ class TestSafeExecCaching(unittest.TestCase):
 
         # Change the value stored in the cache, the result should change.
         cache[cache.keys()[0]] = ("Hey there!", {})
+        LOCAL_RESULTS.clear()
 
         with self.assertRaises(SafeExecException):
             safe_exec(code, g, cache=DictCache(cache))
@@ -163,9 +176,104 @@ class TestSafeExecCaching(unittest.TestCase):
 
         # Change it again, now no exception!
         cache[cache.keys()[0]] = (None, {'a': 17})
+        LOCAL_RESULTS.clear()
         safe_exec(code, g, cache=DictCache(cache))
         self.assertEqual(g['a'], 17)
 
+    def test_local_cache_hit(self):
+        safe_exec("a = int(math.pi)", {}, cache=DictCache({}))
+
+        # The result is cached in this process, so the shared cache isn't read.
+        g = {}
+        cache = {}
+        safe_exec("a = int(math.pi)", g, cache=DictCache(cache))
+        self.assertEqual(g['a'], 3)
+        self.assertEqual(cache, {})
+
+    def test_unused_globals_not_in_key(self):
+        cache = {}
+        g1 = {'b': 1, 'anonymous_student_id': 'student1'}
+        safe_exec("a = b + 1", g1, random_seed=17, cache=DictCache(cache))
+
+        # Another student with the same seed gets the same result, without
+        # the globals of the first one.
+        g2 = {'b': 1, 'anonymous_student_id': 'student2'}
+        with patch.object(SAFE_EXEC_MODULE, 'codejail_safe_exec') as mock_safe_exec:
+            safe_exec("a = b + 1", g2, random_seed=17, cache=DictCache(cache))
+        self.assertFalse(mock_safe_exec.called)
+        self.assertEqual(g2, {'a': 2, 'b': 1, 'anonymous_student_id': 'student2'})
+        self.assertEqual(cache.values(), [(None, {'a': 2, 'b': 1})])
+
+        # Other seeds and values of the globals that are used have results of their own.
+        safe_exec("a = b + 1", {'b': 1}, random_seed=18, cache=DictCache(cache))
+        safe_exec("a = b + 1", {'b': 2}, random_seed=17, cache=DictCache(cache))
+        self.assertEqual(len(cache), 3)
+
+    def test_dynamic_code_uses_all_globals(self):
+        cache = {}
+        safe_exec("a = globals()['b'] + 1", {'b': 1, 'c': 1}, cache=DictCache(cache))
+        safe_exec("a = globals()['b'] + 1", {'b': 1, 'c': 2}, cache=DictCache(cache))
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(sorted(results['c'] for __, results in cache.values()), [1, 2])
+
+    def test_python_lib_uses_all_globals(self):
+        # Helpers on the Python path can read globals that the code doesn't name.
+        pylib = os.path.dirname(__file__) + "/test_files/pylib"
+        cache = {}
+        for student_id in ('student1', 'student2'):
+            g = {'anonymous_student_id': student_id}
+            safe_exec(
+                "import anonymous; a = anonymous.student_id()", g,
+                random_seed=17, python_path=[pylib], cache=DictCache(cache),
+            )
+            self.assertEqual(g['a'], student_id)
+        self.assertEqual(len(cache), 2)
+
+    def test_dynamic_code_digests(self):
+        self.assertFalse(CodeDigest("a = b + 1").dynamic)
+        self.assertTrue(CodeDigest("a = sorted(dir())").dynamic)
+        self.assertTrue(CodeDigest("a = b + 1", extra_files=[("lib.py", "")]).dynamic)
+        self.assertTrue(CodeDigest("a = b + 1", python_path=["lib.zip"]).dynamic)
+
+    def test_python_path_and_extra_files_in_key(self):
+        cache = {}
+        safe_exec("a = 1", {}, cache=DictCache(cache))
+        safe_exec("a = 1", {}, python_path=["lib.zip"], extra_files=[("lib.zip", "1")], cache=DictCache(cache))
+        safe_exec("a = 1", {}, python_path=["lib.zip"], extra_files=[("lib.zip", "2")], cache=DictCache(cache))
+        self.assertEqual(len(cache), 3)
+
+    def test_code_digest(self):
+        cache = {}
+        code_digest = CodeDigest("a = int(math.pi)")
+        safe_exec("a = int(math.pi)", {}, cache=DictCache(cache), code_digest=code_digest)
+        g = {}
+        safe_exec("a = int(math.pi)", g, cache=DictCache(cache))
+        self.assertEqual(g['a'], 3)
+        self.assertEqual(len(cache), 1)
+
+    def test_nondeterministic_exceptions_not_cached(self):
+        cache = {}
+        emsg = "Couldn't execute jailed code: stdout: '', stderr: '' with status code: -9"
+        with patch.object(SAFE_EXEC_MODULE, 'codejail_safe_exec', side_effect=SafeExecException(emsg)):
+            with self.assertRaises(SafeExecException):
+                safe_exec("a = 1", {}, cache=DictCache(cache))
+        self.assertEqual(cache, {})
+
+        g = {}
+        safe_exec("a = 1", g, cache=DictCache(cache))
+        self.assertEqual(g['a'], 1)
+
+    def test_is_deterministic_error(self):
+        self.assertTrue(is_deterministic_error("ZeroDivisionError: integer division or modulo by zero"))
+        self.assertTrue(is_deterministic_error(
+            "Couldn't execute jailed code: stdout: '', stderr: 'ZeroDivisionError' with status code: 1"
+        ))
+        self.assertFalse(is_deterministic_error(
+            "Couldn't execute jailed code: stdout: '', stderr: '' with status code: -9"
+        ))
+        self.assertFalse(is_deterministic_error("Couldn't execute jailed code: timed out after 1 seconds"))
+        self.assertFalse(is_deterministic_error("MemoryError"))
+
     def test_unicode_submission(self):
         # Check that using non-ASCII unicode does not raise an encoding error.
         # Try several non-ASCII unicode characters.
@@ -0,0 +1,147 @@
+"""Test sandbox_pool.py"""
+
+import os
+import os.path
+import sys
+import unittest
+
+from mock import patch
+
+from capa.safe_exec import safe_exec, sandbox_pool
+from capa.safe_exec.sandbox_pool import SandboxPool
+from codejail import jail_code
+from codejail.safe_exec import SafeExecException
+
+# The command line and limits of the pools under test, which aren't sandboxed.
+COMMAND = [sys.executable, "-B"]
+LIMITS = {'CPU': 1, 'REALTIME': 1, 'VMEM': 0, 'FSIZE': 0}
+
+
+class TestSandboxPool(unittest.TestCase):
+    """
+    Tests of a pool of unsandboxed workers.
+    """
+    def setUp(self):
+        super(TestSandboxPool, self).setUp()
+        self.pool = SandboxPool(size=1, max_queue=2, command=COMMAND, limits=LIMITS)
+        self.addCleanup(self.pool.close)
+
+    def test_set_values(self):
+        g = {'b': 16, 'f': lambda: None}
+        self.pool.safe_exec("a = b + 1", g)
+        self.assertEqual(g['a'], 17)
+        self.assertEqual(g['b'], 16)
+        # Values that aren't JSON-safe stay as they were.
+        self.assertIn('f', g)
+
+    def test_python_lib_and_extra_files(self):
+        pylib = os.path.dirname(__file__) + "/test_files/pylib"
+        g = {}
+        self.pool.safe_exec(
+            "import constant, extra; a = constant.THE_CONST; b = extra.VALUE; c = open('data.txt').read()", g,
+            python_path=[pylib], extra_files=[("extra.py", "VALUE = 3\n"), ("data.txt", "some data")],
+        )
+        self.assertEqual(g['a'], 23)
+        self.assertEqual(g['b'], 3)
+        self.assertEqual(g['c'], "some data")
+
+    def test_raising_exceptions(self):
+        with self.assertRaises(SafeExecException) as cm:
+            self.pool.safe_exec("1/0", {})
+        self.assertIn("ZeroDivisionError", cm.exception.message)
+
+    def test_timeout(self):
+        with self.assertRaises(SafeExecException) as cm:
+            self.pool.safe_exec("import time; time.sleep(5)", {})
+        self.assertIn("timed out", cm.exception.message)
+        self.assertEqual(self.pool.get_stats()['timeouts'], 1)
+
+    def test_cpu_limit(self):
+        self.pool.limits['REALTIME'] = 10
+        with self.assertRaises(SafeExecException):
+            self.pool.safe_exec("while True: pass", {})
+        self.assertEqual(self.pool.get_stats()['timeouts'], 0)
+
+    def test_new_session(self):
+        g = {}
+        self.pool.safe_exec("import os; pid = os.getpid(); sid = os.getsid(0)", g)
+        # The worker leads a session of its own, whose process group is killed on timeouts.
+        self.assertEqual(g['sid'], g['pid'])
+        self.assertNotEqual(g['sid'], os.getsid(0))
+
+    def test_writing_files(self):
+        with self.assertRaises(SafeExecException):
+            self.pool.safe_exec("with open('written.txt', 'w') as f: f.write('data')", {})
+
+    def test_command_needed(self):
+        with patch.object(jail_code, 'is_configured', return_value=False):
+            with self.assertRaises(ValueError):
+                SandboxPool(size=0, limits=LIMITS)
+
+    def test_workers_are_recycled(self):
+        pids = []
+        for __ in xrange(3):
+            g = {}
+            self.pool.safe_exec("import os; pid = os.getpid()", g)
+            pids.append(g['pid'])
+        # Each job ran in a worker of its own, all of them warm.
+        self.assertEqual(len(set(pids)), 3)
+        stats = self.pool.get_stats()
+        self.assertEqual(stats['jobs'], 3)
+        self.assertEqual(stats['warm_starts'], 3)
+        self.assertEqual(stats['cold_starts'], 0)
+        self.assertEqual(stats['idle'], 1)
+        self.assertEqual(stats['queue_depth'], 0)
+
+    def test_no_state_shared(self):
+        self.pool.safe_exec("import os; os.environ['LEFTOVER'] = 'yes'", {})
+        g = {}
+        self.pool.safe_exec("import os; leftover = os.environ.get('LEFTOVER')", g)
+        self.assertIsNone(g['leftover'])
+
+    def test_cold_start(self):
+        pool = SandboxPool(size=0, command=COMMAND, limits=LIMITS)
+        g = {}
+        pool.safe_exec("a = 17", g)
+        self.assertEqual(g['a'], 17)
+        self.assertEqual(pool.get_stats()['cold_starts'], 1)
+
+    def test_pool_full(self):
+        pool = SandboxPool(size=0, max_queue=0, command=COMMAND, limits=LIMITS)
+        g = {}
+        with patch('capa.safe_exec.sandbox_pool.codejail_safe_exec') as mock_safe_exec:
+            pool.safe_exec("a = 17", g, slug="full")
+        mock_safe_exec.assert_called_once_with("a = 17", g, python_path=None, extra_files=None, slug="full")
+        self.assertEqual(pool.get_stats()['overflows'], 1)
+
+
+class TestSafeExecWithPool(unittest.TestCase):
+    """
+    Tests of safe_exec using the pool of the process.
+    """
+    def setUp(self):
+        super(TestSafeExecWithPool, self).setUp()
+        # Configure codejail to run this Python, unsandboxed.
+        commands = patch.dict(jail_code.COMMANDS, {"python": {"cmdline_start": COMMAND, "user": None}})
+        commands.start()
+        self.addCleanup(commands.stop)
+        sandbox_pool.configure(size=1)
+        self.addCleanup(sandbox_pool.configure)
+
+    def test_safe_exec(self):
+        g = {}
+        safe_exec("a = int(math.pi); b = 1/2", g, random_seed=17)
+        self.assertEqual(g['a'], 3)
+        self.assertEqual(g['b'], 0.5)
+        self.assertEqual(sandbox_pool.get_stats()['jobs'], 1)
+
+    def test_not_configured(self):
+        sandbox_pool.configure(size=0)
+        self.assertIsNone(sandbox_pool.get_pool())
+        self.assertIsNone(sandbox_pool.get_stats())
+
+    def test_codejail_not_configured(self):
+        with patch.object(jail_code, 'is_configured', return_value=False):
+            self.assertIsNone(sandbox_pool.get_pool())
+        # The pool stays disabled.
+        self.assertIsNone(sandbox_pool.get_pool())
@@ -314,9 +314,18 @@ class StaticContentStream(StaticContent):
                                                   length=length, locked=locked, content_digest=content_digest)
         self._stream = stream
 
+    @property
+    def read_size(self):
+        """
+        The number of bytes to read from the stream at a time: the chunk size of GridFS streams, so that
+        each (aligned) read fetches a single GridFS chunk and only one chunk is held in memory at a time.
+        """
+        return int(getattr(self._stream, 'chunk_size', None) or STREAM_DATA_CHUNK_SIZE)
+
     def stream_data(self):
+        read_size = self.read_size
         while True:
-            chunk = self._stream.read(STREAM_DATA_CHUNK_SIZE)
+            chunk = self._stream.read(read_size)
             if len(chunk) == 0:
                 break
             yield chunk
@@ -325,15 +334,16 @@ class StaticContentStream(StaticContent):
         """
         Stream the data between first_byte and last_byte (included)
         """
+        # Seeking doesn't read anything: the first read fetches the chunk that first_byte is in.
         self._stream.seek(first_byte)
+        read_size = self.read_size
         position = first_byte
-        while True:
-            if last_byte < position + STREAM_DATA_CHUNK_SIZE - 1:
-                chunk = self._stream.read(last_byte - position + 1)
-                yield chunk
+        while position <= last_byte:
+            # Read to the end of the chunk that position is in, so that later reads are aligned to chunks.
+            chunk = self._stream.read(min(read_size - position % read_size, last_byte - position + 1))
+            if len(chunk) == 0:
                 break
-            chunk = self._stream.read(STREAM_DATA_CHUNK_SIZE)
-            position += STREAM_DATA_CHUNK_SIZE
+            position += len(chunk)
             yield chunk
 
     def close(self):
@@ -358,10 +368,14 @@ class ContentStore(object):
     def find(self, filename):
         raise NotImplementedError
 
-    def get_all_content_for_course(self, course_key, start=0, maxresults=-1, sort=None, filter_params=None):
+    def get_all_content_for_course(
+        self, course_key, start=0, maxresults=-1, sort=None, filter_params=None, after=None, with_count=True
+    ):
         '''
         Returns a list of static assets for a course, followed by the total number of assets.
         By default all assets are returned, but start and maxresults can be provided to limit the query.
+        Alternatively, after can be the key of the last asset of the previous page, to return the assets
+        following it. If with_count is False, None is returned rather than the total number of assets.
 
         The return format is a list of asset data dictionaries.
         The asset data dictionaries have the following keys:
@@ -373,6 +387,13 @@ class ContentStore(object):
         '''
         raise NotImplementedError
 
+    def get_asset_version(self, course_key):
+        """
+        Returns the version of the assets of the given course, an opaque string which changes
+        whenever any of them is saved or deleted, under which data about them can be cached.
+        """
+        raise NotImplementedError
+
     def delete_all_course_assets(self, course_key):
         """
         Delete all of the assets which use this course_key as an identifier
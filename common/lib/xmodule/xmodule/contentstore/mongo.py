@@ -1,10 +1,13 @@
 """
 MongoDB/GridFS-level code for the contentstore.
 """
+from __future__ import absolute_import
 import os
 import json
+from uuid import uuid4
 import pymongo
 import gridfs
+from django.core.cache import cache
 from gridfs.errors import NoFile
 from fs.osfs import OSFS
 from bson.son import SON
@@ -99,6 +102,8 @@ class MongoContentStore(ContentStore):
                     fp.write(chunk)
             else:
                 fp.write(content.data)
+        # The assets may have been counted between deleting the previous version and writing this one.
+        self._bump_asset_version(*self._asset_course(content_id))
 
         return content
 
@@ -110,6 +115,44 @@ class MongoContentStore(ContentStore):
             location_or_id, _ = self.asset_db_key(location_or_id)
         # Deletes of non-existent files are considered successful
         self.fs.delete(location_or_id)
+        self._bump_asset_version(*self._asset_course(location_or_id))
+
+    def get_asset_version(self, course_key):
+        """
+        See :meth:`.ContentStore.get_asset_version`
+        """
+        version_key = self._asset_version_key(course_key.org, course_key.course)
+        version = cache.get(version_key)
+        if version is None:
+            version = uuid4().hex
+            # Use the version set by another process in the meantime, if any.
+            if not cache.add(version_key, version, None):
+                version = cache.get(version_key, version)
+        return version
+
+    def _bump_asset_version(self, org, course):
+        """
+        Changes the version of the assets of the given course.
+        """
+        cache.set(self._asset_version_key(org, course), uuid4().hex, None)
+
+    @staticmethod
+    def _asset_version_key(org, course):
+        """
+        Returns the cache key of the version of the assets of the given course. The runs of a course
+        share it, since the ids of the assets of courses with deprecated keys don't have a run.
+        """
+        return u'contentstore.asset_version.{}.{}'.format(org, course)
+
+    @staticmethod
+    def _asset_course(asset_id):
+        """
+        Returns the org and course of the asset with the given database _id.
+        """
+        if isinstance(asset_id, basestring):
+            course_key = AssetKey.from_string(asset_id).course_key
+            return course_key.org, course_key.course
+        return asset_id['org'], asset_id['course']
 
     @autoretry_read()
     def find(self, location, throw_on_not_found=True, as_stream=False):
@@ -152,19 +195,44 @@ class MongoContentStore(ContentStore):
             else:
                 return None
 
+    @staticmethod
+    def get_export_path(content):
+        """
+        Return the path, relative to the static directory of a course export,
+        of the file that the asset `content` is exported to.
+        """
+        # Escape invalid char from filename.
+        export_name = escape_invalid_characters(name=content.name, invalid_char_list=['/', '\\'])
+        if content.import_path is not None:
+            return os.path.join(os.path.dirname(content.import_path), export_name)
+        return export_name
+
+    @staticmethod
+    def get_assets_policy(assets):
+        """
+        Return the policy that export_all_for_course writes to the assets
+        policy file for the given assets: a dict mapping the name of each
+        asset to its attributes.
+
+        :param assets: asset data dicts, as get_all_content_for_course returns them
+        """
+        policy = {}
+        for asset in assets:
+            for attr, value in asset.iteritems():
+                if attr not in ['_id', 'md5', 'uploadDate', 'length', 'chunkSize', 'asset_key']:
+                    policy.setdefault(asset['asset_key'].name, {})[attr] = value
+        return policy
+
     def export(self, location, output_directory):
         content = self.find(location)
 
-        filename = content.name
-        if content.import_path is not None:
-            output_directory = output_directory + '/' + os.path.dirname(content.import_path)
+        export_dir, export_name = os.path.split(self.get_export_path(content))
+        if export_dir:
+            output_directory = output_directory + '/' + export_dir
 
         if not os.path.exists(output_directory):
             os.makedirs(output_directory)
 
-        # Escape invalid char from filename.
-        export_name = escape_invalid_characters(name=filename, invalid_char_list=['/', '\\'])
-
         disk_fs = OSFS(output_directory)
 
         with disk_fs.open(export_name, 'wb') as asset_file:
@@ -181,7 +249,6 @@ class MongoContentStore(ContentStore):
             assets_policy_file: the filename for the policy file which should be in the same
                 directory as the other policy files.
         """
-        policy = {}
         assets, __ = self.get_all_content_for_course(course_key)
 
         for asset in assets:
@@ -194,19 +261,19 @@ class MongoContentStore(ContentStore):
             # When debugging course exports, this might be a good place
             # to look. -- pmitros
             self.export(asset['asset_key'], output_directory)
-            for attr, value in asset.iteritems():
-                if attr not in ['_id', 'md5', 'uploadDate', 'length', 'chunkSize', 'asset_key']:
-                    policy.setdefault(asset['asset_key'].name, {})[attr] = value
 
         with open(assets_policy_file, 'w') as f:
-            json.dump(policy, f, sort_keys=True, indent=4)
+            json.dump(self.get_assets_policy(assets), f, sort_keys=True, indent=4)
 
     def get_all_content_thumbnails_for_course(self, course_key):
         return self._get_all_content_for_course(course_key, get_thumbnails=True)[0]
 
-    def get_all_content_for_course(self, course_key, start=0, maxresults=-1, sort=None, filter_params=None):
+    def get_all_content_for_course(
+        self, course_key, start=0, maxresults=-1, sort=None, filter_params=None, after=None, with_count=True
+    ):
         return self._get_all_content_for_course(
-            course_key, start=start, maxresults=maxresults, get_thumbnails=False, sort=sort, filter_params=filter_params
+            course_key, start=start, maxresults=maxresults, get_thumbnails=False, sort=sort,
+            filter_params=filter_params, after=after, with_count=with_count
         )
 
     def remove_redundant_content_for_courses(self):
@@ -236,7 +303,9 @@ class MongoContentStore(ContentStore):
                                     start=0,
                                     maxresults=-1,
                                     sort=None,
-                                    filter_params=None):
+                                    filter_params=None,
+                                    after=None,
+                                    with_count=True):
         '''
         Returns a list of all static assets for a course. The return format is a list of asset data dictionary elements.
 
@@ -246,8 +315,17 @@ class MongoContentStore(ContentStore):
             uploadDate (datetime.datetime): The date and time that the file was uploadDate
             contentType: The mimetype string of the asset
             md5: An md5 hash of the asset content
+
+        If `after` is the key of an asset, the assets following it in `sort` order are returned rather
+        than skipping `start` assets, so that the query reads only the assets it returns (using the
+        indexes on the sort keys). If the asset doesn't exist anymore, `start` is used.
+
+        If `with_count` is False, the total number of assets isn't counted, and None is returned for it.
         '''
         query = query_for_course(course_key, "asset" if not get_thumbnails else "thumbnail")
+        # Break ties by _id, so that the pages are stable and can be continued from their last asset.
+        sort = list(sort or [])
+        sort.append(('_id', sort[-1][1] if sort else pymongo.ASCENDING))
         find_args = {"sort": sort}
         if maxresults > 0:
             find_args.update({
@@ -257,9 +335,15 @@ class MongoContentStore(ContentStore):
         if filter_params:
             query.update(filter_params)
 
-        items = self.fs_files.find(query, **find_args)
-        count = items.count()
-        assets = list(items)
+        count = self.fs_files.find(query).count() if with_count else None
+
+        if after is not None:
+            after_query = self._query_after(after, sort)
+            if after_query is not None:
+                query = {'$and': [query, after_query]}
+                find_args.pop('skip', None)
+
+        assets = list(self.fs_files.find(query, **find_args))
 
         # We're constructing the asset key immediately after retrieval from the database so that
         # callers are insulated from knowing how our identifiers are stored.
@@ -268,6 +352,26 @@ class MongoContentStore(ContentStore):
             asset['asset_key'] = course_key.make_asset_key(asset_id['category'], asset_id['name'])
         return assets, count
 
+    def _query_after(self, asset_key, sort):
+        """
+        Returns a query for the assets following the given asset in the given sort order (which
+        ends with _id), or None if the asset doesn't exist or lacks one of the sort fields.
+        """
+        content_id, __ = self.asset_db_key(asset_key)
+        asset = self.fs_files.find_one({'_id': content_id}, {field: True for field, __ in sort})
+        # Mongo orders a missing field before every value, so no $gt or $lt query on the
+        # missing value would find the assets after it.
+        if asset is None or any(asset.get(field) is None for field, __ in sort):
+            return None
+
+        # Follow the asset on the first sort key that differs from it.
+        clauses = []
+        for index, (field, direction) in enumerate(sort):
+            clause = {prior_field: asset.get(prior_field) for prior_field, __ in sort[:index]}
+            clause[field] = {'$gt' if direction == pymongo.ASCENDING else '$lt': asset.get(field)}
+            clauses.append(clause)
+        return {'$or': clauses}
+
     def set_attr(self, asset_key, attr, value=True):
         """
         Add/set the given attr on the asset at the given location. Does not allow overwriting gridFS built in
@@ -311,6 +415,7 @@ class MongoContentStore(ContentStore):
         result = self.fs_files.update({'_id': asset_db_key}, {"$set": attr_dict}, upsert=False)
         if not result.get('updatedExisting', True):
             raise NotFoundError(asset_db_key)
+        self._bump_asset_version(location.course_key.org, location.course_key.course)
 
     @autoretry_read()
     def get_attrs(self, location):
@@ -367,6 +472,7 @@ class MongoContentStore(ContentStore):
                 # getattr b/c caching may mean some pickled instances don't have attr
                 locked=asset.get('locked', False)
             )
+        self._bump_asset_version(dest_course_key.org, dest_course_key.course)
 
     def delete_all_course_assets(self, course_key):
         """
@@ -379,6 +485,7 @@ class MongoContentStore(ContentStore):
         for asset in matching_assets:
             asset_key = self.make_id_son(asset)
             self.fs.delete(asset_key)
+        self._bump_asset_version(course_key.org, course_key.course)
 
     # codifying the original order which pymongo used for the dicts coming out of location_to_dict
     # stability of order is more important than sanity of order as any changes to order make things
@@ -418,6 +525,25 @@ class MongoContentStore(ContentStore):
         return dbkey
 
     def ensure_indexes(self):
+        # The Files & Uploads page lists the assets of a course with `_get_all_content_for_course`, sorted by
+        # `uploadDate` or `displayname` (then `_id`), a page at a time. These indexes let it read only the
+        # assets of each page, whichever the sort direction, and count the assets of a course without reading them.
+        # They aren't sparse, so that they can be used to query assets of courses without a run.
+        for prefix in ['_id', 'content_son']:
+            for sort_key in ['uploadDate', 'displayname']:
+                create_collection_index(
+                    self.fs_files,
+                    [
+                        ('{}.tag'.format(prefix), pymongo.ASCENDING),
+                        ('{}.org'.format(prefix), pymongo.ASCENDING),
+                        ('{}.course'.format(prefix), pymongo.ASCENDING),
+                        ('{}.category'.format(prefix), pymongo.ASCENDING),
+                        ('{}.run'.format(prefix), pymongo.ASCENDING),
+                        (sort_key, pymongo.ASCENDING),
+                        ('_id', pymongo.ASCENDING),
+                    ],
+                    background=True
+                )
         # Index needed thru 'category' by `_get_all_content_for_course` and others. That query also takes a sort
         # which can be `uploadDate`, `display_name`,
         create_collection_index(
@@ -11,6 +11,8 @@ import logging
 import random
 import sys
 
+import numpy
+
 
 log = logging.getLogger("edx.courseware")
 
@@ -205,6 +207,26 @@ class CourseGrader(object):
         '''Given a grade sheet, return a dict containing grading information'''
         raise NotImplementedError
 
+    def grade_columns(self, percents_by_format, num_students):
+        '''
+        Vectorized version of grade, which grades many students at once.
+
+        percents_by_format is a dict keyed by section format. Each value is a
+        2-dimensional numpy array with a row per student and a column per
+        section that has the matching section format, in the same order as
+        in a grade_sheet. Each element is the percentage of the section's
+        graded total that was earned by the student, or NaN if the section
+        would be missing from the student's grade_sheet.
+
+        Returns a dict with the same 'percent' and (optional) 'grade_breakdown'
+        keys as grade, where each percent is a numpy array with an entry per
+        student. Each entry is equal to the value that grade would return for
+        the student's grade_sheet.
+
+        Graders that do not support vectorized grading raise NotImplementedError.
+        '''
+        raise NotImplementedError
+
 
 class WeightedSubsectionsGrader(CourseGrader):
     """
@@ -250,6 +272,26 @@ class WeightedSubsectionsGrader(CourseGrader):
             'grade_breakdown': grade_breakdown
         }
 
+    def grade_columns(self, percents_by_format, num_students):
+        total_percent = numpy.zeros(num_students)
+        grade_breakdown = OrderedDict()
+
+        for subgrader, assignment_type, weight in self.subgraders:
+            subgrade_result = subgrader.grade_columns(percents_by_format, num_students)
+
+            weighted_percent = subgrade_result['percent'] * weight
+
+            total_percent += weighted_percent
+            grade_breakdown[assignment_type] = {
+                'percent': weighted_percent,
+                'category': assignment_type,
+            }
+
+        return {
+            'percent': total_percent,
+            'grade_breakdown': grade_breakdown
+        }
+
 
 class AssignmentFormatGrader(CourseGrader):
     """
@@ -407,3 +449,40 @@ class AssignmentFormatGrader(CourseGrader):
             'section_breakdown': breakdown,
             # No grade_breakdown here
         }
+
+    def grade_columns(self, percents_by_format, num_students):
+        percents = percents_by_format.get(self.type)
+        if percents is None:
+            percents = numpy.zeros((num_students, 0))
+        scored = ~numpy.isnan(percents)
+
+        # Each student's breakdown consists of the scored sections, in order,
+        # followed by placeholder scores of 0 up to min_count. Lay these out
+        # as the section columns followed by min_count placeholder columns,
+        # marking which columns are part of each student's breakdown.
+        num_scored = scored.sum(axis=1)
+        num_placeholders = numpy.maximum(self.min_count - num_scored, 0)
+        values = numpy.hstack([numpy.where(scored, percents, 0.0), numpy.zeros((num_students, self.min_count))])
+        in_breakdown = numpy.hstack([scored, numpy.arange(self.min_count) < num_placeholders[:, numpy.newaxis]])
+
+        kept = in_breakdown.copy()
+        if self.drop_count > 0 and values.shape[1] > 0:
+            # Drop the lowest scores. As in grade, the later entries are
+            # dropped first amongst equal scores.
+            positions = numpy.tile(numpy.arange(values.shape[1]), (num_students, 1))
+            ascending_order = numpy.lexsort((-positions, numpy.where(in_breakdown, values, numpy.inf)))
+            kept[numpy.arange(num_students)[:, numpy.newaxis], ascending_order[:, :self.drop_count]] = False
+
+        # Sum the kept scores column by column, so they are added in the same
+        # order as in grade.
+        total_percent = numpy.zeros(num_students)
+        for column in xrange(values.shape[1]):
+            total_percent += numpy.where(kept[:, column], values[:, column], 0.0)
+
+        num_averaged = num_scored + num_placeholders - self.drop_count
+        total_percent = numpy.where(num_averaged > 0, total_percent / numpy.maximum(num_averaged, 1), total_percent)
+
+        return {
+            'percent': total_percent,
+            # No grade_breakdown here
+        }
@@ -3,6 +3,8 @@ Support for inheritance of fields down an XBlock hierarchy.
 """
 from __future__ import absolute_import
 
+import copy
+
 from django.conf import settings
 
 from xmodule.partitions.partitions import UserPartition
@@ -269,14 +271,18 @@ def own_metadata(module):
 class InheritingFieldData(KvsFieldData):
     """A `FieldData` implementation that can inherit value from parents to children."""
 
-    def __init__(self, inheritable_names, **kwargs):
+    def __init__(self, inheritable_names, inherited_values=None, **kwargs):
         """
         `inheritable_names` is a list of names that can be inherited from
         parents.
 
+        `inherited_values` is an optional dict of the (serialized) values that
+        the block inherits, if they are known, by name; otherwise they are found
+        by walking up the block's ancestors.
         """
         super(InheritingFieldData, self).__init__(**kwargs)
         self.inheritable_names = set(inheritable_names)
+        self.inherited_values = inherited_values
 
     def has_default_value(self, name):
         """
@@ -292,7 +298,11 @@ class InheritingFieldData(KvsFieldData):
         """
         The default for an inheritable name is found on a parent.
         """
-        if name in self.inheritable_names:
+        if name in self.inheritable_names and self.inherited_values is not None:
+            if name in self.inherited_values:
+                # Copy the value, since the inherited values may be shared by many blocks.
+                return copy.deepcopy(self.inherited_values[name])
+        elif name in self.inheritable_names:
             # Walk up the content tree to find the first ancestor
             # that this field is set on. Use the field from the current
             # block so that if it has a different default than the root
@@ -316,10 +326,11 @@ class InheritingFieldData(KvsFieldData):
         return super(InheritingFieldData, self).default(block, name)
 
 
-def inheriting_field_data(kvs):
+def inheriting_field_data(kvs, inherited_values=None):
     """Create an InheritanceFieldData that inherits the names in InheritanceMixin."""
     return InheritingFieldData(
         inheritable_names=InheritanceMixin.fields.keys(),
+        inherited_values=inherited_values,
         kvs=kvs,
     )
 
@@ -0,0 +1,99 @@
+"""
+Load test of streaming static assets out of a MongoContentStore (GridFS), as
+the contentserver does: whole assets, single byte ranges and multiple byte
+ranges.
+"""
+import gc
+import itertools
+import logging
+import os
+import random
+from time import time
+import unittest
+
+import ddt
+import psutil
+
+from opaque_keys.edx.locator import CourseLocator
+from xmodule.contentstore.content import StaticContent
+from xmodule.modulestore.tests.utils import MongoContentstoreBuilder
+
+# The sizes of the assets streamed per test run, in bytes.
+ASSET_SIZES_PER_TEST = (64 * 1024, 4 * 1024 * 1024, 64 * 1024 * 1024)
+
+# The number of requests made for each asset.
+REQUESTS_PER_TEST = 20
+
+# The kinds of requests made: the full content, one byte range, or several byte ranges.
+REQUEST_KINDS = ('full', 'range', 'multirange')
+
+log = logging.getLogger(__name__)
+
+
+def rss():
+    """
+    Return the resident set size of this process, in bytes.
+    """
+    gc.collect()
+    return psutil.Process().get_memory_info().rss
+
+
+@ddt.ddt
+# Eventually, exclude this attribute from regular unittests while running *only* tests
+# with this attribute during regular performance tests.
+# @attr("perf_test")
+@unittest.skip
+class AssetStreamingLoad(unittest.TestCase):
+    """
+    Streams assets of different sizes out of a MongoContentStore backed by
+    the local test Mongo, and reports the throughput and the memory that
+    each request uses.
+    """
+    # Use this attribute to skip this test on regular unittest CI runs.
+    perf_test = True
+
+    def request_ranges(self, kind, length):
+        """
+        Return the byte ranges requested by a request of the given kind, for
+        an asset of `length` bytes, or None for the full content.
+        """
+        if kind == 'full':
+            return None
+        num_ranges = 1 if kind == 'range' else 5
+        ranges = []
+        for __ in xrange(num_ranges):
+            first = random.randint(0, length - 1)
+            ranges.append((first, min(length - 1, first + random.randint(0, length / 4))))
+        return ranges
+
+    @ddt.data(*itertools.product(ASSET_SIZES_PER_TEST, REQUEST_KINDS))
+    @ddt.unpack
+    def test_streaming(self, size, kind):
+        with MongoContentstoreBuilder().build() as contentstore:
+            course_key = CourseLocator('org', 'course', 'run')
+            asset_key = course_key.make_asset_key('asset', 'asset.bin')
+            contentstore.save(StaticContent(asset_key, 'asset.bin', 'application/octet-stream', os.urandom(size)))
+
+            streamed = 0
+            max_memory = 0
+            elapsed = 0
+            for __ in xrange(REQUESTS_PER_TEST):
+                before = rss()
+                start = time()
+                content = contentstore.find(asset_key, as_stream=True)
+                ranges = self.request_ranges(kind, content.length)
+                if ranges is None:
+                    chunks = content.stream_data()
+                else:
+                    chunks = itertools.chain(*(content.stream_data_in_range(first, last) for first, last in ranges))
+                # Hold no more than one chunk at a time, as a server writing it out would.
+                for chunk in chunks:
+                    streamed += len(chunk)
+                    max_memory = max(max_memory, psutil.Process().get_memory_info().rss - before)
+                elapsed += time() - start
+
+            log.info(
+                "%s byte asset, %s requests: %.1f MB/s, %.1f requests/s, %.2f MB RSS per request",
+                size, kind, float(streamed) / elapsed / 2 ** 20, REQUESTS_PER_TEST / elapsed,
+                float(max_memory) / 2 ** 20,
+            )
@@ -0,0 +1,100 @@
+"""
+Memory test of loading whole split courses from the published branch, with
+and without compact field storage.
+"""
+import gc
+import itertools
+import logging
+import unittest
+
+import ddt
+import psutil
+
+from xmodule.modulestore import ModuleStoreEnum
+from xmodule.modulestore.tests.utils import VersioningModulestoreBuilder
+
+# The number of children of each block, so that courses have k + k^2 + k^3 + k^4
+# blocks below the course block.
+BRANCHING_PER_TEST = (6, 10)
+
+# The types of blocks at each level below the course block.
+BLOCK_TYPES = ('chapter', 'sequential', 'vertical', 'html')
+
+USER_ID = ModuleStoreEnum.UserID.test
+
+log = logging.getLogger(__name__)
+
+
+def rss():
+    """
+    Return the resident set size of this process, in bytes.
+    """
+    gc.collect()
+    return psutil.Process().get_memory_info().rss
+
+
+@ddt.ddt
+# Eventually, exclude this attribute from regular unittests while running *only* tests
+# with this attribute during regular performance tests.
+# @attr("perf_test")
+@unittest.skip
+class SplitCourseMemory(unittest.TestCase):
+    """
+    Measures the memory that the process uses to hold a whole course loaded
+    from the published branch, per 1,000 blocks.
+
+    The memory freed by one test is reused by the next, so run each test in
+    a process of its own for exact measurements.
+    """
+    # Use this attribute to skip this test on regular unittest CI runs.
+    perf_test = True
+
+    def populate_course(self, store, course_key, branching):
+        """
+        Add `branching` children of the next block type to each block of the
+        course, publish it, and return the number of blocks in the course.
+        """
+        num_blocks = 1
+        with store.bulk_operations(course_key):
+            course = store.get_course(course_key)
+            parents = [course.location]
+            for block_type in BLOCK_TYPES:
+                children = []
+                for parent, index in itertools.product(parents, xrange(branching)):
+                    child = store.create_child(
+                        USER_ID, parent, block_type, fields={'display_name': u'{} {}'.format(block_type, index)}
+                    )
+                    children.append(child.location)
+                num_blocks += len(children)
+                parents = children
+            store.publish(course.location, USER_ID)
+        return num_blocks
+
+    def walk(self, block):
+        """
+        Yield the block and all of its descendants.
+        """
+        yield block
+        for child in block.get_children():
+            for descendant in self.walk(child):
+                yield descendant
+
+    @ddt.data(*itertools.product(BRANCHING_PER_TEST, (False, True)))
+    @ddt.unpack
+    def test_course_memory(self, branching, compact):
+        with VersioningModulestoreBuilder().build(compact_field_storage=compact) as (__, store):
+            course_key = store.create_course('org', 'course', 'run', USER_ID).id
+            num_blocks = self.populate_course(store, course_key, branching)
+
+            with store.branch_setting(ModuleStoreEnum.Branch.published_only, course_key):
+                before = rss()
+                course = store.get_course(course_key, depth=None)
+                # Read a setting of every block, as rendering the course outline would.
+                blocks = [block.display_name for block in self.walk(course)]
+                used = rss() - before
+
+            self.assertEqual(len(blocks), num_blocks)
+            log.info(
+                "%s blocks, compact field storage %s: %.1f MB RSS per 1,000 blocks",
+                num_blocks, compact, float(used) / num_blocks * 1000 / 2 ** 20,
+            )
@@ -0,0 +1,109 @@
+"""
+Performance test of SplitMongoModuleStore.get_items qualifier lookups, with
+and without the BlockIndex of the course structure.
+"""
+import unittest
+
+import ddt
+from mock import patch
+from nose.plugins.skip import SkipTest
+from opaque_keys.edx.locator import CourseLocator
+
+from xmodule.modulestore import BlockData
+from xmodule.modulestore.split_mongo import BlockKey, CourseEnvelope
+from xmodule.modulestore.split_mongo.block_index import BlockIndex
+from xmodule.modulestore.split_mongo.split import SplitMongoModuleStore
+
+# The dependency below needs to be installed manually from the development.txt file, which doesn't
+# get installed during unit tests!
+try:
+    from code_block_timer import CodeBlockTimer
+except ImportError:
+    CodeBlockTimer = None
+
+# The number of blocks in the course structure per test run.
+BLOCK_AMOUNT_PER_TEST = (1000, 10000)
+
+# The number of times each lookup is repeated.
+LOOKUPS_PER_TEST = 10
+
+LOOKUPS = (
+    {'qualifiers': {'category': 'problem'}},
+    {'qualifiers': {'category': 'discussion'}},
+    {'qualifiers': {'name': ['problem_17', 'html_42']}},
+    {'settings': {'group_access': {'$exists': True}}},
+)
+
+
+def make_structure(num_blocks):
+    """
+    Return a structure of num_blocks blocks: mostly problems and html, with
+    a few discussions and some blocks restricted to groups.
+    """
+    blocks = {}
+    for index in xrange(num_blocks):
+        block_type = ('problem', 'html', 'video', 'vertical', 'discussion')[index % 5 if index % 50 else 4]
+        fields = {'display_name': 'Block {}'.format(index)}
+        if index % 100 == 0:
+            fields['group_access'] = {50: [1]}
+        block_id = '{}_{}'.format(block_type, index)
+        blocks[BlockKey(block_type, block_id)] = BlockData(block_type=block_type, fields=fields)
+    return {'_id': 'structure', 'blocks': blocks}
+
+
+@ddt.ddt
+# Eventually, exclude this attribute from regular unittests while running *only* tests
+# with this attribute during regular performance tests.
+# @attr("perf_test")
+@unittest.skip
+class SplitGetItemsLookups(unittest.TestCase):
+    """
+    Times get_items lookups on course structures of different sizes, matching
+    every block (as without a block index) and only the index's candidates.
+    """
+    # Use this attribute to skip this test on regular unittest CI runs.
+    perf_test = True
+
+    def setUp(self):
+        super(SplitGetItemsLookups, self).setUp()
+        # Only the parts of the store that get_items uses to match blocks are needed.
+        self.store = SplitMongoModuleStore.__new__(SplitMongoModuleStore)
+        self.course_key = CourseLocator('org', 'course', 'run')
+        for method, side_effect in (
+                ('_load_items', lambda course, block_keys, **kwargs: sorted(block_keys)),
+                ('get_definition', lambda course_key, definition: {'fields': {}}),
+        ):
+            patcher = patch.object(SplitMongoModuleStore, method, side_effect=side_effect, autospec=False)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def lookup_all(self, structure, block_index):
+        """
+        Return the results of all of the LOOKUPS on the structure, using the
+        given block index (or None).
+        """
+        course = CourseEnvelope(self.course_key, structure)
+        with patch.object(SplitMongoModuleStore, '_lookup_course', return_value=course):
+            with patch.object(SplitMongoModuleStore, 'get_block_index', return_value=block_index):
+                for __ in xrange(LOOKUPS_PER_TEST):
+                    results = [self.store.get_items(self.course_key, **lookup) for lookup in LOOKUPS]
+                return results
+
+    @ddt.data(*BLOCK_AMOUNT_PER_TEST)
+    def test_lookups(self, num_blocks):
+        """
+        Generate timings of the lookups, with and without a block index.
+        """
+        if CodeBlockTimer is None:
+            raise SkipTest("CodeBlockTimer undefined.")
+
+        structure = make_structure(num_blocks)
+        with CodeBlockTimer("SplitGetItems:{}".format(num_blocks)):
+            with CodeBlockTimer("build_index"):
+                block_index = BlockIndex(structure)
+            with CodeBlockTimer("scanned_lookups"):
+                scan_results = self.lookup_all(structure, None)
+            with CodeBlockTimer("indexed_lookups"):
+                index_results = self.lookup_all(structure, block_index)
+
+        self.assertEqual(scan_results, index_results)
@@ -0,0 +1,113 @@
+"""
+A secondary index of the blocks of a split modulestore course structure.
+
+SplitMongoModuleStore.get_items uses the index to narrow down the blocks
+it has to match against its qualifiers to those that can match them,
+rather than matching every block of the structure.
+"""
+from collections import defaultdict
+
+# The types of values that the index can look up (all other qualifiers,
+# such as regexes, functions and {'$in': ...} dicts, are matched by scanning).
+INDEXABLE_TYPES = (basestring, bool, int, long, float)
+
+
+def _is_indexable(value):
+    """
+    Return whether blocks with the value `value` can be looked up in a BlockIndex.
+    """
+    return isinstance(value, INDEXABLE_TYPES)
+
+
+def _indexable_values(value):
+    """
+    Yield all of the indexable values that get_items qualifiers can match in
+    the field value `value`: either the value itself or, if it's a list, any
+    of its (possibly nested) elements.
+    """
+    if isinstance(value, list):
+        for element in value:
+            for element_value in _indexable_values(element):
+                yield element_value
+    elif _is_indexable(value):
+        yield value
+
+
+class BlockIndex(object):
+    """
+    Maps the block types and block ids of the blocks of a structure, and the
+    values of some of their settings fields, to the keys of the blocks.
+
+    Structures are immutable once saved, so the index of a saved structure
+    never changes and can be cached along with it.
+    """
+    # Increment when the contents of the index change, so that the indexes
+    # cached by earlier versions are not used.
+    VERSION = 1
+
+    # The settings fields whose values are indexed.
+    INDEXED_SETTINGS = ('format', 'graded', 'group_access')
+
+    def __init__(self, structure):
+        """
+        Arguments:
+            structure (dict): The structure whose blocks to index.
+        """
+        by_type = defaultdict(set)
+        by_id = defaultdict(set)
+        settings_set = defaultdict(set)
+        settings_values = dict((field, defaultdict(set)) for field in self.INDEXED_SETTINGS)
+
+        for block_key, block_data in structure['blocks'].iteritems():
+            by_type[block_data.block_type].add(block_key)
+            by_id[block_key.id].add(block_key)
+            for field in self.INDEXED_SETTINGS:
+                if field in block_data.fields:
+                    settings_set[field].add(block_key)
+                    for value in _indexable_values(block_data.fields[field]):
+                        settings_values[field][value].add(block_key)
+
+        # Store plain dicts, so the index can be pickled and cached.
+        self.by_type = dict(by_type)
+        self.by_id = dict(by_id)
+        self.settings_set = dict(settings_set)
+        self.settings_values = dict((field, dict(values)) for field, values in settings_values.iteritems())
+
+    def named(self, block_name):
+        """
+        Return the keys of the blocks whose block ids are `in` block_name, as
+        for the 'name' qualifier of get_items: those whose ids are in the
+        list `block_name` or, if it's a string, are substrings of it.
+        """
+        if isinstance(block_name, basestring):
+            block_ids = [block_id for block_id in self.by_id if block_id in block_name]
+        else:
+            block_ids = [block_id for block_id in block_name if block_id in self.by_id]
+        return set().union(*(self.by_id[block_id] for block_id in block_ids))
+
+    def candidates(self, qualifiers, settings):
+        """
+        Return the keys of the blocks that can match the get_items `qualifiers`
+        (with 'category' already replaced by 'block_type') and `settings`, or
+        None if the index can't narrow down the blocks that can match them.
+
+        The returned blocks must still be matched against the qualifiers.
+        """
+        candidates = None
+
+        block_type = qualifiers.get('block_type')
+        if _is_indexable(block_type):
+            candidates = self.by_type.get(block_type, set())
+
+        for field, criteria in settings.iteritems():
+            if field not in self.INDEXED_SETTINGS:
+                continue
+            if criteria == {'$exists': True}:
+                block_keys = self.settings_set.get(field, set())
+            elif _is_indexable(criteria):
+                block_keys = self.settings_values[field].get(criteria, set())
+            else:
+                continue
+            candidates = block_keys if candidates is None else candidates & block_keys
+
+        return candidates
@@ -42,7 +42,10 @@ class CachingDescriptorSystem(MakoDescriptorSystem, EditInfoRuntimeMixin):
     Computes the settings (nee 'metadata') inheritance upon creation.
     """
     @contract(course_entry=CourseEnvelope)
-    def __init__(self, modulestore, course_entry, default_class, module_data, lazy, **kwargs):
+    def __init__(
+            self, modulestore, course_entry, default_class, module_data, lazy, compact=False, inherited_settings=None,
+            **kwargs
+    ):
         """
         Computes the settings inheritance and sets up the cache.
 
@@ -55,6 +58,13 @@ class CachingDescriptorSystem(MakoDescriptorSystem, EditInfoRuntimeMixin):
 
         module_data: a dict mapping Location -> json that was cached from the
             underlying modulestore
+
+        compact: whether the blocks' field data shares the settings in the course structure,
+            copying them only when they are written (for read-only loads)
+
+        inherited_settings: a dict mapping BlockKey -> the settings the block inherits, if they
+            were computed for the whole course structure (otherwise blocks look for them on their
+            ancestors)
         """
         # needed by capa_problem (as runtime.filestore via this.resources_fs)
         if course_entry.course_key.course:
@@ -79,9 +89,13 @@ class CachingDescriptorSystem(MakoDescriptorSystem, EditInfoRuntimeMixin):
         # it here. (grading, for example)
         self.course_id = course_entry.course_key
         self.lazy = lazy
+        self.compact = compact
+        self.inherited_settings = inherited_settings
         self.module_data = module_data
         self.default_class = default_class
         self.local_modules = {}
+        # Definitions loaded ahead of their blocks by the modulestore's prefetch_definitions, by id
+        self.prefetched_definitions = {}
         self._services['library_tools'] = LibraryToolsService(modulestore)
 
     @lazy
@@ -188,7 +202,7 @@ class CachingDescriptorSystem(MakoDescriptorSystem, EditInfoRuntimeMixin):
             block_key = BlockKey(block_data.block_type, LocalId())
 
         convert_fields = lambda field: self.modulestore.convert_references_to_keys(
-            course_key, class_, field, self.course_entry.structure['blocks'],
+            course_key, class_, field, self.course_entry.structure['blocks'], copy_fields=not self.compact,
         )
 
         if definition_id is not None and not block_data.definition_loaded:
@@ -198,6 +212,7 @@ class CachingDescriptorSystem(MakoDescriptorSystem, EditInfoRuntimeMixin):
                 block_key.type,
                 definition_id,
                 convert_fields,
+                self.prefetched_definitions,
             )
         else:
             definition_loader = None
@@ -239,11 +254,15 @@ class CachingDescriptorSystem(MakoDescriptorSystem, EditInfoRuntimeMixin):
                 converted_defaults,
                 parent=parent,
                 aside_fields=aside_fields,
-                field_decorator=kwargs.get('field_decorator')
+                field_decorator=kwargs.get('field_decorator'),
+                copy_on_write=self.compact,
             )
 
             if InheritanceMixin in self.modulestore.xblock_mixins:
-                field_data = inheriting_field_data(kvs)
+                inherited_values = None
+                if self.inherited_settings is not None:
+                    inherited_values = self.inherited_settings.get(block_key)
+                field_data = inheriting_field_data(kvs, inherited_values)
             else:
                 field_data = KvsFieldData(kvs)
 
@@ -0,0 +1,89 @@
+"""
+The settings that the blocks of a split modulestore course structure inherit
+from their ancestors, computed once for the whole structure.
+
+Without them, InheritingFieldData finds an inherited value by walking up the
+ancestors of a block until it finds one that sets the field, for every
+inheritable field of every block it loads.
+"""
+from xmodule.modulestore.inheritance import InheritanceMixin
+
+# Increment when the contents of the inherited settings change, so that the
+# inherited settings cached by earlier versions are not used.
+VERSION = 1
+
+
+def compute_inherited_settings(structure):
+    """
+    Return a dict mapping the key of each block of the (saved) structure to
+    a dict of the (serialized) values of the inheritable fields that the
+    block inherits, as InheritingFieldData would find them.
+
+    Blocks that don't set any inheritable fields share the dict of their
+    parent with their children, so the dicts must not be changed.
+
+    Arguments:
+        structure (dict): The structure whose blocks to compute the
+            inherited settings of.
+    """
+    inheritable_names = set(InheritanceMixin.fields.keys())
+    blocks = structure['blocks']
+
+    # Each block inherits from the parent that the runtime finds for it
+    # (see CachingDescriptorSystem._parent_map).
+    parent_map = {}
+    for block_key, block in blocks.iteritems():
+        for child in block.fields.get('children', []):
+            parent_map[child] = block_key
+
+    # The settings that each block passes down to its children.
+    passed_down = {}
+
+    def inherited_by(block_key):
+        """
+        Return the settings that the block inherits from its ancestors.
+        """
+        parent_key = parent_map.get(block_key)
+        if parent_key is None or parent_key not in blocks:
+            return {}
+        return passed_down_by(parent_key)
+
+    def passed_down_by(block_key):
+        """
+        Return the settings that the block passes down to its children.
+        """
+        if block_key not in passed_down:
+            # Walk up to the nearest ancestor whose settings are already known,
+            # rather than recursing, since courses can be deep.
+            ancestors = []
+            ancestor_key = block_key
+            while ancestor_key is not None and ancestor_key in blocks and ancestor_key not in passed_down:
+                ancestors.append(ancestor_key)
+                ancestor_key = parent_map.get(ancestor_key)
+                if ancestor_key in ancestors:
+                    # A cycle, which the runtime's walk would never leave; stop here.
+                    break
+
+            settings = passed_down.get(ancestor_key, {})
+            for ancestor_key in reversed(ancestors):
+                own_settings = {
+                    name: value
+                    for name, value in blocks[ancestor_key].fields.iteritems()
+                    if name in inheritable_names
+                }
+                if own_settings:
+                    settings = dict(settings)
+                    settings.update(own_settings)
+                passed_down[ancestor_key] = settings
+        return passed_down[block_key]
+
+    inherited_settings = {}
+    for block_key, block in blocks.iteritems():
+        settings = inherited_by(block_key)
+        parent_key = parent_map.get(block_key)
+        if block.defaults and parent_key is not None and parent_key.type == 'library_content':
+            # The children of library_content blocks use their own defaults
+            # (copied from the library) rather than inherited values.
+            settings = {name: value for name, value in settings.iteritems() if name not in block.defaults}
+        inherited_settings[block_key] = settings
+    return inherited_settings
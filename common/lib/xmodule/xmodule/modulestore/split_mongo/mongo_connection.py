@@ -8,6 +8,8 @@ import zlib
 import pymongo
 import pytz
 import re
+import threading
+from collections import OrderedDict
 from contextlib import contextmanager
 from time import time
 
@@ -28,6 +30,8 @@ from mongodb_proxy import autoretry_read
 from xmodule.exceptions import HeartbeatFailure
 from xmodule.modulestore import BlockData
 from xmodule.modulestore.split_mongo import BlockKey
+from xmodule.modulestore.split_mongo import inherited_settings
+from xmodule.modulestore.split_mongo.block_index import BlockIndex
 from xmodule.mongo_utils import connect_to_mongodb, create_collection_index
 
 
@@ -279,16 +283,88 @@ class CourseStructureCache(object):
             self.cache.set(key, compressed_pickled_data, None)
 
 
+class StructureLRUCache(object):
+    """
+    A per-process cache of deserialized structures, by structure id, which
+    evicts the least recently used structures once the structures in it
+    have more than `max_blocks` blocks in total.
+
+    Structures are immutable once saved, so the cached structures are shared
+    by all of the threads and requests of the process, without copying them.
+    """
+    def __init__(self, max_blocks):
+        """
+        Arguments:
+            max_blocks (int): The maximum total number of blocks of the cached
+                structures (the blocks take up most of a structure's memory).
+        """
+        self.max_blocks = max_blocks
+        self.num_blocks = 0
+        self.evictions = 0
+        self._structures = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._structures)
+
+    def get(self, key):
+        """
+        Return the cached structure whose id is `key`, or None.
+        """
+        with self._lock:
+            structure = self._structures.pop(key, None)
+            if structure is not None:
+                self._structures[key] = structure
+            return structure
+
+    def set(self, key, structure):
+        """
+        Cache the structure whose id is `key`, and return the number of
+        structures evicted to make room for it.
+        """
+        num_blocks = len(structure['blocks'])
+        if num_blocks > self.max_blocks:
+            return 0
+
+        with self._lock:
+            if key in self._structures:
+                return 0
+            self._structures[key] = structure
+            self.num_blocks += num_blocks
+
+            evicted = 0
+            while self.num_blocks > self.max_blocks:
+                __, evicted_structure = self._structures.popitem(last=False)
+                self.num_blocks -= len(evicted_structure['blocks'])
+                evicted += 1
+            self.evictions += evicted
+            return evicted
+
+    def clear(self):
+        """
+        Remove all of the cached structures.
+        """
+        with self._lock:
+            self._structures.clear()
+            self.num_blocks = 0
+
+
 class MongoConnection(object):
     """
     Segregation of pymongo functions from the data modeling mechanisms for split modulestore.
     """
+    # The number of items of data derived from structures (such as block indexes) kept in memory.
+    DERIVED_DATA_CACHE_SIZE = 64
+
     def __init__(
         self, db, collection, host, port=27017, tz_aware=True, user=None, password=None,
-        asset_collection=None, retry_wait_time=0.1, **kwargs
+        asset_collection=None, retry_wait_time=0.1, structure_cache_max_blocks=0, **kwargs
     ):
         """
         Create & open the connection, authenticate, and provide pointers to the collections
+
+        Structures are cached in process, up to `structure_cache_max_blocks`
+        blocks in total, if it isn't 0.
         """
         # Set a write concern of 1, which makes writes complete successfully to the primary
         # only before returning. Also makes pymongo report write errors.
@@ -304,6 +380,13 @@ class MongoConnection(object):
         self.structures = self.database[collection + '.structures']
         self.definitions = self.database[collection + '.definitions']
 
+        # The most recently used data derived from structures, by name and structure id.
+        self._derived_data = OrderedDict()
+
+        self.structure_cache = None
+        if structure_cache_max_blocks:
+            self.structure_cache = StructureLRUCache(structure_cache_max_blocks)
+
     def heartbeat(self):
         """
         Check that the db is reachable.
@@ -320,6 +403,12 @@ class MongoConnection(object):
         This method will use a cached version of the structure if it is available.
         """
         with TIMER.timer("get_structure", course_context) as tagger_get_structure:
+            if self.structure_cache is not None:
+                structure = self.structure_cache.get(key)
+                tagger_get_structure.tag(from_process_cache=str(structure is not None).lower())
+                if structure is not None:
+                    return structure
+
             cache = CourseStructureCache()
 
             structure = cache.get(key, course_context)
@@ -342,6 +431,12 @@ class MongoConnection(object):
 
                 cache.set(key, structure, course_context)
 
+            if self.structure_cache is not None:
+                evicted = self.structure_cache.set(key, structure)
+                tagger_get_structure.measure("process_cache_evictions", evicted)
+                tagger_get_structure.measure("process_cache_structures", len(self.structure_cache))
+                tagger_get_structure.measure("process_cache_blocks", self.structure_cache.num_blocks)
+
             return structure
 
     @autoretry_read()
@@ -426,6 +521,49 @@ class MongoConnection(object):
             tagger.measure("structures", len(docs))
             return docs
 
+    def _get_derived_data(self, structure, name, version, compute, course_context=None):
+        """
+        Get the data derived from the given (saved) structure by `compute(structure)`.
+
+        Structures are immutable once saved, so the data is computed once for each
+        structure and cached in memory and, next to the structure itself, in the
+        CourseStructureCache.
+        """
+        key = (name, structure['_id'])
+        data = self._derived_data.pop(key, None)
+        if data is None:
+            with TIMER.timer("get_{}".format(name), course_context) as tagger:
+                cache = CourseStructureCache()
+                cache_key = u'{}.{}.v{}'.format(structure['_id'], name, version)
+
+                data = cache.get(cache_key, course_context)
+                tagger.tag(from_cache=str(data is not None).lower())
+                if data is None:
+                    tagger.measure("blocks", len(structure['blocks']))
+                    data = compute(structure)
+                    cache.set(cache_key, data, course_context)
+
+        self._derived_data[key] = data
+        if len(self._derived_data) > self.DERIVED_DATA_CACHE_SIZE:
+            self._derived_data.popitem(last=False)
+        return data
+
+    def get_block_index(self, structure, course_context=None):
+        """
+        Get the BlockIndex of the given (saved) structure.
+        """
+        return self._get_derived_data(structure, 'block_index', BlockIndex.VERSION, BlockIndex, course_context)
+
+    def get_inherited_settings(self, structure, course_context=None):
+        """
+        Get the settings that the blocks of the given (saved) structure inherit,
+        by block key (see inherited_settings.compute_inherited_settings).
+        """
+        return self._get_derived_data(
+            structure, 'inherited_settings', inherited_settings.VERSION,
+            inherited_settings.compute_inherited_settings, course_context,
+        )
+
     def insert_structure(self, structure, course_context=None):
         """
         Insert a new structure into the database.
@@ -602,5 +740,8 @@ class MongoConnection(object):
             self.structures.remove({})
             self.definitions.remove({})
 
+        if self.structure_cache is not None:
+            self.structure_cache.clear()
+
         if connections:
             connection.close()
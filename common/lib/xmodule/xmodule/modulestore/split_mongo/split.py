@@ -336,6 +336,32 @@ class SplitBulkWriteMixin(BulkOperationsMixin):
             version_guid = course_key.as_object_id(version_guid)
             return self.db_connection.get_structure(version_guid, course_key)
 
+    def _is_saved_structure(self, course_key, structure):
+        """
+        Return whether the structure is saved, rather than changed in the active
+        bulk operation (and so may yet change again).
+        """
+        bulk_write_record = self._get_bulk_ops_record(course_key)
+        return not bulk_write_record.active or structure['_id'] in bulk_write_record.structures_in_db
+
+    def get_block_index(self, course_key, structure):
+        """
+        Return the BlockIndex of the structure, or None if the structure was
+        changed in the active bulk operation.
+        """
+        if not self._is_saved_structure(course_key, structure):
+            return None
+        return self.db_connection.get_block_index(structure, course_key)
+
+    def get_inherited_settings(self, course_key, structure):
+        """
+        Return the settings that the blocks of the structure inherit, by block key,
+        or None if the structure was changed in the active bulk operation.
+        """
+        if not self._is_saved_structure(course_key, structure):
+            return None
+        return self.db_connection.get_inherited_settings(structure, course_key)
+
     def update_structure(self, course_key, structure):
         """
         Update a course structure, respecting the current bulk operation status
@@ -657,14 +683,20 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
                  default_class=None,
                  error_tracker=null_error_tracker,
                  i18n_service=None, fs_service=None, user_service=None,
-                 services=None, signal_handler=None, **kwargs):
+                 services=None, signal_handler=None, structure_cache_max_blocks=0, compact_field_storage=False,
+                 **kwargs):
         """
         :param doc_store_config: must have a host, db, and collection entries. Other common entries: port, tz_aware.
+        :param structure_cache_max_blocks: the maximum total number of blocks of the structures
+            cached in process (0 to not cache structures in process).
+        :param compact_field_storage: whether blocks loaded from the published branch share their
+            settings with the course structure, rather than each keeping a copy of them.
         """
 
         super(SplitMongoModuleStore, self).__init__(contentstore, **kwargs)
 
-        self.db_connection = MongoConnection(**doc_store_config)
+        self.db_connection = MongoConnection(structure_cache_max_blocks=structure_cache_max_blocks, **doc_store_config)
+        self.compact_field_storage = compact_field_storage
 
         if default_class is not None:
             module_path, __, class_name = default_class.rpartition('.')
@@ -744,28 +776,42 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
             # This method supports lazy loading, where the descendent definitions aren't loaded
             # until they're actually needed.
             if not lazy:
-                # Non-lazy loading: Load all descendants by id.
-                descendent_definitions = self.get_definitions(
-                    course_key,
-                    [
-                        block.definition
-                        for block in new_module_data.itervalues()
-                    ]
-                )
-                # Turn definitions into a map.
-                definitions = {definition['_id']: definition
-                               for definition in descendent_definitions}
-
-                for block in new_module_data.itervalues():
-                    if block.definition in definitions:
-                        definition = definitions[block.definition]
-                        # convert_fields gets done later in the runtime's xblock_from_json
-                        block.fields.update(definition.get('fields'))
-                        block.definition_loaded = True
+                # Non-lazy loading: Load all descendants' definitions in one query.
+                self.prefetch_definitions(system, new_module_data.keys(), course_key)
 
             system.module_data.update(new_module_data)
             return system.module_data
 
+    def prefetch_definitions(self, system, block_keys, course_key):
+        """
+        Load the definitions of the given blocks in one query, for the blocks to use
+        (rather than each querying for its own definition) when they are loaded by `system`.
+
+        Arguments:
+            system: a CachingDescriptorSystem
+            block_keys: list of BlockKeys of the blocks in the system's course structure
+            course_key: the course the blocks are being loaded for
+
+        Returns:
+            the number of definitions loaded (those that weren't already prefetched
+            and were found)
+        """
+        blocks = system.course_entry.structure['blocks']
+        definition_ids = set()
+        for block_key in block_keys:
+            block_data = blocks.get(block_key)
+            if block_data is not None and block_data.definition is not None:
+                definition_ids.add(block_data.definition)
+        definition_ids.difference_update(system.prefetched_definitions)
+        if not definition_ids:
+            return 0
+
+        num_loaded = 0
+        for definition in self.get_definitions(course_key, definition_ids):
+            system.prefetched_definitions[definition['_id']] = definition
+            num_loaded += 1
+        return num_loaded
+
     @contract(course_entry=CourseEnvelope, block_keys="list(BlockKey)", depth="int | None")
     def _load_items(self, course_entry, block_keys, depth=0, **kwargs):
         """
@@ -1197,11 +1243,18 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
 
         if settings is None:
             settings = {}
+        blocks = course.structure['blocks']
+        block_index = self.get_block_index(course_locator, course.structure)
+
         if 'name' in qualifiers:
             # odd case where we don't search just confirm
             block_name = qualifiers.pop('name')
             block_ids = []
-            for block_id, block in course.structure['blocks'].iteritems():
+            if block_index is not None:
+                named_blocks = ((block_id, blocks[block_id]) for block_id in block_index.named(block_name))
+            else:
+                named_blocks = blocks.iteritems()
+            for block_id, block in named_blocks:
                 # Do an in comparison on the name qualifier
                 # so that a list can be used to filter on block_id
                 if block_id.id in block_name and _block_matches_all(block):
@@ -1224,7 +1277,14 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
             path_cache = {}
             parents_cache = self.build_block_key_to_parents_mapping(course.structure)
 
-        for block_id, value in course.structure['blocks'].iteritems():
+        # Only match the blocks that the index finds can match, if it can.
+        candidates = block_index.candidates(qualifiers, settings) if block_index is not None else None
+        if candidates is not None:
+            candidate_blocks = ((block_id, blocks[block_id]) for block_id in candidates)
+        else:
+            candidate_blocks = blocks.iteritems()
+
+        for block_id, value in candidate_blocks:
             if _block_matches_all(value):
                 if not include_orphans:
                     if (  # pylint: disable=bad-continuation
@@ -2925,11 +2985,12 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
             # update the index entry if appropriate
             self._update_head(course_locator, index_entry, course_locator.branch, new_structure['_id'])
 
-    def convert_references_to_keys(self, course_key, xblock_class, jsonfields, blocks):
+    def convert_references_to_keys(self, course_key, xblock_class, jsonfields, blocks, copy_fields=True):
         """
         Convert the given serialized fields to the deserialized values by finding all references
         and converting them.
         :param jsonfields: the serialized copy of the xblock's fields
+        :param copy_fields: if False, return jsonfields itself when it has no references to convert
         """
         @contract(block_key="BlockUsageLocator | seq[2]")
         def robust_usage_key(block_key):
@@ -2956,20 +3017,25 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
 
         xblock_class = self.mixologist.mix(xblock_class)
         # Make a shallow copy, so that we aren't manipulating a cached field dictionary
-        output_fields = dict(jsonfields)
-        for field_name, value in output_fields.iteritems():
+        output_fields = dict(jsonfields) if copy_fields else jsonfields
+        for field_name, value in jsonfields.iteritems():
             if value:
                 try:
                     field = xblock_class.fields.get(field_name)
                 except AttributeError:
                     continue
+                if not isinstance(field, (Reference, ReferenceList, ReferenceValueDict)):
+                    continue
+                if output_fields is jsonfields:
+                    output_fields = dict(jsonfields)
                 if isinstance(field, Reference):
                     output_fields[field_name] = robust_usage_key(value)
                 elif isinstance(field, ReferenceList):
                     output_fields[field_name] = [robust_usage_key(ele) for ele in value]
-                elif isinstance(field, ReferenceValueDict):
-                    for key, subvalue in value.iteritems():
-                        value[key] = robust_usage_key(subvalue)
+                else:
+                    output_fields[field_name] = {
+                        key: robust_usage_key(subvalue) for key, subvalue in value.iteritems()
+                    }
         return output_fields
 
     def _get_index_if_valid(self, course_key, force=False):
@@ -3348,11 +3414,18 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
         """
         Create the proper runtime for this course
         """
+        read_only = course_entry.course_key.branch == ModuleStoreEnum.BranchName.published
         return CachingDescriptorSystem(
             modulestore=self,
             course_entry=course_entry,
             module_data={},
             lazy=lazy,
+            compact=self.compact_field_storage and read_only,
+            # Read-only blocks inherit settings precomputed for the whole structure,
+            # rather than looking for them on their ancestors.
+            inherited_settings=(
+                self.get_inherited_settings(course_entry.course_key, course_entry.structure) if read_only else None
+            ),
             default_class=self.default_class,
             error_tracker=self.error_tracker,
             render_template=self.render_template,
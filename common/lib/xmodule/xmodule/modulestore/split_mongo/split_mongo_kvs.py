@@ -13,6 +13,13 @@ SplitMongoKVSid = namedtuple('SplitMongoKVSid', 'id, def_id')
 new_contract('BlockUsageLocator', BlockUsageLocator)
 
 
+def _undecorated(value):
+    """
+    The default field decorator, which returns field values unchanged.
+    """
+    return value
+
+
 class SplitMongoKVS(InheritanceKeyValueStore):
     """
     A KeyValueStore that maps keyed data access to one of the 3 data areas
@@ -22,23 +29,32 @@ class SplitMongoKVS(InheritanceKeyValueStore):
     VALID_SCOPES = (Scope.parent, Scope.children, Scope.settings, Scope.content)
 
     @contract(parent="BlockUsageLocator | None")
-    def __init__(self, definition, initial_values, default_values, parent, aside_fields=None, field_decorator=None):
+    def __init__(
+            self, definition, initial_values, default_values, parent, aside_fields=None, field_decorator=None,
+            copy_on_write=False
+    ):
         """
 
         :param definition: either a lazyloader or definition id for the definition
         :param initial_values: a dictionary of the locally set values
         :param default_values: any Scope.settings field defaults that are set locally
             (copied from a template block with copy_from_template)
+        :param copy_on_write: whether to share initial_values (e.g. with the course structure)
+            rather than copy them, until a field is written or a mutable value is read
         """
-        # deepcopy so that manipulations of fields does not pollute the source
-        super(SplitMongoKVS, self).__init__(copy.deepcopy(initial_values))
+        if copy_on_write:
+            super(SplitMongoKVS, self).__init__(initial_values)
+        else:
+            # deepcopy so that manipulations of fields does not pollute the source
+            super(SplitMongoKVS, self).__init__(copy.deepcopy(initial_values))
+        self._fields_shared = copy_on_write
         self._definition = definition  # either a DefinitionLazyLoader or the db id of the definition.
         # if the db id, then the definition is presumed to be loaded into _fields
 
         self._defaults = default_values
         # a decorator function for field values (to be called when a field is accessed)
         if field_decorator is None:
-            self.field_decorator = lambda x: x
+            self.field_decorator = _undecorated
         else:
             self.field_decorator = field_decorator
 
@@ -61,6 +77,10 @@ class SplitMongoKVS(InheritanceKeyValueStore):
                 self._load_definition()
 
             if key.field_name in aside_fields:
+                if self._fields_shared and isinstance(aside_fields[key.field_name], (list, dict)):
+                    # the caller may change the value in place
+                    self._own_fields()
+                    aside_fields = self.aside_fields[key.block_scope_id.block_type]
                 return self.field_decorator(aside_fields[key.field_name])
 
             raise KeyError()
@@ -84,6 +104,9 @@ class SplitMongoKVS(InheritanceKeyValueStore):
                     raise InvalidScopeError(key)
 
             if key.field_name in self._fields:
+                if self._fields_shared and isinstance(self._fields[key.field_name], (list, dict)):
+                    # the caller may change the value in place
+                    self._own_fields()
                 field_value = self._fields[key.field_name]
                 # return the "decorated" field value
                 return self.field_decorator(field_value)
@@ -101,9 +124,11 @@ class SplitMongoKVS(InheritanceKeyValueStore):
             if key.scope == Scope.children:
                 raise InvalidScopeError(key)
 
+            self._own_fields()
             self.aside_fields.setdefault(key.block_scope_id.block_type, {})[key.field_name] = value
         else:
             # set the field
+            self._own_fields()
             self._fields[key.field_name] = value
 
             # This function is currently incomplete: it doesn't handle side effects.
@@ -128,10 +153,12 @@ class SplitMongoKVS(InheritanceKeyValueStore):
 
             if key.block_scope_id.block_type in self.aside_fields \
                     and key.field_name in self.aside_fields[key.block_scope_id.block_type]:
+                self._own_fields()
                 del self.aside_fields[key.block_scope_id.block_type][key.field_name]
         else:
             # delete the field value
             if key.field_name in self._fields:
+                self._own_fields()
                 del self._fields[key.field_name]
 
     def has(self, key):
@@ -174,6 +201,15 @@ class SplitMongoKVS(InheritanceKeyValueStore):
         # If not, try inheriting from a parent, then use the XBlock type's normal default value:
         return super(SplitMongoKVS, self).default(key)
 
+    def _own_fields(self):
+        """
+        Copy the fields (once) before they can be changed, if they're shared.
+        """
+        if self._fields_shared:
+            self._fields = copy.deepcopy(self._fields)
+            self.aside_fields = copy.deepcopy(self.aside_fields)
+            self._fields_shared = False
+
     def _load_definition(self):
         """
         Update fields w/ the lazily loaded definitions
@@ -182,6 +218,7 @@ class SplitMongoKVS(InheritanceKeyValueStore):
             persisted_definition = self._definition.fetch()
             if persisted_definition is not None:
                 fields = self._definition.field_converter(persisted_definition.get('fields'))
+                self._own_fields()
                 self._fields.update(fields)
                 aside_fields_p = persisted_definition.get('aside_fields')
                 if aside_fields_p:
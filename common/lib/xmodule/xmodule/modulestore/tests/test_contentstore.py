@@ -1,6 +1,7 @@
 """
  Test contentstore.mongo functionality
 """
+import itertools
 import logging
 from uuid import uuid4
 import unittest
@@ -8,6 +9,7 @@ import mimetypes
 from tempfile import mkdtemp
 import path
 import shutil
+import pymongo
 
 from opaque_keys.edx.locator import CourseLocator, AssetLocator
 from opaque_keys.edx.keys import AssetKey
@@ -104,6 +106,25 @@ class TestContentstore(unittest.TestCase):
         # ensure deleting a non-existent file is a noop
         self.contentstore.delete(asset_key)
 
+    @ddt.data(True, False)
+    def test_asset_version(self, deprecated):
+        """
+        Test that saving and deleting assets changes the version of the assets of their course
+        """
+        self.set_up_assets(deprecated)
+        version = self.contentstore.get_asset_version(self.course1_key)
+        self.assertEqual(self.contentstore.get_asset_version(self.course1_key), version)
+
+        asset_key = self.course1_key.make_asset_key('asset', self.course1_files[0])
+        self.contentstore.delete(asset_key)
+        deleted_version = self.contentstore.get_asset_version(self.course1_key)
+        self.assertNotEqual(deleted_version, version)
+
+        course2_version = self.contentstore.get_asset_version(self.course2_key)
+        self.save_asset(self.course1_files[0], asset_key, self.course1_files[0], False)
+        self.assertNotEqual(self.contentstore.get_asset_version(self.course1_key), deleted_version)
+        self.assertEqual(self.contentstore.get_asset_version(self.course2_key), course2_version)
+
     @ddt.data(True, False)
     def test_find(self, deprecated):
         """
@@ -165,6 +186,54 @@ class TestContentstore(unittest.TestCase):
         self.assertEqual(count, 0)
         self.assertEqual(course_assets, [])
 
+    @ddt.data(*itertools.product((True, False), (pymongo.ASCENDING, pymongo.DESCENDING)))
+    @ddt.unpack
+    def test_get_all_content_after(self, deprecated, direction):
+        """
+        Test continuing get_all_content_for_course from the last asset of the previous page
+        """
+        self.set_up_assets(deprecated)
+        sort = [('displayname', direction)]
+        all_assets, __ = self.contentstore.get_all_content_for_course(self.course1_key, sort=sort)
+        expected = [asset['asset_key'] for asset in all_assets]
+
+        page, count = self.contentstore.get_all_content_for_course(
+            self.course1_key, maxresults=2, sort=sort, with_count=False
+        )
+        self.assertIsNone(count)
+        next_page, __ = self.contentstore.get_all_content_for_course(
+            self.course1_key, start=2, maxresults=2, sort=sort, after=page[-1]['asset_key']
+        )
+        self.assertEqual([asset['asset_key'] for asset in page + next_page], expected)
+
+        # If the asset has been deleted, the assets are skipped instead.
+        self.contentstore.delete(page[-1]['asset_key'])
+        next_page, __ = self.contentstore.get_all_content_for_course(
+            self.course1_key, start=1, maxresults=2, sort=sort, after=page[-1]['asset_key']
+        )
+        self.assertEqual([asset['asset_key'] for asset in next_page], expected[2:])
+
+    @ddt.data(True, False)
+    def test_get_all_content_after_asset_without_sort_field(self, deprecated):
+        """
+        Test that the assets are skipped instead when the last asset of the previous page
+        has no value for a sort field
+        """
+        self.set_up_assets(deprecated)
+        sort = [('displayname', pymongo.ASCENDING)]
+        page, __ = self.contentstore.get_all_content_for_course(self.course1_key, maxresults=2, sort=sort)
+        asset_db_key, __ = self.contentstore.asset_db_key(page[-1]['asset_key'])
+        self.contentstore.fs_files.update({'_id': asset_db_key}, {'$unset': {'displayname': True}})
+        all_assets, __ = self.contentstore.get_all_content_for_course(self.course1_key, sort=sort)
+
+        next_page, __ = self.contentstore.get_all_content_for_course(
+            self.course1_key, start=2, maxresults=2, sort=sort, after=page[-1]['asset_key']
+        )
+        self.assertEqual(
+            [asset['asset_key'] for asset in next_page],
+            [asset['asset_key'] for asset in all_assets[2:]],
+        )
+
     @ddt.data(True, False)
     def test_attrs(self, deprecated):
         """
@@ -0,0 +1,130 @@
+"""
+Tests of the BlockIndex of split modulestore structures.
+"""
+import re
+import unittest
+
+import ddt
+from mock import patch
+from opaque_keys.edx.locator import CourseLocator
+
+from xmodule.modulestore import BlockData
+from xmodule.modulestore.split_mongo import BlockKey, CourseEnvelope
+from xmodule.modulestore.split_mongo.block_index import BlockIndex
+from xmodule.modulestore.split_mongo.split import SplitMongoModuleStore
+
+
+def make_structure(*blocks):
+    """
+    Return a structure with the given blocks, each a (block_type, block_id, fields) tuple.
+    """
+    return {
+        '_id': 'structure',
+        'blocks': {
+            BlockKey(block_type, block_id): BlockData(block_type=block_type, fields=fields)
+            for block_type, block_id, fields in blocks
+        },
+    }
+
+
+class TestBlockIndex(unittest.TestCase):
+    """
+    Tests of BlockIndex.
+    """
+    def setUp(self):
+        super(TestBlockIndex, self).setUp()
+        self.block_index = BlockIndex(make_structure(
+            ('course', 'course', {'children': [BlockKey('chapter', 'chapter')]}),
+            ('chapter', 'chapter', {'children': [BlockKey('sequential', 'homework')]}),
+            ('sequential', 'homework', {'format': 'Homework', 'graded': True}),
+            ('problem', 'problem_1', {'group_access': {50: [1]}}),
+            ('problem', 'problem_2', {}),
+            ('html', 'problem_2', {'format': ['Homework', ['Lab']]}),
+        ))
+
+    def test_block_type(self):
+        self.assertEqual(
+            self.block_index.candidates({'block_type': 'problem'}, {}),
+            {BlockKey('problem', 'problem_1'), BlockKey('problem', 'problem_2')},
+        )
+        self.assertEqual(self.block_index.candidates({'block_type': 'video'}, {}), set())
+
+    def test_not_indexable(self):
+        self.assertIsNone(self.block_index.candidates({}, {}))
+        self.assertIsNone(self.block_index.candidates({'block_type': re.compile('prob')}, {}))
+        self.assertIsNone(self.block_index.candidates({}, {'display_name': 'Homework'}))
+        self.assertIsNone(self.block_index.candidates({}, {'format': {'$in': ['Homework']}}))
+
+    def test_settings(self):
+        self.assertEqual(
+            self.block_index.candidates({}, {'format': 'Homework'}),
+            {BlockKey('sequential', 'homework'), BlockKey('html', 'problem_2')},
+        )
+        self.assertEqual(self.block_index.candidates({}, {'format': 'Lab'}), {BlockKey('html', 'problem_2')})
+        self.assertEqual(
+            self.block_index.candidates({'block_type': 'sequential'}, {'format': 'Homework', 'graded': True}),
+            {BlockKey('sequential', 'homework')},
+        )
+        self.assertEqual(
+            self.block_index.candidates({}, {'group_access': {'$exists': True}}),
+            {BlockKey('problem', 'problem_1')},
+        )
+
+    def test_named(self):
+        self.assertEqual(
+            self.block_index.named(['problem_2', 'missing']),
+            {BlockKey('problem', 'problem_2'), BlockKey('html', 'problem_2')},
+        )
+        # A string name matches the blocks whose ids are in it.
+        self.assertEqual(
+            self.block_index.named('problem_1'),
+            {BlockKey('problem', 'problem_1')},
+        )
+
+
+@ddt.ddt
+class TestGetItemsWithBlockIndex(unittest.TestCase):
+    """
+    Tests that SplitMongoModuleStore.get_items finds the same blocks with a
+    BlockIndex as by matching every block of the structure.
+    """
+    def setUp(self):
+        super(TestGetItemsWithBlockIndex, self).setUp()
+        # Only the parts of the store that get_items uses to match blocks are needed.
+        self.store = SplitMongoModuleStore.__new__(SplitMongoModuleStore)
+        self.course_key = CourseLocator('org', 'course', 'run')
+        self.structure = make_structure(
+            ('chapter', 'chapter', {'children': [BlockKey('sequential', 'homework')]}),
+            ('sequential', 'homework', {'format': 'Homework', 'graded': True}),
+            ('problem', 'problem_1', {'group_access': {50: [1]}}),
+            ('problem', 'problem_2', {}),
+            ('html', 'problem_2', {'format': 'Lab'}),
+        )
+        for method, side_effect in (
+                ('_load_items', lambda course, block_keys, **kwargs: sorted(block_keys)),
+                ('get_definition', lambda course_key, definition: {'fields': {}}),
+                ('_lookup_course', lambda course_key, **kwargs: CourseEnvelope(self.course_key, self.structure)),
+        ):
+            patcher = patch.object(SplitMongoModuleStore, method, side_effect=side_effect, autospec=False)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def get_items(self, block_index, **kwargs):
+        """
+        Return the result of get_items, using the given block index (or None).
+        """
+        with patch.object(SplitMongoModuleStore, 'get_block_index', return_value=block_index):
+            return self.store.get_items(self.course_key, **kwargs)
+
+    @ddt.data(
+        {'qualifiers': {'category': 'problem'}},
+        {'qualifiers': {'category': 'video'}},
+        {'qualifiers': {'name': ['problem_2', 'missing']}},
+        {'qualifiers': {'category': 'sequential'}, 'settings': {'format': 'Homework'}},
+        {'settings': {'group_access': {'$exists': True}}},
+    )
+    def test_same_items(self, lookup):
+        self.assertEqual(
+            self.get_items(BlockIndex(self.structure), **lookup),
+            self.get_items(None, **lookup),
+        )
@@ -0,0 +1,152 @@
+"""
+Tests of the inherited settings computed for split modulestore structures.
+"""
+import unittest
+
+from mock import Mock
+from opaque_keys.edx.locator import BlockUsageLocator, CourseLocator
+from xblock.fields import ScopeIds
+
+from xmodule.modulestore import BlockData
+from xmodule.modulestore.inheritance import InheritanceMixin, inheriting_field_data
+from xmodule.modulestore.split_mongo import BlockKey
+from xmodule.modulestore.split_mongo.inherited_settings import compute_inherited_settings
+from xmodule.modulestore.split_mongo.split_mongo_kvs import SplitMongoKVS
+from xmodule.tests import get_test_descriptor_system
+from xmodule.xml_module import XmlDescriptor
+
+COURSE = BlockKey('course', 'course')
+CHAPTER = BlockKey('chapter', 'chapter')
+SEQUENTIAL = BlockKey('sequential', 'homework')
+VERTICAL = BlockKey('vertical', 'vertical')
+PROBLEM = BlockKey('problem', 'problem')
+LIBRARY_CONTENT = BlockKey('library_content', 'library_content')
+LIBRARY_PROBLEM = BlockKey('problem', 'library_problem')
+ORPHAN = BlockKey('html', 'orphan')
+
+
+def make_structure(*blocks):
+    """
+    Return a structure with the given blocks, each a (block_key, fields, defaults) tuple.
+    """
+    return {
+        'blocks': {
+            block_key: BlockData(block_type=block_key.type, fields=fields, defaults=defaults)
+            for block_key, fields, defaults in blocks
+        },
+    }
+
+
+class TestComputeInheritedSettings(unittest.TestCase):
+    """
+    Tests of compute_inherited_settings.
+    """
+    def setUp(self):
+        super(TestComputeInheritedSettings, self).setUp()
+        self.inherited_settings = compute_inherited_settings(make_structure(
+            (COURSE, {'children': [CHAPTER], 'start': '2016-01-01T00:00:00Z', 'display_name': 'Course'}, {}),
+            (CHAPTER, {'children': [SEQUENTIAL, LIBRARY_CONTENT], 'visible_to_staff_only': True}, {}),
+            (SEQUENTIAL, {'children': [VERTICAL], 'due': '2016-02-01T00:00:00Z', 'graded': True}, {}),
+            (VERTICAL, {'children': [PROBLEM], 'display_name': 'Unit'}, {}),
+            (PROBLEM, {'start': '2016-01-15T00:00:00Z'}, {}),
+            (LIBRARY_CONTENT, {'children': [LIBRARY_PROBLEM], 'due': '2016-03-01T00:00:00Z'}, {}),
+            (LIBRARY_PROBLEM, {}, {'due': '2016-04-01T00:00:00Z'}),
+            (ORPHAN, {}, {}),
+        ))
+
+    def test_root(self):
+        self.assertEqual(self.inherited_settings[COURSE], {})
+
+    def test_inherited_from_ancestors(self):
+        self.assertEqual(self.inherited_settings[VERTICAL], {
+            'start': '2016-01-01T00:00:00Z',
+            'visible_to_staff_only': True,
+            'due': '2016-02-01T00:00:00Z',
+            'graded': True,
+        })
+
+    def test_own_settings_not_inherited(self):
+        # A block's own settings override the ones it inherits, so they aren't included.
+        self.assertEqual(self.inherited_settings[PROBLEM]['start'], '2016-01-01T00:00:00Z')
+        self.assertNotIn('display_name', self.inherited_settings[PROBLEM])
+
+    def test_shared_with_parent(self):
+        self.assertIs(self.inherited_settings[PROBLEM], self.inherited_settings[VERTICAL])
+
+    def test_library_content_children_use_defaults(self):
+        self.assertNotIn('due', self.inherited_settings[LIBRARY_PROBLEM])
+        self.assertTrue(self.inherited_settings[LIBRARY_PROBLEM]['visible_to_staff_only'])
+
+    def test_orphan(self):
+        self.assertEqual(self.inherited_settings[ORPHAN], {})
+
+
+class TestInheritedSettingsParity(unittest.TestCase):
+    """
+    Tests that blocks given their precomputed inherited settings find the same
+    values as blocks that walk up their ancestors.
+    """
+    def setUp(self):
+        super(TestInheritedSettingsParity, self).setUp()
+        self.course_key = CourseLocator('org', 'course', 'run')
+        # Inheritable settings set, and overridden, at every depth.
+        self.structure = make_structure(
+            (COURSE, {
+                'children': [CHAPTER], 'start': '2016-01-01T00:00:00Z', 'due': '2016-06-01T00:00:00Z',
+                'showanswer': 'finished', 'max_attempts': 3,
+            }, {}),
+            (CHAPTER, {'children': [SEQUENTIAL, LIBRARY_CONTENT], 'visible_to_staff_only': True}, {}),
+            (SEQUENTIAL, {
+                'children': [VERTICAL], 'due': '2016-02-01T00:00:00Z', 'graded': True, 'max_attempts': 5,
+            }, {}),
+            (VERTICAL, {'children': [PROBLEM], 'start': '2016-01-10T00:00:00Z', 'visible_to_staff_only': False}, {}),
+            (PROBLEM, {'showanswer': 'always'}, {}),
+            (LIBRARY_CONTENT, {'children': [LIBRARY_PROBLEM], 'due': '2016-03-01T00:00:00Z'}, {}),
+            (LIBRARY_PROBLEM, {}, {'due': '2016-04-01T00:00:00Z', 'max_attempts': 1}),
+            (ORPHAN, {}, {}),
+        )
+        self.parent_map = {
+            child: block_key
+            for block_key, block in self.structure['blocks'].iteritems()
+            for child in block.fields.get('children', [])
+        }
+
+    def location(self, block_key):
+        """
+        Return the usage locator of the block.
+        """
+        return BlockUsageLocator(self.course_key, block_key.type, block_key.id)
+
+    def load_blocks(self, inherited_settings):
+        """
+        Return the blocks of the structure by key, given their inherited settings
+        if any (or else finding them on their ancestors).
+        """
+        system = get_test_descriptor_system()
+        loaded = {}
+        system.get_block = loaded.get
+        for block_key, block_data in self.structure['blocks'].iteritems():
+            parent_key = self.parent_map.get(block_key)
+            kvs = SplitMongoKVS(
+                Mock(), block_data.fields, block_data.defaults,
+                parent=self.location(parent_key) if parent_key else None,
+            )
+            inherited_values = inherited_settings[block_key] if inherited_settings is not None else None
+            loaded[self.location(block_key)] = system.construct_xblock_from_class(
+                XmlDescriptor,
+                ScopeIds(None, block_key.type, None, self.location(block_key)),
+                inheriting_field_data(kvs, inherited_values),
+            )
+        return {block_key: loaded[self.location(block_key)] for block_key in self.structure['blocks']}
+
+    def test_same_values(self):
+        walking_blocks = self.load_blocks(None)
+        precomputed_blocks = self.load_blocks(compute_inherited_settings(self.structure))
+
+        for block_key in self.structure['blocks']:
+            for name in InheritanceMixin.fields:
+                self.assertEqual(
+                    getattr(precomputed_blocks[block_key], name),
+                    getattr(walking_blocks[block_key], name),
+                    u'{} of {}'.format(name, block_key),
+                )
@@ -16,7 +16,7 @@ from nose.plugins.attrib import attr
 from django.core.cache import caches, InvalidCacheBackendError
 
 from openedx.core.lib import tempdir
-from xblock.fields import Reference, ReferenceList, ReferenceValueDict
+from xblock.fields import Reference, ReferenceList, ReferenceValueDict, Scope
 from xmodule.course_module import CourseDescriptor
 from xmodule.modulestore import ModuleStoreEnum
 from xmodule.modulestore.exceptions import (
@@ -1251,6 +1251,32 @@ class SplitModuleItemTests(SplitModuleTest):
             expected_ids.remove(child.location.block_id)
         self.assertEqual(len(expected_ids), 0)
 
+    def test_prefetch_definitions(self):
+        """
+        Test that prefetch_definitions loads the definitions of blocks in one query, for the blocks to use
+        """
+        course_key = CourseLocator(org='testx', course='GreekHero', run="run", branch=BRANCH_NAME_DRAFT)
+        store = modulestore()
+        course = store.get_course(course_key)
+        system = course.runtime
+        blocks = system.course_entry.structure['blocks']
+
+        with check_mongo_calls(1):
+            num_loaded = store.prefetch_definitions(system, blocks.keys(), course_key)
+        self.assertEqual(num_loaded, len(set(block.definition for block in blocks.itervalues())))
+
+        # already prefetched definitions aren't loaded again
+        with check_mongo_calls(0):
+            self.assertEqual(store.prefetch_definitions(system, blocks.keys(), course_key), 0)
+
+        # the blocks' content fields come from the prefetched definitions
+        with check_mongo_calls(0):
+            for block_key in blocks:
+                block = system.load_item(block_key)
+                for field in block.fields.itervalues():
+                    if field.scope == Scope.content:
+                        getattr(block, field.name)
+
 
 def version_agnostic(children):
     """
@@ -2024,6 +2050,22 @@ class TestInheritance(SplitModuleTest):
         # FIXME LMS-11376
 #         self.assertTrue(parented_problem.visible_to_staff_only)
 
+    @patch('xmodule.tabs.CourseTab.from_json', side_effect=mock_tab_from_json)
+    def test_published_inheritance_precomputed(self, _from_json):
+        """
+        Blocks loaded from the published branch are given their inherited settings,
+        precomputed for the whole structure, even when the field storage isn't compact.
+        Blocks loaded from the draft branch look for them on their ancestors.
+        """
+        self.assertFalse(modulestore().compact_field_storage)
+        course_key = CourseLocator(org='testx', course='wonderful', run="run", branch=BRANCH_NAME_PUBLISHED)
+        course = modulestore().get_course(course_key)
+        self.assertFalse(course.runtime.compact)
+        self.assertEqual(course.runtime.inherited_settings[BlockKey('course', 'head23456')], {})
+
+        course = modulestore().get_course(course_key.for_branch(BRANCH_NAME_DRAFT))
+        self.assertIsNone(course.runtime.inherited_settings)
+
 
 class TestPublish(SplitModuleTest):
     """
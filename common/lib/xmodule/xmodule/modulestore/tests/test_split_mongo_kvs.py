@@ -0,0 +1,63 @@
+"""
+Tests of the SplitMongoKVS of split modulestore blocks.
+"""
+import copy
+import unittest
+
+from xblock.fields import Scope
+from xblock.runtime import KeyValueStore
+
+from xmodule.modulestore.split_mongo.split_mongo_kvs import SplitMongoKVS
+
+
+def settings_key(field_name):
+    """
+    Return the KVS key of the settings field named `field_name`.
+    """
+    return KeyValueStore.Key(Scope.settings, None, 'block_id', field_name)
+
+
+class TestCopyOnWrite(unittest.TestCase):
+    """
+    Tests that a SplitMongoKVS sharing its fields with a (cached) course
+    structure never changes them.
+    """
+    def setUp(self):
+        super(TestCopyOnWrite, self).setUp()
+        self.structure_fields = {
+            'display_name': 'Problem',
+            'group_access': {50: [1]},
+            'tags': ['easy'],
+        }
+        self.original_fields = copy.deepcopy(self.structure_fields)
+        self.kvs = SplitMongoKVS('definition_id', self.structure_fields, {}, parent=None, copy_on_write=True)
+
+    def test_reading_immutable_values_shares_fields(self):
+        self.assertEqual(self.kvs.get(settings_key('display_name')), 'Problem')
+        self.assertIs(self.kvs._fields, self.structure_fields)  # pylint: disable=protected-access
+
+    def test_changing_read_values(self):
+        self.kvs.get(settings_key('group_access'))[50].append(2)
+        self.kvs.get(settings_key('tags')).append('hard')
+
+        self.assertEqual(self.structure_fields, self.original_fields)
+        self.assertEqual(self.kvs.get(settings_key('group_access')), {50: [1, 2]})
+        self.assertEqual(self.kvs.get(settings_key('tags')), ['easy', 'hard'])
+
+    def test_writing_fields(self):
+        self.kvs.set(settings_key('display_name'), 'Changed')
+        self.kvs.delete(settings_key('tags'))
+
+        self.assertEqual(self.structure_fields, self.original_fields)
+        self.assertEqual(self.kvs.get(settings_key('display_name')), 'Changed')
+        self.assertFalse(self.kvs.has(settings_key('tags')))
+
+    def test_fields_copied_once(self):
+        self.kvs.set(settings_key('display_name'), 'Changed')
+        own_fields = self.kvs._fields  # pylint: disable=protected-access
+        self.assertIsNot(own_fields, self.structure_fields)
+
+        # the value read is the KVS's own, so changes to it persist
+        self.kvs.get(settings_key('tags')).append('hard')
+        self.assertIs(self.kvs._fields, own_fields)  # pylint: disable=protected-access
+        self.assertEqual(self.kvs.get(settings_key('tags')), ['easy', 'hard'])
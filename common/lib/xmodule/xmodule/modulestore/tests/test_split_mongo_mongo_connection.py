@@ -1,7 +1,7 @@
 """ Test the behavior of split_mongo/MongoConnection """
 import unittest
 from mock import patch
-from xmodule.modulestore.split_mongo.mongo_connection import MongoConnection
+from xmodule.modulestore.split_mongo.mongo_connection import MongoConnection, StructureLRUCache
 from xmodule.exceptions import HeartbeatFailure
 
 
@@ -17,3 +17,44 @@ class TestHeartbeatFailureException(unittest.TestCase):
 
             with self.assertRaises(HeartbeatFailure):
                 useless_conn.heartbeat()
+
+
+class TestStructureLRUCache(unittest.TestCase):
+    """ Test the in-process cache of structures """
+    def structure(self, num_blocks):
+        """ Return a structure with num_blocks blocks """
+        return {'blocks': dict((index, None) for index in xrange(num_blocks))}
+
+    def test_get(self):
+        cache = StructureLRUCache(10)
+        structure = self.structure(3)
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.set('a', structure), 0)
+        self.assertIs(cache.get('a'), structure)
+        self.assertEqual(cache.num_blocks, 3)
+
+    def test_evicts_least_recently_used(self):
+        cache = StructureLRUCache(10)
+        cache.set('a', self.structure(4))
+        cache.set('b', self.structure(4))
+        cache.get('a')
+
+        self.assertEqual(cache.set('c', self.structure(4)), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('a'))
+        self.assertIsNotNone(cache.get('c'))
+        self.assertEqual((len(cache), cache.num_blocks, cache.evictions), (2, 8, 1))
+
+    def test_too_large(self):
+        cache = StructureLRUCache(10)
+        cache.set('a', self.structure(4))
+        self.assertEqual(cache.set('b', self.structure(11)), 0)
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('a'))
+
+    def test_clear(self):
+        cache = StructureLRUCache(10)
+        cache.set('a', self.structure(4))
+        cache.clear()
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.num_blocks, 0)
@@ -9,7 +9,9 @@ from xmodule.x_module import XModuleMixin
 from opaque_keys.edx.locations import Location
 from xmodule.modulestore import ModuleStoreEnum
 from xmodule.modulestore.inheritance import InheritanceMixin
-from xmodule.modulestore.xml_importer import _update_and_import_module, _update_module_location
+from xmodule.modulestore.xml_importer import (
+    CourseImportManager, _update_and_import_module, _update_module_location
+)
 from xmodule.modulestore.tests.mongo_connection import MONGO_PORT_NUM, MONGO_HOST
 from opaque_keys.edx.locations import SlashSeparatedCourseKey
 from xmodule.tests import DATA_DIR
@@ -333,3 +335,30 @@ class UpdateLocationTest(ModuleStoreNoSettings):
         # Expect these fields pass "is_set_on" test
         for field in self.CONTENT_FIELDS + self.SETTINGS_FIELDS + self.CHILDREN_FIELDS:
             self.assertTrue(new_version.fields[field].is_set_on(new_version))
+
+
+class TimedStageTest(unittest.TestCase):
+    """
+    Tests of the timing of import stages.
+    """
+    def setUp(self):
+        super(TimedStageTest, self).setUp()
+        # Timing a stage doesn't use the state of the import manager.
+        self.manager = CourseImportManager.__new__(CourseImportManager)
+        self.course_key = CourseLocator('org', 'course', 'run')
+
+    @mock.patch('xmodule.modulestore.xml_importer.dog_stats_api.histogram')
+    def test_reported(self, mock_histogram):
+        with self.manager.timed_stage('static', self.course_key) as counts:
+            counts['items'] = 3
+        tags = [u'stage:static', u'course:{}'.format(self.course_key)]
+        mock_histogram.assert_any_call('xmodule.import.duration', mock.ANY, tags=tags)
+        mock_histogram.assert_any_call('xmodule.import.items', 3, tags=tags)
+
+    @mock.patch('xmodule.modulestore.xml_importer.dog_stats_api.histogram')
+    def test_failed_stage_reported(self, mock_histogram):
+        with self.assertRaises(ValueError):
+            with self.manager.timed_stage('drafts', self.course_key):
+                raise ValueError()
+        tags = [u'stage:drafts', u'course:{}'.format(self.course_key)]
+        mock_histogram.assert_any_call('xmodule.import.duration', mock.ANY, tags=tags)
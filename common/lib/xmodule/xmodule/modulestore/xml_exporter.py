@@ -2,8 +2,12 @@
 Methods for exporting course data to XML
 """
 
+import calendar
 import logging
+import tarfile
+import time
 from abc import abstractmethod
+from multiprocessing.pool import ThreadPool
 import lxml.etree
 from xblock.fields import Scope, Reference, ReferenceList, ReferenceValueDict
 from xmodule.contentstore.content import StaticContent
@@ -13,6 +17,7 @@ from xmodule.modulestore import EdxJSONEncoder, ModuleStoreEnum
 from xmodule.modulestore.inheritance import own_metadata
 from xmodule.modulestore.store_utilities import draft_node_constructor, get_draft_subtree_roots
 from xmodule.modulestore import LIBRARY_ROOT
+from fs.memoryfs import MemoryFS
 from fs.osfs import OSFS
 from json import dumps
 import os
@@ -25,6 +30,10 @@ PUBLISHED_DIR = "published"
 
 DEFAULT_CONTENT_FIELDS = ['metadata', 'data']
 
+# The path, relative to the courselike directory of an export, to which the
+# default course image is also exported, for backwards compatibility.
+LEGACY_COURSE_IMAGE_PATH = 'static/images/course_image.jpg'
+
 
 def _export_drafts(modulestore, course_key, export_fs, xml_centric_course_key):
     """
@@ -104,7 +113,7 @@ class ExportManager(object):
     """
     Manages XML exporting for courselike objects.
     """
-    def __init__(self, modulestore, contentstore, courselike_key, root_dir, target_dir):
+    def __init__(self, modulestore, contentstore, courselike_key, root_dir, target_dir, root_fs=None):
         """
         Export all modules from `modulestore` and content from `contentstore` as xml to `root_dir`.
 
@@ -113,12 +122,15 @@ class ExportManager(object):
         `courselike_key`: The Locator of the Descriptor to export
         `root_dir`: The directory to write the exported xml to
         `target_dir`: The name of the directory inside `root_dir` to write the content to
+        `root_fs`: The filesystem to write the exported xml to instead of `root_dir` (for example a
+            `MemoryFS`), can be None. The content of `contentstore` is always written to `root_dir`.
         """
         self.modulestore = modulestore
         self.contentstore = contentstore
         self.courselike_key = courselike_key
         self.root_dir = root_dir
         self.target_dir = target_dir
+        self.root_fs = root_fs
 
     @abstractmethod
     def get_key(self):
@@ -150,11 +162,12 @@ class ExportManager(object):
 
     def export(self):
         """
-        Perform the export given the parameters handed to this class at init.
+        Perform the export given the parameters handed to this class at init, and return the
+        exported courselike object.
         """
         with self.modulestore.bulk_operations(self.courselike_key):
 
-            fsm = OSFS(self.root_dir)
+            fsm = self.root_fs if self.root_fs is not None else OSFS(self.root_dir)
             root = lxml.etree.Element('unknown')
 
             # export only the published content
@@ -171,12 +184,14 @@ class ExportManager(object):
             self.process_root(root, export_fs)
 
             # Process extra items-- drafts, assets, etc
-            root_courselike_dir = self.root_dir + '/' + self.target_dir
+            root_courselike_dir = self.root_dir + '/' + self.target_dir if self.root_dir is not None else None
             self.process_extra(root, courselike, root_courselike_dir, xml_centric_courselike_key, export_fs)
 
             # Any last pass adjustments
             self.post_process(root, export_fs)
 
+        return courselike
+
 
 class CourseExportManager(ExportManager):
     """
@@ -201,16 +216,14 @@ class CourseExportManager(ExportManager):
 
     def process_extra(self, root, courselike, root_courselike_dir, xml_centric_courselike_key, export_fs):
         # Export the modulestore's asset metadata.
-        asset_dir = root_courselike_dir + '/' + AssetMetadata.EXPORTED_ASSET_DIR + '/'
-        if not os.path.isdir(asset_dir):
-            os.makedirs(asset_dir)
+        asset_dir = export_fs.makeopendir(AssetMetadata.EXPORTED_ASSET_DIR)
         asset_root = lxml.etree.Element(AssetMetadata.ALL_ASSETS_XML_TAG)
         course_assets = self.modulestore.get_all_asset_metadata(self.courselike_key, None)
         for asset_md in course_assets:
             # All asset types are exported using the "asset" tag - but their asset type is specified in each asset key.
             asset = lxml.etree.SubElement(asset_root, AssetMetadata.ASSET_XML_TAG)
             asset_md.to_xml(asset)
-        with OSFS(asset_dir).open(AssetMetadata.EXPORTED_ASSET_FILENAME, 'w') as asset_xml_file:
+        with asset_dir.open(AssetMetadata.EXPORTED_ASSET_FILENAME, 'w') as asset_xml_file:
             lxml.etree.ElementTree(asset_root).write(asset_xml_file)
 
         # export the static assets
@@ -224,21 +237,15 @@ class CourseExportManager(ExportManager):
 
             # If we are using the default course image, export it to the
             # legacy location to support backwards compatibility.
-            if courselike.course_image == courselike.fields['course_image'].default:
+            course_image_key = get_default_course_image_key(courselike)
+            if course_image_key is not None:
                 try:
-                    course_image = self.contentstore.find(
-                        StaticContent.compute_location(
-                            courselike.id,
-                            courselike.course_image
-                        ),
-                    )
+                    course_image = self.contentstore.find(course_image_key)
                 except NotFoundError:
                     pass
                 else:
-                    output_dir = root_courselike_dir + '/static/images/'
-                    if not os.path.isdir(output_dir):
-                        os.makedirs(output_dir)
-                    with OSFS(output_dir).open('course_image.jpg', 'wb') as course_image_file:
+                    output_dir, filename = os.path.split(LEGACY_COURSE_IMAGE_PATH)
+                    with export_fs.makeopendir(output_dir, recursive=True).open(filename, 'wb') as course_image_file:
                         course_image_file.write(course_image.data)
 
         # export the static tabs
@@ -351,6 +358,141 @@ def export_library_to_xml(modulestore, contentstore, library_key, root_dir, libr
     LibraryExportManager(modulestore, contentstore, library_key, root_dir, library_dir).export()
 
 
+def get_default_course_image_key(course):
+    """
+    Return the key of the course image asset of the course if the course uses the default course image
+    (which is also exported to LEGACY_COURSE_IMAGE_PATH), otherwise None.
+    """
+    if course.course_image == course.fields['course_image'].default:
+        return StaticContent.compute_location(course.id, course.course_image)
+    return None
+
+
+class _ExportStream(object):
+    """
+    A file-like object that holds what is written to it until it is taken with `pop`.
+    """
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        """
+        Hold `data` until the next `pop`.
+        """
+        self.chunks.append(data)
+
+    def pop(self):
+        """
+        Return (and stop holding) all of the data written since the last `pop`.
+        """
+        data = ''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def _add_tar_member(tar_file, name, chunks, size, mtime=None):
+    """
+    Add a file named `name` of `size` bytes with the data `chunks` (an iterable of strings) to the
+    stream-mode tar_file, and yield after each chunk is written, so that the caller can send the
+    compressed data on without holding the whole file in memory.
+    """
+    tarinfo = tarfile.TarInfo(name)
+    tarinfo.size = size
+    tarinfo.mtime = mtime if mtime is not None else time.time()
+    # Write the header only (as addfile does without a fileobj), then the data and padding as
+    # addfile would, a chunk at a time.
+    tar_file.addfile(tarinfo)
+    written = 0
+    for chunk in chunks:
+        tar_file.fileobj.write(chunk)
+        written += len(chunk)
+        yield
+    if written != size:
+        raise IOError(u'Expected {} bytes for {}, got {}'.format(size, name, written))
+    blocks, remainder = divmod(size, tarfile.BLOCKSIZE)
+    if remainder > 0:
+        tar_file.fileobj.write(tarfile.NUL * (tarfile.BLOCKSIZE - remainder))
+        blocks += 1
+    tar_file.offset += blocks * tarfile.BLOCKSIZE
+
+
+def _add_tar_asset(tar_file, contentstore, asset_key, name):
+    """
+    Add the asset asset_key of contentstore to the stream-mode tar_file as a file named `name` (or
+    the asset's export path in the directory `name`, if it ends with '/'), streaming its data from
+    the contentstore, and yield after each chunk is written.
+    """
+    try:
+        content = contentstore.find(asset_key, as_stream=True)
+    except NotFoundError:
+        logging.warning(u'Asset %s was deleted during export, skipping it', asset_key)
+        return
+    try:
+        if name.endswith('/'):
+            name += contentstore.get_export_path(content)
+        mtime = calendar.timegm(content.last_modified_at.utctimetuple()) if content.last_modified_at else None
+        for __ in _add_tar_member(tar_file, name, content.stream_data(), content.length, mtime):
+            yield
+    finally:
+        content.close()
+
+
+def stream_course_export_tarball(modulestore, contentstore, course_key, course_dir):
+    """
+    Export the course as export_course_to_xml does, but to a tar.gz of the course directory
+    `course_dir`, and yield the chunks of the tar.gz as they are compressed, without writing
+    the export to disk.
+
+    The static assets are streamed first, straight from the contentstore, while the blocks of the
+    course are exported (into memory) in another thread; the blocks follow the assets.
+    """
+    export_fs = MemoryFS()
+    pool = ThreadPool(1)
+    # The contentstore's assets are streamed below, rather than exported by the manager.
+    manager = CourseExportManager(modulestore, None, course_key, None, course_dir, root_fs=export_fs)
+    course_export = pool.apply_async(manager.export)
+    pool.close()
+
+    def add_members(tar_file):
+        """
+        Add all of the files of the export to tar_file, yielding after each chunk is written.
+        """
+        if contentstore:
+            assets, __ = contentstore.get_all_content_for_course(course_key)
+            for asset in assets:
+                for __ in _add_tar_asset(tar_file, contentstore, asset['asset_key'], course_dir + '/static/'):
+                    yield
+
+            policy = dumps(contentstore.get_assets_policy(assets), sort_keys=True, indent=4)
+            for __ in _add_tar_member(tar_file, course_dir + '/policies/assets.json', [policy], len(policy)):
+                yield
+
+        # Any error exporting the blocks is raised here.
+        course = course_export.get()
+
+        if contentstore:
+            course_image_key = get_default_course_image_key(course)
+            if course_image_key is not None:
+                name = course_dir + '/' + LEGACY_COURSE_IMAGE_PATH
+                for __ in _add_tar_asset(tar_file, contentstore, course_image_key, name):
+                    yield
+
+        for path in list(export_fs.walkfiles(course_dir)):
+            data = export_fs.getcontents(path)
+            # Release the exported files as they are added.
+            export_fs.remove(path)
+            for __ in _add_tar_member(tar_file, path.lstrip('/'), [data], len(data)):
+                yield
+
+    output = _ExportStream()
+    with tarfile.open(fileobj=output, mode='w|gz') as tar_file:
+        for __ in add_members(tar_file):
+            data = output.pop()
+            if data:
+                yield data
+    yield output.pop()
+
+
 def adapt_references(subtree, destination_course_key, export_fs):
     """
     Map every reference in the subtree into destination_course_key and set it back into the xblock fields
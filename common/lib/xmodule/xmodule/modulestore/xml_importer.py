@@ -20,8 +20,12 @@ Modulestore virtual   |          XML physical (draft, published)
              (a, a)   |  (a, a) | (x, a) | (x, x) | (x, y) | (a, x)
              (a, b)   |  (a, b) | (x, b) | (x, x) | (x, y) | (a, x)
 """
+import hashlib
 import logging
 from abc import abstractmethod
+from contextlib import contextmanager
+from multiprocessing.pool import ThreadPool
+from time import time
 from opaque_keys.edx.locator import LibraryLocator
 import os
 import mimetypes
@@ -41,6 +45,7 @@ from .inheritance import own_metadata
 from xmodule.errortracker import make_error_tracker
 from .store_utilities import rewrite_nonportable_content_links
 import xblock
+import dogstats_wrapper as dog_stats_api
 from xmodule.tabs import CourseTabList
 from xmodule.assetstore import AssetMetadata
 from xmodule.modulestore.django import ASSET_IGNORE_REGEX
@@ -55,10 +60,54 @@ from xmodule.util.misc import escape_invalid_characters
 log = logging.getLogger(__name__)
 
 
+# The number of threads that import_static_content uses to save static assets
+# to the content store concurrently, when importing courses.
+STATIC_IMPORT_WORKERS = 4
+
+
+def _existing_assets(static_content_store, target_id):
+    """
+    Return a dict mapping the keys of the assets that are already in the
+    content store for target_id to the asset data dicts of the assets (see
+    ContentStore.get_all_content_for_course).
+    """
+    assets, __ = static_content_store.get_all_content_for_course(target_id)
+    return {asset['asset_key']: asset for asset in assets}
+
+
+def _is_unchanged(existing_asset, content):
+    """
+    Return whether the asset data dict existing_asset (from the content store)
+    describes the same asset as the StaticContent content, so that content
+    doesn't need to be saved again.
+    """
+    return (
+        existing_asset is not None and
+        existing_asset.get('md5') == hashlib.md5(content.data).hexdigest() and
+        existing_asset.get('displayname') == content.name and
+        existing_asset.get('contentType') == content.content_type and
+        existing_asset.get('import_path') == content.import_path and
+        existing_asset.get('locked', False) == content.locked
+    )
+
+
 def import_static_content(
         course_data_path, static_content_store,
-        target_id, subpath='static', verbose=False):
-
+        target_id, subpath='static', verbose=False,
+        num_workers=1, skip_unchanged=False):
+    """
+    Import the static assets in the subpath directory of course_data_path into
+    static_content_store, and return a dict mapping their paths (relative to
+    the subpath directory) to their asset keys.
+
+    Arguments:
+        num_workers (int): The number of threads that read and save assets
+            concurrently.
+        skip_unchanged (bool): If True, assets that are already in the content
+            store with the same contents and attributes aren't saved again,
+            so that importing a course again after a failed import only saves
+            the assets that the failed import didn't.
+    """
     remap_dict = {}
 
     # now import all static assets
@@ -66,7 +115,7 @@ def import_static_content(
     try:
         with open(course_data_path / 'policies/assets.json') as f:
             policy = json.load(f)
-    except (IOError, ValueError) as err:
+    except (IOError, ValueError):
         # xml backed courses won't have this file, only exported courses;
         # so, its absence is not really an exception.
         policy = {}
@@ -77,71 +126,103 @@ def import_static_content(
     mimetypes.add_type('application/octet-stream', '.srt')
     mimetypes_list = mimetypes.types_map.values()
 
-    for dirname, _, filenames in os.walk(static_dir):
-        for filename in filenames:
+    existing_assets = _existing_assets(static_content_store, target_id) if skip_unchanged else {}
 
-            content_path = os.path.join(dirname, filename)
+    def import_asset(content_path):
+        """
+        Save the asset at content_path to the content store (unless it's
+        already there), and return its path and asset key, or None if it's
+        skipped.
+        """
+        filename = os.path.basename(content_path)
 
-            if re.match(ASSET_IGNORE_REGEX, filename):
-                if verbose:
-                    log.debug('skipping static content %s...', content_path)
-                continue
+        if verbose:
+            log.debug('importing static content %s...', content_path)
 
+        try:
+            with open(content_path, 'rb') as f:
+                data = f.read()
+        except IOError:
+            if filename.startswith('._'):
+                # OS X "companion files". See
+                # http://www.diigo.com/annotated/0c936fda5da4aa1159c189cea227e174
+                return None
+            # Not a 'hidden file', then re-raise exception
+            raise
+
+        # strip away leading path from the name
+        fullname_with_subpath = content_path.replace(static_dir, '')
+        if fullname_with_subpath.startswith('/'):
+            fullname_with_subpath = fullname_with_subpath[1:]
+        asset_key = StaticContent.compute_location(target_id, fullname_with_subpath)
+
+        policy_ele = policy.get(asset_key.path, {})
+
+        # During export display name is used to create files, strip away slashes from name
+        displayname = escape_invalid_characters(
+            name=policy_ele.get('displayname', filename),
+            invalid_char_list=['/', '\\']
+        )
+        locked = policy_ele.get('locked', False)
+        mime_type = policy_ele.get('contentType')
+
+        # Check extracted contentType in list of all valid mimetypes
+        if not mime_type or mime_type not in mimetypes_list:
+            mime_type = mimetypes.guess_type(filename)[0]   # Assign guessed mimetype
+        content = StaticContent(
+            asset_key, displayname, mime_type, data,
+            import_path=fullname_with_subpath, locked=locked
+        )
+
+        if _is_unchanged(existing_assets.get(asset_key), content):
             if verbose:
-                log.debug('importing static content %s...', content_path)
+                log.debug('static content %s is unchanged, skipping...', content_path)
+            return fullname_with_subpath, asset_key
 
-            try:
-                with open(content_path, 'rb') as f:
-                    data = f.read()
-            except IOError:
-                if filename.startswith('._'):
-                    # OS X "companion files". See
-                    # http://www.diigo.com/annotated/0c936fda5da4aa1159c189cea227e174
-                    continue
-                # Not a 'hidden file', then re-raise exception
-                raise
+        # first let's save a thumbnail so we can get back a thumbnail location
+        thumbnail_content, thumbnail_location = static_content_store.generate_thumbnail(content)
 
-            # strip away leading path from the name
-            fullname_with_subpath = content_path.replace(static_dir, '')
-            if fullname_with_subpath.startswith('/'):
-                fullname_with_subpath = fullname_with_subpath[1:]
-            asset_key = StaticContent.compute_location(target_id, fullname_with_subpath)
+        if thumbnail_content is not None:
+            content.thumbnail_location = thumbnail_location
 
-            policy_ele = policy.get(asset_key.path, {})
+        # then commit the content
+        try:
+            static_content_store.save(content)
+        except Exception as err:
+            log.exception(u'Error importing {0}, error={1}'.format(
+                fullname_with_subpath, err
+            ))
 
-            # During export display name is used to create files, strip away slashes from name
-            displayname = escape_invalid_characters(
-                name=policy_ele.get('displayname', filename),
-                invalid_char_list=['/', '\\']
-            )
-            locked = policy_ele.get('locked', False)
-            mime_type = policy_ele.get('contentType')
-
-            # Check extracted contentType in list of all valid mimetypes
-            if not mime_type or mime_type not in mimetypes_list:
-                mime_type = mimetypes.guess_type(filename)[0]   # Assign guessed mimetype
-            content = StaticContent(
-                asset_key, displayname, mime_type, data,
-                import_path=fullname_with_subpath, locked=locked
-            )
+        return fullname_with_subpath, asset_key
 
-            # first let's save a thumbnail so we can get back a thumbnail location
-            thumbnail_content, thumbnail_location = static_content_store.generate_thumbnail(content)
+    content_paths = []
+    for dirname, _, filenames in os.walk(static_dir):
+        for filename in filenames:
 
-            if thumbnail_content is not None:
-                content.thumbnail_location = thumbnail_location
+            content_path = os.path.join(dirname, filename)
 
-            # then commit the content
-            try:
-                static_content_store.save(content)
-            except Exception as err:
-                log.exception(u'Error importing {0}, error={1}'.format(
-                    fullname_with_subpath, err
-                ))
+            if re.match(ASSET_IGNORE_REGEX, filename):
+                if verbose:
+                    log.debug('skipping static content %s...', content_path)
+                continue
 
-            # store the remapping information which will be needed
-            # to subsitute in the module data
-            remap_dict[fullname_with_subpath] = asset_key
+            content_paths.append(content_path)
+
+    if num_workers > 1 and len(content_paths) > 1:
+        pool = ThreadPool(min(num_workers, len(content_paths)))
+        try:
+            imported = pool.imap_unordered(import_asset, content_paths)
+            remapped = [asset for asset in imported if asset is not None]
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        remapped = [asset for asset in (import_asset(path) for path in content_paths) if asset is not None]
+
+    # store the remapping information which will be needed
+    # to subsitute in the module data
+    for fullname_with_subpath, asset_key in remapped:
+        remap_dict[fullname_with_subpath] = asset_key
 
     return remap_dict
 
@@ -178,6 +259,10 @@ class ImportManager(object):
             Otherwise, it throws an InvalidLocationError if the courselike does not exist.
 
         default_class, load_error_modules: are arguments for constructing the XMLModuleStore (see its doc)
+
+        static_import_workers: the number of threads that save static assets to static_content_store
+            concurrently. Assets that are already in static_content_store, unchanged, aren't saved
+            again, so importing a courselike again after a failed import resumes its static import.
     """
     store_class = XMLModuleStore
 
@@ -187,7 +272,7 @@ class ImportManager(object):
             load_error_modules=True, static_content_store=None,
             target_id=None, verbose=False,
             do_import_static=True, create_if_not_present=False,
-            raise_on_failure=False
+            raise_on_failure=False, static_import_workers=STATIC_IMPORT_WORKERS
     ):
         self.store = store
         self.user_id = user_id
@@ -200,6 +285,7 @@ class ImportManager(object):
         self.do_import_static = do_import_static
         self.create_if_not_present = create_if_not_present
         self.raise_on_failure = raise_on_failure
+        self.static_import_workers = static_import_workers
         self.xml_module_store = self.store_class(
             data_dir,
             default_class=default_class,
@@ -220,16 +306,41 @@ class ImportManager(object):
         if self.target_id:
             assert len(self.xml_module_store.modules) == 1
 
+    @contextmanager
+    def timed_stage(self, stage, dest_id):
+        """
+        Time the import stage `stage` of the courselike dest_id, and report
+        its duration and the number of items it imported, which the body of
+        the `with` statement sets as the 'items' of the yielded dict.
+        """
+        counts = {'items': 0}
+        start = time()
+        try:
+            yield counts
+        finally:
+            # Report the stage even if it failed.
+            duration = time() - start
+            tags = [u'stage:{}'.format(stage), u'course:{}'.format(dest_id)]
+            dog_stats_api.histogram('xmodule.import.duration', duration, tags=tags)
+            dog_stats_api.histogram('xmodule.import.items', counts['items'], tags=tags)
+            log.info(
+                u'Import stage %s of %s: %d items in %.2fs (%.1f items/s)',
+                stage, dest_id, counts['items'], duration, counts['items'] / duration if duration else 0,
+            )
+
     def import_static(self, data_path, dest_id):
         """
-        Import all static items into the content store.
+        Import all static items into the content store, and return the number
+        of static items imported.
         """
+        num_imported = 0
         if self.static_content_store is not None and self.do_import_static:
             # first pass to find everything in /static/
-            import_static_content(
+            num_imported += len(import_static_content(
                 data_path, self.static_content_store,
-                dest_id, subpath='static', verbose=self.verbose
-            )
+                dest_id, subpath='static', verbose=self.verbose,
+                num_workers=self.static_import_workers, skip_unchanged=True,
+            ))
 
         elif self.verbose and not self.do_import_static:
             log.debug(
@@ -249,14 +360,18 @@ class ImportManager(object):
 
         simport = 'static_import'
         if os.path.exists(data_path / simport):
-            import_static_content(
+            num_imported += len(import_static_content(
                 data_path, self.static_content_store,
-                dest_id, subpath=simport, verbose=self.verbose
-            )
+                dest_id, subpath=simport, verbose=self.verbose,
+                num_workers=self.static_import_workers, skip_unchanged=True,
+            ))
+
+        return num_imported
 
     def import_asset_metadata(self, data_dir, course_id):
         """
-        Read in assets XML file, parse it, and add all asset metadata to the modulestore.
+        Read in assets XML file, parse it, and add all asset metadata to the modulestore,
+        and return the number of assets added.
         """
         asset_dir = path(data_dir) / AssetMetadata.EXPORTED_ASSET_DIR
         assets_filename = AssetMetadata.EXPORTED_ASSET_FILENAME
@@ -288,17 +403,18 @@ class ImportManager(object):
                     all_assets.append(asset_md)
         except IOError:
             logging.info('No %s file is present with asset metadata.', assets_filename)
-            return
+            return 0
         except Exception:  # pylint: disable=W0703
             logging.exception('Error while parsing asset xml.')
             if self.raise_on_failure:
                 raise
             else:
-                return
+                return 0
 
         # Now add all asset metadata to the modulestore.
         if len(all_assets) > 0:
             self.store.save_asset_metadata_list(all_assets, all_assets[0].edited_by, import_only=True)
+        return len(all_assets)
 
     def import_courselike(self, runtime, courselike_key, dest_id, source_courselike):
         """
@@ -368,7 +484,8 @@ class ImportManager(object):
     @abstractmethod
     def import_drafts(self, courselike, courselike_key, data_path, dest_id):
         """
-        To be overloaded with a method that installs the draft items into self.store.
+        To be overloaded with a method that installs the draft items into self.store,
+        and returns the (updated) courselike and the number of draft items installed.
         """
         raise NotImplementedError
 
@@ -437,16 +554,22 @@ class ImportManager(object):
             # This bulk operation wraps all the operations to populate the published branch.
             with self.store.bulk_operations(dest_id):
                 # Retrieve the course itself.
-                source_courselike, courselike, data_path = self.get_courselike(courselike_key, runtime, dest_id)
+                with self.timed_stage('courselike', dest_id) as counts:
+                    source_courselike, courselike, data_path = self.get_courselike(courselike_key, runtime, dest_id)
+                    counts['items'] = 1
 
                 # Import all static pieces.
-                self.import_static(data_path, dest_id)
+                with self.timed_stage('static', dest_id) as counts:
+                    counts['items'] = self.import_static(data_path, dest_id)
 
                 # Import asset metadata stored in XML.
-                self.import_asset_metadata(data_path, dest_id)
+                with self.timed_stage('asset_metadata', dest_id) as counts:
+                    counts['items'] = self.import_asset_metadata(data_path, dest_id)
 
                 # Import all children
-                self.import_children(source_courselike, courselike, courselike_key, dest_id)
+                with self.timed_stage('children', dest_id) as counts:
+                    self.import_children(source_courselike, courselike, courselike_key, dest_id)
+                    counts['items'] = len(self.xml_module_store.modules[courselike_key])
 
             # This bulk operation wraps all the operations to populate the draft branch with any items
             # from the /drafts subdirectory.
@@ -455,7 +578,8 @@ class ImportManager(object):
             # and then publishing it.
             with self.store.bulk_operations(dest_id):
                 # Import all draft items into the courselike.
-                courselike = self.import_drafts(courselike, courselike_key, data_path, dest_id)
+                with self.timed_stage('drafts', dest_id) as counts:
+                    courselike, counts['items'] = self.import_drafts(courselike, courselike_key, data_path, dest_id)
 
             yield courselike
 
@@ -563,7 +687,7 @@ class CourseImportManager(ImportManager):
         """
         # Import any draft items
         with self.store.branch_setting(ModuleStoreEnum.Branch.draft_preferred, dest_id):
-            _import_course_draft(
+            num_imported = _import_course_draft(
                 self.xml_module_store,
                 self.store,
                 self.user_id,
@@ -576,7 +700,7 @@ class CourseImportManager(ImportManager):
         # Importing the drafts potentially triggered a new structure version.
         # If so, the HEAD version_guid of the passed-in courselike will be out-of-date.
         # Fetch the course to return the most recent course version.
-        return self.store.get_course(courselike.id.replace(branch=None, version_guid=None))
+        return self.store.get_course(courselike.id.replace(branch=None, version_guid=None)), num_imported
 
 
 class LibraryImportManager(ImportManager):
@@ -647,7 +771,7 @@ class LibraryImportManager(ImportManager):
         """
         Imports all drafts into the desired store.
         """
-        return courselike
+        return courselike, 0
 
 
 def import_course_from_xml(*args, **kwargs):
@@ -784,10 +908,12 @@ def _import_course_draft(
     (and blocks beneath) can be in draft. Therefore, different call points into the import
     process_xml are used as the XMLModuleStore() constructor cannot simply be called
     (as is done for importing public content).
+
+    Returns the number of draft items imported.
     """
     draft_dir = course_data_path + "/drafts"
     if not os.path.exists(draft_dir):
-        return
+        return 0
 
     # create a new 'System' object which will manage the importing
     errorlog = make_error_tracker()
@@ -813,6 +939,9 @@ def _import_course_draft(
     )
 
     def _import_module(module):
+        """
+        Import the module and its descendants, and return how many were imported.
+        """
         # IMPORTANT: Be sure to update the module location in the NEW namespace
         module_location = module.location.map_into_course(target_id)
         # Update the module's location to DRAFT revision
@@ -847,8 +976,10 @@ def _import_course_draft(
             target_id,
             runtime=mongo_runtime,
         )
+        num_imported = 1
         for child in module.get_children():
-            _import_module(child)
+            num_imported += _import_module(child)
+        return num_imported
 
     # Now walk the /drafts directory.
     # Each file in the directory will be a draft copy of the vertical.
@@ -897,11 +1028,13 @@ def _import_course_draft(
     # Sort drafts by `index_in_children_list` attribute.
     drafts.sort(key=lambda x: x.index)
 
+    num_imported = 0
     for draft in get_draft_subtree_roots(drafts):
         try:
-            _import_module(draft.module)
+            num_imported += _import_module(draft.module)
         except Exception:  # pylint: disable=broad-except
             logging.exception('while importing draft descriptor %s', draft.module)
+    return num_imported
 
 
 def allowed_metadata_by_category(category):
@@ -208,6 +208,43 @@ class ContentTest(unittest.TestCase):
 
         self.assertEqual(total_length, last_byte - first_byte + 1)
 
+    def test_static_content_stream_reads_whole_chunks(self):
+        """
+        Test that StaticContentStream reads a GridFS item a chunk at a time,
+        each read within a single chunk of the item
+        """
+        data = SAMPLE_STRING
+        item = FakeGridFsItem(data)
+        item.chunk_size = 256
+        item.read = Mock(side_effect=item.read)
+        static_content_stream = StaticContentStream('loc', 'name', 'type', item, length=item.length)
+
+        first_byte = 100
+        last_byte = 1500
+        stream = static_content_stream.stream_data_in_range(first_byte, last_byte)
+        self.assertEqual(''.join(stream), data[first_byte:last_byte + 1])
+
+        position = first_byte
+        for call in item.read.call_args_list:
+            size = call[0][0]
+            self.assertEqual(position // item.chunk_size, (position + size - 1) // item.chunk_size)
+            position += size
+        self.assertEqual(item.read.call_count, len(range(first_byte // 256, last_byte // 256 + 1)))
+
+    def test_static_content_stream_data_in_chunks(self):
+        """
+        Test that StaticContentStream streams a whole GridFS item a chunk at a time
+        """
+        data = SAMPLE_STRING
+        item = FakeGridFsItem(data)
+        item.chunk_size = 256
+        static_content_stream = StaticContentStream('loc', 'name', 'type', item, length=item.length)
+
+        chunks = list(static_content_stream.stream_data())
+        self.assertEqual(''.join(chunks), data)
+        self.assertTrue(all(len(chunk) <= item.chunk_size for chunk in chunks))
+        self.assertEqual(len(chunks), len(range(0, len(data), item.chunk_size)))
+
     def test_static_content_write_js(self):
         """
         Test that only one filename starts with 000.
@@ -1,5 +1,8 @@
 """Grading tests"""
+from collections import OrderedDict
 import ddt
+import numpy
+import random
 import unittest
 
 from xmodule import graders
@@ -237,6 +240,45 @@ class GraderTest(unittest.TestCase):
         self.assertEqual(len(graded['section_breakdown']), 0)
         self.assertEqual(len(graded['grade_breakdown']), 0)
 
+    def test_grade_columns(self):
+        # Verify that vectorized grading gives exactly the same results as
+        # grading each student's grade sheet, including for ties in the
+        # dropped scores and for students that are missing sections.
+        weighted_grader = graders.grader_from_conf([
+            {'type': "Homework", 'min_count': 4, 'drop_count': 2, 'weight': 0.3},
+            {'type': "Lab", 'min_count': 8, 'drop_count': 3, 'category': "Labs", 'weight': 0.2},
+            {'type': "Midterm", 'min_count': 1, 'drop_count': 0, 'weight': 0.15},
+            {'type': "Final", 'min_count': 0, 'drop_count': 1, 'weight': 0.35},
+        ])
+        num_sections_by_format = {'Homework': 6, 'Lab': 5, 'Midterm': 1, 'Final': 2}
+        num_students = 200
+        rand = random.Random(0)
+
+        percents_by_format = {}
+        grade_sheets = [OrderedDict() for _ in xrange(num_students)]
+        for section_format, num_sections in num_sections_by_format.iteritems():
+            percents = numpy.empty((num_students, num_sections))
+            percents.fill(numpy.nan)
+            for student, grade_sheet in enumerate(grade_sheets):
+                grade_sheet[section_format] = OrderedDict()
+                for section in xrange(num_sections):
+                    if rand.random() < 0.2:
+                        continue
+                    earned, possible = float(rand.randint(0, 3)), float(rand.choice([3, 7]))
+                    grade_sheet[section_format][section] = self.MockGrade(
+                        AggregatedScore(tw_earned=earned, tw_possible=possible, **self.common_fields),
+                        display_name=str(section),
+                    )
+                    percents[student, section] = earned / possible
+            percents_by_format[section_format] = percents
+
+        graded_columns = weighted_grader.grade_columns(percents_by_format, num_students)
+        for student, grade_sheet in enumerate(grade_sheets):
+            graded = weighted_grader.grade(grade_sheet)
+            self.assertEqual(graded_columns['percent'][student], graded['percent'])
+            for category, breakdown in graded['grade_breakdown'].iteritems():
+                self.assertEqual(graded_columns['grade_breakdown'][category]['percent'][student], breakdown['percent'])
+
     def test_grader_from_conf(self):
 
         # Confs always produce a graders.WeightedSubsectionsGrader, so we test this by repeating the test
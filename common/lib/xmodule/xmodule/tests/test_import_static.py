@@ -1,6 +1,7 @@
 """
 Tests that check that we ignore the appropriate files when importing courses.
 """
+import hashlib
 import unittest
 from mock import Mock
 from xmodule.modulestore.xml_importer import import_static_content
@@ -39,3 +40,52 @@ class IgnoredFilesTestCase(unittest.TestCase):
         self.assertNotIn(".DS_Store", name_val)
         self.assertIn("GREEN", name_val["example.txt"])
         self.assertIn("BLUE", name_val[".example.txt"])
+
+
+class ImportStaticContentTestCase(unittest.TestCase):
+    "Tests for concurrent and resumed imports of static content"
+    def setUp(self):
+        super(ImportStaticContentTestCase, self).setUp()
+        self.course_dir = DATA_DIR / "dot-underscore"
+        self.course_id = SlashSeparatedCourseKey("edX", "dot-underscore", "2014_Fall")
+
+    def import_static_content(self, existing_assets=(), **kwargs):
+        """
+        Import the static content of the course into a mock content store
+        which already has existing_assets, and return the remap dict and the
+        names of the saved assets.
+        """
+        content_store = Mock()
+        content_store.generate_thumbnail.return_value = ("content", "location")
+        content_store.get_all_content_for_course.return_value = (list(existing_assets), len(existing_assets))
+        remap_dict = import_static_content(self.course_dir, content_store, self.course_id, **kwargs)
+        saved_static_content = [call[0][0] for call in content_store.save.call_args_list]
+        return remap_dict, sorted(sc.name for sc in saved_static_content)
+
+    def test_concurrent_import(self):
+        serial_remap_dict, serial_saved = self.import_static_content()
+        concurrent_remap_dict, concurrent_saved = self.import_static_content(num_workers=4)
+        self.assertEqual(serial_remap_dict, concurrent_remap_dict)
+        self.assertEqual(serial_saved, concurrent_saved)
+
+    def test_skip_unchanged(self):
+        with open(self.course_dir / "static" / "example.txt", 'rb') as f:
+            data = f.read()
+        asset_key = self.course_id.make_asset_key('asset', 'example.txt')
+        existing_asset = {
+            'asset_key': asset_key,
+            'md5': hashlib.md5(data).hexdigest(),
+            'displayname': 'example.txt',
+            'contentType': 'text/plain',
+            'import_path': 'example.txt',
+            'locked': False,
+        }
+        changed_asset = dict(existing_asset, asset_key=self.course_id.make_asset_key('asset', '.example.txt'))
+
+        remap_dict, saved = self.import_static_content([existing_asset, changed_asset], skip_unchanged=True)
+        self.assertEqual(remap_dict['example.txt'], asset_key)
+        self.assertNotIn('example.txt', saved)
+        self.assertIn('.example.txt', saved)
+
+        __, saved = self.import_static_content([existing_asset], skip_unchanged=False)
+        self.assertIn('example.txt', saved)
@@ -23,6 +23,7 @@ class BlocksAPITransformer(BlockStructureTransformer):
     """
 
     VERSION = 1
+    SUPPORTS_INCREMENTAL_COLLECT = True
     STUDENT_VIEW_DATA = 'student_view_data'
     STUDENT_VIEW_MULTI_DEVICE = 'student_view_multi_device'
 
@@ -61,3 +62,10 @@ class BlocksAPITransformer(BlockStructureTransformer):
         BlockCountsTransformer(self.block_types_to_count).transform(usage_info, block_structure)
         BlockDepthTransformer(self.depth).transform(usage_info, block_structure)
         BlockNavigationTransformer(self.nav_depth).transform(usage_info, block_structure)
+
+    def transform_equivalence_key(self, usage_info, block_structure):
+        """
+        Returns a constant, since the transforms only depend on the
+        parameters of this transformer and not on the given usage_info.
+        """
+        return True
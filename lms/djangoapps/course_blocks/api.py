@@ -1,6 +1,6 @@
 """
 API entry point to the course_blocks app with top-level
-get_course_blocks function.
+get_course_blocks and get_course_blocks_for_users functions.
 """
 from openedx.core.djangoapps.content.block_structure.api import get_block_structure_manager
 from openedx.core.lib.block_structure.transformers import BlockStructureTransformers
@@ -29,6 +29,7 @@ def get_course_blocks(
         starting_block_usage_key,
         transformers=None,
         collected_block_structure=None,
+        transformed_block_structures=None,
 ):
     """
     A higher order function implemented on top of the
@@ -51,6 +52,16 @@ def get_course_blocks(
             BlockStructureManager.get_collected.  Can be optionally
             provided if already available, for optimization.
 
+        transformed_block_structures (dict) - An optional dict, shared
+            across calls for many users with the same
+            starting_block_usage_key, transformers and
+            collected_block_structure, in which transformed block
+            structures are stored by the combined
+            transform_equivalence_key of the transformers.  If
+            provided, a user with the same key as a previous user is
+            given the block structure that was transformed for that
+            user, which must therefore be treated as read-only.
+
     Returns:
         BlockStructureBlockData - A transformed block structure,
             starting at starting_block_usage_key, that has undergone the
@@ -63,9 +74,64 @@ def get_course_blocks(
     if not transformers:
         transformers = BlockStructureTransformers(COURSE_BLOCK_ACCESS_TRANSFORMERS)
     transformers.usage_info = CourseUsageInfo(starting_block_usage_key.course_key, user)
+    block_structure_manager = get_block_structure_manager(starting_block_usage_key.course_key)
+
+    equivalence_key = None
+    if transformed_block_structures is not None:
+        if not collected_block_structure:
+            collected_block_structure = block_structure_manager.get_collected()
+        equivalence_key = transformers.transform_equivalence_key(collected_block_structure)
+        if equivalence_key in transformed_block_structures:
+            return transformed_block_structures[equivalence_key]
 
-    return get_block_structure_manager(starting_block_usage_key.course_key).get_transformed(
+    block_structure = block_structure_manager.get_transformed(
         transformers,
         starting_block_usage_key,
         collected_block_structure,
     )
+    if equivalence_key is not None:
+        transformed_block_structures[equivalence_key] = block_structure
+    return block_structure
+
+
+def get_course_blocks_for_users(
+        users,
+        starting_block_usage_key,
+        transformers=None,
+        collected_block_structure=None,
+):
+    """
+    Bulk version of get_course_blocks that yields a tuple of each of the
+    given users and its transformed block structure.
+
+    Users for whom the transformers' inputs are equivalent (for
+    example, users that are in the same cohorts and enrollment tracks,
+    with the same beta tester status) are given the same block
+    structure, which is transformed only once.  So the yielded block
+    structures must be treated as read-only.
+
+    Note: Since the shared block structures are transformed when first
+    needed, any time-based transforms (such as start dates) are applied
+    as of the time that the first user of each group is processed.
+
+    Arguments:
+        users (iterable of django.contrib.auth.models.User) - User
+            objects for which the block structure is to be transformed.
+
+        starting_block_usage_key, transformers,
+        collected_block_structure - See get_course_blocks.
+    """
+    if not collected_block_structure:
+        collected_block_structure = get_block_structure_manager(
+            starting_block_usage_key.course_key
+        ).get_collected()
+
+    transformed_block_structures = {}
+    for user in users:
+        yield user, get_course_blocks(
+            user,
+            starting_block_usage_key,
+            transformers,
+            collected_block_structure,
+            transformed_block_structures,
+        )
@@ -0,0 +1,50 @@
+"""
+Tests for the course_blocks api.
+"""
+from datetime import timedelta
+from django.utils.timezone import now
+from mock import patch
+from nose.plugins.attrib import attr
+
+from courseware.tests.factories import BetaTesterFactory
+from student.tests.factories import UserFactory
+
+from ..api import get_course_blocks_for_users
+from ..transformers.start_date import StartDateTransformer
+from ..transformers.tests.helpers import BlockParentsMapTestCase, publish_course, update_block
+
+
+@attr(shard=3)
+class GetCourseBlocksForUsersTestCase(BlockParentsMapTestCase):
+    """
+    Tests for get_course_blocks_for_users.
+    """
+    TRANSFORMER_CLASS_TO_TEST = StartDateTransformer
+
+    def setUp(self, **kwargs):
+        super(GetCourseBlocksForUsersTestCase, self).setUp(**kwargs)
+        self.beta_user = BetaTesterFactory(course_key=self.course.id, username='beta_tester', password=self.password)
+        course = self.get_block(0)
+        course.days_early_for_beta = 33
+        update_block(course)
+
+    @patch.dict('django.conf.settings.FEATURES', {'DISABLE_START_DATES': False})
+    def test_course_blocks_for_users(self):
+        block = self.get_block(2)
+        block.start = now() + timedelta(days=30)
+        update_block(block)
+        publish_course(self.course)
+
+        other_student = UserFactory.create(username='other_student', password=self.password)
+        users = [self.student, self.beta_user, other_student, self.staff]
+        block_structures = dict(
+            get_course_blocks_for_users(users, self.course.location, self.transformers)
+        )
+
+        # Students share the same block structure, while the beta user
+        # and staff have access to more blocks.
+        self.assertIs(block_structures[self.student], block_structures[other_student])
+        self.assertNotIn(self.get_block(2).location, block_structures[self.student])
+        for user in (self.beta_user, self.staff):
+            self.assertIsNot(block_structures[user], block_structures[self.student])
+            self.assertIn(self.get_block(2).location, block_structures[user])
@@ -26,6 +26,7 @@ class HiddenContentTransformer(FilteringTransformerMixin, BlockStructureTransfor
     Staff users are exempted from hidden content rules.
     """
     VERSION = 1
+    SUPPORTS_INCREMENTAL_COLLECT = True
     MERGED_DUE_DATE = 'merged_due_date'
     MERGED_HIDE_AFTER_DUE = 'merged_hide_after_due'
 
@@ -81,6 +82,9 @@ class HiddenContentTransformer(FilteringTransformerMixin, BlockStructureTransfor
             func_merge_ancestors=min,
         )
 
+    def transform_equivalence_key(self, usage_info, block_structure):
+        return usage_info.has_staff_access
+
     def transform_block_filters(self, usage_info, block_structure):
         # Users with staff access bypass the Visibility check.
         if usage_info.has_staff_access:
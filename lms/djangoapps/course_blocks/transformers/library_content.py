@@ -18,6 +18,7 @@ class ContentLibraryTransformer(FilteringTransformerMixin, BlockStructureTransfo
     Staff users are *not* exempted from library content pathways.
     """
     VERSION = 1
+    SUPPORTS_INCREMENTAL_COLLECT = True
 
     @classmethod
     def name(cls):
@@ -59,6 +60,14 @@ class ContentLibraryTransformer(FilteringTransformerMixin, BlockStructureTransfo
                 summary = summarize_block(child_key)
                 block_structure.set_transformer_block_field(child_key, cls, 'block_analytics_summary', summary)
 
+    def transform_equivalence_key(self, usage_info, block_structure):
+        # Children of library_content modules are selected individually
+        # for each user, so the transform can only be shared when there
+        # are no such modules.
+        if any(block_key.block_type == 'library_content' for block_key in block_structure):
+            return None
+        return True
+
     def transform_block_filters(self, usage_info, block_structure):
         all_library_children = set()
         all_selected_children = set()
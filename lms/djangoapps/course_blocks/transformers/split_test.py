@@ -20,6 +20,7 @@ class SplitTestTransformer(FilteringTransformerMixin, BlockStructureTransformer)
     'group_access' fields.
     """
     VERSION = 1
+    SUPPORTS_INCREMENTAL_COLLECT = True
 
     @classmethod
     def name(cls):
@@ -68,6 +69,10 @@ class SplitTestTransformer(FilteringTransformerMixin, BlockStructureTransformer)
                 group = child_to_group.get(child_location, None)
                 child.group_access[partition_for_this_block.id] = [group] if group is not None else []
 
+    def transform_equivalence_key(self, usage_info, block_structure):
+        # The split_test modules are removed for all users.
+        return True
+
     def transform_block_filters(self, usage_info, block_structure):
         """
         Mutates block_structure based on the given usage_info.
@@ -3,6 +3,8 @@ Start Date Transformer implementation.
 """
 from openedx.core.lib.block_structure.transformer import BlockStructureTransformer, FilteringTransformerMixin
 from lms.djangoapps.courseware.access_utils import check_start_date
+from courseware.masquerade import is_masquerading_as_student
+from student.roles import CourseBetaTesterRole
 from xmodule.course_metadata_utils import DEFAULT_START_DATE
 
 from .utils import collect_merged_date_field
@@ -25,6 +27,7 @@ class StartDateTransformer(FilteringTransformerMixin, BlockStructureTransformer)
     Staff users are exempted from visibility rules.
     """
     VERSION = 1
+    SUPPORTS_INCREMENTAL_COLLECT = True
     MERGED_START_DATE = 'merged_start_date'
 
     @classmethod
@@ -63,6 +66,16 @@ class StartDateTransformer(FilteringTransformerMixin, BlockStructureTransformer)
             func_merge_ancestors=max,
         )
 
+    def transform_equivalence_key(self, usage_info, block_structure):
+        # Users with staff access bypass the Start Date check.  For all
+        # other users, only beta testers are given earlier access.
+        if usage_info.has_staff_access:
+            return 'staff'
+        return (
+            is_masquerading_as_student(usage_info.user, usage_info.course_key),
+            CourseBetaTesterRole(usage_info.course_key).has_user(usage_info.user),
+        )
+
     def transform_block_filters(self, usage_info, block_structure):
         # Users with staff access bypass the Start Date check.
         if usage_info.has_staff_access:
@@ -8,6 +8,7 @@ from openedx.core.djangoapps.content.block_structure.api import clear_course_fro
 from openedx.core.lib.block_structure.transformers import BlockStructureTransformers
 
 from ...api import get_course_blocks
+from ...usage_info import CourseUsageInfo
 from ..library_content import ContentLibraryTransformer
 from .helpers import CourseStructureTestCase
 
@@ -107,6 +108,21 @@ class ContentLibraryTransformerTestCase(CourseStructureTestCase):
             ]
         }]
 
+    def test_transform_equivalence_key(self):
+        transformer = ContentLibraryTransformer()
+        usage_info = CourseUsageInfo(self.course.id, self.user)
+        block_structure = get_course_blocks(
+            self.user,
+            self.course.location,
+            transformers=BlockStructureTransformers(),
+        )
+
+        # The children of library_content blocks are selected for each user.
+        self.assertIsNone(transformer.transform_equivalence_key(usage_info, block_structure))
+
+        block_structure.remove_block(self.blocks['library_content1'].location, keep_descendants=False)
+        self.assertTrue(transformer.transform_equivalence_key(usage_info, block_structure))
+
     def test_content_library(self):
         """
         Test when course has content library section.
@@ -11,11 +11,13 @@ from openedx.core.djangoapps.course_groups.partition_scheme import CohortPartiti
 from openedx.core.djangoapps.course_groups.tests.helpers import CohortFactory, config_course_cohorts
 from openedx.core.djangoapps.course_groups.cohorts import add_user_to_cohort
 from openedx.core.djangoapps.course_groups.views import link_cohort_to_partition_group
-from student.tests.factories import CourseEnrollmentFactory
+from openedx.core.djangoapps.content.block_structure.api import get_block_structure_manager
+from student.tests.factories import CourseEnrollmentFactory, UserFactory
 from xmodule.partitions.partitions import Group, UserPartition
 from xmodule.modulestore.tests.factories import CourseFactory
 
 from ...api import get_course_blocks
+from ...usage_info import CourseUsageInfo
 from ..user_partitions import UserPartitionTransformer, _MergedGroupAccess
 from .helpers import CourseStructureTestCase, update_block
 
@@ -240,6 +242,29 @@ class UserPartitionTransformerTestCase(UserPartitionTestMixin, CourseStructureTe
             self.get_block_key_set(self.blocks, *expected_blocks)
         )
 
+    def test_transform_equivalence_key(self):
+        self.setup_partitions_and_course()
+        users = [self.user] + [UserFactory.create() for __ in range(3)]
+        for user in users[1:]:
+            CourseEnrollmentFactory.create(user=user, course_id=self.course.id, is_active=True)
+        for user, group_id in zip(users, [1, 1, 2]):
+            cohort = self.partition_cohorts[self.user_partition.id - 1][group_id - 1]
+            add_user_to_cohort(cohort, user.username)
+
+        block_structure = get_block_structure_manager(self.course.id).get_collected()
+        keys = [
+            UserPartitionTransformer().transform_equivalence_key(
+                CourseUsageInfo(self.course.id, user), block_structure
+            )
+            for user in users
+        ]
+
+        # Users are equivalent only if they are in the same groups.
+        self.assertEqual(keys[0], ((self.user_partition.id, 1),))
+        self.assertEqual(keys[1], keys[0])
+        self.assertEqual(keys[2], ((self.user_partition.id, 2),))
+        self.assertEqual(keys[3], ())
+
 
 @attr(shard=3)
 @ddt.ddt
@@ -1,11 +1,16 @@
 """
 Middleware for the courseware app
 """
+import logging
 
 from django.shortcuts import redirect
 from django.core.urlresolvers import reverse
 
 from courseware.courses import UserNotEnrolled
+from courseware.model_data import flush_user_state_writes
+from xblock.exceptions import KeyValueMultiSaveError
+
+log = logging.getLogger(__name__)
 
 
 class RedirectUnenrolledMiddleware(object):
@@ -22,3 +27,25 @@ class RedirectUnenrolledMiddleware(object):
                     args=[course_key.to_deprecated_string()]
                 )
             )
+
+
+class UserStateWriteBehindMiddleware(object):
+    """
+    Write the user state that was written behind during the request (see
+    UserStateCache) to the database before the response is returned.
+    """
+    def process_response(self, _request, response):
+        flush_user_state_writes()
+        return response
+
+    def process_exception(self, _request, _exception):
+        """
+        Write the user state even when the view raised, before RequestCache
+        clears the request cache that holds it.  A failure to write it is
+        logged, so that it does not hide the view's exception.
+        """
+        try:
+            flush_user_state_writes()
+        except KeyValueMultiSaveError:
+            log.exception("Writing the user state of a failed request failed")
+        return None
@@ -24,6 +24,7 @@ DjangoOrmFieldCache: A base-class for single-row-per-field caches.
 import json
 from abc import abstractmethod, ABCMeta
 from collections import defaultdict, namedtuple
+from contextlib import contextmanager
 from .models import (
     StudentModule,
     XModuleUserStateSummaryField,
@@ -31,19 +32,22 @@ from .models import (
     XModuleStudentInfoField
 )
 import logging
+import crum
 from opaque_keys.edx.keys import CourseKey, UsageKey
 from opaque_keys.edx.block_types import BlockTypeKeyV1
 from opaque_keys.edx.asides import AsideUsageKeyV1, AsideUsageKeyV2
 from contracts import contract, new_contract
 
-from django.db import DatabaseError
+from django.conf import settings
+from django.db import DatabaseError, connection
 
-from xblock.runtime import KeyValueStore
+from xblock.runtime import KeyValueStore, Mixologist
 from xblock.exceptions import KeyValueMultiSaveError, InvalidScopeError
-from xblock.fields import Scope, UserScope
+from xblock.fields import Scope, ScopeIds, UserScope
 from xmodule.modulestore.django import modulestore
-from xblock.core import XBlockAside
+from xblock.core import XBlock, XBlockAside
 from courseware.user_state_client import DjangoXBlockUserStateClient
+from request_cache import get_cache
 
 
 log = logging.getLogger(__name__)
@@ -56,6 +60,48 @@ class InvalidWriteError(Exception):
     """
 
 
+# The name of the request cache of the UserStateCaches with writes to flush
+# at the end of the request.
+USER_STATE_WRITE_BEHIND_CACHE = 'courseware.model_data.user_state_write_behind'
+
+# A stand-in for a descriptor, with only the attributes that the
+# FieldDataCache uses, for blocks planned from a block structure.
+PlannedBlock = namedtuple('PlannedBlock', ['scope_ids', 'location', 'entry_point', 'fields', 'has_score'])
+
+# The Mixologist used to look up the fields of planned blocks, created on
+# first use.  See _planned_block_class.
+_MIXOLOGIST = None
+
+
+def _planned_block_class(block_type):
+    """
+    Return the XBlock class, with the LMS XBlock mixins mixed in, of the
+    blocks of type `block_type`, or the mixed-in XBlock class if there is
+    no such block type installed.
+    """
+    global _MIXOLOGIST  # pylint: disable=global-statement
+    if _MIXOLOGIST is None:
+        _MIXOLOGIST = Mixologist(settings.XBLOCK_MIXINS)
+    return _MIXOLOGIST.mix(
+        XBlock.load_class(block_type, default=XBlock, select=settings.XBLOCK_SELECT_FUNCTION)
+    )
+
+
+@contextmanager
+def _count_queries(query_counts, key):
+    """
+    Add the number of database queries run in the block to `query_counts[key]`.
+    """
+    force_debug_cursor = connection.force_debug_cursor
+    connection.force_debug_cursor = True
+    initial_queries = len(connection.queries_log)
+    try:
+        yield
+    finally:
+        connection.force_debug_cursor = force_debug_cursor
+    query_counts[key] = query_counts.get(key, 0) + len(connection.queries_log) - initial_queries
+
+
 def _all_usage_keys(descriptors, aside_types):
     """
     Return a set of all usage_ids for the `descriptors` and for
@@ -349,12 +395,19 @@ class DjangoOrmFieldCache(object):
 class UserStateCache(object):
     """
     Cache for Scope.user_state xblock field data.
+
+    If write-behind is enabled, the fields set during a request are merged
+    by block and written together, in bulk, when the cache is flushed at the
+    end of the request (see UserStateWriteBehindMiddleware) rather than as
+    soon as they are set.
     """
-    def __init__(self, user, course_id):
+    def __init__(self, user, course_id, write_behind=False):
         self._cache = defaultdict(dict)
         self.course_id = course_id
         self.user = user
         self._client = DjangoXBlockUserStateClient(self.user)
+        self._write_behind = write_behind
+        self._pending_writes = defaultdict(dict)
 
     def cache_fields(self, fields, xblocks, aside_types):  # pylint: disable=unused-argument
         """
@@ -394,6 +447,9 @@ class UserStateCache(object):
 
         Returns: datetime if there was a modified date, or None otherwise
         """
+        if self._cache_key_for_kvs_key(kvs_key) in self._pending_writes:
+            self.flush()
+
         try:
             return self._client.get(
                 self.user.username,
@@ -418,6 +474,13 @@ class UserStateCache(object):
 
             pending_updates[cache_key][kvs_key.field_name] = value
 
+        if self._write_behind:
+            for cache_key, state in pending_updates.iteritems():
+                self._pending_writes[cache_key].update(state)
+                self._cache[cache_key].update(state)
+            get_cache(USER_STATE_WRITE_BEHIND_CACHE)[id(self)] = self
+            return
+
         try:
             self._client.set_many(
                 self.user.username,
@@ -465,6 +528,7 @@ class UserStateCache(object):
         if kvs_key.field_name not in field_state:
             raise KeyError(kvs_key.field_name)
 
+        self._pending_writes.get(cache_key, {}).pop(kvs_key.field_name, None)
         self._client.delete(self.user.username, cache_key, fields=[kvs_key.field_name])
         del field_state[kvs_key.field_name]
 
@@ -488,6 +552,24 @@ class UserStateCache(object):
     def __len__(self):
         return len(self._cache)
 
+    def flush(self):
+        """
+        Write all of the fields set since the last flush, if write-behind is
+        enabled, to the underlying datastore.
+        """
+        pending_writes = dict(
+            (cache_key, state) for cache_key, state in self._pending_writes.iteritems() if state
+        )
+        self._pending_writes.clear()
+        if not pending_writes:
+            return
+
+        try:
+            self._client.bulk_set_many(self.user.username, pending_writes)
+        except DatabaseError:
+            log.exception("Saving user state failed for %s", self.user.username)
+            raise KeyValueMultiSaveError([])
+
     def _cache_key_for_kvs_key(self, key):
         """
         Return the key used in this DjangoOrmFieldCache for the specified KeyValueStore key.
@@ -498,6 +580,24 @@ class UserStateCache(object):
         return key.block_scope_id
 
 
+def flush_user_state_writes():
+    """
+    Flush all of the UserStateCaches with user state written behind during
+    the current request.  All of them are flushed even if some fail, in which
+    case the error of the last failure is raised.
+    """
+    write_behind_caches = get_cache(USER_STATE_WRITE_BEHIND_CACHE)
+    error = None
+    while write_behind_caches:
+        __, user_state_cache = write_behind_caches.popitem()
+        try:
+            user_state_cache.flush()
+        except KeyValueMultiSaveError as exc:
+            error = exc
+    if error is not None:
+        raise error  # pylint: disable=raising-bad-type
+
+
 class UserStateSummaryCache(DjangoOrmFieldCache):
     """
     Cache for Scope.user_state_summary xblock field data.
@@ -698,7 +798,8 @@ class FieldDataCache(object):
         descriptors: A list of XModuleDescriptors.
         course_id: The id of the current course
         user: The user for which to cache data
-        select_for_update: Ignored
+        select_for_update: Whether the user state must be written as soon as it is set,
+            even if write-behind of user state is enabled.
         asides: The list of aside types to load, or None to prefetch no asides.
         """
         if asides is None:
@@ -714,6 +815,11 @@ class FieldDataCache(object):
             Scope.user_state: UserStateCache(
                 self.user,
                 self.course_id,
+                write_behind=(
+                    settings.FEATURES.get('ENABLE_USER_STATE_WRITE_BEHIND', False) and
+                    not select_for_update and
+                    crum.get_current_request() is not None
+                ),
             ),
             Scope.user_info: UserInfoCache(
                 self.user,
@@ -728,9 +834,12 @@ class FieldDataCache(object):
         self.scorable_locations = set()
         self.add_descriptors_to_cache(descriptors)
 
-    def add_descriptors_to_cache(self, descriptors):
+    def add_descriptors_to_cache(self, descriptors, query_counts=None):
         """
         Add all `descriptors` to this FieldDataCache.
+
+        If `query_counts` is given, the number of database queries run for each
+        scope is added to it, by Scope.
         """
         if self.user.is_authenticated():
             self.scorable_locations.update(desc.location for desc in descriptors if desc.has_score)
@@ -738,7 +847,11 @@ class FieldDataCache(object):
                 if scope not in self.cache:
                     continue
 
-                self.cache[scope].cache_fields(fields, descriptors, self.asides)
+                if query_counts is None:
+                    self.cache[scope].cache_fields(fields, descriptors, self.asides)
+                else:
+                    with _count_queries(query_counts, scope):
+                        self.cache[scope].cache_fields(fields, descriptors, self.asides)
 
     def add_descriptor_descendents(self, descriptor, depth=None, descriptor_filter=lambda descriptor: True):
         """
@@ -780,6 +893,54 @@ class FieldDataCache(object):
 
         self.add_descriptors_to_cache(descriptors)
 
+    def add_blocks_to_cache(self, block_structure, starting_block_key=None):
+        """
+        Add the block at `starting_block_key` and all of its descendants in
+        `block_structure` to this FieldDataCache, without loading any of their
+        descriptors.
+
+        The usage keys and block types of the blocks are planned from the block
+        structure, and the fields of each block type from its XBlock class, so
+        the field data of all the blocks is loaded together in a fixed number
+        of batched queries for each scope.  The number of blocks, and the
+        number of queries for each scope, are reported to NewRelic.
+
+        Blocks that render other blocks than their children (such as
+        conditionals) and blocks added to the course since `block_structure`
+        was collected are not planned; use add_descriptor_descendents to add
+        those.
+
+        Arguments:
+            block_structure (BlockStructure) - The (collected) block structure
+                of the course, which should include the 'has_score' field.
+            starting_block_key (UsageKey) - The block to start at, or None to
+                start at the root of the block structure.
+
+        Returns:
+            set(UsageKey) - The usage keys of the blocks added to the cache.
+        """
+        planned_blocks = []
+        if starting_block_key is not None and starting_block_key not in block_structure:
+            return set()
+
+        for block_key in block_structure.topological_traversal(start_node=starting_block_key):
+            block_class = _planned_block_class(block_key.block_type)
+            planned_blocks.append(PlannedBlock(
+                scope_ids=ScopeIds(self.user.id, block_key.block_type, None, block_key),
+                location=block_key,
+                entry_point=block_class.entry_point,
+                fields=block_class.fields,
+                has_score=block_structure.get_xblock_field(block_key, 'has_score', False),
+            ))
+
+        query_counts = {}
+        self.add_descriptors_to_cache(planned_blocks, query_counts)
+
+        if self.user.is_authenticated():
+            DjangoXBlockUserStateClient(self.user).report_prefetch(len(planned_blocks), query_counts)
+
+        return set(planned_block.location for planned_block in planned_blocks)
+
     @classmethod
     def cache_for_descriptor_descendents(cls, course_id, user, descriptor, depth=None,
                                          descriptor_filter=lambda descriptor: True,
@@ -792,7 +953,7 @@ class FieldDataCache(object):
             the supplied descriptor. If depth is None, load all descendant StudentModules
         descriptor_filter is a function that accepts a descriptor and return whether the field data
             should be cached
-        select_for_update: Ignored
+        select_for_update: Whether the user state must be written as soon as it is set
         """
         cache = FieldDataCache([], course_id, user, select_for_update, asides=asides)
         cache.add_descriptor_descendents(descriptor, depth, descriptor_filter)
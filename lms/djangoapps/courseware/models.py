@@ -38,6 +38,24 @@ def chunks(items, chunk_size):
     return (items[i:i + chunk_size] for i in xrange(0, len(items), chunk_size))
 
 
+def keyset_pages(queryset, page_size, key_field='pk'):
+    """
+    Yields the objects of queryset in lists of at most page_size, ordered by
+    key_field, which must be unique within queryset.  Each page is loaded by
+    a single query that continues after the key of the last object of the
+    previous page, rather than at an offset, so that all of the pages of a
+    large queryset are equally cheap to load.
+    """
+    queryset = queryset.order_by(key_field)
+    page = list(queryset[:page_size])
+    while page:
+        yield page
+        if len(page) < page_size:
+            return
+        last_key = getattr(page[-1], key_field)
+        page = list(queryset.filter(**{key_field + '__gt': last_key})[:page_size])
+
+
 class ChunkingManager(models.Manager):
     """
     :class:`~Manager` that adds an additional method :meth:`chunked_filter` to provide
@@ -61,10 +79,13 @@ class ChunkingManager(models.Manager):
                 :meth:`~Manager.filter`. This implies that ``chunk_field`` should be an
                 ``__in`` key.
             chunk_size (int): The size of chunks to pass. Defaults to 500.
+            select_for_update (bool): Whether to lock the selected rows until the
+                end of the current transaction. Defaults to False.
         """
         chunk_size = kwargs.pop('chunk_size', 500)
+        queryset = self.select_for_update() if kwargs.pop('select_for_update', False) else self
         res = itertools.chain.from_iterable(
-            self.filter(**dict([(chunk_field, chunk)] + kwargs.items()))
+            queryset.filter(**dict([(chunk_field, chunk)] + kwargs.items()))
             for chunk in chunks(items, chunk_size)
         )
         return res
@@ -199,6 +220,31 @@ class BaseStudentModuleHistory(models.Model):
 
         return history_entries
 
+    @staticmethod
+    def save_history_in_bulk(student_modules):
+        """
+        Save the history entries for the given StudentModules, which were saved
+        without sending the post_save signal that saves them one at a time (as
+        with bulk_create or update), in a single insert.
+        """
+        if settings.FEATURES.get('ENABLE_CSMH_EXTENDED'):
+            history_class = coursewarehistoryextended.models.StudentModuleHistoryExtended
+        else:
+            history_class = StudentModuleHistory
+
+        history_class.objects.bulk_create([
+            history_class(
+                student_module=student_module,
+                version=None,
+                created=student_module.modified,
+                state=student_module.state,
+                grade=student_module.grade,
+                max_grade=student_module.max_grade,
+            )
+            for student_module in student_modules
+            if student_module.module_type in history_class.HISTORY_SAVING_TYPES
+        ])
+
 
 class StudentModuleHistory(BaseStudentModuleHistory):
     """Keeps a complete history of state changes for a given XModule for a given
@@ -2,14 +2,18 @@
 Test for lms courseware app, module data (runtime data storage for XBlocks)
 """
 import json
-from mock import Mock, patch
+import ddt
+from mock import MagicMock, Mock, patch
 from nose.plugins.attrib import attr
 from functools import partial
 
-from courseware.model_data import DjangoKeyValueStore, FieldDataCache, InvalidScopeError
+from courseware.middleware import UserStateWriteBehindMiddleware
+from courseware.model_data import DjangoKeyValueStore, FieldDataCache, InvalidScopeError, flush_user_state_writes
+from courseware.user_state_client import DjangoXBlockUserStateClient
 from courseware.models import StudentModule, XModuleUserStateSummaryField
 from courseware.models import XModuleStudentInfoField, XModuleStudentPrefsField
 
+from request_cache.middleware import RequestCache
 from student.tests.factories import UserFactory
 from courseware.tests.factories import StudentModuleFactory as cmfStudentModuleFactory, location, course_id
 from courseware.tests.factories import UserStateSummaryFactory
@@ -426,3 +430,145 @@ class TestStudentInfoStorage(OtherUserFailureTestMixin, StorageTestBase, TestCas
     storage_class = XModuleStudentInfoField
     other_key_factory = partial(DjangoKeyValueStore.Key, Scope.user_info, 2, 'mock_problem')  # user_id=2, not 1
     existing_field_name = "existing_field"
+
+
+def mock_block_structure(block_keys):
+    """
+    Return a mock block structure whose blocks, in topological order, are
+    `block_keys`, all of which are scored.
+    """
+    block_structure = MagicMock()
+    block_structure.__contains__.side_effect = lambda block_key: block_key in block_keys
+    block_structure.topological_traversal.return_value = block_keys
+    block_structure.get_xblock_field.return_value = True
+    return block_structure
+
+
+@attr(shard=1)
+@ddt.ddt
+class TestPlannedPrefetch(TestCase):
+    """Tests for FieldDataCache.add_blocks_to_cache"""
+    def setUp(self):
+        super(TestPlannedPrefetch, self).setUp()
+        self.user = UserFactory.create(username='user')
+        self.field_data_cache = FieldDataCache([], course_id, self.user)
+
+    @ddt.data(1, 10, 100)
+    def test_fixed_number_of_queries(self, num_problems):
+        block_keys = [course_id.make_usage_key('vertical', 'vertical')] + [
+            course_id.make_usage_key('problem', 'problem_{}'.format(index)) for index in range(num_problems)
+        ]
+        for block_key in block_keys[1:]:
+            StudentModuleFactory.create(
+                student=self.user, module_state_key=block_key, state=json.dumps({'attempts': 1})
+            )
+        block_class = Mock(entry_point=XBlock.entry_point, fields={
+            'attempts': mock_field(Scope.user_state, 'attempts'),
+            'summary': mock_field(Scope.user_state_summary, 'summary'),
+        })
+
+        # One query for each scope, however many blocks there are.
+        with patch('courseware.model_data._planned_block_class', return_value=block_class):
+            with patch.object(DjangoXBlockUserStateClient, 'report_prefetch') as mock_report_prefetch:
+                with self.assertNumQueries(2):
+                    planned_block_keys = self.field_data_cache.add_blocks_to_cache(
+                        mock_block_structure(block_keys), starting_block_key=block_keys[0]
+                    )
+
+        self.assertEquals(planned_block_keys, set(block_keys))
+        self.assertEquals(self.field_data_cache.scorable_locations, set(block_keys))
+        mock_report_prefetch.assert_called_once_with(
+            len(block_keys), {Scope.user_state: 1, Scope.user_state_summary: 1}
+        )
+
+        with self.assertNumQueries(0):
+            for block_key in block_keys[1:]:
+                kvs_key = DjangoKeyValueStore.Key(Scope.user_state, self.user.id, block_key, 'attempts')
+                self.assertEquals(self.field_data_cache.get(kvs_key), 1)
+
+    def test_starting_block_not_in_structure(self):
+        block_keys = [course_id.make_usage_key('vertical', 'vertical')]
+        with self.assertNumQueries(0):
+            planned_block_keys = self.field_data_cache.add_blocks_to_cache(
+                mock_block_structure(block_keys), starting_block_key=course_id.make_usage_key('vertical', 'other')
+            )
+        self.assertEquals(planned_block_keys, set())
+
+
+@attr(shard=1)
+@patch.dict('django.conf.settings.FEATURES', {'ENABLE_USER_STATE_WRITE_BEHIND': True})
+@patch('courseware.model_data.crum.get_current_request', Mock(return_value=Mock()))
+class TestUserStateWriteBehind(TestCase):
+    """Tests for writing user state behind, at the end of the request"""
+    # Tell Django to clean out all databases, not just default
+    multi_db = True
+
+    def setUp(self):
+        super(TestUserStateWriteBehind, self).setUp()
+        self.user = UserFactory.create(username='user')
+        self.addCleanup(RequestCache.clear_request_cache)
+
+    def get_kvs(self, select_for_update=False):
+        """
+        Return a DjangoKeyValueStore for a new FieldDataCache of the user.
+        """
+        field_data_cache = FieldDataCache(
+            [mock_descriptor([mock_field(Scope.user_state, 'a_field')])],
+            course_id,
+            self.user,
+            select_for_update=select_for_update,
+        )
+        return DjangoKeyValueStore(field_data_cache)
+
+    def user_state_key(self, field_name):
+        """
+        Return the key of the user's field `field_name`.
+        """
+        return DjangoKeyValueStore.Key(Scope.user_state, self.user.id, location('usage_id'), field_name)
+
+    def test_writes_merged_and_flushed(self):
+        kvs = self.get_kvs()
+        with self.assertNumQueries(0):
+            kvs.set(self.user_state_key('a_field'), 'first value')
+            kvs.set(self.user_state_key('other_field'), 'other value')
+            kvs.set(self.user_state_key('a_field'), 'second value')
+            self.assertEquals(kvs.get(self.user_state_key('a_field')), 'second value')
+        self.assertFalse(StudentModule.objects.filter(student=self.user).exists())
+
+        flush_user_state_writes()
+
+        student_module = StudentModule.objects.get(student=self.user)
+        self.assertEquals(
+            json.loads(student_module.state),
+            {'a_field': 'second value', 'other_field': 'other value'},
+        )
+
+    def test_flushed_when_view_raises(self):
+        kvs = self.get_kvs()
+        kvs.set(self.user_state_key('a_field'), 'a value')
+
+        # Django calls process_exception in the reverse order of the
+        # middleware, so RequestCache clears the request cache last.
+        request, exception = Mock(), Exception()
+        self.assertIsNone(UserStateWriteBehindMiddleware().process_exception(request, exception))
+        RequestCache().process_exception(request, exception)
+
+        student_module = StudentModule.objects.get(student=self.user)
+        self.assertEquals(json.loads(student_module.state), {'a_field': 'a value'})
+
+    def test_select_for_update_writes_through(self):
+        kvs = self.get_kvs(select_for_update=True)
+        kvs.set(self.user_state_key('a_field'), 'a value')
+        student_module = StudentModule.objects.get(student=self.user)
+        self.assertEquals(json.loads(student_module.state), {'a_field': 'a value'})
+
+    def test_deleted_field_not_flushed(self):
+        kvs = self.get_kvs()
+        kvs.set(self.user_state_key('a_field'), 'a value')
+        kvs.set(self.user_state_key('other_field'), 'other value')
+        kvs.delete(self.user_state_key('a_field'))
+
+        flush_user_state_writes()
+
+        student_module = StudentModule.objects.get(student=self.user)
+        self.assertEquals(json.loads(student_module.state), {'other_field': 'other value'})
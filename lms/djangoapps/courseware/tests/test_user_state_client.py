@@ -3,14 +3,18 @@ Black-box tests of the DjangoUserStateClient against the semantics
 defined in edx_user_state_client.
 """
 
+import json
 from collections import defaultdict
 from unittest import skip
 
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from opaque_keys.edx.locations import SlashSeparatedCourseKey
 
 from edx_user_state_client.tests import UserStateClientTestBase
 from courseware.user_state_client import DjangoXBlockUserStateClient
-from courseware.tests.factories import UserFactory
+from courseware.tests.factories import StudentModuleFactory, UserFactory
 
 
 class TestDjangoUserStateClient(UserStateClientTestBase, TestCase):
@@ -67,3 +71,61 @@ class TestDjangoUserStateClient(UserStateClientTestBase, TestCase):
     @skip("Not supported by DjangoXBlockUserStateClient")
     def test_iter_course_many_users(self):
         pass
+
+
+class TestDjangoUserStateClientBulkSetMany(TestCase):
+    """
+    Tests of DjangoXBlockUserStateClient.bulk_set_many.
+    """
+    # Tell Django to clean out all databases, not just default
+    multi_db = True
+
+    def setUp(self):
+        super(TestDjangoUserStateClientBulkSetMany, self).setUp()
+        self.user = UserFactory.create()
+        self.client = DjangoXBlockUserStateClient(self.user)
+        course_key = SlashSeparatedCourseKey('edX', 'test_course', 'test')
+        self.block_keys = [course_key.make_usage_key('problem', 'problem_{}'.format(index)) for index in range(3)]
+
+    def test_creates_and_updates(self):
+        StudentModuleFactory.create(
+            student=self.user,
+            course_id=self.block_keys[0].course_key,
+            module_state_key=self.block_keys[0],
+            state=json.dumps({'attempts': 1, 'seed': 5}),
+        )
+
+        self.client.bulk_set_many(
+            self.user.username,
+            {block_key: {'attempts': 2} for block_key in self.block_keys},
+        )
+
+        states = {
+            user_state.block_key: user_state.state
+            for user_state in self.client.get_many(self.user.username, self.block_keys)
+        }
+        self.assertEqual(states, {
+            self.block_keys[0]: {'attempts': 2, 'seed': 5},
+            self.block_keys[1]: {'attempts': 2},
+            self.block_keys[2]: {'attempts': 2},
+        })
+        for block_key in self.block_keys:
+            self.assertEqual(len(self.client.get_history(self.user.username, block_key)), 1)
+
+    def test_fixed_number_of_queries(self):
+        def num_queries(block_keys):
+            """
+            Return the number of queries (on the default database) that
+            bulk_set_many makes to create the state of `block_keys`.
+            """
+            with CaptureQueriesContext(connection) as captured_queries:
+                self.client.bulk_set_many(
+                    self.user.username,
+                    {block_key: {'attempts': 1} for block_key in block_keys},
+                )
+            return len(captured_queries)
+
+        course_key = SlashSeparatedCourseKey('edX', 'other_course', 'test')
+        many_block_keys = [course_key.make_usage_key('problem', 'problem_{}'.format(index)) for index in range(10)]
+        self.assertEqual(num_queries(self.block_keys[:1]), num_queries(many_block_keys))
+
@@ -17,6 +17,7 @@ import dogstats_wrapper as dog_stats_api
 from django.contrib.auth.models import User
 from django.db import transaction
 from django.db.utils import IntegrityError
+from django.utils import timezone
 from xblock.fields import Scope
 from courseware.models import StudentModule, BaseStudentModuleHistory
 from edx_user_state_client.interface import XBlockUserStateClient, XBlockUserState
@@ -47,6 +48,10 @@ class DjangoXBlockUserStateClient(XBlockUserStateClient):
     # Use this sample rate for DataDog events.
     API_DATADOG_SAMPLE_RATE = 0.1
 
+    # The number of StudentModules to load in each query when reading the
+    # state of many users.
+    BULK_READ_BATCH_SIZE = 500
+
     class ServiceUnavailable(XBlockUserStateClient.ServiceUnavailable):
         """
         This error is raised if the service backing this client is currently unavailable.
@@ -74,13 +79,15 @@ class DjangoXBlockUserStateClient(XBlockUserStateClient):
         """
         self.user = user
 
-    def _get_student_modules(self, username, block_keys):
+    def _get_student_modules(self, username, block_keys, select_for_update=False):
         """
         Retrieve the :class:`~StudentModule`s for the supplied ``username`` and ``block_keys``.
 
         Arguments:
             username (str): The name of the user to load `StudentModule`s for.
             block_keys (list of :class:`~UsageKey`): The set of XBlocks to load data for.
+            select_for_update (bool): Whether to lock the `StudentModule`s until the end
+                of the current transaction.
         """
         course_key_func = attrgetter('course_key')
         by_course = itertools.groupby(
@@ -94,6 +101,7 @@ class DjangoXBlockUserStateClient(XBlockUserStateClient):
                 usage_keys,
                 student__username=username,
                 course_id=course_key,
+                select_for_update=select_for_update,
             )
 
             for student_module in query:
@@ -166,6 +174,21 @@ class DjangoXBlockUserStateClient(XBlockUserStateClient):
         """
         self._nr_block_stat_accumulate(function_name, block_type, stat_name, count)
 
+    def report_prefetch(self, num_blocks, query_counts):
+        """
+        Report to NR a prefetch of the field data, in all scopes, of
+        `num_blocks` blocks planned from a block structure.
+
+        Arguments:
+            num_blocks (int): The number of blocks prefetched.
+            query_counts (dict): The number of queries the prefetch ran, by Scope.
+        """
+        self._nr_stat_increment('prefetch', 'calls')
+        self._nr_stat_accumulate('prefetch', 'blocks_requested', num_blocks)
+        for scope, num_queries in query_counts.iteritems():
+            # Reported both in total and for each scope.
+            self._nr_block_stat_accumulate('prefetch', scope.name, 'queries', num_queries)
+
     def get_many(self, username, block_keys, scope=Scope.user_state, fields=None):
         """
         Retrieve the stored XBlock state for the specified XBlock usages.
@@ -334,6 +357,120 @@ class DjangoXBlockUserStateClient(XBlockUserStateClient):
         self._ddog_histogram(evt_time, 'set_many.response_time', duration)
         self._nr_stat_accumulate('set_many', 'duration', duration)
 
+    def bulk_set_many(self, username, block_keys_to_state, scope=Scope.user_state):
+        """
+        Set fields for many XBlocks at once.
+
+        This behaves like :meth:`set_many`, but rather than creating or updating
+        the StudentModule (and history entry) of each block separately, it
+        locks all of the existing StudentModules in one query, creates all of
+        the missing ones in another and inserts all of their history entries
+        together.  If another request creates one of the missing StudentModules
+        concurrently, it falls back to :meth:`set_many`.
+
+        Arguments:
+            username: The name of the user whose state should be set
+            block_keys_to_state (dict): A dict mapping UsageKeys to state dicts.
+                Each state dict maps field names to values. These state dicts
+                are overlaid over the stored state.
+            scope (Scope): The scope to set data in
+        """
+        if scope != Scope.user_state:
+            raise ValueError("Only Scope.user_state is supported")
+
+        # count how many times this function gets called
+        self._nr_stat_increment('bulk_set_many', 'calls')
+
+        if self.user is not None and self.user.username == username:
+            user = self.user
+        else:
+            user = User.objects.get(username=username)
+
+        if user.is_anonymous():
+            # Anonymous users cannot be persisted to the database, so let's just use
+            # what we have.
+            return
+
+        evt_time = time()
+
+        try:
+            with transaction.atomic():
+                student_modules = self._bulk_save_student_modules(user, block_keys_to_state)
+        except IntegrityError:
+            log.warning(
+                "bulk_set_many: IntegrityError for student %s - falling back to set_many for %d block keys",
+                user, len(block_keys_to_state),
+            )
+            self.set_many(username, block_keys_to_state, scope)
+            return
+
+        BaseStudentModuleHistory.save_history_in_bulk(student_modules)
+
+        # Events for the entire bulk_set_many call.
+        finish_time = time()
+        duration = (finish_time - evt_time) * 1000  # milliseconds
+        self._ddog_histogram(evt_time, 'bulk_set_many.blks_updated', len(block_keys_to_state))
+        self._ddog_histogram(evt_time, 'bulk_set_many.response_time', duration)
+        self._nr_stat_accumulate('bulk_set_many', 'blocks', len(block_keys_to_state))
+        self._nr_stat_accumulate('bulk_set_many', 'duration', duration)
+
+    def _bulk_save_student_modules(self, user, block_keys_to_state):
+        """
+        Overlay the states in `block_keys_to_state` over the stored states of
+        the StudentModules of `user`, creating the missing StudentModules, and
+        return all of the saved StudentModules.
+
+        This must be called in a transaction, so that the existing
+        StudentModules stay locked until their merged states are committed.
+        """
+        existing_student_modules = {
+            usage_key: student_module
+            for student_module, usage_key in self._get_student_modules(
+                user.username, block_keys_to_state.keys(), select_for_update=True
+            )
+        }
+
+        modified = timezone.now()
+        for usage_key, student_module in existing_student_modules.iteritems():
+            if student_module.state is None:
+                current_state = {}
+            else:
+                current_state = json.loads(student_module.state)
+            current_state.update(block_keys_to_state[usage_key])
+            student_module.state = json.dumps(current_state)
+            student_module.modified = modified
+            # Updating the object without sending post_save, whose history
+            # entries are saved in bulk by the caller.
+            StudentModule.objects.filter(pk=student_module.pk).update(
+                state=student_module.state,
+                modified=modified,
+            )
+            self._nr_block_stat_increment('bulk_set_many', usage_key.block_type, 'blocks_updated')
+
+        new_usage_keys = set(block_keys_to_state) - set(existing_student_modules)
+        if not new_usage_keys:
+            return existing_student_modules.values()
+
+        StudentModule.objects.bulk_create([
+            StudentModule(
+                student=user,
+                course_id=usage_key.course_key,
+                module_state_key=usage_key,
+                module_type=usage_key.block_type,
+                state=json.dumps(block_keys_to_state[usage_key]),
+            )
+            for usage_key in new_usage_keys
+        ])
+        for usage_key in new_usage_keys:
+            self._nr_block_stat_increment('bulk_set_many', usage_key.block_type, 'blocks_created')
+
+        # bulk_create does not set the primary keys of the new StudentModules,
+        # which their history entries need.
+        new_student_modules = [
+            student_module for student_module, __ in self._get_student_modules(user.username, new_usage_keys)
+        ]
+        return existing_student_modules.values() + new_student_modules
+
     def delete_many(self, username, block_keys, scope=Scope.user_state, fields=None):
         """
         Delete the stored XBlock state for a many xblock usages.
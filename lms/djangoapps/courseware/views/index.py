@@ -24,6 +24,7 @@ import urllib
 
 from xblock.fragment import Fragment
 from opaque_keys.edx.keys import CourseKey
+from openedx.core.djangoapps.content.block_structure.api import get_block_structure_manager
 from openedx.core.djangoapps.lang_pref import LANGUAGE_KEY
 from openedx.core.djangoapps.user_api.preferences.api import get_user_preference
 from shoppingcart.models import CourseRegistrationCode
@@ -347,9 +348,23 @@ class CoursewareIndex(View):
         Prefetches all descendant data for the requested section and
         sets up the runtime, which binds the request user to the section.
         """
-        # Pre-fetch all descendant data
+        # Pre-fetch all descendant data, planned from the course's block
+        # structure if it's cached (it isn't collected here, which would
+        # load the whole course), and then any (required or newly added)
+        # blocks that could not be planned.
+        planned_block_keys = set()
+        block_structure = get_block_structure_manager(self.course_key).get_cached()
+        if block_structure is not None:
+            planned_block_keys = self.field_data_cache.add_blocks_to_cache(
+                block_structure,
+                starting_block_key=self.section.location,
+            )
         self.section = modulestore().get_item(self.section.location, depth=None, lazy=False)
-        self.field_data_cache.add_descriptor_descendents(self.section, depth=None)
+        self.field_data_cache.add_descriptor_descendents(
+            self.section,
+            depth=None,
+            descriptor_filter=lambda descriptor: descriptor.location not in planned_block_keys,
+        )
 
         # Bind section to user
         self.section = get_module_for_descriptor(
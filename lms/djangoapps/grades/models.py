@@ -370,6 +370,25 @@ class PersistentSubsectionGrade(DeleteGradesMixin, TimeStampedModel):
             course_id=course_key,
         )
 
+    @classmethod
+    def bulk_read_graded_totals(cls, user_ids, course_key):
+        """
+        Reads the graded totals of all grades for the given users and
+        course, without instantiating the models.
+
+        Returns a list of (user_id, usage_key, earned_graded,
+        possible_graded, first_attempted) tuples, where usage_key is the
+        serialized value of the (possibly incomplete) usage_key field.
+
+        Arguments:
+            user_ids: The users associated with the desired grades
+            course_key: The course identifier for the desired grades
+        """
+        return cls.objects.filter(
+            user_id__in=user_ids,
+            course_id=course_key,
+        ).values_list('user_id', 'usage_key', 'earned_graded', 'possible_graded', 'first_attempted')
+
     @classmethod
     def update_or_create_grade(cls, **params):
         """
@@ -77,7 +77,7 @@ class CourseGrade(object):
         )
         # can't use the existing properties due to recursion issues caused by referencing self.grade_value
         percent = self._calc_percent(grade_value)
-        letter_grade = self._compute_letter_grade(percent)
+        letter_grade = self._compute_letter_grade(self.course.grade_cutoffs, percent)
         self._log_event(log.warning, u"grade_value, percent: {0}, grade: {1}".format(percent, letter_grade))
         return grade_value
 
@@ -119,7 +119,7 @@ class CourseGrade(object):
         Returns a letter representing the grade.
         """
         if self._letter_grade is None:
-            self._letter_grade = self._compute_letter_grade(self.percent)
+            self._letter_grade = self._compute_letter_grade(self.course.grade_cutoffs, self.percent)
         return self._letter_grade
 
     @property
@@ -269,7 +269,8 @@ class CourseGrade(object):
         """
         return round(grade_value['percent'] * 100 + 0.05) / 100
 
-    def _compute_letter_grade(self, percentage):
+    @staticmethod
+    def _compute_letter_grade(grade_cutoffs, percentage):
         """
         Returns a letter grade as defined in grading_policy (e.g. 'A' 'B' 'C' for 6.002x) or None.
 
@@ -280,7 +281,6 @@ class CourseGrade(object):
         """
 
         letter_grade = None
-        grade_cutoffs = self.course.grade_cutoffs
 
         # Possible grades, sorted in descending order of score
         descending_grades = sorted(grade_cutoffs, key=lambda x: grade_cutoffs[x], reverse=True)
@@ -324,17 +324,29 @@ class CourseGradeFactory(object):
     """
     Factory class to create Course Grade objects
     """
-    def create(self, student, course, collected_block_structure=None, read_only=True):
+    def create(
+            self,
+            student,
+            course,
+            collected_block_structure=None,
+            read_only=True,
+            transformed_block_structures=None,
+    ):
         """
         Returns the CourseGrade object for the given student and course.
 
         If read_only is True, doesn't save any updates to the grades.
         Raises a PermissionDenied if the user does not have course access.
+
+        If transformed_block_structures is given, course structures are
+        shared with other students with equivalent access to the course,
+        as described in get_course_blocks.
         """
         course_structure = get_course_blocks(
             student,
             course.location,
             collected_block_structure=collected_block_structure,
+            transformed_block_structures=transformed_block_structures,
         )
 
         # if user does not have access to this course, throw an exception
@@ -363,12 +375,20 @@ class CourseGradeFactory(object):
         #    compute the grade for all students.
         # 2. Optimization: the collected course_structure is not
         #    retrieved from the data store multiple times.
+        # 3. Optimization: the course_structure is transformed only once
+        #    for all students with equivalent access to the course.
 
         collected_block_structure = get_block_structure_manager(course.id).get_collected()
+        transformed_block_structures = {}
         for student in students:
             with dog_stats_api.timer('lms.grades.CourseGradeFactory.iter', tags=[u'action:{}'.format(course.id)]):
                 try:
-                    course_grade = CourseGradeFactory().create(student, course, collected_block_structure)
+                    course_grade = CourseGradeFactory().create(
+                        student,
+                        course,
+                        collected_block_structure,
+                        transformed_block_structures=transformed_block_structures,
+                    )
                     yield self.GradeResult(student, course_grade, "")
 
                 except Exception as exc:  # pylint: disable=broad-except
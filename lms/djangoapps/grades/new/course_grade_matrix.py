@@ -0,0 +1,415 @@
+"""
+CourseGradeMatrix Class
+
+Computes the course grades of many students at once, for use in grade
+reports.  Instead of building SubsectionGrade and CourseGrade objects for
+each student, the persisted subsection grades of a batch of students are
+loaded in bulk into numpy arrays, with a row per student and a column per
+graded subsection, and the course's grader is applied to all rows at once.
+"""
+from collections import OrderedDict
+from itertools import islice
+from logging import getLogger
+
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+import dogstats_wrapper as dog_stats_api
+import numpy
+from opaque_keys.edx.keys import UsageKey
+
+from lms.djangoapps.course_blocks.api import get_course_blocks
+from lms.djangoapps.grades.config.models import PersistentGradesEnabledFlag
+from openedx.core.djangoapps.content.block_structure.api import get_block_structure_manager
+from xmodule.graders import AggregatedScore
+
+from ..models import PersistentSubsectionGrade
+from .course_grade import CourseGrade, CourseGradeFactory
+
+
+log = getLogger(__name__)
+
+
+class CourseGradeMatrix(object):
+    """
+    The course grades of a batch of students, stored in arrays with a row
+    per student and a column per graded subsection of the course.
+    """
+    def __init__(self, students, subsection_keys):
+        self.students = students
+        self.subsection_keys = subsection_keys
+        self.subsection_columns = {subsection_key: column for column, subsection_key in enumerate(subsection_keys)}
+
+        shape = (len(students), len(subsection_keys))
+
+        # Graded totals of each student's subsection grades.
+        self.earned = numpy.zeros(shape)
+        self.possible = numpy.zeros(shape)
+        self.attempted = numpy.zeros(shape, dtype=bool)
+
+        # Whether each subsection is included in the student's grade,
+        # that is, whether it is accessible to the student and has a
+        # positive possible score.
+        self.included = numpy.zeros(shape, dtype=bool)
+
+        # Weighted percent of each category of the course's grader, keyed
+        # by category.  NaN for students without a value.
+        self.grade_breakdown = OrderedDict()
+
+        self.percents = [None] * len(students)
+        self.letter_grades = [None] * len(students)
+
+        # Error message for each student that could not be graded, or None.
+        self.errors = [None] * len(students)
+
+    def __len__(self):
+        return len(self.students)
+
+    def __getitem__(self, index):
+        """
+        Returns the CourseGradeMatrixRow for the student at the given index.
+        """
+        return CourseGradeMatrixRow(self, index)
+
+    def set_grade_breakdown_percent(self, category, index, percent):
+        """
+        Sets the weighted percent of the given grader category for the
+        student at the given index.
+        """
+        if category not in self.grade_breakdown:
+            self.grade_breakdown[category] = numpy.empty(len(self.students))
+            self.grade_breakdown[category].fill(numpy.nan)
+        self.grade_breakdown[category][index] = percent
+
+
+class CourseGradeMatrixRow(object):
+    """
+    Read-only view of a single student's course grade in a
+    CourseGradeMatrix, providing the values used by grade reports.
+    """
+    def __init__(self, matrix, index):
+        self._matrix = matrix
+        self._index = index
+
+    @property
+    def student(self):
+        """
+        Returns the student whose grade this is.
+        """
+        return self._matrix.students[self._index]
+
+    @property
+    def percent(self):
+        """
+        Returns a rounded percent from the overall grade.
+        """
+        return self._matrix.percents[self._index]
+
+    @property
+    def letter_grade(self):
+        """
+        Returns a letter representing the grade.
+        """
+        return self._matrix.letter_grades[self._index]
+
+    def subsection_graded_total(self, subsection_key):
+        """
+        Returns the graded total (AggregatedScore) of the student's grade
+        for the given subsection, or None if the subsection is not
+        included in the student's grade.
+        """
+        column = self._matrix.subsection_columns.get(subsection_key)
+        if column is None or not self._matrix.included[self._index, column]:
+            return None
+        return AggregatedScore(
+            tw_earned=self._matrix.earned[self._index, column],
+            tw_possible=self._matrix.possible[self._index, column],
+            graded=True,
+            attempted=bool(self._matrix.attempted[self._index, column]),
+        )
+
+    def grade_breakdown_percent(self, category):
+        """
+        Returns the weighted percent of the given grader category in the
+        student's grade, or None if not available.
+        """
+        percents = self._matrix.grade_breakdown.get(category)
+        if percents is None or numpy.isnan(percents[self._index]):
+            return None
+        return float(percents[self._index])
+
+
+class CourseGradeMatrixFactory(object):
+    """
+    Factory class to create CourseGradeMatrix objects for a course.
+
+    Students whose persisted subsection grades are all available are
+    graded from those persisted values using the vectorized grade_columns
+    method of the course's grader.  All other students (and all students
+    if the course does not persist grades or its grader does not support
+    vectorized grading) are graded individually by CourseGradeFactory.
+    Either way, the resulting grades are equal to those computed by
+    CourseGrade.
+    """
+    # Number of students whose grades are computed together.
+    BATCH_SIZE = 1000
+
+    def __init__(self, course):
+        self.course = course
+
+        # Pre-fetch the collected course_structure so the same version of
+        # the course is used to compute the grades of all students, and
+        # share the transformed course_structures of students with
+        # equivalent access to the course.
+        self._collected_block_structure = get_block_structure_manager(course.id).get_collected()
+        self._transformed_block_structures = {}
+
+        # Grading policy might be overriden by a CCX, need to reset it
+        self.course.set_grading_policy(self.course.grading_policy)
+
+        self._subsection_keys = self._get_graded_subsection_keys()
+        self._subsection_keys_by_serialized_key = {}
+        self._use_persisted_grades = (
+            PersistentGradesEnabledFlag.feature_enabled(course.id) and
+            self._grader_supports_columns()
+        )
+
+    def iter(self, students):
+        """
+        Given an iterable of students (User), yield a GradeResult for every
+        student, as CourseGradeFactory.iter does, except that the
+        course_grade of each result is a CourseGradeMatrixRow.
+        """
+        students = iter(students)
+        while True:
+            batch = list(islice(students, self.BATCH_SIZE))
+            if not batch:
+                break
+            matrix = self.create(batch)
+            for index, student in enumerate(batch):
+                if matrix.errors[index] is not None:
+                    yield CourseGradeFactory.GradeResult(student, None, matrix.errors[index])
+                else:
+                    yield CourseGradeFactory.GradeResult(student, matrix[index], "")
+
+    def create(self, students):
+        """
+        Returns the CourseGradeMatrix for the given list of students.
+        """
+        with dog_stats_api.timer('lms.grades.CourseGradeMatrixFactory.create', tags=[u'action:{}'.format(self.course.id)]):
+            matrix = CourseGradeMatrix(students, self._subsection_keys)
+            if self._use_persisted_grades:
+                accessible = self._get_accessible_subsections(matrix)
+                persisted = self._load_persisted_grades(matrix, accessible)
+                self._grade_columns(matrix)
+
+                # Students with accessible subsections that have not been
+                # graded yet are graded individually.
+                ungraded = (accessible & ~persisted).any(axis=1)
+                individual_indices = [index for index in xrange(len(matrix)) if ungraded[index]]
+            else:
+                individual_indices = xrange(len(matrix))
+
+            for index in individual_indices:
+                if matrix.errors[index] is None:
+                    self._grade_individually(matrix, index)
+            return matrix
+
+    def _grader_supports_columns(self):
+        """
+        Returns whether the course's grader supports vectorized grading.
+        """
+        if settings.GENERATE_PROFILE_SCORES:
+            return False
+        try:
+            self.course.grader.grade_columns({}, 0)
+        except NotImplementedError:
+            log.info(u"Grader of course %s does not support vectorized grading.", self.course.id)
+            return False
+        return True
+
+    def _get_graded_subsection_keys(self):
+        """
+        Returns the usage keys of all graded subsections in the course, in
+        the order in which they are graded by CourseGrade.
+        """
+        block_structure = self._collected_block_structure
+        subsection_keys = OrderedDict()
+        for chapter_key in block_structure.get_children(self.course.location):
+            for subsection_key in block_structure.get_children(chapter_key):
+                if block_structure.get_xblock_field(subsection_key, 'graded', False):
+                    subsection_keys[subsection_key] = True
+        return subsection_keys.keys()
+
+    def _get_accessible_subsections(self, matrix):
+        """
+        Returns a boolean array of whether each graded subsection is in
+        each student's course_structure, recording an error for students
+        that do not have access to the course.
+        """
+        accessible = numpy.zeros(matrix.included.shape, dtype=bool)
+        accessible_by_course_structure = {}
+        for index, student in enumerate(matrix.students):
+            try:
+                course_structure = get_course_blocks(
+                    student,
+                    self.course.location,
+                    collected_block_structure=self._collected_block_structure,
+                    transformed_block_structures=self._transformed_block_structures,
+                )
+                if not len(course_structure) > 0:
+                    raise PermissionDenied("User does not have access to this course")
+            except Exception as exc:  # pylint: disable=broad-except
+                self._log_exception(matrix, index, exc)
+                continue
+
+            # Students with equivalent access share the same course_structure.
+            if id(course_structure) not in accessible_by_course_structure:
+                accessible_by_course_structure[id(course_structure)] = (
+                    course_structure,
+                    self._get_accessible_columns(matrix, course_structure),
+                )
+            accessible[index] = accessible_by_course_structure[id(course_structure)][1]
+        return accessible
+
+    def _get_accessible_columns(self, matrix, course_structure):
+        """
+        Returns a boolean array of whether each graded subsection is in
+        the given course_structure, as traversed by CourseGrade.
+        """
+        accessible = numpy.zeros(len(matrix.subsection_keys), dtype=bool)
+        for chapter_key in course_structure.get_children(self.course.location):
+            for subsection_key in course_structure.get_children(chapter_key):
+                column = matrix.subsection_columns.get(subsection_key)
+                if column is not None:
+                    accessible[column] = True
+        return accessible
+
+    def _load_persisted_grades(self, matrix, accessible):
+        """
+        Loads the graded totals of the persisted subsection grades of all
+        students in the given matrix, marking the accessible subsections
+        with a positive possible score as included in the grades.
+
+        Returns a boolean array of whether each subsection grade of each
+        student is persisted.
+        """
+        rows = {student.id: index for index, student in enumerate(matrix.students)}
+        persisted = numpy.zeros(matrix.included.shape, dtype=bool)
+        for user_id, usage_key, earned, possible, first_attempted in PersistentSubsectionGrade.bulk_read_graded_totals(
+                rows.keys(), self.course.id,
+        ):
+            column = matrix.subsection_columns.get(self._get_subsection_key(usage_key))
+            if column is None:
+                continue
+            index = rows[user_id]
+            matrix.earned[index, column] = earned
+            matrix.possible[index, column] = possible
+            matrix.attempted[index, column] = first_attempted is not None
+            persisted[index, column] = True
+        matrix.included = accessible & persisted & (matrix.possible > 0)
+        return persisted
+
+    def _get_subsection_key(self, serialized_usage_key):
+        """
+        Returns the full usage key for the given usage key serialized in a
+        persisted subsection grade, caching the result since the same
+        keys are read for all students.
+        """
+        if serialized_usage_key not in self._subsection_keys_by_serialized_key:
+            usage_key = UsageKey.from_string(serialized_usage_key)
+            if usage_key.run is None:  # pylint: disable=no-member
+                usage_key = usage_key.replace(course_key=self.course.id)
+            self._subsection_keys_by_serialized_key[serialized_usage_key] = usage_key
+        return self._subsection_keys_by_serialized_key[serialized_usage_key]
+
+    def _grade_columns(self, matrix):
+        """
+        Grades all students in the given matrix at once, using the graded
+        totals of their included subsections.
+        """
+        percents_by_format = {}
+        subsection_formats = [
+            self._collected_block_structure.get_xblock_field(subsection_key, 'format', '')
+            for subsection_key in matrix.subsection_keys
+        ]
+        for subsection_format in set(subsection_formats):
+            columns = [
+                column for column, column_format in enumerate(subsection_formats) if column_format == subsection_format
+            ]
+            included = matrix.included[:, columns]
+            possible = numpy.where(included, matrix.possible[:, columns], 1.0)
+            percents_by_format[subsection_format] = numpy.where(
+                included, matrix.earned[:, columns] / possible, numpy.nan,
+            )
+
+        grade_value = self.course.grader.grade_columns(percents_by_format, len(matrix))
+        for category, breakdown in grade_value.get('grade_breakdown', {}).iteritems():
+            matrix.grade_breakdown[category] = numpy.array(breakdown['percent'], dtype=float)
+
+        for index, raw_percent in enumerate(grade_value['percent']):
+            if matrix.errors[index] is not None:
+                continue
+            percent = CourseGrade._calc_percent({'percent': float(raw_percent)})  # pylint: disable=protected-access
+            matrix.percents[index] = percent
+            matrix.letter_grades[index] = CourseGrade._compute_letter_grade(  # pylint: disable=protected-access
+                self.course.grade_cutoffs, percent,
+            )
+
+    def _grade_individually(self, matrix, index):
+        """
+        Computes the grade of the student at the given index in the given
+        matrix using CourseGradeFactory, overriding any values computed
+        by _grade_columns.
+        """
+        try:
+            course_grade = CourseGradeFactory().create(
+                matrix.students[index],
+                self.course,
+                self._collected_block_structure,
+                transformed_block_structures=self._transformed_block_structures,
+            )
+            subsection_grades = [
+                subsection_grade
+                for subsection_grades in course_grade.graded_subsections_by_format.itervalues()
+                for subsection_grade in subsection_grades.itervalues()
+            ]
+            grade_breakdown = course_grade.grade_value['grade_breakdown']
+            percent, letter_grade = course_grade.percent, course_grade.letter_grade
+        except Exception as exc:  # pylint: disable=broad-except
+            self._log_exception(matrix, index, exc)
+            return
+
+        matrix.included[index] = False
+        for subsection_grade in subsection_grades:
+            column = matrix.subsection_columns.get(subsection_grade.location)
+            if column is None:
+                continue
+            matrix.earned[index, column] = subsection_grade.graded_total.earned
+            matrix.possible[index, column] = subsection_grade.graded_total.possible
+            matrix.attempted[index, column] = subsection_grade.graded_total.attempted
+            matrix.included[index, column] = True
+
+        for category in matrix.grade_breakdown:
+            matrix.grade_breakdown[category][index] = numpy.nan
+        for category, breakdown in grade_breakdown.iteritems():
+            matrix.set_grade_breakdown_percent(category, index, breakdown['percent'])
+
+        matrix.percents[index] = percent
+        matrix.letter_grades[index] = letter_grade
+
+    def _log_exception(self, matrix, index, exc):
+        """
+        Records the given exception as the error for the student at the
+        given index in the given matrix.
+        """
+        # Keep marching on even if this student couldn't be graded for
+        # some reason, but log it for future reference.
+        student = matrix.students[index]
+        log.exception(
+            'Cannot grade student %s (%s) in course %s because of exception: %s',
+            student.username,
+            student.id,
+            self.course.id,
+            exc.message
+        )
+        matrix.errors[index] = exc.message
@@ -26,7 +26,8 @@ from xmodule.modulestore.tests.utils import TEST_DATA_DIR
 from xmodule.modulestore.xml_importer import import_course_from_xml
 
 from ..models import PersistentSubsectionGrade
-from ..new.course_grade import CourseGradeFactory
+from ..new.course_grade import CourseGrade, CourseGradeFactory
+from ..new.course_grade_matrix import CourseGradeMatrixFactory
 from ..new.subsection_grade import SubsectionGrade, SubsectionGradeFactory
 from .utils import mock_get_score, mock_get_submissions_score
 
@@ -173,6 +174,66 @@ class TestCourseGradeFactory(GradeTestBase):
         self.assertEqual(course_grade.percent, 0.5)
 
 
+class TestCourseGradeMatrixFactory(GradeTestBase):
+    """
+    Test that CourseGradeMatrixes are calculated the same as CourseGrades
+    """
+    def setUp(self):
+        super(TestCourseGradeMatrixFactory, self).setUp()
+        grading_policy = {
+            "GRADER": [
+                {
+                    "type": "Homework",
+                    "min_count": 2,
+                    "drop_count": 1,
+                    "short_label": "HW",
+                    "weight": 0.75,
+                },
+            ],
+            "GRADE_CUTOFFS": {
+                "Pass": 0.5,
+            },
+        }
+        self.course.set_grading_policy(grading_policy)
+
+        # Persist the grades of students with different scores.
+        self.students = []
+        for earned in (0, 1, 2):
+            student = UserFactory()
+            CourseEnrollment.enroll(student, self.course.id)
+            with mock_get_score(earned, 2):
+                CourseGradeFactory().create(student, self.course, read_only=False)
+            self.students.append(student)
+
+        # A student without persisted grades is graded individually.
+        self.students.append(self.request.user)
+
+    def test_parity_with_course_grade(self):
+        matrix = CourseGradeMatrixFactory(self.course).create(self.students)
+        self.assertEqual(matrix.errors, [None] * len(self.students))
+
+        for index, student in enumerate(self.students):
+            course_grade = CourseGradeFactory().create(student, self.course)
+            grade_value = course_grade.grade_value
+            self.assertEqual(matrix[index].percent, CourseGrade._calc_percent(grade_value))
+            self.assertEqual(matrix[index].letter_grade, course_grade.letter_grade)
+            self.assertEqual(
+                matrix[index].grade_breakdown_percent('Homework'),
+                grade_value['grade_breakdown']['Homework']['percent'],
+            )
+            subsection_grade = course_grade.graded_subsections_by_format['Homework'].get(self.sequence.location)
+            self.assertEqual(
+                matrix[index].subsection_graded_total(self.sequence.location),
+                subsection_grade.graded_total if subsection_grade else None,
+            )
+
+    def test_iter(self):
+        results = list(CourseGradeMatrixFactory(self.course).iter(self.students))
+        self.assertEqual([result.student for result in results], self.students)
+        self.assertEqual([result.err_msg for result in results], [""] * len(self.students))
+        self.assertEqual([result.course_grade.percent for result in results], [0.0, 0.38, 0.75, 0.0])
+
+
 @ddt.ddt
 class TestSubsectionGradeFactory(ProblemSubmissionTestMixin, GradeTestBase):
     """
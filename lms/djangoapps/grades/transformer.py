@@ -40,6 +40,7 @@ class GradesTransformer(BlockStructureTransformer):
         max_score: (numeric)
     """
     VERSION = 4
+    SUPPORTS_INCREMENTAL_COLLECT = True
     FIELDS_TO_COLLECT = [u'due', u'format', u'graded', u'has_score', u'weight', u'course_version', u'subtree_edited_on']
 
     EXPLICIT_GRADED_FIELD_NAME = 'explicit_graded'
@@ -75,6 +76,12 @@ class GradesTransformer(BlockStructureTransformer):
         """
         pass
 
+    def transform_equivalence_key(self, usage_info, block_structure):
+        """
+        Returns a constant, since no transformations are performed.
+        """
+        return True
+
     @classmethod
     def _collect_explicit_graded(cls, block_structure):
         """
@@ -416,10 +416,12 @@ def list_problem_responses(course_key, problem_location):
     if problem_key.course_key != course_key:
         return []
 
+    # Load the students with their responses, rather than with a query for
+    # each student.
     smdat = StudentModule.objects.filter(
         course_id=course_key,
         module_state_key=problem_key
-    )
+    ).select_related('student')
     smdat = smdat.order_by('student')
 
     return [
@@ -11,7 +11,7 @@ from django.core.urlresolvers import reverse
 from django.db.models import Q
 
 from course_modes.models import CourseMode
-from courseware.tests.factories import InstructorFactory
+from courseware.tests.factories import InstructorFactory, StudentModuleFactory
 from instructor_analytics.basic import (
     StudentModule, sale_record_features, sale_order_record_features, enrolled_students_features,
     course_registration_features, coupon_codes_features, get_proctored_exam_results, list_may_enroll,
@@ -97,6 +97,30 @@ class TestAnalyticsBasic(ModuleStoreTestCase):
                         problem_responses
                     )
 
+    def test_list_problem_responses_in_one_query(self):
+        problem_key = self.course_key.make_usage_key('problem', 'problem')
+        states = [json.dumps({'attempts': 1}), '{}', None]
+        for user, state in reversed(zip(self.users, states)):
+            StudentModuleFactory.create(
+                student=user,
+                course_id=self.course_key,
+                module_state_key=problem_key,
+                state=state,
+            )
+
+        with self.assertNumQueries(1):
+            problem_responses = list_problem_responses(self.course_key, unicode(problem_key))
+
+        # Every response is listed as stored, in the order of the students.
+        self.assertEqual(
+            problem_responses,
+            [{'username': user.username, 'state': state} for user, state in zip(self.users, states)]
+        )
+
+    def test_list_problem_responses_other_course(self):
+        other_problem_key = self.store.make_course_key('robot', 'other', 'id').make_usage_key('problem', 'problem')
+        self.assertEqual(list_problem_responses(self.course_key, unicode(other_problem_key)), [])
+
     def test_enrolled_students_features_username(self):
         self.assertIn('username', AVAILABLE_FEATURES)
         userreports = enrolled_students_features(self.course_key, ['username'])
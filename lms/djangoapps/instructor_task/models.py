@@ -14,13 +14,16 @@ ASSUMPTIONS: modules have unique IDs, even across different module_types
 """
 from uuid import uuid4
 import csv
+import errno
 import json
 import hashlib
 import os.path
+import shutil
+from tempfile import SpooledTemporaryFile
 
 from django.conf import settings
 from django.contrib.auth.models import User
-from django.core.files.base import ContentFile
+from django.core.files.base import File
 from django.db import models, transaction
 
 from openedx.core.storage import get_storage
@@ -178,9 +181,7 @@ class InstructorTask(models.Model):
 class ReportStore(object):
     """
     Simple abstraction layer that can fetch and store CSV files for reports
-    download. Should probably refactor later to create a ReportFile object that
-    can simply be appended to for the sake of memory efficiency, rather than
-    passing in the whole dataset. Doing that for now just because it's simpler.
+    download.
     """
     @classmethod
     def from_config(cls, config_name):
@@ -226,6 +227,14 @@ class DjangoStorageReportStore(ReportStore):
     """
     ReportStore implementation that delegates to django's storage api.
     """
+    # Size (in bytes) of the csv data that store_rows keeps in memory
+    # before spooling it to a temporary file.
+    ROWS_BUFFER_MAX_SIZE = 5 * 1024 * 1024
+
+    # Directory (within a course's directory) that local storages write
+    # files to before moving them into place.
+    PARTIAL_DIR = '.partial'
+
     def __init__(self, storage_class=None, storage_kwargs=None):
         if storage_kwargs is None:
             storage_kwargs = {}
@@ -256,20 +265,109 @@ class DjangoStorageReportStore(ReportStore):
         Store the contents of `buff` in a directory determined by hashing
         `course_id`, and name the file `filename`. `buff` can be any file-like
         object, ready to be read from the beginning.
+
+        The stored file only becomes visible (e.g. in `links_for`) once it
+        has been completely written.
         """
         path = self.path_to(course_id, filename)
-        self.storage.save(path, buff)
+        try:
+            self.storage.path(path)
+        except NotImplementedError:
+            # Remote storages (such as S3) only make a file visible once
+            # its upload has completed.
+            self.storage.save(path, buff)
+            return
+
+        # Local storages write the file in place, so write it to a
+        # separate directory first and then atomically move it into the
+        # course directory.
+        partial_path = self.storage.save(self.path_to(course_id, os.path.join(self.PARTIAL_DIR, filename)), buff)
+        full_path = self.storage.path(self.storage.get_available_name(path))
+        try:
+            os.makedirs(os.path.dirname(full_path))
+        except OSError as error:
+            if error.errno != errno.EEXIST:
+                raise
+        os.rename(self.storage.path(partial_path), full_path)
 
     def store_rows(self, course_id, filename, rows):
         """
         Given a course_id, filename, and rows (each row is an iterable of
         strings), write the rows to the storage backend in csv format.
+
+        `rows` can be any iterable, including a generator, and is consumed
+        only once. The csv data is kept in memory up to
+        ROWS_BUFFER_MAX_SIZE bytes, after which it is spooled to a
+        temporary file, so the memory used does not depend on the size of
+        the report.
+        """
+        with SpooledTemporaryFile(max_size=self.ROWS_BUFFER_MAX_SIZE) as output_buffer:
+            csvwriter = csv.writer(output_buffer)
+            csvwriter.writerows(self._get_utf8_encoded_rows(rows))
+            output_buffer.seek(0)
+            self.store(course_id, filename, File(output_buffer, name=filename))
+
+    def merge_parts(self, course_id, filename, parts_dir, header_rows=()):
+        """
+        Given a course_id, filename, and the directory of a set of csv part
+        files (stored with `store_rows`), store a single csv file made of
+        the given `header_rows` followed by the contents of the part files,
+        in the order of their names. The part files are deleted once the
+        merged file has been stored.
+
+        Returns the number of part files that were merged. Nothing is
+        stored if there are no part files.
+        """
+        parts_path = self.path_to(course_id, parts_dir)
+        try:
+            _, part_filenames = self.storage.listdir(parts_path)
+        except OSError:
+            # Django's FileSystemStorage fails with an OSError if the
+            # directory does not exist; other storage types return an
+            # empty list.
+            return 0
+        if not part_filenames:
+            return 0
+
+        part_paths = [os.path.join(parts_path, part_filename) for part_filename in sorted(part_filenames)]
+        with SpooledTemporaryFile(max_size=self.ROWS_BUFFER_MAX_SIZE) as output_buffer:
+            csvwriter = csv.writer(output_buffer)
+            csvwriter.writerows(self._get_utf8_encoded_rows(header_rows))
+            for part_path in part_paths:
+                with self.storage.open(part_path) as part_file:
+                    shutil.copyfileobj(part_file, output_buffer)
+            output_buffer.seek(0)
+            self.store(course_id, filename, File(output_buffer, name=filename))
+
+        for part_path in part_paths:
+            self.storage.delete(part_path)
+        return len(part_paths)
+
+    def delete_dir(self, course_id, dirname):
+        """
+        Delete the directory `dirname` of the course's directory, and
+        everything in it.
+        """
+        path = self.path_to(course_id, dirname)
+        try:
+            full_path = self.storage.path(path)
+        except NotImplementedError:
+            # Remote storages (such as S3) have no directories, only files
+            # named by their paths.
+            self._delete_files(path)
+        else:
+            shutil.rmtree(full_path, ignore_errors=True)
+
+    def _delete_files(self, path):
+        """
+        Delete the files in the directory `path` of the storage, and in its
+        subdirectories.
         """
-        output_buffer = ContentFile('')
-        csvwriter = csv.writer(output_buffer)
-        csvwriter.writerows(self._get_utf8_encoded_rows(rows))
-        output_buffer.seek(0)
-        self.store(course_id, filename, output_buffer)
+        dirnames, filenames = self.storage.listdir(path)
+        for filename in filenames:
+            self.storage.delete(os.path.join(path, filename))
+        for dirname in dirnames:
+            self._delete_files(os.path.join(path, dirname))
 
     def links_for(self, course_id):
         """
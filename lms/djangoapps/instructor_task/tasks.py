@@ -36,6 +36,7 @@ from lms.djangoapps.instructor_task.tasks_helper import (
     delete_problem_module_state,
     upload_problem_responses_csv,
     upload_grades_csv,
+    upload_grades_csv_shard,
     upload_problem_grade_report,
     upload_students_csv,
     cohort_students_and_upload,
@@ -172,10 +173,23 @@ def calculate_grades_csv(entry_id, xmodule_instance_args):
         xmodule_instance_args.get('task_id'), entry_id, action_name
     )
 
-    task_fn = partial(upload_grades_csv, xmodule_instance_args)
+    task_fn = partial(upload_grades_csv, xmodule_instance_args, shard_task=calculate_grades_csv_shard)
     return run_main_task(entry_id, task_fn, action_name)
 
 
+@task(routing_key=settings.GRADES_DOWNLOAD_ROUTING_KEY)  # pylint: disable=not-callable
+def calculate_grades_csv_shard(entry_id, student_list, shard_index, start_time, subtask_status_dict):
+    """
+    Grade a shard of the students of a course, for a grade report that is
+    split across multiple subtasks by calculate_grades_csv.  Once all of the
+    shards have completed, their results are merged into the grade report.
+
+    Progress is recorded in the InstructorTask through `subtask_status_dict`,
+    as for other subtasks (see `lms.djangoapps.instructor_task.subtasks`).
+    """
+    return upload_grades_csv_shard(entry_id, student_list, shard_index, start_time, subtask_status_dict)
+
+
 @task(base=BaseInstructorTask, routing_key=settings.GRADES_DOWNLOAD_ROUTING_KEY)  # pylint: disable=not-callable
 def calculate_problem_grade_report(entry_id, xmodule_instance_args):
     """
@@ -5,10 +5,11 @@ running state of a course.
 """
 import json
 import logging
+import os.path
 from StringIO import StringIO
 from collections import OrderedDict
 from datetime import datetime
-from itertools import chain
+from itertools import chain, count, islice
 from time import time
 
 import dogstats_wrapper as dog_stats_api
@@ -18,6 +19,7 @@ from celery import Task, current_task
 from celery.states import SUCCESS, FAILURE
 from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.core.files.storage import DefaultStorage
 from django.db import reset_queries
 from django.db.models import Q
@@ -42,8 +44,10 @@ from certificates.models import (
 from courseware.courses import get_course_by_id, get_problems_in_section
 from lms.djangoapps.grades.context import grading_context_for_course
 from lms.djangoapps.grades.new.course_grade import CourseGradeFactory
+from lms.djangoapps.grades.new.course_grade_matrix import CourseGradeMatrixFactory
 from courseware.model_data import DjangoKeyValueStore, FieldDataCache
-from courseware.models import StudentModule
+from courseware.user_state_client import DjangoXBlockUserStateClient
+from courseware.models import StudentModule, keyset_pages
 from courseware.module_render import get_module_for_descriptor_internal
 from edxmako.shortcuts import render_to_string
 from instructor_analytics.basic import (
@@ -59,6 +63,14 @@ from shoppingcart.models import (
 )
 from openassessment.data import OraAggregateData
 from lms.djangoapps.instructor_task.models import ReportStore, InstructorTask, PROGRESS
+from lms.djangoapps.instructor_task.subtasks import (
+    SUBTASK_LOCK_EXPIRE,
+    SubtaskStatus,
+    check_subtask_is_valid,
+    queue_subtasks_for_query,
+    track_memory_usage,
+    update_subtask_status,
+)
 from lms.djangoapps.lms_xblock.runtime import LmsPartitionService
 from openedx.core.djangoapps.course_groups.cohorts import get_cohort
 from openedx.core.djangoapps.course_groups.models import CourseUserGroup
@@ -89,6 +101,10 @@ GRADES_RESCORE_EVENT_TYPE = 'edx.grades.problem.rescored'
 # The setting name used for events when "settings" (account settings, preferences, profile information) change.
 REPORT_REQUESTED_EVENT_NAME = u'edx.instructor.report.requested'
 
+# Report store directory (within a course's directory) of the CSV parts
+# written by the shards of grade reports, before they are merged.
+GRADES_CSV_PARTS_DIR = '.parts'
+
 
 class BaseInstructorTask(Task):
     """
@@ -382,6 +398,11 @@ def perform_module_state_update(update_fcn, filter_fcn, _entry_id, course_id, ta
     task_progress = TaskProgress(action_name, modules_to_update.count(), start_time)
     task_progress.update_task_state()
 
+    # Load the modules (with their students) in pages, rather than all at once
+    # or with a query per student.
+    modules_to_update = chain.from_iterable(
+        keyset_pages(modules_to_update.select_related('student'), DjangoXBlockUserStateClient.BULK_READ_BATCH_SIZE)
+    )
     for module_to_update in modules_to_update:
         task_progress.attempted += 1
         module_descriptor = problems[unicode(module_to_update.module_state_key)]
@@ -439,7 +460,8 @@ def _get_module_instance_for_task(course_id, student, module_descriptor, xmodule
     the need for a Request object when instantiating an xmodule instance.
     """
     # reconstitute the problem's corresponding XModule:
-    field_data_cache = FieldDataCache.cache_for_descriptor_descendents(course_id, student, module_descriptor)
+    field_data_cache = FieldDataCache([], course_id, student)
+    field_data_cache.add_descriptor_descendents(module_descriptor)
     student_data = KvsFieldData(DjangoKeyValueStore(field_data_cache))
 
     # get request-related tracking information from args passthrough, and supplement with task-specific
@@ -638,6 +660,18 @@ def delete_problem_module_state(xmodule_instance_args, _module_descriptor, stude
     return UPDATE_STATUS_SUCCEEDED
 
 
+def _report_csv_filename(csv_name, course_id, timestamp):
+    """
+    Returns the name of the CSV report with the given `csv_name`, for the
+    given course and time.
+    """
+    return u"{course_prefix}_{csv_name}_{timestamp_str}.csv".format(
+        course_prefix=course_filename_prefix_generator(course_id),
+        csv_name=csv_name,
+        timestamp_str=timestamp.strftime("%Y-%m-%d-%H%M")
+    )
+
+
 def upload_csv_to_report_store(rows, csv_name, course_id, timestamp, config_name='GRADES_DOWNLOAD'):
     """
     Upload data as a CSV using ReportStore.
@@ -649,22 +683,36 @@ def upload_csv_to_report_store(rows, csv_name, course_id, timestamp, config_name
                 [row1_colum1, row1_colum2, ...],
                 ...
             ]
+            Any iterable of rows, such as a generator, may be given; it is
+            consumed only once while writing the CSV.
         csv_name: Name of the resulting CSV
         course_id: ID of the course
     """
     report_store = ReportStore.from_config(config_name)
-    report_store.store_rows(
-        course_id,
-        u"{course_prefix}_{csv_name}_{timestamp_str}.csv".format(
-            course_prefix=course_filename_prefix_generator(course_id),
-            csv_name=csv_name,
-            timestamp_str=timestamp.strftime("%Y-%m-%d-%H%M")
-        ),
-        rows
-    )
+    report_store.store_rows(course_id, _report_csv_filename(csv_name, course_id, timestamp), rows)
     tracker.emit(REPORT_REQUESTED_EVENT_NAME, {"report_type": csv_name, })
 
 
+def merge_csv_parts_in_report_store(header_rows, parts_dir, csv_name, course_id, timestamp,
+                                    config_name='GRADES_DOWNLOAD'):
+    """
+    Upload the CSV parts that were stored in the `parts_dir` directory of
+    the ReportStore as a single CSV, in the order of their names, and delete
+    the parts.  Nothing is uploaded if there are no parts.
+
+    Arguments:
+        header_rows: rows to write before the contents of the parts
+        parts_dir: directory of the parts in the ReportStore
+        csv_name: Name of the resulting CSV
+        course_id: ID of the course
+    """
+    report_store = ReportStore.from_config(config_name)
+    if report_store.merge_parts(
+        course_id, _report_csv_filename(csv_name, course_id, timestamp), parts_dir, header_rows
+    ):
+        tracker.emit(REPORT_REQUESTED_EVENT_NAME, {"report_type": csv_name, })
+
+
 def upload_exec_summary_to_store(data_dict, report_name, course_id, generated_at, config_name='FINANCIAL_REPORTS'):
     """
     Upload Executive Summary Html file using ReportStore.
@@ -691,14 +739,21 @@ def upload_exec_summary_to_store(data_dict, report_name, course_id, generated_at
     tracker.emit(REPORT_REQUESTED_EVENT_NAME, {"report_type": report_name})
 
 
-def upload_grades_csv(_xmodule_instance_args, _entry_id, course_id, _task_input, action_name):  # pylint: disable=too-many-statements
+def upload_grades_csv(_xmodule_instance_args, _entry_id, course_id, _task_input, action_name, shard_task=None):
     """
     For a given `course_id`, generate a grades CSV file for all students that
     are enrolled, and store using a `ReportStore`. Once created, the files can
     be accessed by instantiating another `ReportStore` (via
-    `ReportStore.from_config()`) and calling `link_for()` on it. Writes are
-    buffered, so we'll never write part of a CSV file to S3 -- i.e. any files
-    that are visible in ReportStore will be complete ones.
+    `ReportStore.from_config()`) and calling `link_for()` on it. Rows are
+    streamed to the `ReportStore` as students are graded, which only makes
+    the file visible once it is complete -- i.e. any files that are visible
+    in ReportStore will be complete ones.
+
+    If `shard_task` is given and there are more enrolled students than
+    settings.GRADES_DOWNLOAD_STUDENTS_PER_TASK, the students are instead
+    split into shards that are each graded by a `shard_task` subtask (see
+    `upload_grades_csv_shard`), and the report is stored once the last of
+    them has completed.
 
     As we start to add more CSV downloads, it will probably be worthwhile to
     make a more general CSVDoc class instead of building out the rows like we
@@ -720,25 +775,26 @@ def upload_grades_csv(_xmodule_instance_args, _entry_id, course_id, _task_input,
     )
     TASK_LOG.info(u'%s, Task type: %s, Starting task execution', task_info_string, action_name)
 
-    course = get_course_by_id(course_id)
-    course_is_cohorted = is_course_cohorted(course.id)
-    teams_enabled = course.teams_enabled
-    cohorts_header = ['Cohort Name'] if course_is_cohorted else []
-    teams_header = ['Team Name'] if teams_enabled else []
-
-    experiment_partitions = get_split_user_partitions(course.user_partitions)
-    group_configs_header = [u'Experiment Group ({})'.format(partition.name) for partition in experiment_partitions]
+    students_per_task = settings.GRADES_DOWNLOAD_STUDENTS_PER_TASK
+    if shard_task is not None and students_per_task and total_enrolled_students > students_per_task:
+        TASK_LOG.info(
+            u'%s, Task type: %s, Splitting grade calculation for total students: %s into shards of %s',
+            task_info_string,
+            action_name,
+            total_enrolled_students,
+            students_per_task,
+        )
+        return _queue_grades_csv_shards(
+            _entry_id, action_name, shard_task, enrolled_students, total_enrolled_students, start_time
+        )
 
-    certificate_info_header = ['Certificate Eligible', 'Certificate Delivered', 'Certificate Type']
-    certificate_whitelist = CertificateWhitelist.objects.filter(course_id=course_id, whitelist=True)
-    whitelisted_user_ids = [entry.user_id for entry in certificate_whitelist]
+    course = get_course_by_id(course_id)
 
-    # Loop over all our students and build our CSV lists in memory
-    rows = []
+    # Error rows are only expected for a handful of students, so they are
+    # kept in memory while the grade rows are streamed to the report store.
     err_rows = [["id", "username", "error_msg"]]
     current_step = {'step': 'Calculating Grades'}
 
-    student_counter = 0
     TASK_LOG.info(
         u'%s, Task type: %s, Current step: %s, Starting grade calculation for total students: %s',
         task_info_string,
@@ -747,6 +803,55 @@ def upload_grades_csv(_xmodule_instance_args, _entry_id, course_id, _task_input,
         total_enrolled_students,
     )
 
+    header, grade_rows = _grade_report_rows(course)
+    rows = grade_rows(enrolled_students, task_progress, err_rows, task_info_string, current_step, status_interval)
+
+    # Perform the actual upload, writing out each row as soon as it is computed.
+    with track_memory_usage('instructor_task.grade_report.memory', course_id):
+        upload_csv_to_report_store(chain([header], rows), 'grade_report', course_id, start_date)
+
+    TASK_LOG.info(
+        u'%s, Task type: %s, Current step: %s, Grade calculation completed for students: %s/%s',
+        task_info_string,
+        action_name,
+        current_step,
+        task_progress.attempted,
+        total_enrolled_students
+    )
+
+    # By this point, we've uploaded all the grade rows.
+    current_step = {'step': 'Uploading CSVs'}
+    task_progress.update_task_state(extra_meta=current_step)
+    TASK_LOG.info(u'%s, Task type: %s, Current step: %s', task_info_string, action_name, current_step)
+
+    # If there are any error rows (don't count the header), write them out as well
+    if len(err_rows) > 1:
+        upload_csv_to_report_store(err_rows, 'grade_report_err', course_id, start_date)
+
+    # One last update before we close out...
+    TASK_LOG.info(u'%s, Task type: %s, Finalizing grade task', task_info_string, action_name)
+    return task_progress.update_task_state(extra_meta=current_step)
+
+
+def _grade_report_rows(course):
+    """
+    Returns the header row of the grade report for the given course, and a
+    generator function that yields the grade report rows of students (see
+    its docstring).
+    """
+    course_id = course.id
+    course_is_cohorted = is_course_cohorted(course.id)
+    teams_enabled = course.teams_enabled
+    cohorts_header = ['Cohort Name'] if course_is_cohorted else []
+    teams_header = ['Team Name'] if teams_enabled else []
+
+    experiment_partitions = get_split_user_partitions(course.user_partitions)
+    group_configs_header = [u'Experiment Group ({})'.format(partition.name) for partition in experiment_partitions]
+
+    certificate_info_header = ['Certificate Eligible', 'Certificate Delivered', 'Certificate Type']
+    certificate_whitelist = CertificateWhitelist.objects.filter(course_id=course_id, whitelist=True)
+    whitelisted_user_ids = [entry.user_id for entry in certificate_whitelist]
+
     graded_assignments = _graded_assignments(course_id)
     grade_header = []
     for assignment_info in graded_assignments.itervalues():
@@ -754,7 +859,7 @@ def upload_grades_csv(_xmodule_instance_args, _entry_id, course_id, _task_input,
             grade_header.extend(assignment_info['subsection_headers'].itervalues())
         grade_header.append(assignment_info['average_header'])
 
-    rows.append(
+    header = (
         ["Student ID", "Email", "Username", "Grade"] +
         grade_header +
         cohorts_header +
@@ -764,114 +869,267 @@ def upload_grades_csv(_xmodule_instance_args, _entry_id, course_id, _task_input,
         certificate_info_header
     )
 
-    for student, course_grade, err_msg in CourseGradeFactory().iter(course, enrolled_students):
-        # Periodically update task status (this is a cache write)
-        if task_progress.attempted % status_interval == 0:
-            task_progress.update_task_state(extra_meta=current_step)
-        task_progress.attempted += 1
-
-        # Now add a log entry after each student is graded to get a sense
-        # of the task's progress
-        student_counter += 1
-        TASK_LOG.info(
-            u'%s, Task type: %s, Current step: %s, Grade calculation in-progress for students: %s/%s',
-            task_info_string,
-            action_name,
-            current_step,
-            student_counter,
-            total_enrolled_students
-        )
-
-        if not course_grade:
-            # An empty gradeset means we failed to grade a student.
-            task_progress.failed += 1
-            err_rows.append([student.id, student.username, err_msg])
-            continue
+    def grade_rows(students, task_progress, err_rows, task_info_string, current_step, status_interval=None):
+        """
+        Yields a row for each of the given students that is successfully
+        graded, so that the rows can be written out as they are computed
+        instead of being built up in memory.  Students that fail to be
+        graded are instead appended to `err_rows`.
+
+        The counts of `task_progress` are updated as students are graded,
+        and the task state is updated every `status_interval` students, if
+        given.
+        """
+        for student, course_grade, err_msg in CourseGradeMatrixFactory(course).iter(students):
+            # Periodically update task status (this is a cache write)
+            if status_interval and task_progress.attempted % status_interval == 0:
+                task_progress.update_task_state(extra_meta=current_step)
+            task_progress.attempted += 1
 
-        # We were able to successfully grade this student for this course.
-        task_progress.succeeded += 1
+            # Now add a log entry after each student is graded to get a sense
+            # of the task's progress
+            TASK_LOG.info(
+                u'%s, Task type: %s, Current step: %s, Grade calculation in-progress for students: %s/%s',
+                task_info_string,
+                task_progress.action_name,
+                current_step,
+                task_progress.attempted,
+                task_progress.total
+            )
 
-        cohorts_group_name = []
-        if course_is_cohorted:
-            group = get_cohort(student, course_id, assign=False)
-            cohorts_group_name.append(group.name if group else '')
+            if not course_grade:
+                # An empty gradeset means we failed to grade a student.
+                task_progress.failed += 1
+                err_rows.append([student.id, student.username, err_msg])
+                continue
 
-        group_configs_group_names = []
-        for partition in experiment_partitions:
-            group = LmsPartitionService(student, course_id).get_group(partition, assign=False)
-            group_configs_group_names.append(group.name if group else '')
+            # We were able to successfully grade this student for this course.
+            task_progress.succeeded += 1
 
-        team_name = []
-        if teams_enabled:
-            try:
-                membership = CourseTeamMembership.objects.get(user=student, team__course_id=course_id)
-                team_name.append(membership.team.name)
-            except CourseTeamMembership.DoesNotExist:
-                team_name.append('')
+            cohorts_group_name = []
+            if course_is_cohorted:
+                group = get_cohort(student, course_id, assign=False)
+                cohorts_group_name.append(group.name if group else '')
 
-        enrollment_mode = CourseEnrollment.enrollment_mode_for_user(student, course_id)[0]
-        verification_status = SoftwareSecurePhotoVerification.verification_status_for_user(
-            student,
-            course_id,
-            enrollment_mode
-        )
-        certificate_info = certificate_info_for_user(
-            student,
-            course_id,
-            course_grade.letter_grade,
-            student.id in whitelisted_user_ids
-        )
+            group_configs_group_names = []
+            for partition in experiment_partitions:
+                group = LmsPartitionService(student, course_id).get_group(partition, assign=False)
+                group_configs_group_names.append(group.name if group else '')
 
-        grade_results = []
-        for assignment_type, assignment_info in graded_assignments.iteritems():
-            for subsection_location in assignment_info['subsection_headers']:
+            team_name = []
+            if teams_enabled:
                 try:
-                    subsection_grade = course_grade.graded_subsections_by_format[assignment_type][subsection_location]
-                except KeyError:
-                    grade_results.append([u'Not Available'])
-                else:
-                    if subsection_grade.graded_total.attempted:
-                        grade_results.append(
-                            [subsection_grade.graded_total.earned / subsection_grade.graded_total.possible]
-                        )
+                    membership = CourseTeamMembership.objects.get(user=student, team__course_id=course_id)
+                    team_name.append(membership.team.name)
+                except CourseTeamMembership.DoesNotExist:
+                    team_name.append('')
+
+            enrollment_mode = CourseEnrollment.enrollment_mode_for_user(student, course_id)[0]
+            verification_status = SoftwareSecurePhotoVerification.verification_status_for_user(
+                student,
+                course_id,
+                enrollment_mode
+            )
+            certificate_info = certificate_info_for_user(
+                student,
+                course_id,
+                course_grade.letter_grade,
+                student.id in whitelisted_user_ids
+            )
+
+            grade_results = []
+            for assignment_type, assignment_info in graded_assignments.iteritems():
+                for subsection_location in assignment_info['subsection_headers']:
+                    graded_total = course_grade.subsection_graded_total(subsection_location)
+                    if graded_total is None:
+                        grade_results.append([u'Not Available'])
+                    elif graded_total.attempted:
+                        grade_results.append([graded_total.earned / graded_total.possible])
                     else:
                         grade_results.append([u'Not Attempted'])
-            if assignment_info['use_subsection_headers']:
-                assignment_average = course_grade.grade_value['grade_breakdown'].get(assignment_type, {}).get('percent')
-                grade_results.append([assignment_average])
+                if assignment_info['use_subsection_headers']:
+                    assignment_average = course_grade.grade_breakdown_percent(assignment_type)
+                    grade_results.append([assignment_average])
+
+            grade_results = list(chain.from_iterable(grade_results))
+
+            yield (
+                [student.id, student.email, student.username, course_grade.percent] +
+                grade_results + cohorts_group_name + group_configs_group_names + team_name +
+                [enrollment_mode] + [verification_status] + certificate_info
+            )
+
+    return header, grade_rows
+
+
+def _grades_csv_parts_dir(entry, part_type):
+    """
+    Returns the report store directory of the CSV parts of the given type
+    ('grades' or 'errors') written by the shards of the given grade report
+    InstructorTask entry.
+    """
+    return os.path.join(GRADES_CSV_PARTS_DIR, entry.task_id, part_type)
 
-        grade_results = list(chain.from_iterable(grade_results))
 
-        rows.append(
-            [student.id, student.email, student.username, course_grade.percent] +
-            grade_results + cohorts_group_name + group_configs_group_names + team_name +
-            [enrollment_mode] + [verification_status] + certificate_info
+def _queue_grades_csv_shards(entry_id, action_name, shard_task, enrolled_students, total_enrolled_students, start_time):
+    """
+    Splits the given enrolled students into shards of at most
+    settings.GRADES_DOWNLOAD_STUDENTS_PER_TASK students, ordered by id, and
+    queues a `shard_task` subtask to grade each of them.
+
+    `shard_task` is called with the InstructorTask's entry_id, the list of
+    students of the shard, the index of the shard, the start time of the
+    report and the initial status of the subtask.
+
+    Returns the task progress as stored in the InstructorTask object.
+    """
+    entry = InstructorTask.objects.get(pk=entry_id)
+    shard_indexes = count()
+
+    def _create_grades_csv_shard_subtask(student_list, initial_subtask_status):
+        """Creates a subtask to grade the given list of students."""
+        return shard_task.subtask(
+            (
+                entry_id,
+                student_list,
+                next(shard_indexes),
+                start_time,
+                initial_subtask_status.to_dict(),
+            ),
+            task_id=initial_subtask_status.task_id,
+            routing_key=settings.GRADES_DOWNLOAD_ROUTING_KEY,
         )
 
-    TASK_LOG.info(
-        u'%s, Task type: %s, Current step: %s, Grade calculation completed for students: %s/%s',
-        task_info_string,
+    return queue_subtasks_for_query(
+        entry,
         action_name,
-        current_step,
-        student_counter,
-        total_enrolled_students
+        _create_grades_csv_shard_subtask,
+        [enrolled_students.order_by('id')],
+        [],
+        settings.GRADES_DOWNLOAD_STUDENTS_PER_TASK,
+        total_enrolled_students,
     )
 
-    # By this point, we've got the rows we're going to stuff into our CSV files.
-    current_step = {'step': 'Uploading CSVs'}
-    task_progress.update_task_state(extra_meta=current_step)
-    TASK_LOG.info(u'%s, Task type: %s, Current step: %s', task_info_string, action_name, current_step)
 
-    # Perform the actual upload
-    upload_csv_to_report_store(rows, 'grade_report', course_id, start_date)
+def upload_grades_csv_shard(entry_id, student_list, shard_index, start_time, subtask_status_dict):
+    """
+    Grades a shard of the students of a course for a grade report that was
+    split by `upload_grades_csv`, and stores the resulting rows as CSV parts
+    in the report store, named after `shard_index` so that the shards are
+    merged in a stable order.
 
-    # If there are any error rows (don't count the header), write them out as well
-    if len(err_rows) > 1:
-        upload_csv_to_report_store(err_rows, 'grade_report_err', course_id, start_date)
+    The status of the subtask is recorded in the InstructorTask, and once
+    all shards have completed, their parts are merged into the grade report
+    (and the error report, if any student failed to be graded).
 
-    # One last update before we close out...
-    TASK_LOG.info(u'%s, Task type: %s, Finalizing grade task', task_info_string, action_name)
-    return task_progress.update_task_state(extra_meta=current_step)
+    Returns the status of the subtask, as a dict.
+    """
+    subtask_status = SubtaskStatus.from_dict(subtask_status_dict)
+    current_task_id = subtask_status.task_id
+    entry = InstructorTask.objects.get(pk=entry_id)
+    course_id = entry.course_id
+    task_info_string = u'Task: {task_id}, InstructorTask ID: {entry_id}, Course: {course_id}, Shard: {shard}'.format(
+        task_id=current_task_id,
+        entry_id=entry_id,
+        course_id=course_id,
+        shard=shard_index,
+    )
+    TASK_LOG.info(u'%s, Grading shard of %s students', task_info_string, len(student_list))
+
+    # Confirm that this shard is known to the InstructorTask, and has not
+    # already been completed or started by another worker.
+    check_subtask_is_valid(entry_id, current_task_id, subtask_status)
+
+    task_progress = TaskProgress(json.loads(entry.task_output)['action_name'], len(student_list), start_time)
+    try:
+        course = get_course_by_id(course_id)
+        students = User.objects.filter(id__in=[item['pk'] for item in student_list]).order_by('id')
+        err_rows = []
+        _, grade_rows = _grade_report_rows(course)
+        rows = grade_rows(students, task_progress, err_rows, task_info_string, {'step': 'Calculating Grades'})
+
+        report_store = ReportStore.from_config(config_name='GRADES_DOWNLOAD')
+        part_filename = u'{:05d}.csv'.format(shard_index)
+        with track_memory_usage('instructor_task.grade_report_shard.memory', course_id):
+            report_store.store_rows(
+                course_id, os.path.join(_grades_csv_parts_dir(entry, 'grades'), part_filename), rows
+            )
+        if err_rows:
+            report_store.store_rows(
+                course_id, os.path.join(_grades_csv_parts_dir(entry, 'errors'), part_filename), err_rows
+            )
+    except Exception:
+        # Unexpected exception. Count all the students of the shard as
+        # having failed, and record that before failing.
+        TASK_LOG.exception(u'%s, Grading shard failed unexpectedly', task_info_string)
+        subtask_status.increment(failed=len(student_list), state=FAILURE)
+        update_subtask_status(entry_id, current_task_id, subtask_status, complete_parent=False)
+        _merge_grades_csv_shards(entry_id, start_time)
+        raise
+
+    subtask_status.increment(
+        succeeded=task_progress.succeeded,
+        failed=task_progress.failed,
+        skipped=len(student_list) - task_progress.attempted,
+        state=SUCCESS,
+    )
+    update_subtask_status(entry_id, current_task_id, subtask_status, complete_parent=False)
+    TASK_LOG.info(u'%s, Grading shard succeeded with status %s', task_info_string, subtask_status)
+    _merge_grades_csv_shards(entry_id, start_time)
+    return subtask_status.to_dict()
+
+
+def _merge_grades_csv_shards(entry_id, start_time):
+    """
+    Merges the CSV parts of all the shards of the given grade report
+    InstructorTask into the grade report (and error report), if all of its
+    shards have completed.  Only the first caller to find all shards
+    completed performs the merge, deletes the parts and then marks the
+    InstructorTask as having succeeded.
+    """
+    entry = InstructorTask.objects.get(pk=entry_id)
+    subtask_dict = json.loads(entry.subtasks)
+    if subtask_dict['succeeded'] + subtask_dict['failed'] < subtask_dict['total']:
+        return
+    lock_key = u'grade-report-merge-{}'.format(entry.task_id)
+    if not cache.add(lock_key, 'true', SUBTASK_LOCK_EXPIRE):
+        return
+
+    if subtask_dict['failed']:
+        TASK_LOG.warning(
+            u'InstructorTask ID: %s, Course: %s, Merging grade report although %s of %s shards failed',
+            entry_id,
+            entry.course_id,
+            subtask_dict['failed'],
+            subtask_dict['total'],
+        )
+
+    try:
+        header, _ = _grade_report_rows(get_course_by_id(entry.course_id))
+        start_date = datetime.fromtimestamp(start_time, UTC)
+        merge_csv_parts_in_report_store(
+            [header], _grades_csv_parts_dir(entry, 'grades'), 'grade_report', entry.course_id, start_date
+        )
+        merge_csv_parts_in_report_store(
+            [["id", "username", "error_msg"]], _grades_csv_parts_dir(entry, 'errors'), 'grade_report_err',
+            entry.course_id, start_date
+        )
+        ReportStore.from_config(config_name='GRADES_DOWNLOAD').delete_dir(
+            entry.course_id, os.path.join(GRADES_CSV_PARTS_DIR, entry.task_id)
+        )
+    except Exception:
+        # Release the lock, so that the merge can be retried rather than
+        # leaving the report unmerged until the lock expires.
+        TASK_LOG.exception(
+            u'InstructorTask ID: %s, Course: %s, Merging grade report shards failed', entry_id, entry.course_id
+        )
+        cache.delete(lock_key)
+        raise
+    TASK_LOG.info(u'InstructorTask ID: %s, Course: %s, Merged grade report shards', entry_id, entry.course_id)
+
+    # The report is only complete now that it has been merged.
+    entry.task_state = SUCCESS
+    entry.save_now()
 
 
 def _graded_assignments(course_key):
@@ -983,45 +1241,58 @@ def upload_problem_grade_report(_xmodule_instance_args, _entry_id, course_id, _t
 
     graded_scorable_blocks = _graded_scorable_blocks_to_header(course_id)
 
-    # Just generate the static fields for now.
-    rows = [list(header_row.values()) + ['Grade'] + list(chain.from_iterable(graded_scorable_blocks.values()))]
+    # Error rows are only expected for a handful of students, so they are
+    # kept in memory while the grade rows are streamed to the report store.
     error_rows = [list(header_row.values()) + ['error_msg']]
     current_step = {'step': 'Calculating Grades'}
 
     course = get_course_by_id(course_id)
-    for student, course_grade, err_msg in CourseGradeFactory().iter(course, enrolled_students):
-        student_fields = [getattr(student, field_name) for field_name in header_row]
-        task_progress.attempted += 1
 
-        if not course_grade:
-            # There was an error grading this student.
-            if not err_msg:
-                err_msg = u'Unknown error'
-            error_rows.append(student_fields + [err_msg])
-            task_progress.failed += 1
-            continue
+    def problem_grade_rows():
+        """
+        Yields the header row followed by a row for each student that is
+        successfully graded.
+        """
+        # Just generate the static fields for now.
+        yield list(header_row.values()) + ['Grade'] + list(chain.from_iterable(graded_scorable_blocks.values()))
 
-        earned_possible_values = []
-        for block_location in graded_scorable_blocks:
-            try:
-                problem_score = course_grade.locations_to_scores[block_location]
-            except KeyError:
-                earned_possible_values.append([u'Not Available', u'Not Available'])
-            else:
-                if problem_score.attempted:
-                    earned_possible_values.append([problem_score.earned, problem_score.possible])
-                else:
-                    earned_possible_values.append([u'Not Attempted', problem_score.possible])
+        for student, course_grade, err_msg in CourseGradeFactory().iter(course, enrolled_students):
+            student_fields = [getattr(student, field_name) for field_name in header_row]
+            task_progress.attempted += 1
 
-        rows.append(student_fields + [course_grade.percent] + list(chain.from_iterable(earned_possible_values)))
+            if not course_grade:
+                # There was an error grading this student.
+                if not err_msg:
+                    err_msg = u'Unknown error'
+                error_rows.append(student_fields + [err_msg])
+                task_progress.failed += 1
+                continue
 
-        task_progress.succeeded += 1
-        if task_progress.attempted % status_interval == 0:
-            task_progress.update_task_state(extra_meta=current_step)
+            earned_possible_values = []
+            for block_location in graded_scorable_blocks:
+                try:
+                    problem_score = course_grade.locations_to_scores[block_location]
+                except KeyError:
+                    earned_possible_values.append([u'Not Available', u'Not Available'])
+                else:
+                    if problem_score.attempted:
+                        earned_possible_values.append([problem_score.earned, problem_score.possible])
+                    else:
+                        earned_possible_values.append([u'Not Attempted', problem_score.possible])
 
-    # Perform the upload if any students have been successfully graded
-    if len(rows) > 1:
-        upload_csv_to_report_store(rows, 'problem_grade_report', course_id, start_date)
+            yield student_fields + [course_grade.percent] + list(chain.from_iterable(earned_possible_values))
+
+            task_progress.succeeded += 1
+            if task_progress.attempted % status_interval == 0:
+                task_progress.update_task_state(extra_meta=current_step)
+
+    # Perform the upload if any students have been successfully graded, which
+    # is known as soon as the first row after the header has been computed.
+    with track_memory_usage('instructor_task.problem_grade_report.memory', course_id):
+        rows = problem_grade_rows()
+        first_rows = list(islice(rows, 2))
+        if len(first_rows) > 1:
+            upload_csv_to_report_store(chain(first_rows, rows), 'problem_grade_report', course_id, start_date)
     # If there are any error rows, write them out as well
     if len(error_rows) > 1:
         upload_csv_to_report_store(error_rows, 'problem_grade_report_err', course_id, start_date)
@@ -1083,13 +1354,9 @@ def upload_enrollment_report(_xmodule_instance_args, _entry_id, course_id, _task
     )
     TASK_LOG.info(u'%s, Task type: %s, Starting task execution', task_info_string, action_name)
 
-    # Loop over all our students and build our CSV lists in memory
-    rows = []
-    header = None
     current_step = {'step': 'Gathering Profile Information'}
     enrollment_report_provider = PaidCourseEnrollmentReportProvider()
     total_students = students_in_course.count()
-    student_counter = 0
     TASK_LOG.info(
         u'%s, Task type: %s, Current step: %s, generating detailed enrollment report for total students: %s',
         task_info_string,
@@ -1098,86 +1365,98 @@ def upload_enrollment_report(_xmodule_instance_args, _entry_id, course_id, _task
         total_students
     )
 
-    for student in students_in_course:
-        # Periodically update task status (this is a cache write)
-        if task_progress.attempted % status_interval == 0:
-            task_progress.update_task_state(extra_meta=current_step)
-        task_progress.attempted += 1
+    # display name map for the column headers
+    enrollment_report_headers = {
+        'User ID': _('User ID'),
+        'Username': _('Username'),
+        'Full Name': _('Full Name'),
+        'First Name': _('First Name'),
+        'Last Name': _('Last Name'),
+        'Company Name': _('Company Name'),
+        'Title': _('Title'),
+        'Language': _('Language'),
+        'Year of Birth': _('Year of Birth'),
+        'Gender': _('Gender'),
+        'Level of Education': _('Level of Education'),
+        'Mailing Address': _('Mailing Address'),
+        'Goals': _('Goals'),
+        'City': _('City'),
+        'Country': _('Country'),
+        'Enrollment Date': _('Enrollment Date'),
+        'Currently Enrolled': _('Currently Enrolled'),
+        'Enrollment Source': _('Enrollment Source'),
+        'Manual (Un)Enrollment Reason': _('Manual (Un)Enrollment Reason'),
+        'Enrollment Role': _('Enrollment Role'),
+        'List Price': _('List Price'),
+        'Payment Amount': _('Payment Amount'),
+        'Coupon Codes Used': _('Coupon Codes Used'),
+        'Registration Code Used': _('Registration Code Used'),
+        'Payment Status': _('Payment Status'),
+        'Transaction Reference Number': _('Transaction Reference Number')
+    }
 
-        # Now add a log entry after certain intervals to get a hint that task is in progress
-        student_counter += 1
-        if student_counter % 100 == 0:
-            TASK_LOG.info(
-                u'%s, Task type: %s, Current step: %s, gathering enrollment profile for students in progress: %s/%s',
-                task_info_string,
-                action_name,
-                current_step,
-                student_counter,
-                total_students
-            )
+    def enrollment_rows():
+        """
+        Yields the header row followed by a row for each student, so that
+        the rows can be written out as they are computed instead of being
+        built up in memory.
+        """
+        header = None
+        student_counter = 0
+        for student in students_in_course:
+            # Periodically update task status (this is a cache write)
+            if task_progress.attempted % status_interval == 0:
+                task_progress.update_task_state(extra_meta=current_step)
+            task_progress.attempted += 1
 
-        user_data = enrollment_report_provider.get_user_profile(student.id)
-        course_enrollment_data = enrollment_report_provider.get_enrollment_info(student, course_id)
-        payment_data = enrollment_report_provider.get_payment_info(student, course_id)
-
-        # display name map for the column headers
-        enrollment_report_headers = {
-            'User ID': _('User ID'),
-            'Username': _('Username'),
-            'Full Name': _('Full Name'),
-            'First Name': _('First Name'),
-            'Last Name': _('Last Name'),
-            'Company Name': _('Company Name'),
-            'Title': _('Title'),
-            'Language': _('Language'),
-            'Year of Birth': _('Year of Birth'),
-            'Gender': _('Gender'),
-            'Level of Education': _('Level of Education'),
-            'Mailing Address': _('Mailing Address'),
-            'Goals': _('Goals'),
-            'City': _('City'),
-            'Country': _('Country'),
-            'Enrollment Date': _('Enrollment Date'),
-            'Currently Enrolled': _('Currently Enrolled'),
-            'Enrollment Source': _('Enrollment Source'),
-            'Manual (Un)Enrollment Reason': _('Manual (Un)Enrollment Reason'),
-            'Enrollment Role': _('Enrollment Role'),
-            'List Price': _('List Price'),
-            'Payment Amount': _('Payment Amount'),
-            'Coupon Codes Used': _('Coupon Codes Used'),
-            'Registration Code Used': _('Registration Code Used'),
-            'Payment Status': _('Payment Status'),
-            'Transaction Reference Number': _('Transaction Reference Number')
-        }
+            # Now add a log entry after certain intervals to get a hint that task is in progress
+            student_counter += 1
+            if student_counter % 100 == 0:
+                TASK_LOG.info(
+                    u'%s, Task type: %s, Current step: %s, '
+                    u'gathering enrollment profile for students in progress: %s/%s',
+                    task_info_string,
+                    action_name,
+                    current_step,
+                    student_counter,
+                    total_students
+                )
 
-        if not header:
-            header = user_data.keys() + course_enrollment_data.keys() + payment_data.keys()
-            display_headers = []
-            for header_element in header:
-                # translate header into a localizable display string
-                display_headers.append(enrollment_report_headers.get(header_element, header_element))
-            rows.append(display_headers)
+            user_data = enrollment_report_provider.get_user_profile(student.id)
+            course_enrollment_data = enrollment_report_provider.get_enrollment_info(student, course_id)
+            payment_data = enrollment_report_provider.get_payment_info(student, course_id)
 
-        rows.append(user_data.values() + course_enrollment_data.values() + payment_data.values())
-        task_progress.succeeded += 1
+            if not header:
+                header = user_data.keys() + course_enrollment_data.keys() + payment_data.keys()
+                display_headers = []
+                for header_element in header:
+                    # translate header into a localizable display string
+                    display_headers.append(enrollment_report_headers.get(header_element, header_element))
+                yield display_headers
 
-    TASK_LOG.info(
-        u'%s, Task type: %s, Current step: %s, Detailed enrollment report generated for students: %s/%s',
-        task_info_string,
-        action_name,
-        current_step,
-        student_counter,
-        total_students
-    )
+            yield user_data.values() + course_enrollment_data.values() + payment_data.values()
+            task_progress.succeeded += 1
 
-    # By this point, we've got the rows we're going to stuff into our CSV files.
+        TASK_LOG.info(
+            u'%s, Task type: %s, Current step: %s, Detailed enrollment report generated for students: %s/%s',
+            task_info_string,
+            action_name,
+            current_step,
+            student_counter,
+            total_students
+        )
+
+    # Perform the actual upload, writing out each row as soon as it is computed.
+    with track_memory_usage('instructor_task.enrollment_report.memory', course_id):
+        upload_csv_to_report_store(
+            enrollment_rows(), 'enrollment_report', course_id, start_date, config_name='FINANCIAL_REPORTS'
+        )
+
+    # By this point, we've uploaded all the rows.
     current_step = {'step': 'Uploading CSVs'}
     task_progress.update_task_state(extra_meta=current_step)
     TASK_LOG.info(u'%s, Task type: %s, Current step: %s', task_info_string, action_name, current_step)
 
-    # Perform the actual upload
-    upload_csv_to_report_store(rows, 'enrollment_report', course_id, start_date, config_name='FINANCIAL_REPORTS')
-
     # One last update before we close out...
     TASK_LOG.info(u'%s, Task type: %s, Finalizing detailed enrollment task', task_info_string, action_name)
     return task_progress.update_task_state(extra_meta=current_step)
@@ -3,6 +3,7 @@ Tests for instructor_task/models.py.
 """
 import copy
 from cStringIO import StringIO
+import StringIO as pyStringIO
 import time
 
 import boto
@@ -49,6 +50,31 @@ class ReportStoreTestMixin(object):
             ['new_file', 'middle_file', 'old_file']
         )
 
+    def test_store_rows(self):
+        """
+        Test that ReportStore.store_rows() writes all of the rows given by a
+        generator, even when they do not fit in its in-memory buffer.
+        """
+        report_store = self.create_report_store()
+
+        def rows():
+            """
+            Yields the rows of the report.
+            """
+            yield [u'id', u'name']
+            for index in range(100):
+                yield [index, u'\u00e9l\u00e8ve {}'.format(index)]
+
+        with patch.object(report_store, 'ROWS_BUFFER_MAX_SIZE', 64):
+            report_store.store_rows(self.course_id, 'report.csv', rows())
+
+        self.assertEqual([link[0] for link in report_store.links_for(self.course_id)], ['report.csv'])
+        with report_store.storage.open(report_store.path_to(self.course_id, 'report.csv')) as report_file:
+            lines = report_file.read().splitlines()
+        self.assertEqual(len(lines), 101)
+        self.assertEqual(lines[0], 'id,name')
+        self.assertEqual(lines[-1], u'99,\u00e9l\u00e8ve 99'.encode('utf-8'))
+
 
 class LocalFSReportStoreTestCase(ReportStoreTestMixin, TestReportMixin, SimpleTestCase):
     """
@@ -92,6 +118,25 @@ class DjangoStorageReportStoreLocalTestCase(ReportStoreTestMixin, TestReportMixi
         with override_settings(GRADES_DOWNLOAD=test_settings):
             return ReportStore.from_config(config_name='GRADES_DOWNLOAD')
 
+    def test_store_is_atomic(self):
+        """
+        Test that a file is not visible in ReportStore.links_for() while it
+        is being written.
+        """
+        report_store = self.create_report_store()
+        test_case = self
+
+        class CheckingBuffer(pyStringIO.StringIO):
+            """
+            Buffer that checks the visible reports whenever it is read.
+            """
+            def read(self, *args, **kwargs):
+                test_case.assertEqual(report_store.links_for(test_case.course_id), [])
+                return pyStringIO.StringIO.read(self, *args, **kwargs)
+
+        report_store.store(self.course_id, 'report.csv', CheckingBuffer('id,name\n'))
+        self.assertEqual([link[0] for link in report_store.links_for(self.course_id)], ['report.csv'])
+
 
 class DjangoStorageReportStoreS3TestCase(MockS3Mixin, ReportStoreTestMixin, TestReportMixin, SimpleTestCase):
     """
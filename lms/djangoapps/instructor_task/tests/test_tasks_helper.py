@@ -8,10 +8,13 @@ Unit tests for LMS instructor-initiated background tasks helper functions.
 
 """
 
+import json
 import os
 import shutil
 from datetime import datetime
+from time import time
 import urllib
+from uuid import uuid4
 
 import ddt
 from freezegun import freeze_time
@@ -19,6 +22,8 @@ from mock import Mock, patch, MagicMock
 from nose.plugins.attrib import attr
 import tempfile
 import unicodecsv
+from celery.states import SUCCESS
+from django.core.cache import cache
 from django.core.urlresolvers import reverse
 from django.test.utils import override_settings
 
@@ -48,7 +53,9 @@ from student.models import CourseEnrollment, CourseEnrollmentAllowed, ManualEnro
 from lms.djangoapps.verify_student.tests.factories import SoftwareSecurePhotoVerificationFactory
 from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
 from xmodule.partitions.partitions import Group, UserPartition
-from lms.djangoapps.instructor_task.models import ReportStore
+from lms.djangoapps.instructor_task.models import InstructorTask, ReportStore
+from lms.djangoapps.instructor_task.tasks import calculate_grades_csv_shard
+from lms.djangoapps.instructor_task.tests.factories import InstructorTaskFactory
 from survey.models import SurveyForm, SurveyAnswer
 from lms.djangoapps.instructor_task.tasks_helper import (
     cohort_students_and_upload,
@@ -64,6 +71,7 @@ from lms.djangoapps.instructor_task.tasks_helper import (
     upload_ora2_data,
     UPDATE_STATUS_FAILED,
     UPDATE_STATUS_SUCCEEDED,
+    _merge_grades_csv_shards,
 )
 from instructor_analytics.basic import UNAVAILABLE
 from openedx.core.djangoapps.util.testing import ContentGroupTestCase, TestConditionalContent
@@ -115,7 +123,7 @@ class TestInstructorGradeReport(InstructorGradeReportTestCase):
         self.assertDictContainsSubset({'attempted': num_students, 'succeeded': num_students, 'failed': 0}, result)
 
     @patch('lms.djangoapps.instructor_task.tasks_helper._get_current_task')
-    @patch('lms.djangoapps.grades.new.course_grade.CourseGradeFactory.iter')
+    @patch('lms.djangoapps.grades.new.course_grade_matrix.CourseGradeMatrixFactory.iter')
     def test_grading_failure(self, mock_grades_iter, _mock_current_task):
         """
         Test that any grading errors are properly reported in the
@@ -292,7 +300,7 @@ class TestInstructorGradeReport(InstructorGradeReportTestCase):
         )
 
     @patch('lms.djangoapps.instructor_task.tasks_helper._get_current_task')
-    @patch('lms.djangoapps.grades.new.course_grade.CourseGradeFactory.iter')
+    @patch('lms.djangoapps.grades.new.course_grade_matrix.CourseGradeMatrixFactory.iter')
     def test_unicode_in_csv_header(self, mock_grades_iter, _mock_current_task):
         """
         Tests that CSV grade report works if unicode in headers.
@@ -349,6 +357,108 @@ class TestTeamGradeReport(InstructorGradeReportTestCase):
         self._verify_cell_data_for_user(self.student2.username, self.course.id, 'Team Name', team2.name)
 
 
+@override_settings(GRADES_DOWNLOAD_STUDENTS_PER_TASK=2)
+class TestShardedGradeReport(InstructorGradeReportTestCase):
+    """
+    Test that grade reports of courses with more students than fit in a
+    single task are split into shards that are merged into a single report.
+    """
+    def setUp(self):
+        super(TestShardedGradeReport, self).setUp()
+        self.course = CourseFactory.create()
+        self.students = [self.create_student(u'student{}'.format(index)) for index in range(5)]
+        self.entry = InstructorTaskFactory.create(
+            course_id=self.course.id,
+            task_type='grade_course',
+            task_id=str(uuid4()),
+            requester=self.students[0],
+        )
+
+    def _upload_sharded_grades_csv(self):
+        """
+        Generates the grade report of the course, using shard subtasks.
+        """
+        with patch('lms.djangoapps.instructor_task.tasks_helper._get_current_task'):
+            upload_grades_csv(
+                None, self.entry.id, self.course.id, None, 'graded', shard_task=calculate_grades_csv_shard
+            )
+        return InstructorTask.objects.get(id=self.entry.id)
+
+    def _assert_parts_deleted(self):
+        """
+        Asserts that the directory of the CSV parts written by the shards
+        has been deleted.
+        """
+        report_store = ReportStore.from_config(config_name='GRADES_DOWNLOAD')
+        parts_path = report_store.path_to(self.course.id, os.path.join('.parts', self.entry.task_id))
+        self.assertFalse(report_store.storage.exists(parts_path))
+
+    def test_shards_merged(self):
+        entry = self._upload_sharded_grades_csv()
+
+        self.assertEqual(entry.task_state, SUCCESS)
+        self.assertEqual(json.loads(entry.subtasks)['total'], 3)
+        self.assertDictContainsSubset(
+            {'attempted': 5, 'succeeded': 5, 'failed': 0, 'total': 5},
+            json.loads(entry.task_output),
+        )
+        report_store = ReportStore.from_config(config_name='GRADES_DOWNLOAD')
+        self.assertEqual(len(report_store.links_for(self.course.id)), 1)
+        self.verify_rows_in_csv(
+            [
+                {u'Student ID': unicode(student.id), u'Username': student.username, u'Grade': u'0.0'}
+                for student in sorted(self.students, key=lambda student: student.id)
+            ],
+            ignore_other_columns=True,
+        )
+        self._assert_parts_deleted()
+
+    def test_success_after_merge(self):
+        task_states_while_merging = []
+
+        def record_task_state(*args, **kwargs):  # pylint: disable=unused-argument
+            """Records the state of the InstructorTask while the report is merged."""
+            task_states_while_merging.append(InstructorTask.objects.get(id=self.entry.id).task_state)
+
+        merge_path = 'lms.djangoapps.instructor_task.tasks_helper.merge_csv_parts_in_report_store'
+        with patch(merge_path, side_effect=record_task_state):
+            entry = self._upload_sharded_grades_csv()
+
+        self.assertEqual(len(task_states_while_merging), 2)
+        self.assertNotIn(SUCCESS, task_states_while_merging)
+        self.assertEqual(entry.task_state, SUCCESS)
+
+    @patch('lms.djangoapps.grades.new.course_grade_matrix.CourseGradeMatrixFactory.iter')
+    def test_shard_grading_failures(self, mock_grades_iter):
+        mock_grades_iter.side_effect = lambda students: [
+            (student, None, 'Cannot grade student') for student in students
+        ]
+        entry = self._upload_sharded_grades_csv()
+
+        self.assertDictContainsSubset(
+            {'attempted': 5, 'succeeded': 0, 'failed': 5},
+            json.loads(entry.task_output),
+        )
+        report_store = ReportStore.from_config(config_name='GRADES_DOWNLOAD')
+        report_names = [link[0] for link in report_store.links_for(self.course.id)]
+        self.assertEqual(len(report_names), 2)
+        self.assertTrue(any('grade_report_err' in report_name for report_name in report_names))
+        self._assert_parts_deleted()
+
+    def test_failed_merge_releases_lock(self):
+        entry = self._upload_sharded_grades_csv()
+        cache.delete(u'grade-report-merge-{}'.format(entry.task_id))
+
+        merge_path = 'lms.djangoapps.instructor_task.tasks_helper.merge_csv_parts_in_report_store'
+        with patch(merge_path, side_effect=IOError):
+            with self.assertRaises(IOError):
+                _merge_grades_csv_shards(entry.id, time())
+        # The merge can be retried.
+        with patch(merge_path) as mock_merge:
+            _merge_grades_csv_shards(entry.id, time())
+        self.assertEqual(mock_merge.call_count, 2)
+
+
 class TestProblemResponsesReport(TestReportMixin, InstructorTaskCourseTestCase):
     """
     Tests that generation of CSV files listing student answers to a
@@ -361,6 +361,11 @@ FEATURES = {
     # making multiple queries.
     'ENABLE_READING_FROM_MULTIPLE_HISTORY_TABLES': True,
 
+    # Collect the XBlock user state set during a request and write it,
+    # merged by block, in bulk at the end of the request rather than
+    # writing each StudentModule (and its history) as soon as it is set.
+    'ENABLE_USER_STATE_WRITE_BEHIND': False,
+
     # Display the 'Analytics' tab in the instructor dashboard for CCX courses.
     # Note: This has no effect unless ANALYTICS_DASHBOARD_URL is already set,
     #       because without that setting, the tab does not show up for any courses.
@@ -749,6 +754,11 @@ MODULESTORE = {
                         'default_class': 'xmodule.hidden_module.HiddenDescriptor',
                         'fs_root': DATA_DIR,
                         'render_template': 'edxmako.shortcuts.render_to_string',
+                        # Cache up to this many blocks of course structures in each
+                        # process (0 to not cache them).
+                        'structure_cache_max_blocks': 0,
+                        # Share the settings of published blocks with their course structure.
+                        'compact_field_storage': False,
                     }
                 },
                 {
@@ -779,6 +789,16 @@ CODE_JAIL = {
         # How many CPU seconds can jailed code use?
         'CPU': 1,
     },
+
+    # The pool of sandboxes that are started ahead of time, with the
+    # sandbox packages imported, in each process.
+    'pool': {
+        # How many idle sandboxes to keep.  0 means don't use a pool.
+        'size': 0,
+        # How many executions can use the pool at once?  More executions
+        # start a sandbox of their own.
+        'max_queue': 4,
+    },
 }
 
 # Some courses are allowed to run unsafe code. This is a list of regexes, one
@@ -840,6 +860,11 @@ if not EDX_PLATFORM_REVISION:
 STATIC_URL = '/static/'
 STATIC_ROOT = ENV_ROOT / "staticfiles"
 
+# Overrides of the size thresholds, in bytes, of the tiers in which the contentserver caches
+# course assets (LOCAL_MAX_ASSET_SIZE, LOCAL_MAX_SIZE and SHARED_MAX_ASSET_SIZE): see
+# DEFAULT_CACHE_TIERS in openedx.core.djangoapps.contentserver.caching for their defaults.
+COURSE_ASSET_CACHE_TIERS = {}
+
 STATICFILES_DIRS = [
     COMMON_ROOT / "static",
     PROJECT_ROOT / "static",
@@ -1112,6 +1137,11 @@ MIDDLEWARE_CLASSES = (
     'request_cache.middleware.RequestCache',
     'newrelic_custom_metrics.middleware.NewRelicCustomMetrics',
 
+    # Must run its process_response and process_exception before the two
+    # above, so that the write-behind caches are still there and its
+    # metrics are reported.
+    'courseware.middleware.UserStateWriteBehindMiddleware',
+
     'mobile_api.middleware.AppVersionUpgrade',
     'openedx.core.djangoapps.header_control.middleware.HeaderControlMiddleware',
     'microsite_configuration.middleware.MicrositeMiddleware',
@@ -1170,6 +1200,7 @@ MIDDLEWARE_CLASSES = (
 
     'django_comment_client.utils.ViewNameMiddleware',
     'codejail.django_integration.ConfigureCodeJailMiddleware',
+    'util.sandboxing.ConfigureSandboxPoolMiddleware',
 
     # catches any uncaught RateLimitExceptions and returns a 403 instead of a 500
     'ratelimitbackend.middleware.RateLimitMiddleware',
@@ -1821,6 +1852,17 @@ BLOCK_STRUCTURES_SETTINGS = dict(
 
     # Maximum number of retries per task.
     BLOCK_STRUCTURES_TASK_MAX_RETRIES=5,
+
+    # Whether to recollect only the blocks that changed when a course is
+    # published, instead of recollecting the entire course.  When
+    # enabled, the previously cached data continues to be served until
+    # the update task completes.
+    BLOCK_STRUCTURES_INCREMENTAL_COLLECT=False,
+
+    # Maximum size, in bytes of serialized data, of the per-process
+    # cache of deserialized block structures that is consulted before
+    # the shared cache.  Set to 0 to disable the per-process cache.
+    BLOCK_STRUCTURES_LOCAL_CACHE_MAX_SIZE=0,
 )
 
 ################################ Bulk Email ###################################
@@ -2413,6 +2455,12 @@ BADGR_TIMEOUT = 10
 # the ones that contain information other than grades.
 GRADES_DOWNLOAD_ROUTING_KEY = HIGH_MEM_QUEUE
 
+# Grade reports for courses with more enrolled students than this are split
+# into shards of at most this many students, which are graded by separate
+# subtasks and then merged into a single report.  None (the default) always
+# grades all students in a single task.
+GRADES_DOWNLOAD_STUDENTS_PER_TASK = None
+
 GRADES_DOWNLOAD = {
     'STORAGE_TYPE': 'localfs',
     'BUCKET': 'edx-grades',
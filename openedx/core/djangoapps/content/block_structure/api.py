@@ -1,11 +1,18 @@
 """
 Higher order functions built on the BlockStructureManager to interact with a django cache.
 """
+from django.conf import settings
 from django.core.cache import cache
+from openedx.core.lib.block_structure.cache import BlockStructureLocalCache
 from openedx.core.lib.block_structure.manager import BlockStructureManager
 from xmodule.modulestore.django import modulestore
 
 
+# The per-process cache of deserialized block structures, created on
+# first use.  See get_local_cache.
+_LOCAL_CACHE = None
+
+
 def get_course_in_cache(course_key):
     """
     A higher order function implemented on top of the
@@ -19,13 +26,16 @@ def get_course_in_cache(course_key):
     return get_block_structure_manager(course_key).get_collected()
 
 
-def update_course_in_cache(course_key):
+def update_course_in_cache(course_key, incremental=False):
     """
     A higher order function implemented on top of the
     block_structure.updated_collected function that updates the block
     structure in the cache for the given course_key.
+
+    If incremental is True, only the data for blocks that changed since
+    the cached block structure was collected is recollected.
     """
-    return get_block_structure_manager(course_key).update_collected()
+    return get_block_structure_manager(course_key).update_collected(incremental=incremental)
 
 
 def clear_course_from_cache(course_key):
@@ -42,13 +52,24 @@ def clear_course_from_cache(course_key):
     get_block_structure_manager(course_key).clear()
 
 
+def clear_course_from_local_cache(course_key):
+    """
+    Clears the block structure for the given course_key from only the
+    per-process cache.  Other processes detect that their copies are
+    outdated once the block structure is updated in the shared cache.
+    """
+    local_cache = get_local_cache()
+    if local_cache:
+        local_cache.delete(modulestore().make_course_usage_key(course_key))
+
+
 def get_block_structure_manager(course_key):
     """
     Returns the manager for managing Block Structures for the given course.
     """
     store = modulestore()
     course_usage_key = store.make_course_usage_key(course_key)
-    return BlockStructureManager(course_usage_key, store, get_cache())
+    return BlockStructureManager(course_usage_key, store, get_cache(), get_local_cache())
 
 
 def get_cache():
@@ -56,3 +77,26 @@ def get_cache():
     Returns the storage for caching Block Structures.
     """
     return cache
+
+
+def get_local_cache():
+    """
+    Returns the per-process cache of deserialized Block Structures, or
+    None if it is disabled.
+    """
+    global _LOCAL_CACHE  # pylint: disable=global-statement
+    max_size = settings.BLOCK_STRUCTURES_SETTINGS.get('BLOCK_STRUCTURES_LOCAL_CACHE_MAX_SIZE', 0)
+    if not max_size:
+        return None
+    if _LOCAL_CACHE is None:
+        _LOCAL_CACHE = BlockStructureLocalCache(max_size)
+    return _LOCAL_CACHE
+
+
+def get_local_cache_stats():
+    """
+    Returns the hit, miss and eviction statistics of the per-process
+    cache of deserialized Block Structures, or None if it is disabled.
+    """
+    local_cache = get_local_cache()
+    return local_cache.get_stats() if local_cache else None
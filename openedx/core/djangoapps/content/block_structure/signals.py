@@ -6,7 +6,7 @@ from django.dispatch.dispatcher import receiver
 
 from xmodule.modulestore.django import SignalHandler
 
-from .api import clear_course_from_cache
+from .api import clear_course_from_cache, clear_course_from_local_cache
 from .tasks import update_course_in_cache
 
 
@@ -16,12 +16,18 @@ def _listen_for_course_publish(sender, course_key, **kwargs):  # pylint: disable
     Catches the signal that a course has been published in the module
     store and creates/updates the corresponding cache entry.
     """
-    clear_course_from_cache(course_key)
+    # When updating incrementally, the previously collected data is kept
+    # in the cache since it is needed to determine what has changed.
+    incremental = settings.BLOCK_STRUCTURES_SETTINGS.get('BLOCK_STRUCTURES_INCREMENTAL_COLLECT', False)
+    if incremental:
+        clear_course_from_local_cache(course_key)
+    else:
+        clear_course_from_cache(course_key)
 
     # The countdown=0 kwarg ensures the call occurs after the signal emitter
     # has finished all operations.
     update_course_in_cache.apply_async(
-        [unicode(course_key)],
+        [unicode(course_key), incremental],
         countdown=settings.BLOCK_STRUCTURES_SETTINGS['BLOCK_STRUCTURES_COURSE_PUBLISH_TASK_DELAY'],
     )
 
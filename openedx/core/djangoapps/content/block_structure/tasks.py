@@ -25,21 +25,21 @@ NO_RETRY_TASKS = (XMLSyntaxError, LoncapaProblemError, UnicodeEncodeError)
     default_retry_delay=settings.BLOCK_STRUCTURES_SETTINGS['BLOCK_STRUCTURES_TASK_DEFAULT_RETRY_DELAY'],
     max_retries=settings.BLOCK_STRUCTURES_SETTINGS['BLOCK_STRUCTURES_TASK_MAX_RETRIES'],
 )
-def update_course_in_cache(course_id):
+def update_course_in_cache(course_id, incremental=False):
     """
     Updates the course blocks (in the database) for the specified course.
     """
     try:
         course_key = CourseKey.from_string(course_id)
-        api.update_course_in_cache(course_key)
+        api.update_course_in_cache(course_key, incremental=incremental)
     except NO_RETRY_TASKS as exc:
         # Known unrecoverable errors
         raise
     except RETRY_TASKS as exc:
         log.exception("update_course_in_cache encounted expected error, retrying.")
-        raise update_course_in_cache.retry(args=[course_id], exc=exc)
+        raise update_course_in_cache.retry(args=[course_id, incremental], exc=exc)
     except Exception as exc:   # pylint: disable=broad-except
         log.exception("update_course_in_cache encounted unknown error. Retry #{}".format(
             update_course_in_cache.request.retries,
         ))
-        raise update_course_in_cache.retry(args=[course_id], exc=exc)
+        raise update_course_in_cache.retry(args=[course_id, incremental], exc=exc)
@@ -1,9 +1,25 @@
 """
 Helper functions for caching course assets.
+
+Assets are cached in tiers, by size (see COURSE_ASSET_CACHE_TIERS):
+
+* small assets in an LRU cache in each process (and in the shared cache),
+* medium assets in the shared "course_assets" cache,
+* large assets not at all.
+
+The metadata of assets (everything but their data) is cached separately in
+the shared cache, so that conditional requests can be answered without loading
+the assets. It is also what the copies of assets in each process are validated
+against, since deleting content from the cache only reaches the shared cache.
 """
+from collections import OrderedDict
+import threading
+
+from django.conf import settings
 from django.core.cache import caches
 from django.core.cache.backends.base import InvalidCacheBackendError
 from opaque_keys import InvalidKeyError
+import dogstats_wrapper as dog_stats_api
 from xmodule.contentstore.content import STATIC_CONTENT_VERSION
 
 # See if there's a "course_assets" cache configured, and if not, fallback to the default cache.
@@ -13,19 +29,211 @@ try:
 except InvalidCacheBackendError:
     pass
 
+# The size thresholds of the cache tiers, in bytes.  The COURSE_ASSET_CACHE_TIERS
+# setting overrides the ones it sets.
+DEFAULT_CACHE_TIERS = {
+    # Assets up to this size are cached in each process.
+    'LOCAL_MAX_ASSET_SIZE': 64 * 1024,
+    # The total size of the assets cached in each process.
+    'LOCAL_MAX_SIZE': 32 * 1024 * 1024,
+    # Assets up to this size are cached in the shared cache; larger ones aren't cached.
+    'SHARED_MAX_ASSET_SIZE': 1024 * 1024 - 1,
+}
+
+
+def get_cache_tiers():
+    """
+    Returns the size thresholds of the cache tiers.
+    """
+    tiers = dict(DEFAULT_CACHE_TIERS)
+    tiers.update(getattr(settings, 'COURSE_ASSET_CACHE_TIERS', {}))
+    return tiers
+
+
+class ContentMetadata(object):
+    """
+    The metadata of a piece of content: all of its attributes but its data.
+    """
+    def __init__(self, content):
+        self.location = content.location
+        self.name = getattr(content, 'name', None)
+        self.content_type = getattr(content, 'content_type', None)
+        self.length = getattr(content, 'length', None)
+        self.last_modified_at = getattr(content, 'last_modified_at', None)
+        self.locked = getattr(content, 'locked', False)
+        self.content_digest = getattr(content, 'content_digest', None)
+
+    def matches(self, content):
+        """
+        Returns whether the given content has this metadata's version.
+        """
+        return (
+            self.content_digest == getattr(content, 'content_digest', None) and
+            self.last_modified_at == getattr(content, 'last_modified_at', None)
+        )
+
+
+class LocalContentCache(object):
+    """
+    A thread-safe LRU cache of content in this process, which holds content up to a total size.
+    """
+    def __init__(self):
+        self._content = OrderedDict()
+        self._lock = threading.Lock()
+        self.size = 0
+
+    def get(self, key):
+        """
+        Returns the cached content for key, or None.
+        """
+        with self._lock:
+            if key not in self._content:
+                return None
+            # Mark the content as the most recently used.
+            content, size = self._content.pop(key)
+            self._content[key] = (content, size)
+            return content
+
+    def set(self, key, content, size, max_size):
+        """
+        Caches the content of the given size for key, evicting the least recently used content
+        so that all of the cached content fits in max_size.
+        """
+        with self._lock:
+            self._delete(key)
+            if size > max_size:
+                return
+            self._content[key] = (content, size)
+            self.size += size
+            while self.size > max_size:
+                __, (__, evicted_size) = self._content.popitem(last=False)
+                self.size -= evicted_size
+
+    def delete(self, key):
+        """
+        Deletes the cached content for key, if any.
+        """
+        with self._lock:
+            self._delete(key)
+
+    def _delete(self, key):
+        """
+        Deletes the cached content for key, if any (with the lock held).
+        """
+        if key in self._content:
+            __, size = self._content.pop(key)
+            self.size -= size
+
+    def clear(self):
+        """
+        Deletes all of the cached content.
+        """
+        with self._lock:
+            self._content.clear()
+            self.size = 0
+
+
+LOCAL_CONTENT_CACHE = LocalContentCache()
+
+
+def _record_lookup(tier, hit):
+    """
+    Counts a hit or miss of the given cache tier ('local', 'shared' or 'metadata').
+    """
+    result = 'hits' if hit else 'misses'
+    dog_stats_api.increment('contentserver.cache.{}'.format(result), tags=['tier:{}'.format(tier)])
+
+
+def _content_key(location):
+    """Force the location to a Unicode string."""
+    return unicode(location).encode("utf-8")
+
+
+def _metadata_key(content_key):
+    """The key of the metadata of the content cached under content_key."""
+    return content_key + '.metadata'
+
+
+def _content_size(content):
+    """The size of the content's data, or None if it's unknown."""
+    length = getattr(content, 'length', None)
+    if length is None and isinstance(getattr(content, 'data', None), basestring):
+        length = len(content.data)
+    return length
+
+
+def is_content_cacheable(content):
+    """
+    Returns whether the given content is small enough to be cached (so should be read into memory).
+    """
+    size = _content_size(content)
+    return size is not None and size <= get_cache_tiers()['SHARED_MAX_ASSET_SIZE']
+
 
 def set_cached_content(content):
     """
     Stores the given piece of content in the cache, using its location as the key.
+
+    The content is stored in the tiers that its size fits in, and its metadata is stored too.
     """
-    CONTENT_CACHE.set(unicode(content.location).encode("utf-8"), content, version=STATIC_CONTENT_VERSION)
+    key = _content_key(content.location)
+    tiers = get_cache_tiers()
+    size = _content_size(content)
+    set_cached_content_metadata(content)
+    if size is None or size <= tiers['SHARED_MAX_ASSET_SIZE']:
+        CONTENT_CACHE.set(key, content, version=STATIC_CONTENT_VERSION)
+    if size is not None and size <= tiers['LOCAL_MAX_ASSET_SIZE']:
+        LOCAL_CONTENT_CACHE.set(key, content, size, tiers['LOCAL_MAX_SIZE'])
 
 
-def get_cached_content(location):
+def get_cached_content(location, metadata=None):
     """
     Retrieves the given piece of content by its location if cached.
+
+    The content's cached metadata is looked up to validate the copy of the content cached in this
+    process, unless it's given as `metadata`.
+    """
+    key = _content_key(location)
+    content = LOCAL_CONTENT_CACHE.get(key)
+    if content is not None:
+        # Only use the local copy of the content if it's still the cached version.
+        if metadata is None:
+            metadata = CONTENT_CACHE.get(_metadata_key(key), version=STATIC_CONTENT_VERSION)
+        if metadata is not None and metadata.matches(content):
+            _record_lookup('local', True)
+            return content
+        LOCAL_CONTENT_CACHE.delete(key)
+    _record_lookup('local', False)
+
+    content = CONTENT_CACHE.get(key, version=STATIC_CONTENT_VERSION)
+    _record_lookup('shared', content is not None)
+    if content is not None:
+        tiers = get_cache_tiers()
+        size = _content_size(content)
+        if size is not None and size <= tiers['LOCAL_MAX_ASSET_SIZE']:
+            LOCAL_CONTENT_CACHE.set(key, content, size, tiers['LOCAL_MAX_SIZE'])
+            if metadata is None:
+                # The metadata was evicted (deleting the content deletes both), so restore it
+                # for the local copy to be used.
+                set_cached_content_metadata(content)
+    return content
+
+
+def set_cached_content_metadata(content):
+    """
+    Stores the metadata of the given piece of content (of any size) in the cache.
     """
-    return CONTENT_CACHE.get(unicode(location).encode("utf-8"), version=STATIC_CONTENT_VERSION)
+    key = _content_key(content.location)
+    CONTENT_CACHE.set(_metadata_key(key), ContentMetadata(content), version=STATIC_CONTENT_VERSION)
+
+
+def get_cached_content_metadata(location):
+    """
+    Retrieves the ContentMetadata of the given piece of content by its location if cached.
+    """
+    metadata = CONTENT_CACHE.get(_metadata_key(_content_key(location)), version=STATIC_CONTENT_VERSION)
+    _record_lookup('metadata', metadata is not None)
+    return metadata
 
 
 def del_cached_content(location):
@@ -34,16 +242,18 @@ def del_cached_content(location):
 
     It's possible that the content could have been cached without knowing the course_key,
     and so without having the run.
-    """
-    def location_str(loc):
-        """Force the location to a Unicode string."""
-        return unicode(loc).encode("utf-8")
 
-    locations = [location_str(location)]
+    The content's metadata is deleted too, which invalidates the content cached in other processes.
+    """
+    locations = [_content_key(location)]
     try:
-        locations.append(location_str(location.replace(run=None)))
+        locations.append(_content_key(location.replace(run=None)))
     except InvalidKeyError:
         # although deprecated keys allowed run=None, new keys don't if there is no version.
         pass
 
-    CONTENT_CACHE.delete_many(locations, version=STATIC_CONTENT_VERSION)
+    for key in locations:
+        LOCAL_CONTENT_CACHE.delete(key)
+    CONTENT_CACHE.delete_many(
+        locations + [_metadata_key(key) for key in locations], version=STATIC_CONTENT_VERSION
+    )
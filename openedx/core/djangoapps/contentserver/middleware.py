@@ -4,19 +4,24 @@ Middleware to serve assets.
 
 import logging
 import datetime
+import uuid
 import newrelic.agent
 from django.http import (
     HttpResponse, HttpResponseNotModified, HttpResponseForbidden,
-    HttpResponseBadRequest, HttpResponseNotFound, HttpResponsePermanentRedirect)
+    HttpResponseBadRequest, HttpResponseNotFound, HttpResponsePermanentRedirect,
+    StreamingHttpResponse)
 from student.models import CourseEnrollment
 
 from xmodule.assetstore.assetmgr import AssetManager
-from xmodule.contentstore.content import StaticContent, XASSET_LOCATION_TAG
+from xmodule.contentstore.content import StaticContent, StaticContentStream, XASSET_LOCATION_TAG
 from xmodule.modulestore import InvalidLocationError
 from opaque_keys import InvalidKeyError
 from opaque_keys.edx.locator import AssetLocator
 from openedx.core.djangoapps.header_control import force_header_for_response
-from .caching import get_cached_content, set_cached_content
+from .caching import (
+    ContentMetadata, get_cached_content, get_cached_content_metadata, is_content_cacheable,
+    set_cached_content, set_cached_content_metadata
+)
 from xmodule.modulestore.exceptions import ItemNotFoundError
 from xmodule.exceptions import NotFoundError
 
@@ -28,6 +33,10 @@ from .models import CourseAssetCacheTtlConfig, CdnUserAgentsConfig
 log = logging.getLogger(__name__)
 HTTP_DATE_FORMAT = "%a, %d %b %Y %H:%M:%S GMT"
 
+# Requests for more byte ranges than this get the full content, rather than a
+# multipart response with many tiny parts.
+MAX_BYTE_RANGES = 20
+
 
 class StaticContentServer(object):
     """
@@ -64,11 +73,11 @@ class StaticContentServer(object):
             except (InvalidLocationError, InvalidKeyError):
                 return HttpResponseBadRequest()
 
-            # Attempt to load the asset to make sure it exists, and grab the asset digest
-            # if we're able to load it.
+            # Attempt to load the asset's metadata (cached separately from the asset), or else the asset,
+            # to make sure it exists, and grab the asset digest if we're able to load it.
             actual_digest = None
             try:
-                content = self.load_asset_from_location(loc)
+                content = get_cached_content_metadata(loc) or self.load_asset_from_location(loc)
                 actual_digest = getattr(content, "content_digest", None)
             except (ItemNotFoundError, NotFoundError):
                 return HttpResponseNotFound()
@@ -109,6 +118,20 @@ class StaticContentServer(object):
                 if_modified_since = request.META['HTTP_IF_MODIFIED_SINCE']
                 if if_modified_since == last_modified_at_str:
                     return HttpResponseNotModified()
+            etag = get_etag(content)
+            if etag is not None and 'HTTP_IF_NONE_MATCH' in request.META:
+                if_none_match = [tag.strip() for tag in request.META['HTTP_IF_NONE_MATCH'].split(',')]
+                if etag in if_none_match or '*' in if_none_match:
+                    response = HttpResponseNotModified()
+                    response['ETag'] = etag
+                    return response
+
+            # Only the asset's metadata may have been loaded so far.
+            if isinstance(content, ContentMetadata):
+                try:
+                    content = self.load_asset_from_location(loc, metadata=content)
+                except (ItemNotFoundError, NotFoundError):
+                    return HttpResponseNotFound()
 
             # *** File streaming within a byte range ***
             # If a Range is provided, parse Range attribute of the request
@@ -117,6 +140,7 @@ class StaticContentServer(object):
             # Response -> Content-Range attribute structure: "Content-Range: bytes first-last/totalLength"
             # http://www.w3.org/Protocols/rfc2616/rfc2616-sec14.html#sec14.35
             response = None
+            content_type = content.content_type
             if request.META.get('HTTP_RANGE'):
                 # If we have a StaticContent, get a StaticContentStream.  Can't manipulate the bytes otherwise.
                 if isinstance(content, StaticContent):
@@ -134,19 +158,36 @@ class StaticContentServer(object):
                     if unit != 'bytes':
                         # Only accept ranges in bytes
                         log.warning(u"Unknown unit in Range header: %s for content: %s", header_value, unicode(loc))
+                    elif len(ranges) > MAX_BYTE_RANGES:
+                        # We send back the full content.
+                        log.warning(
+                            u"Too many ranges in Range header: %s for content: %s", header_value, unicode(loc)
+                        )
                     elif len(ranges) > 1:
                         # According to Http/1.1 spec content for multiple ranges should be sent as a multipart message.
                         # http://www.w3.org/Protocols/rfc2616/rfc2616-sec14.html#sec14.16
-                        # But we send back the full content.
-                        log.warning(
-                            u"More than 1 ranges in Range header: %s for content: %s", header_value, unicode(loc)
-                        )
+                        # Unsatisfiable ranges are left out of it.
+                        ranges = [(first, last) for first, last in ranges if 0 <= first <= last < content.length]
+                        if not ranges:
+                            log.warning(
+                                u"Cannot satisfy ranges in Range header: %s for content: %s", header_value, unicode(loc)
+                            )
+                            return HttpResponse(status=416)  # Requested Range Not Satisfiable
+
+                        boundary = uuid.uuid4().hex
+                        parts, length = multipart_byteranges(content, ranges, boundary)
+                        response = StreamingHttpResponse(parts)
+                        content_type = 'multipart/byteranges; boundary={}'.format(boundary)
+                        response['Content-Length'] = str(length)
+                        response.status_code = 206  # Partial Content
+
+                        newrelic.agent.add_custom_parameter('contentserver.ranged', True)
                     else:
                         first, last = ranges[0]
 
                         if 0 <= first <= last < content.length:
                             # If the byte range is satisfiable
-                            response = HttpResponse(content.stream_data_in_range(first, last))
+                            response = StreamingHttpResponse(content.stream_data_in_range(first, last))
                             response['Content-Range'] = 'bytes {first}-{last}/{length}'.format(
                                 first=first, last=last, length=content.length
                             )
@@ -162,7 +203,11 @@ class StaticContentServer(object):
 
             # If Range header is absent or syntactically invalid return a full content response.
             if response is None:
-                response = HttpResponse(content.stream_data())
+                # Stream content that isn't in memory, rather than reading it all into the response.
+                if isinstance(content, StaticContentStream):
+                    response = StreamingHttpResponse(content.stream_data())
+                else:
+                    response = HttpResponse(content.stream_data())
                 response['Content-Length'] = content.length
 
             newrelic.agent.add_custom_parameter('contentserver.content_len', content.length)
@@ -170,7 +215,7 @@ class StaticContentServer(object):
 
             # "Accept-Ranges: bytes" tells the user that only "bytes" ranges are allowed
             response['Accept-Ranges'] = 'bytes'
-            response['Content-Type'] = content.content_type
+            response['Content-Type'] = content_type
 
             # Set any caching headers, and do any response cleanup needed.  Based on how much
             # middleware we have in place, there's no easy way to use the built-in Django
@@ -204,6 +249,9 @@ class StaticContentServer(object):
             response['Cache-Control'] = "private, no-cache, no-store"
 
         response['Last-Modified'] = content.last_modified_at.strftime(HTTP_DATE_FORMAT)
+        etag = get_etag(content)
+        if etag is not None:
+            response['ETag'] = etag
 
         # Force the Vary header to only vary responses on Origin, so that XHR and browser requests get cached
         # separately and don't screw over one another. i.e. a browser request that doesn't send Origin, and
@@ -257,14 +305,16 @@ class StaticContentServer(object):
 
         return True
 
-    def load_asset_from_location(self, location):
+    def load_asset_from_location(self, location, metadata=None):
         """
         Loads an asset based on its location, either retrieving it from a cache
         or loading it directly from the contentstore.
+
+        `metadata` is the asset's cached ContentMetadata, if it has been loaded already.
         """
 
         # See if we can load this item from cache.
-        content = get_cached_content(location)
+        content = get_cached_content(location, metadata=metadata)
         if content is None:
             # Not in cache, so just try and load it from the asset manager.
             try:
@@ -272,16 +322,57 @@ class StaticContentServer(object):
             except (ItemNotFoundError, NotFoundError):
                 raise
 
-            # Now that we fetched it, let's go ahead and try to cache it. We cap this at 1MB
-            # because it's the default for memcached and also we don't want to do too much
-            # buffering in memory when we're serving an actual request.
-            if content.length is not None and content.length < 1048576:
+            # Now that we fetched it, let's go ahead and try to cache it, if it's small enough
+            # (see COURSE_ASSET_CACHE_TIERS): we don't want to do too much buffering in memory
+            # when we're serving an actual request. Its metadata is cached whatever its size.
+            if is_content_cacheable(content):
                 content = content.copy_to_in_mem()
                 set_cached_content(content)
+            else:
+                set_cached_content_metadata(content)
 
         return content
 
 
+def get_etag(content):
+    """
+    Returns the (quoted) ETag of the given content or content metadata: its digest, if known.
+    """
+    digest = getattr(content, 'content_digest', None)
+    return '"{}"'.format(digest) if digest else None
+
+
+def multipart_byteranges(content, ranges, boundary):
+    """
+    Returns an iterator over the body of a multipart/byteranges response with the given ranges of
+    the StaticContentStream content, separated by boundary, and the length of the body.
+
+    See spec for details: http://www.w3.org/Protocols/rfc2616/rfc2616-sec19.html#sec19.2
+    """
+    part_headers = []
+    for first, last in ranges:
+        part_header = '--{}\r\n'.format(boundary)
+        if content.content_type:
+            part_header += 'Content-Type: {}\r\n'.format(content.content_type)
+        part_header += 'Content-Range: bytes {}-{}/{}\r\n\r\n'.format(first, last, content.length)
+        part_headers.append(part_header)
+    closing = '--{}--\r\n'.format(boundary)
+
+    def parts():
+        """
+        Yields the body, streaming the data of each range in turn.
+        """
+        for part_header, (first, last) in zip(part_headers, ranges):
+            yield part_header
+            for chunk in content.stream_data_in_range(first, last):
+                yield chunk
+            yield '\r\n'
+        yield closing
+
+    length = sum(len(part_header) + (last - first + 1) + 2 for part_header, (first, last) in zip(part_headers, ranges))
+    return parts(), length + len(closing)
+
+
 def parse_range_header(header_value, content_length):
     """
     Returns the unit and a list of (start, end) tuples of ranges.
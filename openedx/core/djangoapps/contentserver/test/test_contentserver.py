@@ -7,6 +7,7 @@ import datetime
 import ddt
 import logging
 import unittest
+from StringIO import StringIO
 from uuid import uuid4
 
 from django.conf import settings
@@ -16,7 +17,7 @@ from django.test.utils import override_settings
 from mock import patch
 
 from xmodule.contentstore.django import contentstore
-from xmodule.contentstore.content import StaticContent, VERSIONED_ASSETS_PREFIX
+from xmodule.contentstore.content import StaticContent, StaticContentStream, VERSIONED_ASSETS_PREFIX
 from xmodule.modulestore.django import modulestore
 from xmodule.modulestore.tests.django_utils import SharedModuleStoreTestCase
 from xmodule.modulestore.xml_importer import import_course_from_xml
@@ -27,7 +28,9 @@ from xmodule.modulestore.exceptions import ItemNotFoundError
 from student.models import CourseEnrollment
 from student.tests.factories import UserFactory, AdminFactory
 
-from ..middleware import parse_range_header, HTTP_DATE_FORMAT, StaticContentServer
+from ..middleware import (
+    parse_range_header, multipart_byteranges, HTTP_DATE_FORMAT, MAX_BYTE_RANGES, StaticContentServer
+)
 
 log = logging.getLogger(__name__)
 
@@ -242,13 +245,28 @@ class ContentStoreToyCourseTest(SharedModuleStoreTestCase):
 
     def test_range_request_multiple_ranges(self):
         """
-        Test that multiple ranges in request outputs the full content.
+        Test that multiple ranges in request outputs a multipart response with each range.
         """
         first_byte = self.length_unlocked / 4
         last_byte = self.length_unlocked / 2
-        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes={first}-{last}, -100'.format(
+        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes={first}-{last}, -10'.format(
             first=first_byte, last=last_byte))
 
+        self.assertEqual(resp.status_code, 206)  # HTTP_206_PARTIAL_CONTENT
+        self.assertNotIn('Content-Range', resp)
+        self.assertTrue(resp['Content-Type'].startswith('multipart/byteranges; boundary='))
+        body = ''.join(resp.streaming_content)
+        self.assertEqual(resp['Content-Length'], str(len(body)))
+        self.assertIn('Content-Range: bytes {first}-{last}/{length}'.format(
+            first=first_byte, last=last_byte, length=self.length_unlocked), body)
+        self.assertIn('Content-Range: bytes {first}-{last}/{length}'.format(
+            first=self.length_unlocked - 10, last=self.length_unlocked - 1, length=self.length_unlocked), body)
+
+    def test_range_request_too_many_ranges(self):
+        """
+        Test that too many ranges in request outputs the full content.
+        """
+        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes=' + ', '.join(['0-0'] * (MAX_BYTE_RANGES + 1)))
         self.assertEqual(resp.status_code, 200)
         self.assertNotIn('Content-Range', resp)
         self.assertEqual(resp['Content-Length'], str(self.length_unlocked))
@@ -285,6 +303,24 @@ class ContentStoreToyCourseTest(SharedModuleStoreTestCase):
             first=(self.length_unlocked), last=(self.length_unlocked)))
         self.assertEqual(resp.status_code, 416)
 
+    def test_etag_revalidation(self):
+        """
+        Test that a request with the asset's ETag in If-None-Match gets a 304 Not Modified,
+        from the cached metadata of the asset, without loading the asset.
+        """
+        resp = self.client.get(self.url_unlocked)
+        self.assertEqual(resp.status_code, 200)
+        etag = resp['ETag']
+
+        with patch('openedx.core.djangoapps.contentserver.middleware.AssetManager.find') as mock_find:
+            resp = self.client.get(self.url_unlocked, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(resp.status_code, 304)
+            self.assertEqual(resp['ETag'], etag)
+            self.assertFalse(mock_find.called)
+
+        resp = self.client.get(self.url_unlocked, HTTP_IF_NONE_MATCH='"other"')
+        self.assertEqual(resp.status_code, 200)
+
     def test_vary_header_sent(self):
         """
         Tests that we're properly setting the Vary header to ensure browser requests don't get
@@ -447,3 +483,22 @@ class ParseRangeHeaderTestCase(unittest.TestCase):
         self.assertRaisesRegexp(
             exception_class, exception_message_regex, parse_range_header, header_value, self.content_length
         )
+
+
+class MultipartByterangesTestCase(unittest.TestCase):
+    """
+    Tests for the multipart_byteranges function.
+    """
+    def test_multipart_byteranges(self):
+        data = ''.join(chr(ord('a') + index % 26) for index in range(1000))
+        content = StaticContentStream('loc', 'name', 'text/plain', StringIO(data), length=len(data))
+        parts, length = multipart_byteranges(content, [(0, 9), (990, 999)], 'BOUNDARY')
+        body = ''.join(parts)
+        self.assertEqual(length, len(body))
+        self.assertEqual(body, (
+            '--BOUNDARY\r\nContent-Type: text/plain\r\nContent-Range: bytes 0-9/1000\r\n\r\n'
+            '{}\r\n'
+            '--BOUNDARY\r\nContent-Type: text/plain\r\nContent-Range: bytes 990-999/1000\r\n\r\n'
+            '{}\r\n'
+            '--BOUNDARY--\r\n'
+        ).format(data[:10], data[990:]))
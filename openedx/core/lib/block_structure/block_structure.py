@@ -23,6 +23,14 @@ logger = getLogger(__name__)  # pylint: disable=invalid-name
 # A dictionary key value for storing a transformer's version number.
 TRANSFORMER_VERSION_KEY = '_version'
 
+# The name of the xBlock field that identifies the version of the
+# modulestore structure in which a block was last edited.
+BLOCK_VERSION_FIELD = 'update_version'
+
+# The name of the xBlock field that identifies the current version of
+# the modulestore structure, which is the same for all of its blocks.
+STRUCTURE_VERSION_FIELD = 'course_version'
+
 
 class _BlockRelations(object):
     """
@@ -39,6 +47,16 @@ class _BlockRelations(object):
         # list [UsageKey]
         self.children = []
 
+    def copy(self):
+        """
+        Returns a new _BlockRelations with copies of this block's
+        lists of parents and children.
+        """
+        relations = _BlockRelations()
+        relations.parents = list(self.parents)
+        relations.children = list(self.children)
+        return relations
+
 
 class BlockStructure(object):
     """
@@ -369,6 +387,8 @@ class TransformerDataMap(dict):
             map[TransformerClass] or
             map['transformer_name']
         """
+        if isinstance(key, basestring):
+            return key
         try:
             return key.name()
         except AttributeError:
@@ -414,6 +434,17 @@ class BlockStructureBlockData(BlockStructure):
         # Map of a transformer's name to its non-block-specific data.
         self.transformer_data = TransformerDataMap()
 
+        # Whether the transformer data and the block data of this
+        # instance are shared with another instance, in which case they
+        # are copied before being modified.  See copy_on_write.
+        self._is_transformer_data_shared = False
+        self._is_block_data_shared = False
+
+        # Set of usage keys of blocks whose data is no longer shared,
+        # when _is_block_data_shared is True.
+        # set(UsageKey)
+        self._unshared_block_keys = set()
+
     def copy(self):
         """
         Returns a new instance of BlockStructureBlockData with a
@@ -427,6 +458,32 @@ class BlockStructureBlockData(BlockStructure):
             deepcopy(self._block_data_map),
         )
 
+    def copy_on_write(self):
+        """
+        Returns a new instance of BlockStructureBlockData with a copy of
+        this instance's block relations, but which shares this
+        instance's block and transformer data until it is modified
+        through the new instance's methods.  This is considerably
+        cheaper than a deep-copy when only a few blocks are modified.
+
+        Note: This instance's data should not be modified while copies
+        created by this method are in use.
+        """
+        from .factory import BlockStructureFactory
+        block_structure = BlockStructureFactory.create_new(
+            self.root_block_usage_key,
+            {
+                usage_key: relations.copy()
+                for usage_key, relations in self._block_relations.iteritems()
+            },
+            self.transformer_data,
+            dict(self._block_data_map),
+        )
+        # pylint: disable=protected-access
+        block_structure._is_transformer_data_shared = True
+        block_structure._is_block_data_shared = True
+        return block_structure
+
     def iteritems(self):
         """
         Returns iterator of (UsageKey, BlockData) pairs for all
@@ -497,6 +554,8 @@ class BlockStructureBlockData(BlockStructure):
             value (any picklable type) - The value to associate with the
                 given key for the given transformer's data.
         """
+        if self._is_transformer_data_shared:
+            self._unshare_transformer_data()
         setattr(self.transformer_data.get_or_create(transformer), key, value)
 
     def get_transformer_block_data(self, usage_key, transformer):
@@ -577,6 +636,8 @@ class BlockStructureBlockData(BlockStructure):
                 whose data entry is to be deleted.
         """
         try:
+            if self._is_block_data_shared:
+                self._unshare_block(usage_key)
             transformer_block_data = self.get_transformer_block_data(usage_key, transformer)
             delattr(transformer_block_data, key)
         except (AttributeError, KeyError):
@@ -740,6 +801,8 @@ class BlockStructureBlockData(BlockStructure):
         If not found, creates and returns a new BlockData and
         maps it to the given key.
         """
+        if self._is_block_data_shared:
+            self._unshare_block(usage_key)
         try:
             return self._block_data_map[usage_key]
         except KeyError:
@@ -747,6 +810,24 @@ class BlockStructureBlockData(BlockStructure):
             self._block_data_map[usage_key] = block_data
             return block_data
 
+    def _unshare_block(self, usage_key):
+        """
+        Replaces the given block's shared data, if any, with a deep-copy
+        so it can be modified.
+        """
+        if usage_key not in self._unshared_block_keys:
+            self._unshared_block_keys.add(usage_key)
+            if usage_key in self._block_data_map:
+                self._block_data_map[usage_key] = deepcopy(self._block_data_map[usage_key])
+
+    def _unshare_transformer_data(self):
+        """
+        Replaces the shared transformer data with a deep-copy so it can
+        be modified.
+        """
+        self.transformer_data = deepcopy(self.transformer_data)
+        self._is_transformer_data_shared = False
+
 
 class BlockStructureModulestoreData(BlockStructureBlockData):
     """
@@ -814,6 +895,84 @@ class BlockStructureModulestoreData(BlockStructureBlockData):
         """
         self._xblock_map[usage_key] = xblock
 
+    def get_changed_block_keys(self, collected_block_structure):
+        """
+        Returns the usage keys of the blocks in this structure that were
+        edited since the given block structure was collected, as
+        determined by comparing the edit version of each xBlock with the
+        version recorded at the time of collection.
+
+        Blocks that are new to this structure and blocks whose edit
+        version is unknown are considered changed.  So are the current
+        parents of any blocks that no longer exist in this structure.
+
+        Arguments:
+            collected_block_structure (BlockStructureBlockData) - A
+                previously collected block structure for the same root.
+        """
+        changed_block_keys = set()
+        for usage_key, xblock in self._xblock_map.iteritems():
+            current_version = getattr(xblock, BLOCK_VERSION_FIELD, None)
+            collected_version = collected_block_structure.get_xblock_field(usage_key, BLOCK_VERSION_FIELD)
+            if current_version is None or current_version != collected_version:
+                changed_block_keys.add(usage_key)
+
+        for usage_key in collected_block_structure:
+            if usage_key not in self:
+                changed_block_keys.update(
+                    parent_key
+                    for parent_key in collected_block_structure.get_parents(usage_key)
+                    if parent_key in self
+                )
+        return changed_block_keys
+
+    def get_blocks_to_recollect(self, changed_block_keys):
+        """
+        Returns the usage keys of the blocks whose collected data needs
+        to be recomputed when the given blocks have changed.  These are
+        the changed blocks, all of their descendants (since collected
+        data is percolated down the structure) and all of the ancestors
+        of those blocks (since they are needed to recompute the
+        percolated data).
+
+        Arguments:
+            changed_block_keys (set(UsageKey)) - Usage keys of the blocks
+                that changed.
+        """
+        blocks_to_recollect = set()
+        for block_key in self.topological_traversal():
+            if block_key in changed_block_keys or any(
+                    parent_key in blocks_to_recollect for parent_key in self.get_parents(block_key)
+            ):
+                blocks_to_recollect.add(block_key)
+
+        blocks_to_visit = list(blocks_to_recollect)
+        while blocks_to_visit:
+            for parent_key in self.get_parents(blocks_to_visit.pop()):
+                if parent_key not in blocks_to_recollect:
+                    blocks_to_recollect.add(parent_key)
+                    blocks_to_visit.append(parent_key)
+        return blocks_to_recollect
+
+    def create_substructure(self, block_keys):
+        """
+        Returns a new BlockStructureModulestoreData with the same root,
+        containing only the given blocks, their xBlocks and the
+        relations amongst them.
+
+        Arguments:
+            block_keys (set(UsageKey)) - Usage keys of the blocks to
+                include.  Each block's ancestors are expected to be
+                included as well.
+        """
+        substructure = BlockStructureModulestoreData(self.root_block_usage_key)
+        for block_key in self.topological_traversal(filter_func=lambda block_key: block_key in block_keys):
+            substructure._add_xblock(block_key, self._xblock_map[block_key])
+            for child_key in self.get_children(block_key):
+                if child_key in block_keys:
+                    substructure._add_relation(block_key, child_key)
+        return substructure
+
     def _collect_requested_xblock_fields(self):
         """
         Iterates through all instantiated xBlocks that were added and
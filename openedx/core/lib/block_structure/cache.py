@@ -1,35 +1,142 @@
 """
 Module for the Cache class for BlockStructure objects.
 """
-# pylint: disable=protected-access
+from collections import OrderedDict
 from logging import getLogger
-
-from openedx.core.lib.cache_utils import zpickle, zunpickle
+from uuid import uuid4
 
 from .block_structure import BlockStructureBlockData
 from .factory import BlockStructureFactory
+from .serializer import BlockStructureSerializer
 
 
 logger = getLogger(__name__)  # pylint: disable=C0103
 
 
+class BlockStructureLocalCache(object):
+    """
+    A per-process, size-bounded, least-recently-used cache of
+    deserialized block structures.
+
+    Each entry is keyed by the root usage key of its block structure
+    and is tagged with the version of the data it was deserialized
+    from.  An entry is only returned if its version matches the
+    requested version, so entries for outdated data are never used.
+
+    Block structures are returned as copy-on-write views so that
+    modifications made by clients (such as transformers) do not affect
+    the cached block structure.
+    """
+    def __init__(self, max_size):
+        """
+        Arguments:
+            max_size (int) - The maximum total size, in bytes of
+                serialized data, of the block structures to keep.
+        """
+        self.max_size = max_size
+        self.size = 0
+
+        # Map of a root usage key to a tuple of the version, block
+        # structure and size of its entry, ordered from least to most
+        # recently used.
+        # OrderedDict {UsageKey: (string, BlockStructureBlockData, int)}
+        self._entries = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, root_block_usage_key, version):
+        """
+        Returns a copy-on-write view of the block structure cached for
+        the given root_block_usage_key at the given version; returns
+        None if not found.
+        """
+        entry = self._entries.pop(root_block_usage_key, None)
+        if entry is None or entry[0] != version:
+            if entry is not None:
+                self.size -= entry[2]
+            self.misses += 1
+            return None
+
+        # Re-insert the entry to mark it as the most recently used.
+        self._entries[root_block_usage_key] = entry
+        self.hits += 1
+        return entry[1].copy_on_write()
+
+    def set(self, root_block_usage_key, version, block_structure, size):
+        """
+        Caches the given block structure for the given
+        root_block_usage_key at the given version, evicting the least
+        recently used entries as needed to stay within max_size.
+
+        Arguments:
+            size (int) - The size of the block structure's serialized
+                data, used as an estimate of its memory footprint.
+        """
+        self.delete(root_block_usage_key)
+        if size > self.max_size:
+            return
+
+        while self.size + size > self.max_size:
+            _, (_, _, evicted_size) = self._entries.popitem(last=False)
+            self.size -= evicted_size
+            self.evictions += 1
+
+        self._entries[root_block_usage_key] = (version, block_structure, size)
+        self.size += size
+
+    def delete(self, root_block_usage_key):
+        """
+        Removes the entry for the given root_block_usage_key, if any.
+        """
+        entry = self._entries.pop(root_block_usage_key, None)
+        if entry is not None:
+            self.size -= entry[2]
+
+    def clear(self):
+        """
+        Removes all entries.
+        """
+        self._entries.clear()
+        self.size = 0
+
+    def get_stats(self):
+        """
+        Returns a dictionary of statistics of the usage of this cache.
+        """
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'entries': len(self._entries),
+            'size': self.size,
+            'max_size': self.max_size,
+        }
+
+
 class BlockStructureCache(object):
     """
     Cache for BlockStructure objects.
     """
-    def __init__(self, cache):
+    def __init__(self, cache, local_cache=None):
         """
         Arguments:
             cache (django.core.cache.backends.base.BaseCache) - The
                 cache into which cacheable data of the block structure
                 is to be serialized.
+
+            local_cache (BlockStructureLocalCache) - An optional
+                per-process cache of deserialized block structures to
+                consult before the given cache.
         """
         self._cache = cache
+        self._local_cache = local_cache
 
     def add(self, block_structure):
         """
-        Store a compressed and pickled serialization of the given
-        block structure into the given cache.
+        Store a compact serialization of the given block structure
+        into the given cache.  See BlockStructureSerializer.
 
         The key in the cache is 'root.key.<root_block_usage_key>'.
         The data stored in the cache includes the structure's
@@ -39,29 +146,34 @@ class BlockStructureCache(object):
             block_structure (BlockStructure) - The block structure
                 that is to be serialized to the given cache.
         """
-        data_to_cache = (
-            block_structure._block_relations,
-            block_structure.transformer_data,
-            block_structure._block_data_map,
-        )
-        zp_data_to_cache = zpickle(data_to_cache)
+        serialized_data = BlockStructureSerializer.serialize(block_structure)
 
         # Set the timeout value for the cache to 1 day as a fail-safe
         # in case the signal to invalidate the cache doesn't come through.
         timeout_in_seconds = 60 * 60 * 24
         self._cache.set(
             self._encode_root_cache_key(block_structure.root_block_usage_key),
-            zp_data_to_cache,
+            serialized_data,
             timeout=timeout_in_seconds,
         )
 
+        # The version is written after the data so that readers never
+        # associate a new version with outdated data.
+        self._cache.set(
+            self._encode_version_cache_key(block_structure.root_block_usage_key),
+            self._create_version(block_structure),
+            timeout=timeout_in_seconds,
+        )
+        if self._local_cache:
+            self._local_cache.delete(block_structure.root_block_usage_key)
+
         logger.info(
             "Wrote BlockStructure %s to cache, size: %s",
             block_structure.root_block_usage_key,
-            len(zp_data_to_cache),
+            len(serialized_data),
         )
 
-    def get(self, root_block_usage_key):
+    def get(self, root_block_usage_key, transformers=None):
         """
         Deserializes and returns the block structure starting at
         root_block_usage_key from the given cache, if it's found in the cache.
@@ -74,6 +186,11 @@ class BlockStructureCache(object):
                 of the block structure that is to be deserialized from
                 the given cache.
 
+            transformers ([BlockStructureTransformer]) - If provided,
+                only the block-specific data of these transformers is
+                deserialized.  Otherwise, the data of all transformers
+                is deserialized.
+
         Returns:
             BlockStructure - The deserialized block structure starting
             at root_block_usage_key, if found in the cache.
@@ -81,9 +198,16 @@ class BlockStructureCache(object):
             NoneType - If the root_block_usage_key is not found in the cache.
         """
 
+        use_local_cache = self._local_cache is not None and transformers is None
+        if use_local_cache:
+            version = self._cache.get(self._encode_version_cache_key(root_block_usage_key))
+            block_structure = self._local_cache.get(root_block_usage_key, version) if version else None
+            if block_structure is not None:
+                return block_structure
+
         # Find root_block_usage_key in the cache.
-        zp_data_from_cache = self._cache.get(self._encode_root_cache_key(root_block_usage_key))
-        if not zp_data_from_cache:
+        serialized_data = self._cache.get(self._encode_root_cache_key(root_block_usage_key))
+        if not serialized_data:
             logger.info(
                 "Did not find BlockStructure %r in the cache.",
                 root_block_usage_key,
@@ -93,17 +217,28 @@ class BlockStructureCache(object):
             logger.info(
                 "Read BlockStructure %r from cache, size: %s",
                 root_block_usage_key,
-                len(zp_data_from_cache),
+                len(serialized_data),
             )
 
         # Deserialize and construct the block structure.
-        block_relations, transformer_data, block_data_map = zunpickle(zp_data_from_cache)
-        return BlockStructureFactory.create_new(
+        deserialized_data = BlockStructureSerializer.deserialize(serialized_data, transformers)
+        if deserialized_data is None:
+            logger.info(
+                "Found BlockStructure %r in the cache in an outdated format.",
+                root_block_usage_key,
+            )
+            return None
+        block_relations, transformer_data, block_data_map = deserialized_data
+        block_structure = BlockStructureFactory.create_new(
             root_block_usage_key,
             block_relations,
             transformer_data,
             block_data_map,
         )
+        if use_local_cache and version:
+            self._local_cache.set(root_block_usage_key, version, block_structure, len(serialized_data))
+            return block_structure.copy_on_write()
+        return block_structure
 
     def delete(self, root_block_usage_key):
         """
@@ -116,6 +251,9 @@ class BlockStructureCache(object):
                 the cache.
         """
         self._cache.delete(self._encode_root_cache_key(root_block_usage_key))
+        self._cache.delete(self._encode_version_cache_key(root_block_usage_key))
+        if self._local_cache:
+            self._local_cache.delete(root_block_usage_key)
         logger.info(
             "Deleted BlockStructure %r from the cache.",
             root_block_usage_key,
@@ -127,7 +265,34 @@ class BlockStructureCache(object):
         Returns the cache key to use for storing the block structure
         for the given root_block_usage_key.
         """
-        return "v{version}.root.key.{root_usage_key}".format(
+        return "v{version}.f{format_version}.root.key.{root_usage_key}".format(
             version=unicode(BlockStructureBlockData.VERSION),
+            format_version=unicode(BlockStructureSerializer.FORMAT_VERSION),
             root_usage_key=unicode(root_block_usage_key),
         )
+
+    @classmethod
+    def _encode_version_cache_key(cls, root_block_usage_key):
+        """
+        Returns the cache key to use for storing the version of the
+        block structure for the given root_block_usage_key.
+        """
+        return "{root_cache_key}.version".format(
+            root_cache_key=cls._encode_root_cache_key(root_block_usage_key),
+        )
+
+    @classmethod
+    def _create_version(cls, block_structure):
+        """
+        Returns a new unique version for the data of the given block
+        structure, prefixed with the course version of the root block,
+        if it was collected.
+        """
+        return u"{course_version}.{unique_id}".format(
+            course_version=block_structure.get_xblock_field(
+                block_structure.root_block_usage_key,
+                'course_version',
+                '',
+            ),
+            unique_id=uuid4().hex,
+        )
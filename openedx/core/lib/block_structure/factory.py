@@ -1,7 +1,11 @@
 """
 Module for factory class for BlockStructure objects.
 """
-from .block_structure import BlockStructureModulestoreData, BlockStructureBlockData
+from copy import copy
+
+from .block_structure import (
+    BlockStructureModulestoreData, BlockStructureBlockData, TransformerDataMap, STRUCTURE_VERSION_FIELD
+)
 
 
 class BlockStructureFactory(object):
@@ -9,7 +13,7 @@ class BlockStructureFactory(object):
     Factory class for BlockStructure objects.
     """
     @classmethod
-    def create_from_modulestore(cls, root_block_usage_key, modulestore):
+    def create_from_modulestore(cls, root_block_usage_key, modulestore, lazy=False):
         """
         Creates and returns a block structure from the modulestore
         starting at the given root_block_usage_key.
@@ -22,6 +26,9 @@ class BlockStructureFactory(object):
                 contains the data for the xBlocks within the block
                 structure starting at root_block_usage_key.
 
+            lazy (bool) - Whether the modulestore may defer loading the
+                xBlocks' definitions until their fields are accessed.
+
         Returns:
             BlockStructureModulestoreData - The created block structure
                 with instantiated xBlocks from the given modulestore
@@ -53,12 +60,12 @@ class BlockStructureFactory(object):
                 block_structure._add_relation(xblock.location, child.location)  # pylint: disable=protected-access
                 build_block_structure(child)
 
-        root_xblock = modulestore.get_item(root_block_usage_key, depth=None, lazy=False)
+        root_xblock = modulestore.get_item(root_block_usage_key, depth=None, lazy=lazy)
         build_block_structure(root_xblock)
         return block_structure
 
     @classmethod
-    def create_from_cache(cls, root_block_usage_key, block_structure_cache):
+    def create_from_cache(cls, root_block_usage_key, block_structure_cache, transformers=None):
         """
         Deserializes and returns the block structure starting at
         root_block_usage_key from the given cache, if it's found in the cache.
@@ -75,13 +82,17 @@ class BlockStructureFactory(object):
                 cache from which the block structure is to be
                 deserialized.
 
+            transformers ([BlockStructureTransformer]) - If provided,
+                only the block-specific data of these transformers is
+                deserialized.
+
         Returns:
             BlockStructure - The deserialized block structure starting
             at root_block_usage_key, if found in the cache.
 
             NoneType - If the root_block_usage_key is not found in the cache.
         """
-        return block_structure_cache.get(root_block_usage_key)
+        return block_structure_cache.get(root_block_usage_key, transformers)
 
     @classmethod
     def create_new(cls, root_block_usage_key, block_relations, transformer_data, block_data_map):
@@ -93,3 +104,57 @@ class BlockStructureFactory(object):
         block_structure.transformer_data = transformer_data
         block_structure._block_data_map = block_data_map  # pylint: disable=protected-access
         return block_structure
+
+    @classmethod
+    def create_from_recollected(cls, block_structure, collected_block_structure, recollected_substructure):
+        """
+        Returns a new block structure that combines the previously
+        collected data of unchanged blocks with the newly collected data
+        of the recollected blocks.
+
+        The structure version collected for unchanged blocks is updated,
+        since it changes even though they didn't.
+
+        Arguments:
+            block_structure (BlockStructureModulestoreData) - The current
+                block structure from the modulestore, whose relations
+                are used for the returned structure.
+
+            collected_block_structure (BlockStructureBlockData) - The
+                previously collected block structure for the same root.
+
+            recollected_substructure (BlockStructureModulestoreData) - A
+                substructure of block_structure whose data was just
+                collected.
+        """
+        # pylint: disable=protected-access
+        structure_version = getattr(
+            block_structure.get_xblock(block_structure.root_block_usage_key), STRUCTURE_VERSION_FIELD, None
+        )
+        block_data_map = {}
+        for block_key in block_structure:
+            # The root is in every structure, so check for its xBlock.
+            if block_key in recollected_substructure._xblock_map:
+                block_data = recollected_substructure._block_data_map.get(block_key)
+            else:
+                block_data = collected_block_structure._block_data_map.get(block_key)
+                if block_data is not None and STRUCTURE_VERSION_FIELD in block_data.fields:
+                    # Copy the block data, since the previously collected
+                    # structure can be shared.
+                    block_data = copy(block_data)
+                    block_data.fields = dict(block_data.fields)
+                    block_data.fields[STRUCTURE_VERSION_FIELD] = structure_version
+            if block_data is not None:
+                block_data_map[block_key] = block_data
+
+        # Build a new map, since the previously collected structure can be
+        # shared (with the cache, for one).
+        transformer_data = TransformerDataMap(collected_block_structure.transformer_data)
+        transformer_data.update(recollected_substructure.transformer_data)
+
+        return cls.create_new(
+            block_structure.root_block_usage_key,
+            block_structure._block_relations,
+            transformer_data,
+            block_data_map,
+        )
@@ -3,6 +3,7 @@ Top-level module for the Block Structure framework with a class for managing
 BlockStructures.
 """
 from contextlib import contextmanager
+from logging import getLogger
 
 from .cache import BlockStructureCache
 from .factory import BlockStructureFactory
@@ -10,12 +11,15 @@ from .exceptions import UsageKeyNotInBlockStructure
 from .transformers import BlockStructureTransformers
 
 
+logger = getLogger(__name__)  # pylint: disable=C0103
+
+
 class BlockStructureManager(object):
     """
     Top-level class for managing Block Structures.
     """
 
-    def __init__(self, root_block_usage_key, modulestore, cache):
+    def __init__(self, root_block_usage_key, modulestore, cache, local_cache=None):
         """
         Arguments:
             root_block_usage_key (UsageKey) - The usage_key for the root
@@ -28,10 +32,14 @@ class BlockStructureManager(object):
             cache (django.core.cache.backends.base.BaseCache) - The
                 cache to use for storing/retrieving the block structure's
                 collected data.
+
+            local_cache (BlockStructureLocalCache) - An optional
+                per-process cache of deserialized block structures to
+                consult before the given cache.
         """
         self.root_block_usage_key = root_block_usage_key
         self.modulestore = modulestore
-        self.block_structure_cache = BlockStructureCache(cache)
+        self.block_structure_cache = BlockStructureCache(cache, local_cache)
 
     def get_transformed(self, transformers, starting_block_usage_key=None, collected_block_structure=None):
         """
@@ -59,7 +67,10 @@ class BlockStructureManager(object):
             BlockStructureBlockData - A transformed block structure,
                 starting at starting_block_usage_key.
         """
-        block_structure = collected_block_structure.copy() if collected_block_structure else self.get_collected()
+        if collected_block_structure:
+            block_structure = collected_block_structure.copy_on_write()
+        else:
+            block_structure = self.get_collected()
 
         if starting_block_usage_key:
             # Override the root_block_usage_key so traversals start at the
@@ -89,12 +100,8 @@ class BlockStructureManager(object):
                 starting at root_block_usage_key, with collected data
                 from each registered transformer.
         """
-        block_structure = BlockStructureFactory.create_from_cache(
-            self.root_block_usage_key,
-            self.block_structure_cache
-        )
-        cache_miss = block_structure is None
-        if cache_miss or BlockStructureTransformers.is_collected_outdated(block_structure):
+        block_structure = self.get_cached()
+        if block_structure is None:
             with self._bulk_operations():
                 block_structure = BlockStructureFactory.create_from_modulestore(
                     self.root_block_usage_key,
@@ -104,16 +111,92 @@ class BlockStructureManager(object):
                 self.block_structure_cache.add(block_structure)
         return block_structure
 
-    def update_collected(self):
+    def get_cached(self):
+        """
+        Returns the collected Block Structure for the root_block_usage_key
+        from the cache, without accessing the modulestore.
+
+        Returns:
+            BlockStructureBlockData - The collected block structure,
+                or None if it is not in the cache or its collected data
+                is outdated.
+        """
+        block_structure = BlockStructureFactory.create_from_cache(
+            self.root_block_usage_key,
+            self.block_structure_cache
+        )
+        if block_structure is None or BlockStructureTransformers.is_collected_outdated(block_structure):
+            return None
+        return block_structure
+
+    def update_collected(self, incremental=False):
         """
         Updates the collected Block Structure for the root_block_usage_key.
 
         Details: The cache is cleared and updated by collecting transformers
         data from the modulestore.
+
+        Arguments:
+            incremental (bool) - If True, and a previously collected
+                block structure is available in the cache, transformers
+                data is recollected only for the blocks that were edited
+                since the previous collection (along with their
+                descendants and ancestors).  Falls back to a full
+                collection whenever an incremental update is not
+                possible.
         """
+        if incremental and self._update_collected_incrementally():
+            return
         self.clear()
         self.get_collected()
 
+    def _update_collected_incrementally(self):
+        """
+        Updates the collected Block Structure by recollecting data for
+        only the changed blocks.  Returns whether the update was done.
+        """
+        collected_block_structure = BlockStructureFactory.create_from_cache(
+            self.root_block_usage_key,
+            self.block_structure_cache
+        )
+        if (
+                collected_block_structure is None or
+                BlockStructureTransformers.is_collected_outdated(collected_block_structure) or
+                not BlockStructureTransformers.supports_incremental_collect()
+        ):
+            return False
+
+        with self._bulk_operations():
+            block_structure = BlockStructureFactory.create_from_modulestore(
+                self.root_block_usage_key,
+                self.modulestore,
+                lazy=True,
+            )
+            changed_block_keys = block_structure.get_changed_block_keys(collected_block_structure)
+            if self.root_block_usage_key in changed_block_keys:
+                # Every block would be recollected anyway.
+                return False
+
+            blocks_to_recollect = block_structure.get_blocks_to_recollect(changed_block_keys)
+            logger.info(
+                "Incrementally recollecting %d of %d blocks in BlockStructure %s.",
+                len(blocks_to_recollect),
+                len(block_structure),
+                self.root_block_usage_key,
+            )
+            # The cache is updated even if no block changed, for the
+            # structure version of the blocks to be updated.
+            recollected_substructure = block_structure.create_substructure(blocks_to_recollect)
+            if blocks_to_recollect:
+                BlockStructureTransformers.collect(recollected_substructure)
+            collected_block_structure = BlockStructureFactory.create_from_recollected(
+                block_structure,
+                collected_block_structure,
+                recollected_substructure,
+            )
+            self.block_structure_cache.add(collected_block_structure)
+        return True
+
     def clear(self):
         """
         Removes cached data for the block structure associated with the given
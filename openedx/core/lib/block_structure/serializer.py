@@ -0,0 +1,231 @@
+"""
+Module for the compact serialization of collected BlockStructures.
+
+The serialized format interns each block's usage key into an integer
+index and stores the rest of the block structure in terms of those
+indices:
+
+    * Block relations are stored as integer arrays, using a compressed
+      sparse row layout: an offsets array with an entry per block and a
+      flat array of the indices of the related blocks.
+
+    * xBlock fields and block-specific transformer data are stored in
+      columns: for each field, an array of the indices of the blocks
+      that have a value for the field and a list of the corresponding
+      values.
+
+The block-specific data of each transformer is compressed separately so
+that clients interested in only a subset of the transformers need not
+decode the data of all of them.
+"""
+# pylint: disable=protected-access
+from array import array
+import cPickle as pickle
+from itertools import izip
+import zlib
+
+from .block_structure import _BlockRelations, BlockData, TransformerData
+
+
+# Type code of the arrays used to store block indices.
+_INDEX_TYPECODE = 'l'
+
+
+class BlockStructureSerializer(object):
+    """
+    Serializer of BlockStructureBlockData objects to and from a compact
+    binary representation.
+    """
+    # Incrementally update this value whenever the serialized format
+    # changes, so any previously serialized data is no longer used.
+    FORMAT_VERSION = 1
+
+    @classmethod
+    def serialize(cls, block_structure):
+        """
+        Returns a compact binary serialization of the relations,
+        transformer data and block data of the given block structure.
+
+        Arguments:
+            block_structure (BlockStructureBlockData) - The block
+                structure that is to be serialized.
+        """
+        block_relations = block_structure._block_relations
+        block_data_map = block_structure._block_data_map
+
+        # Intern the usage keys.  Blocks with relations come first,
+        # followed by any blocks that only have collected data.
+        block_keys = list(block_relations)
+        block_keys.extend(block_key for block_key in block_data_map if block_key not in block_relations)
+        block_indices = {block_key: index for index, block_key in enumerate(block_keys)}
+
+        xblock_fields = _ColumnsBuilder(block_indices)
+        transformer_block_data = {}
+        for block_key, block_data in block_data_map.iteritems():
+            xblock_fields.add(block_key, block_data.fields)
+            for transformer_name, transformer_data in block_data.transformer_data.iteritems():
+                if transformer_name not in transformer_block_data:
+                    transformer_block_data[transformer_name] = _ColumnsBuilder(block_indices)
+                transformer_block_data[transformer_name].add(block_key, transformer_data.fields)
+
+        header = {
+            'block_keys': block_keys,
+            'num_related_blocks': len(block_relations),
+            'parents': cls._serialize_relations(block_relations, block_keys, block_indices, 'parents'),
+            'children': cls._serialize_relations(block_relations, block_keys, block_indices, 'children'),
+            'block_data': array(_INDEX_TYPECODE, sorted(block_indices[block_key] for block_key in block_data_map)),
+            'xblock_fields': xblock_fields.columns,
+            'transformer_data': block_structure.transformer_data,
+        }
+        return pickle.dumps(
+            (
+                cls.FORMAT_VERSION,
+                cls._compress(header),
+                {
+                    transformer_name: cls._compress((builder.indices, builder.columns))
+                    for transformer_name, builder in transformer_block_data.iteritems()
+                },
+            ),
+            pickle.HIGHEST_PROTOCOL,
+        )
+
+    @classmethod
+    def deserialize(cls, serialized_data, transformers=None):
+        """
+        Returns a tuple of the block relations, transformer data and
+        block data map deserialized from the given data, as expected by
+        BlockStructureFactory.create_new.  Returns None if the data was
+        serialized in a different format version.
+
+        Arguments:
+            serialized_data (str) - Data previously returned by
+                serialize.
+
+            transformers ([BlockStructureTransformer | str]) - The
+                transformers (or names of transformers) whose
+                block-specific data is to be deserialized.  If None,
+                the data of all transformers is deserialized.
+        """
+        format_version, compressed_header, compressed_transformer_block_data = pickle.loads(serialized_data)
+        if format_version != cls.FORMAT_VERSION:
+            return None
+
+        header = cls._decompress(compressed_header)
+        block_keys = header['block_keys']
+
+        block_relations = {}
+        parents, children = header['parents'], header['children']
+        for index in xrange(header['num_related_blocks']):
+            relations = _BlockRelations()
+            relations.parents = cls._get_related_block_keys(parents, index, block_keys)
+            relations.children = cls._get_related_block_keys(children, index, block_keys)
+            block_relations[block_keys[index]] = relations
+
+        block_data_by_index = {index: BlockData(block_keys[index]) for index in header['block_data']}
+        for field_name, (indices, values) in header['xblock_fields'].iteritems():
+            for index, value in izip(indices, values):
+                block_data_by_index[index].fields[field_name] = value
+
+        if transformers is None:
+            transformer_names = compressed_transformer_block_data.keys()
+        else:
+            transformer_names = [cls._get_transformer_name(transformer) for transformer in transformers]
+
+        for transformer_name in transformer_names:
+            if transformer_name not in compressed_transformer_block_data:
+                continue
+            transformer_indices, columns = cls._decompress(compressed_transformer_block_data[transformer_name])
+            transformer_data_by_index = {}
+            for index in transformer_indices:
+                transformer_data = TransformerData()
+                block_data_by_index[index].transformer_data[transformer_name] = transformer_data
+                transformer_data_by_index[index] = transformer_data
+            for key, (indices, values) in columns.iteritems():
+                for index, value in izip(indices, values):
+                    transformer_data_by_index[index].fields[key] = value
+
+        block_data_map = {
+            block_data.location: block_data
+            for block_data in block_data_by_index.itervalues()
+        }
+        return block_relations, header['transformer_data'], block_data_map
+
+    @staticmethod
+    def _serialize_relations(block_relations, block_keys, block_indices, relation_name):
+        """
+        Returns the given relation (parents or children) of all blocks
+        as a tuple of offsets and indices arrays.  The related blocks of
+        the block at index i are at indices[offsets[i]:offsets[i + 1]].
+        """
+        offsets = array(_INDEX_TYPECODE, [0])
+        indices = array(_INDEX_TYPECODE)
+        for block_key in block_keys[:len(block_relations)]:
+            indices.extend(
+                block_indices[related_key]
+                for related_key in getattr(block_relations[block_key], relation_name)
+            )
+            offsets.append(len(indices))
+        return offsets, indices
+
+    @staticmethod
+    def _get_related_block_keys(relation, index, block_keys):
+        """
+        Returns the list of usage keys of the blocks related to the
+        block at the given index, for a relation serialized by
+        _serialize_relations.
+        """
+        offsets, indices = relation
+        return [block_keys[related_index] for related_index in indices[offsets[index]:offsets[index + 1]]]
+
+    @staticmethod
+    def _get_transformer_name(transformer):
+        """
+        Returns the name of the given transformer, which may already be
+        a name.
+        """
+        return transformer if isinstance(transformer, basestring) else transformer.name()
+
+    @staticmethod
+    def _compress(data):
+        """
+        Returns a zlib compressed pickled serialization of the given data.
+        """
+        return zlib.compress(pickle.dumps(data, pickle.HIGHEST_PROTOCOL))
+
+    @staticmethod
+    def _decompress(compressed_data):
+        """
+        Returns the data deserialized from the given compressed data.
+        """
+        return pickle.loads(zlib.decompress(compressed_data))
+
+
+class _ColumnsBuilder(object):
+    """
+    Helper for building columns of field values, keyed by field name,
+    for a set of blocks.
+    """
+    def __init__(self, block_indices):
+        # Map of a block's usage key to its interned index.
+        self._block_indices = block_indices
+
+        # Indices of the blocks that were added.
+        self.indices = array(_INDEX_TYPECODE)
+
+        # Map of field name to a tuple of the indices of the blocks with
+        # a value for the field and a list of the corresponding values.
+        # dict {string: (array, list)}
+        self.columns = {}
+
+    def add(self, block_key, fields):
+        """
+        Adds the given fields of the given block to the columns.
+        """
+        index = self._block_indices[block_key]
+        self.indices.append(index)
+        for field_name, value in fields.iteritems():
+            if field_name not in self.columns:
+                self.columns[field_name] = (array(_INDEX_TYPECODE), [])
+            indices, values = self.columns[field_name]
+            indices.append(index)
+            values.append(value)
@@ -267,3 +267,32 @@ class TestBlockStructureData(TestCase, ChildrenMapTestMixin):
         _set_value(new_copy, 'edit2')
         self.assertEquals(_get_value(block_structure), 'edit1')
         self.assertEquals(_get_value(new_copy), 'edit2')
+
+    def test_copy_on_write(self):
+        block_structure = self.create_block_structure(ChildrenMapTestMixin.LINEAR_CHILDREN_MAP)
+        for block in block_structure:
+            block_structure.set_transformer_block_field(block, 'transformer', 'test_key', 'original_value')
+        block_structure.set_transformer_data('transformer', 'test_key', 'original_value')
+
+        # create a view of the structure and verify the data is shared
+        view = block_structure.copy_on_write()
+        self.assert_block_structure(view, [[1], [2], [3], []])
+        self.assertIs(view[1], block_structure[1])
+
+        # verify edits to the view do not affect the original
+        view.remove_block(2, keep_descendants=True)
+        view.set_transformer_block_field(1, 'transformer', 'test_key', 'edit')
+        view.set_transformer_data('transformer', 'test_key', 'edit')
+        self.assert_block_structure(view, [[1], [3], [], []], missing_blocks=[2])
+        self.assert_block_structure(block_structure, [[1], [2], [3], []])
+        self.assertEquals(view.get_transformer_block_field(1, 'transformer', 'test_key'), 'edit')
+        self.assertEquals(view.get_transformer_data('transformer', 'test_key'), 'edit')
+        for block in block_structure:
+            self.assertEquals(
+                block_structure.get_transformer_block_field(block, 'transformer', 'test_key'),
+                'original_value',
+            )
+        self.assertEquals(block_structure.get_transformer_data('transformer', 'test_key'), 'original_value')
+
+        # verify unmodified blocks are still shared
+        self.assertIs(view[0], block_structure[0])
@@ -4,7 +4,7 @@ Tests for block_structure/cache.py
 from nose.plugins.attrib import attr
 from unittest import TestCase
 
-from ..cache import BlockStructureCache
+from ..cache import BlockStructureCache, BlockStructureLocalCache
 from .helpers import ChildrenMapTestMixin, MockCache, MockTransformer
 
 
@@ -54,3 +54,82 @@ class TestBlockStructureCache(ChildrenMapTestMixin, TestCase):
         self.assertIsNone(
             self.block_structure_cache.get(self.block_structure.root_block_usage_key)
         )
+
+
+@attr(shard=2)
+class TestBlockStructureLocalCache(ChildrenMapTestMixin, TestCase):
+    """
+    Tests for BlockStructureCache with a BlockStructureLocalCache
+    """
+    def setUp(self):
+        super(TestBlockStructureLocalCache, self).setUp()
+        self.children_map = self.SIMPLE_CHILDREN_MAP
+        self.block_structure = self.create_block_structure(self.children_map)
+        self.block_structure.set_transformer_block_field(1, MockTransformer, 'test', 'original_value')
+        self.mock_cache = MockCache()
+        self.local_cache = BlockStructureLocalCache(max_size=1000000)
+        self.block_structure_cache = BlockStructureCache(self.mock_cache, self.local_cache)
+
+    def get_and_verify(self, hits, misses):
+        """
+        Gets the block structure from the cache and verifies the local
+        cache's statistics.
+        """
+        cached_value = self.block_structure_cache.get(self.block_structure.root_block_usage_key)
+        self.assert_block_structure(cached_value, self.children_map)
+        stats = self.local_cache.get_stats()
+        self.assertEquals((stats['hits'], stats['misses']), (hits, misses))
+        return cached_value
+
+    def test_hit(self):
+        self.block_structure_cache.add(self.block_structure)
+        self.get_and_verify(hits=0, misses=1)
+        self.get_and_verify(hits=1, misses=1)
+        self.assertEquals(self.local_cache.get_stats()['entries'], 1)
+
+    def test_copy_on_write(self):
+        self.block_structure_cache.add(self.block_structure)
+        cached_value = self.get_and_verify(hits=0, misses=1)
+        cached_value.remove_block(2, keep_descendants=False)
+        cached_value.set_transformer_block_field(1, MockTransformer, 'test', 'edit')
+
+        cached_value = self.get_and_verify(hits=1, misses=1)
+        self.assertEquals(cached_value.get_transformer_block_field(1, MockTransformer, 'test'), 'original_value')
+
+    def test_add_invalidates(self):
+        self.block_structure_cache.add(self.block_structure)
+        self.get_and_verify(hits=0, misses=1)
+        self.block_structure_cache.add(self.block_structure)
+        self.get_and_verify(hits=0, misses=2)
+
+    def test_shared_cache_update_invalidates(self):
+        self.block_structure_cache.add(self.block_structure)
+        self.get_and_verify(hits=0, misses=1)
+
+        # Simulate an update from another process, which does not
+        # affect this process's local cache.
+        self.block_structure.set_transformer_block_field(1, MockTransformer, 'test', 'new_value')
+        BlockStructureCache(self.mock_cache).add(self.block_structure)
+        cached_value = self.get_and_verify(hits=0, misses=2)
+        self.assertEquals(cached_value.get_transformer_block_field(1, MockTransformer, 'test'), 'new_value')
+
+    def test_delete(self):
+        self.block_structure_cache.add(self.block_structure)
+        self.get_and_verify(hits=0, misses=1)
+        self.block_structure_cache.delete(self.block_structure.root_block_usage_key)
+        self.assertEquals(self.local_cache.get_stats()['entries'], 0)
+        self.assertIsNone(self.block_structure_cache.get(self.block_structure.root_block_usage_key))
+
+    def test_eviction(self):
+        self.local_cache.max_size = 0
+        self.block_structure_cache.add(self.block_structure)
+        self.get_and_verify(hits=0, misses=1)
+        self.assertEquals(self.local_cache.get_stats()['entries'], 0)
+
+        self.local_cache.max_size = 100
+        for root_block_usage_key in range(3):
+            self.local_cache.set(root_block_usage_key, 'version', self.block_structure, 40)
+        stats = self.local_cache.get_stats()
+        self.assertEquals((stats['entries'], stats['size'], stats['evictions']), (2, 80, 1))
+        self.assertIsNone(self.local_cache.get(0, 'version'))
+        self.assertIsNotNone(self.local_cache.get(1, 'version'))
@@ -5,6 +5,7 @@ from nose.plugins.attrib import attr
 from unittest import TestCase
 from xmodule.modulestore.exceptions import ItemNotFoundError
 
+from ..block_structure import TransformerData
 from ..cache import BlockStructureCache
 from ..factory import BlockStructureFactory
 from .helpers import (
@@ -66,3 +67,26 @@ class TestBlockStructureFactory(TestCase, ChildrenMapTestMixin):
             block_structure._block_data_map,  # pylint: disable=protected-access
         )
         self.assert_block_structure(new_structure, self.children_map)
+
+    def test_from_recollected(self):
+        collected_block_structure = self.create_block_structure(self.children_map)
+        unchanged_data, outdated_data, recollected_data = TransformerData(), TransformerData(), TransformerData()
+        collected_block_structure.transformer_data['unchanged'] = unchanged_data
+        collected_block_structure.transformer_data['recollected'] = outdated_data
+        block_structure = BlockStructureFactory.create_from_modulestore(
+            root_block_usage_key=0, modulestore=self.modulestore
+        )
+        recollected_substructure = BlockStructureFactory.create_from_modulestore(
+            root_block_usage_key=0, modulestore=self.modulestore
+        )
+        recollected_substructure.transformer_data['recollected'] = recollected_data
+
+        new_structure = BlockStructureFactory.create_from_recollected(
+            block_structure, collected_block_structure, recollected_substructure,
+        )
+        self.assert_block_structure(new_structure, self.children_map)
+        self.assertIs(new_structure.transformer_data['unchanged'], unchanged_data)
+        self.assertIs(new_structure.transformer_data['recollected'], recollected_data)
+
+        # The previously collected structure, which can be shared, is left as it was.
+        self.assertIs(collected_block_structure.transformer_data['recollected'], outdated_data)
@@ -85,6 +85,24 @@ class TestTransformer1(MockTransformer):
         return data_key + 't1.val1.' + unicode(block_key)
 
 
+class TestIncrementalTransformer(TestTransformer1):
+    """
+    Test Transformer class that supports incremental collection and
+    records the blocks for which data was collected.
+    """
+    SUPPORTS_INCREMENTAL_COLLECT = True
+    collected_blocks = set()
+
+    @classmethod
+    def collect(cls, block_structure):
+        """
+        Collects block data for the block structure.
+        """
+        super(TestIncrementalTransformer, cls).collect(block_structure)
+        block_structure.request_xblock_fields('course_version')
+        cls.collected_blocks.update(block_structure.topological_traversal())
+
+
 @attr(shard=2)
 class TestBlockStructureManager(TestCase, ChildrenMapTestMixin):
     """
@@ -122,7 +140,9 @@ class TestBlockStructureManager(TestCase, ChildrenMapTestMixin):
             self.assertGreater(self.modulestore.get_items_call_count, 0)
         else:
             self.assertEquals(self.modulestore.get_items_call_count, 0)
-        self.assertEquals(self.cache.set_call_count, 1 if expect_cache_updated else 0)
+        # Each update of the cache writes both the block structure's
+        # data and its version.
+        self.assertEquals(self.cache.set_call_count, 2 if expect_cache_updated else 0)
 
     def test_get_transformed(self):
         with mock_registered_transformers(self.registered_transformers):
@@ -179,8 +199,124 @@ class TestBlockStructureManager(TestCase, ChildrenMapTestMixin):
         self.collect_and_verify(expect_modulestore_called=True, expect_cache_updated=True)
         self.assertEquals(TestTransformer1.collect_call_count, 2)
 
+    def test_get_cached(self):
+        with mock_registered_transformers(self.registered_transformers):
+            self.assertIsNone(self.bs_manager.get_cached())
+            self.assertEquals(self.modulestore.get_items_call_count, 0)
+
+            self.bs_manager.get_collected()
+            block_structure = self.bs_manager.get_cached()
+            self.assert_block_structure(block_structure, self.children_map)
+            TestTransformer1.assert_collected(block_structure)
+
+            TestTransformer1.VERSION += 1
+            self.assertIsNone(self.bs_manager.get_cached())
+        self.assertEquals(TestTransformer1.collect_call_count, 1)
+
     def test_clear(self):
         self.collect_and_verify(expect_modulestore_called=True, expect_cache_updated=True)
         self.bs_manager.clear()
         self.collect_and_verify(expect_modulestore_called=True, expect_cache_updated=True)
         self.assertEquals(TestTransformer1.collect_call_count, 2)
+
+
+@attr(shard=2)
+class TestBlockStructureManagerIncremental(TestCase, ChildrenMapTestMixin):
+    """
+    Test class for incremental updates with BlockStructureManager.
+    """
+    def setUp(self):
+        super(TestBlockStructureManagerIncremental, self).setUp()
+
+        TestIncrementalTransformer.collect_call_count = 0
+        TestIncrementalTransformer.collected_blocks = set()
+        self.registered_transformers = [TestIncrementalTransformer()]
+
+        self.children_map = self.SIMPLE_CHILDREN_MAP
+        self.modulestore = MockModulestoreFactory.create(self.children_map)
+        for block in self.modulestore.blocks.itervalues():
+            block.field_map['update_version'] = 'version1'
+            block.field_map['course_version'] = 'course1'
+        self.cache = MockCache()
+        self.bs_manager = BlockStructureManager(
+            root_block_usage_key=0,
+            modulestore=self.modulestore,
+            cache=self.cache,
+        )
+        with mock_registered_transformers(self.registered_transformers):
+            self.bs_manager.get_collected()
+        TestIncrementalTransformer.collected_blocks = set()
+
+    def update_and_verify(self, expected_recollected_blocks):
+        """
+        Incrementally updates the collected block structure and verifies
+        the blocks that were recollected and the resulting structure.
+        """
+        with mock_registered_transformers(self.registered_transformers):
+            self.bs_manager.update_collected(incremental=True)
+            block_structure = self.bs_manager.get_collected()
+        self.assertEquals(TestIncrementalTransformer.collected_blocks, expected_recollected_blocks)
+        self.assert_block_structure(block_structure, self.children_map)
+        TestIncrementalTransformer.assert_collected(block_structure)
+        for block_key in block_structure:
+            self.assertEquals(
+                block_structure.get_xblock_field(block_key, 'update_version'),
+                self.modulestore.blocks[block_key].update_version,
+            )
+
+    def set_course_version(self, course_version):
+        """
+        Sets the course version of all blocks, as publishing does.
+        """
+        for block in self.modulestore.blocks.itervalues():
+            block.field_map['course_version'] = course_version
+
+    def assert_course_version(self, course_version):
+        """
+        Verifies the course version collected for all blocks.
+        """
+        block_structure = self.bs_manager.get_cached()
+        for block_key in block_structure:
+            self.assertEquals(block_structure.get_xblock_field(block_key, 'course_version'), course_version)
+
+    def test_no_changes(self):
+        self.update_and_verify(expected_recollected_blocks=set())
+
+    def test_new_course_version(self):
+        self.set_course_version('course2')
+        self.update_and_verify(expected_recollected_blocks=set())
+        self.assert_course_version('course2')
+
+        self.set_course_version('course3')
+        self.modulestore.blocks[3].field_map['update_version'] = 'version2'
+        self.update_and_verify(expected_recollected_blocks={0, 1, 3})
+        self.assert_course_version('course3')
+
+    def test_changed_leaf(self):
+        self.modulestore.blocks[3].field_map['update_version'] = 'version2'
+        self.update_and_verify(expected_recollected_blocks={0, 1, 3})
+
+    def test_changed_subtree(self):
+        self.modulestore.blocks[1].field_map['update_version'] = 'version2'
+        self.update_and_verify(expected_recollected_blocks={0, 1, 3, 4})
+
+    def test_changed_root(self):
+        self.modulestore.blocks[0].field_map['update_version'] = 'version2'
+        self.update_and_verify(expected_recollected_blocks={0, 1, 2, 3, 4})
+
+    def test_removed_block(self):
+        self.children_map = [[1, 2], [3], [], [], []]
+        self.modulestore.blocks[1].children = [3]
+        del self.modulestore.blocks[4]
+        with mock_registered_transformers(self.registered_transformers):
+            self.bs_manager.update_collected(incremental=True)
+            block_structure = self.bs_manager.get_collected()
+        self.assertEquals(TestIncrementalTransformer.collected_blocks, {0, 1, 3})
+        self.assert_block_structure(block_structure, self.children_map, missing_blocks=[4])
+
+    def test_unsupported_transformer(self):
+        self.registered_transformers.append(TestTransformer1())
+        self.modulestore.blocks[3].field_map['update_version'] = 'version2'
+        with mock_registered_transformers(self.registered_transformers):
+            self.bs_manager.update_collected(incremental=True)
+        self.assertEquals(TestIncrementalTransformer.collected_blocks, {0, 1, 2, 3, 4})
@@ -0,0 +1,214 @@
+"""
+Tests for serializer.py
+"""
+from datetime import datetime
+from logging import getLogger
+from timeit import timeit
+from nose.plugins.attrib import attr
+from unittest import skip, TestCase
+
+from opaque_keys.edx.locator import CourseLocator
+from openedx.core.lib.cache_utils import zpickle, zunpickle
+
+from ..block_structure import BlockStructureBlockData
+from ..factory import BlockStructureFactory
+from ..serializer import BlockStructureSerializer
+from .helpers import ChildrenMapTestMixin, MockTransformer
+
+
+log = getLogger(__name__)  # pylint: disable=invalid-name
+
+
+class TestTransformer1(MockTransformer):
+    """
+    Test Transformer class.
+    """
+    pass
+
+
+class TestTransformer2(MockTransformer):
+    """
+    Test Transformer class.
+    """
+    pass
+
+
+@attr(shard=2)
+class TestBlockStructureSerializer(ChildrenMapTestMixin, TestCase):
+    """
+    Tests for BlockStructureSerializer
+    """
+    def setUp(self):
+        super(TestBlockStructureSerializer, self).setUp()
+        self.children_map = self.DAG_CHILDREN_MAP
+        self.block_structure = self.create_block_structure(self.children_map)
+        for transformer in [TestTransformer1, TestTransformer2]:
+            self.block_structure._add_transformer(transformer)  # pylint: disable=protected-access
+            for block_key in self.block_structure:
+                self.block_structure.set_transformer_block_field(
+                    block_key, transformer, 'test', u'{} val {}'.format(transformer.name(), block_key),
+                )
+        for block_key in self.block_structure:
+            block_data = self.block_structure._get_or_create_block(block_key)  # pylint: disable=protected-access
+            block_data.display_name = u'Block {}'.format(block_key)
+
+    def deserialize(self, transformers=None):
+        """
+        Returns a block structure after a round-trip through the
+        serializer.
+        """
+        serialized_data = BlockStructureSerializer.serialize(self.block_structure)
+        block_relations, transformer_data, block_data_map = BlockStructureSerializer.deserialize(
+            serialized_data,
+            transformers,
+        )
+        return BlockStructureFactory.create_new(
+            self.block_structure.root_block_usage_key,
+            block_relations,
+            transformer_data,
+            block_data_map,
+        )
+
+    def test_round_trip(self):
+        block_structure = self.deserialize()
+        self.assert_block_structure(block_structure, self.children_map)
+        for block_key in self.block_structure:
+            self.assertEquals(
+                block_structure.get_parents(block_key),
+                self.block_structure.get_parents(block_key),
+            )
+            self.assertEquals(
+                block_structure.get_xblock_field(block_key, 'display_name'),
+                u'Block {}'.format(block_key),
+            )
+            for transformer in [TestTransformer1, TestTransformer2]:
+                self.assertEquals(
+                    block_structure.get_transformer_block_field(block_key, transformer, 'test'),
+                    u'{} val {}'.format(transformer.name(), block_key),
+                )
+        for transformer in [TestTransformer1, TestTransformer2]:
+            self.assertEquals(
+                block_structure._get_transformer_data_version(transformer),  # pylint: disable=protected-access
+                transformer.VERSION,
+            )
+
+    def test_partial(self):
+        block_structure = self.deserialize(transformers=[TestTransformer2])
+        self.assert_block_structure(block_structure, self.children_map)
+        for block_key in self.block_structure:
+            self.assertIsNone(block_structure.get_transformer_block_field(block_key, TestTransformer1, 'test'))
+            self.assertEquals(
+                block_structure.get_transformer_block_field(block_key, TestTransformer2, 'test'),
+                u'{} val {}'.format(TestTransformer2.name(), block_key),
+            )
+        # Versions of all transformers are still available.
+        self.assertEquals(
+            block_structure._get_transformer_data_version(TestTransformer1),  # pylint: disable=protected-access
+            TestTransformer1.VERSION,
+        )
+
+    def test_outdated_format(self):
+        serialized_data = BlockStructureSerializer.serialize(self.block_structure)
+        BlockStructureSerializer.FORMAT_VERSION += 1
+        self.addCleanup(setattr, BlockStructureSerializer, 'FORMAT_VERSION', BlockStructureSerializer.FORMAT_VERSION - 1)
+        self.assertIsNone(BlockStructureSerializer.deserialize(serialized_data))
+
+    def test_block_data_without_relations(self):
+        # Blocks can have collected data after they're removed from the structure.
+        block_data = self.block_structure._get_or_create_block(7)  # pylint: disable=protected-access
+        block_data.display_name = u'Removed block'
+        block_structure = self.deserialize()
+        self.assert_block_structure(block_structure, self.children_map)
+        self.assertEquals(block_structure.get_xblock_field(7, 'display_name'), u'Removed block')
+
+    def test_unknown_transformer(self):
+        block_structure = self.deserialize(transformers=['unknown transformer'])
+        self.assert_block_structure(block_structure, self.children_map)
+        for block_key in self.block_structure:
+            self.assertIsNone(block_structure.get_transformer_block_field(block_key, TestTransformer1, 'test'))
+
+
+# Eventually, exclude this attribute from regular unittests while running *only* tests
+# with this attribute during regular performance tests.
+# @attr("perf_test")
+@skip
+class TestBlockStructureSerializerPerformance(TestCase):
+    """
+    Benchmark comparing the compact serialization with a zpickle of the
+    block structure's internal data, for a synthetic 5,000-block course.
+    """
+    NUM_CHAPTERS = 10
+    NUM_SEQUENTIALS = 10
+    NUM_VERTICALS = 5
+    NUM_PROBLEMS = 9
+    NUM_LOADS = 5
+
+    def setUp(self):
+        super(TestBlockStructureSerializerPerformance, self).setUp()
+        self.block_structure = self._create_course_block_structure()
+
+    def _create_course_block_structure(self):
+        """
+        Returns a collected block structure for a synthetic course with
+        a chapter > sequential > vertical > problem hierarchy.
+        """
+        course_key = CourseLocator('org', 'course', 'run')
+        root_key = course_key.make_usage_key('course', 'course')
+        block_structure = BlockStructureBlockData(root_key)
+        for transformer in [TestTransformer1, TestTransformer2]:
+            block_structure._add_transformer(transformer)  # pylint: disable=protected-access
+
+        def add_block(parent_key, block_type, block_id):
+            """
+            Adds a block with collected data under the given parent.
+            """
+            block_key = course_key.make_usage_key(block_type, block_id)
+            block_structure._add_relation(parent_key, block_key)  # pylint: disable=protected-access
+            block_data = block_structure._get_or_create_block(block_key)  # pylint: disable=protected-access
+            block_data.display_name = u'Block {}'.format(block_id)
+            block_data.category = block_type
+            block_data.start = datetime(2016, 1, 1)
+            block_structure.set_transformer_block_field(block_key, TestTransformer1, 'merged_start', datetime(2016, 1, 1))
+            block_structure.set_transformer_block_field(block_key, TestTransformer2, 'staff_only', False)
+            return block_key
+
+        for chapter in xrange(self.NUM_CHAPTERS):
+            chapter_key = add_block(root_key, 'chapter', 'c{}'.format(chapter))
+            for sequential in xrange(self.NUM_SEQUENTIALS):
+                sequential_id = '{}s{}'.format(chapter, sequential)
+                sequential_key = add_block(chapter_key, 'sequential', sequential_id)
+                for vertical in xrange(self.NUM_VERTICALS):
+                    vertical_id = '{}v{}'.format(sequential_id, vertical)
+                    vertical_key = add_block(sequential_key, 'vertical', vertical_id)
+                    for problem in xrange(self.NUM_PROBLEMS):
+                        add_block(vertical_key, 'problem', '{}p{}'.format(vertical_id, problem))
+        return block_structure
+
+    def test_compare_with_zpickle(self):
+        # pylint: disable=protected-access
+        self.assertGreaterEqual(len(self.block_structure), 5000)
+
+        zpickled_data = zpickle((
+            self.block_structure._block_relations,
+            self.block_structure.transformer_data,
+            self.block_structure._block_data_map,
+        ))
+        serialized_data = BlockStructureSerializer.serialize(self.block_structure)
+
+        zpickle_load_time = timeit(lambda: zunpickle(zpickled_data), number=self.NUM_LOADS)
+        full_load_time = timeit(lambda: BlockStructureSerializer.deserialize(serialized_data), number=self.NUM_LOADS)
+        partial_load_time = timeit(
+            lambda: BlockStructureSerializer.deserialize(serialized_data, transformers=[TestTransformer1]),
+            number=self.NUM_LOADS,
+        )
+        log.info(
+            "BlockStructure of %d blocks. zpickle: %d bytes, %.4fs per load. "
+            "Compact: %d bytes, %.4fs per full load, %.4fs per partial load.",
+            len(self.block_structure),
+            len(zpickled_data),
+            zpickle_load_time / self.NUM_LOADS,
+            len(serialized_data),
+            full_load_time / self.NUM_LOADS,
+            partial_load_time / self.NUM_LOADS,
+        )
+        self.assertLess(len(serialized_data), len(zpickled_data))
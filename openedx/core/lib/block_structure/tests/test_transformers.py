@@ -81,3 +81,21 @@ class TestBlockStructureTransformers(ChildrenMapTestMixin, TestCase):
             self.assertTrue(self.transformers.is_collected_outdated(block_structure))
             self.transformers.collect(block_structure)
             self.assertFalse(self.transformers.is_collected_outdated(block_structure))
+
+    def test_transform_equivalence_key(self):
+        self.add_mock_transformer()
+        block_structure = MagicMock()
+
+        # By default, transforms are specific to the usage_info.
+        self.assertIsNone(self.transformers.transform_equivalence_key(block_structure))
+
+        with patch(
+            'openedx.core.lib.block_structure.tests.helpers.MockTransformer.transform_equivalence_key',
+            return_value='key1',
+        ):
+            self.assertIsNone(self.transformers.transform_equivalence_key(block_structure))
+            with patch(
+                'openedx.core.lib.block_structure.tests.helpers.MockFilteringTransformer.transform_equivalence_key',
+                return_value='key2',
+            ):
+                self.assertEquals(self.transformers.transform_equivalence_key(block_structure), ('key2', 'key1'))
@@ -28,6 +28,18 @@ class BlockStructureTransformer(object):
     #
     VERSION = 0
 
+    # Whether the transformer's collect method can be run on a partial
+    # block structure during an incremental update of the collected
+    # data.  The partial structure contains only the blocks that changed
+    # since the last collection, their descendants and all of their
+    # ancestors (up to the root).  Transformers that only percolate data
+    # down from ancestors to descendants (or that collect data for each
+    # block independently) can safely set this to True.  Transformers
+    # that aggregate data from descendants up to their ancestors during
+    # the collect phase must leave this as False, in which case the
+    # framework always falls back to a full collection.
+    SUPPORTS_INCREMENTAL_COLLECT = False
+
     @classmethod
     def name(cls):
         """
@@ -128,6 +140,35 @@ class BlockStructureTransformer(object):
         """
         raise NotImplementedError
 
+    def transform_equivalence_key(self, usage_info, block_structure):  # pylint: disable=unused-argument
+        """
+        Returns a hashable key identifying the inputs of this
+        transformer's transform for the given usage_info, such that
+        transforming the given block_structure for any two usage_infos
+        with equal keys yields identical results.  For example, a
+        transformer that only depends on whether the user has staff
+        access can return that boolean value, while a transformer whose
+        output is independent of the usage_info can return a constant.
+
+        This allows clients that transform a block structure for many
+        usage_infos (for example, for all learners in a course) to
+        compute the transform only once for each distinct combination of
+        keys of the requested transformers.
+
+        The default implementation returns None, which indicates that
+        the result of the transform is specific to the given usage_info
+        and can not be shared.
+
+        Arguments:
+            usage_info (any negotiated type) - A usage-specific object
+                that would be passed to the transform method.
+
+            block_structure (BlockStructureBlockData) - The collected
+                block structure that would be transformed.  It must not
+                be modified.
+        """
+        return None
+
 
 class FilteringTransformerMixin(BlockStructureTransformer):
     """
@@ -4,6 +4,7 @@ Module for a collection of BlockStructureTransformers.
 import functools
 from logging import getLogger
 
+from .block_structure import BLOCK_VERSION_FIELD
 from .exceptions import TransformerException
 from .transformer import FilteringTransformerMixin
 from .transformer_registry import TransformerRegistry
@@ -75,6 +76,10 @@ class BlockStructureTransformers(object):
         """
         Collects data for each registered transformer.
         """
+        # Record the edit version of each block so a later collection
+        # can be limited to only the blocks that have since changed.
+        block_structure.request_xblock_fields(BLOCK_VERSION_FIELD)
+
         for transformer in TransformerRegistry.get_registered_transformers():
             block_structure._add_transformer(transformer)  # pylint: disable=protected-access
             transformer.collect(block_structure)
@@ -82,6 +87,23 @@ class BlockStructureTransformers(object):
         # Collect all fields that were requested by the transformers.
         block_structure._collect_requested_xblock_fields()  # pylint: disable=protected-access
 
+    @classmethod
+    def supports_incremental_collect(cls):
+        """
+        Returns whether all registered transformers support collecting
+        their data on a partial block structure.
+        """
+        unsupported_transformers = [
+            transformer for transformer in TransformerRegistry.get_registered_transformers()
+            if not transformer.SUPPORTS_INCREMENTAL_COLLECT
+        ]
+        if unsupported_transformers:
+            logger.info(
+                "The following transformers do not support incremental collection: '%s'.",
+                [transformer.name() for transformer in unsupported_transformers],
+            )
+        return not unsupported_transformers
+
     @classmethod
     def is_collected_outdated(cls, block_structure):
         """
@@ -101,6 +123,24 @@ class BlockStructureTransformers(object):
 
         return bool(outdated_transformers)
 
+    def transform_equivalence_key(self, block_structure):
+        """
+        Returns a hashable key such that transforming the given block
+        structure with this collection for any two usage_infos with
+        equal keys yields identical results.  Returns None if the
+        result is specific to this collection's usage_info, that is, if
+        any of the transformers does not support sharing its transform.
+
+        See BlockStructureTransformer.transform_equivalence_key.
+        """
+        keys = []
+        for transformer in self._transformers['supports_filter'] + self._transformers['no_filter']:
+            key = transformer.transform_equivalence_key(self.usage_info, block_structure)
+            if key is None:
+                return None
+            keys.append(key)
+        return tuple(keys)
+
     def transform(self, block_structure):
         """
         The given block structure is transformed by each transformer in the